@@ -0,0 +1,177 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from metrics import ADMISSION_QUEUE_SECONDS, ADMISSION_REJECTIONS
+
+# -----------------------------
+# Admission settings
+# -----------------------------
+DEFAULT_TIMEOUT = 30.0  # seconds a client waits for a response unless it sends TIMEOUT_HEADER
+TIMEOUT_HEADER = "x-request-timeout"
+MAX_CLIENTS = 10000  # token buckets kept (least recently seen dropped first)
+EWMA_WEIGHT = 0.2  # weight of the latest service time in the running estimate
+
+
+class Rejected(Exception):
+    """A request turned away; the client should retry after retry_after seconds."""
+
+    def __init__(self, reason, retry_after, detail):
+        super().__init__(detail)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class TokenBucket:
+    """rate requests per second on average, with bursts of up to burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Spend a token; returns 0 on success, otherwise the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RouteLimit:
+    """
+    Concurrency limit and bounded FIFO wait queue for one route.
+
+    The expected wait of a new request is estimated from its place in the
+    queue and a running average of the route's service time. A request is
+    rejected up front when the queue is full or when that wait plus its own
+    service time would exceed the client's timeout, rather than queueing work
+    whose answer would arrive after the client has gone.
+
+    Waiters are plain futures on the running loop, so one limit can serve
+    several event loops over its life (the benchmark's TestClients).
+
+    Args:
+        name: Route label for metrics and messages
+        concurrency: Requests served at once
+        queue: Requests allowed to wait for a slot
+        service_seconds: Initial service time estimate, until requests have been timed
+        rate, burst: Per-client token bucket (requests per second, burst size); rate None turns it off
+    """
+
+    def __init__(self, name, concurrency, queue, service_seconds, rate=None, burst=1):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.service_seconds = service_seconds
+        self.rate = rate
+        self.burst = burst
+        self.active = 0
+        self.waiters = deque()
+        self.buckets = OrderedDict()
+
+    def expected_wait(self, position=None):
+        """Seconds until a request at position (default: the back of the queue) gets a slot."""
+        position = len(self.waiters) if position is None else position
+        if self.active < self.concurrency and position == 0:
+            return 0.0
+        return (position // self.concurrency + 1) * self.service_seconds
+
+    def _bucket(self, client):
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(self.rate, self.burst)
+            if len(self.buckets) > MAX_CLIENTS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+        return bucket
+
+    def _reject(self, reason, retry_after, detail):
+        ADMISSION_REJECTIONS.labels(self.name, reason).inc()
+        return Rejected(reason, max(1, math.ceil(retry_after)), detail)
+
+    async def acquire(self, client, timeout):
+        """
+        Wait for a slot or raise Rejected.
+
+        Args:
+            client: Key of the client's token bucket
+            timeout: Seconds the client will wait for the whole response
+        """
+        if self.rate is not None:
+            wait = self._bucket(client).take()
+            if wait:
+                raise self._reject("rate_limited", wait, f"Too many {self.name} requests from this client")
+        wait = self.expected_wait()
+        if wait and len(self.waiters) >= self.queue:
+            raise self._reject("queue_full", wait, f"{self.name} is at capacity")
+        if wait + self.service_seconds > timeout:
+            raise self._reject("deadline", wait,
+                               f"{self.name} would not answer within {timeout:g}s (about {wait:.0f}s queued)")
+        if not wait:
+            self.active += 1
+            ADMISSION_QUEUE_SECONDS.labels(self.name).observe(0)
+            return
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout - self.service_seconds)
+        except BaseException as error:
+            # Past the deadline while queued (the estimate was low), or the client went away;
+            # a slot handed over just before is passed on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            if isinstance(error, asyncio.TimeoutError):
+                raise self._reject("deadline", self.expected_wait(),
+                                   f"{self.name} queue wait exceeded the deadline") from None
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        ADMISSION_QUEUE_SECONDS.labels(self.name).observe(time.monotonic() - start)
+
+    def release(self, seconds=None):
+        """Free a slot, handing it to the next waiter, and fold the served request's time into the estimate."""
+        if seconds is not None:
+            self.service_seconds += EWMA_WEIGHT * (seconds - self.service_seconds)
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot moves to the waiter, active stays the same
+                return
+        self.active -= 1
+
+    def status(self):
+        return {"concurrency": self.concurrency, "active": self.active, "queued": len(self.waiters),
+                "queue": self.queue, "service_seconds": round(self.service_seconds, 3),
+                "expected_wait_seconds": round(self.expected_wait(), 3)}
+
+
+def request_timeout(headers, default=DEFAULT_TIMEOUT):
+    """The client's timeout from TIMEOUT_HEADER (seconds), or default when missing or malformed."""
+    try:
+        timeout = float(headers.get(TIMEOUT_HEADER, default))
+    except ValueError:
+        return default
+    return timeout if timeout > 0 and math.isfinite(timeout) else default
+
+
+def client_key(request):
+    """
+    Token bucket key: the client's address.
+
+    Identifiers the client sends itself (e.g. an X-Client-Id header) are not
+    used, since a new one per request would get a fresh bucket every time.
+    Behind a reverse proxy, run uvicorn with --proxy-headers and
+    --forwarded-allow-ips so the address is the original client's.
+    """
+    return request.client.host if request.client else "unknown"
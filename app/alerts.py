@@ -0,0 +1,363 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+import webhooks
+from dataset import API_COLUMNS, CATEGORY_COLUMNS, format_day
+from metrics import record_alerts
+from watchlists import WATCHLIST_ID
+
+# -----------------------------
+# Rules
+# -----------------------------
+# A rule compares an indicator column with a number or with another column times a factor, e.g.
+#   RSI crosses_below 30, MA20 crosses_above MA50, close crosses_above BB_UPPER, vol crosses_above 3 x VOL_AVG20.
+# Rules are edge-triggered: an alert fires when the comparison turns true for a symbol, not while it stays true.
+OPERATORS = ("crosses_above", "crosses_below")
+
+# Average volume of the 20 days before the latest one (derived by alert_frame)
+VOLUME_AVERAGE = "VOL_AVG20"
+RULE_COLUMNS = [c for c in API_COLUMNS if c not in CATEGORY_COLUMNS and c != 'tradedate'] + [VOLUME_AVERAGE]
+
+MAX_RULES_PER_OWNER = 500
+RECENT_UPDATES = 100  # evaluations whose fired alerts stay readable
+
+
+def validate_rule(rule, columns=RULE_COLUMNS):
+    """
+    Normalized copy of a rule dict, or ValueError.
+
+    Fields: owner, left (column), op (crosses_above | crosses_below), right
+    (number or column), factor (multiplies a right-hand column, default 1),
+    symbols (optional; all symbols when empty), name and webhook_url
+    (optional; fired alerts are POSTed there; see webhooks.check_url).
+    """
+    owner = str(rule.get("owner", ""))
+    if not WATCHLIST_ID.match(owner):
+        raise ValueError("Owner must be 1-64 letters, digits, '_', '-' or '.'")
+    left, op, right = rule.get("left"), rule.get("op"), rule.get("right")
+    if left not in columns:
+        raise ValueError(f"Unknown column {left!r}")
+    if op not in OPERATORS:
+        raise ValueError(f"op must be one of {list(OPERATORS)}")
+    if isinstance(right, str):
+        if right not in columns:
+            raise ValueError(f"Unknown column {right!r}")
+    elif isinstance(right, (int, float)) and not isinstance(right, bool) and np.isfinite(right):
+        right = float(right)
+    else:
+        raise ValueError("right must be a number or a column")
+    factor = float(rule.get("factor") or 1.0)
+    if not np.isfinite(factor) or factor <= 0:
+        raise ValueError("factor must be positive")
+    webhook_url = rule.get("webhook_url") or None
+    if webhook_url is not None:
+        webhooks.check_url(webhook_url)
+    symbols = list(dict.fromkeys(s.strip().upper() for s in rule.get("symbols") or () if s.strip()))
+    return {"id": rule.get("id") or uuid.uuid4().hex, "owner": owner, "name": rule.get("name") or None,
+            "left": left, "op": op, "right": right, "factor": factor, "symbols": symbols,
+            "webhook_url": webhook_url, "created_at": rule.get("created_at") or time.time()}
+
+
+def describe_rule(rule):
+    right = rule["right"]
+    if not isinstance(right, str):
+        right = f"{right:g}"
+    elif rule["factor"] != 1:
+        right = f"{rule['factor']:g} x {right}"
+    return f"{rule['left']} {rule['op'].replace('_', ' ')} {right}"
+
+
+def alert_frame(df):
+    """
+    Latest row of every symbol with the rule columns, indexed by symbol.
+
+    Args:
+        df: Frame from dataset.load_stock_data (sorted by symbol then date)
+
+    Returns:
+        DataFrame with 'tradedate' and the RULE_COLUMNS present in df
+    """
+    codes = df['symbol'].array.codes
+    ends = np.flatnonzero(np.r_[codes[1:] != codes[:-1], True]) if len(codes) else np.array([], dtype=int)
+    starts = np.r_[0, ends[:-1] + 1] if len(ends) else ends
+    columns = ['tradedate'] + [c for c in RULE_COLUMNS if c in df.columns]
+    frame = df.iloc[ends][columns].copy()
+    frame.index = df['symbol'].iloc[ends].astype(str).to_numpy()
+    # Full 20-day average volume before the latest day, from a cumulative sum over all rows
+    volume = np.r_[0.0, np.cumsum(df['vol'].to_numpy(dtype=np.float64))]
+    first = np.maximum(starts, ends - 20)
+    frame[VOLUME_AVERAGE] = np.where(ends - first == 20, (volume[ends] - volume[first]) / 20, np.nan)
+    return frame
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+class FiredAlerts:
+    """
+    Alerts fired by one evaluation, kept column-wise.
+
+    A busy day can fire tens of thousands of alerts; building a dict per
+    alert would cost more than the evaluation itself, so dicts are only
+    built for the alerts a reader asks for.
+    """
+
+    def __init__(self, first_id, rules, descriptions, owners, rows, symbols, days, values, thresholds, fired_at):
+        self.first_id = first_id
+        self.rules = rules
+        self.descriptions = descriptions
+        self.rows = rows
+        self.owners = owners[rows]
+        self.symbols = symbols
+        self.days = days
+        self.values = values
+        self.thresholds = thresholds
+        self.fired_at = fired_at
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def last_id(self):
+        return self.first_id + len(self.rows) - 1
+
+    def select(self, last_id=0, owner=None, positions=None):
+        """Alerts with an id above last_id (and of one owner), as dicts."""
+        if positions is None:
+            keep = np.arange(len(self.rows)) >= last_id - self.first_id + 1
+            if owner is not None:
+                keep &= self.owners == owner
+            positions = np.flatnonzero(keep)
+        day_of = {}
+        alerts = []
+        for n in positions.tolist():
+            rule, day = self.rules[self.rows[n]], self.days[n]
+            if day not in day_of:
+                day_of[day] = None if np.isnan(day) else format_day(day)
+            alerts.append({"id": self.first_id + n, "rule_id": rule["id"], "owner": rule["owner"], "name": rule["name"],
+                           "symbol": self.symbols[n], "condition": self.descriptions[self.rows[n]],
+                           "date": day_of[day], "value": round(float(self.values[n]), 4),
+                           "threshold": round(float(self.thresholds[n]), 4), "fired_at": self.fired_at})
+        return alerts
+
+
+class AlertEngine:
+    """
+    Registered alert rules, evaluated as one vectorized pass over all symbols.
+
+    Rules are compiled into arrays (left column, right column or constant,
+    factor, direction, symbol scope), so evaluating a new day or tick is a
+    few numpy operations over a (rules, symbols) matrix. Per rule and symbol
+    the engine keeps the last truth value (1, 0, or -1 when unknown) and
+    fires only on a 0 -> 1 transition. A rule added between updates is armed
+    against the last values seen, so it fires on the next crossing rather
+    than on a condition that already holds.
+
+    Rules persist to a JSON file; the edge state lives in memory and is
+    re-armed by the first evaluation after a restart. Fired alerts are kept
+    in a ring buffer with increasing ids (for SSE and polling) and POSTed to
+    the rule's webhook_url.
+    """
+
+    def __init__(self, path=None):
+        self.path = None if path is None else str(path)
+        self.lock = threading.Lock()
+        self.rules = {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.rules = {rule["id"]: rule for rule in json.load(f)}
+        self.columns = list(RULE_COLUMNS)
+        self.column_position = {c: i for i, c in enumerate(self.columns)}
+        self.symbols, self.position = [], {}
+        self.values = np.empty((len(self.columns), 0))  # last seen values, (columns, symbols)
+        self.days = np.empty(0)
+        self.compiled_ids = []
+        self.state = np.empty((0, 0), dtype=np.int8)
+        self.dirty = True
+        self.recent = deque(maxlen=RECENT_UPDATES)
+        self.last_id = 0
+        self.webhooks = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alert-webhook")
+
+    def _save(self):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self.rules.values()), f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    # -----------------------------
+    # Rule registry
+    # -----------------------------
+    def add(self, rules):
+        """Validate and register rules (a list of dicts); returns them normalized."""
+        rules = [validate_rule(rule) for rule in rules]
+        with self.lock:
+            counts = {}
+            for rule in list(self.rules.values()) + rules:
+                counts[rule["owner"]] = counts.get(rule["owner"], 0) + 1
+            over = [owner for owner, n in counts.items() if n > MAX_RULES_PER_OWNER]
+            if over:
+                raise ValueError(f"An owner holds at most {MAX_RULES_PER_OWNER} alert rules")
+            self.rules.update((rule["id"], rule) for rule in rules)
+            self.dirty = True
+            self._save()
+        return rules
+
+    def remove(self, rule_id):
+        with self.lock:
+            if self.rules.pop(rule_id, None) is None:
+                return False
+            self.dirty = True
+            self._save()
+        return True
+
+    def get(self, rule_id):
+        return self.rules.get(rule_id)
+
+    def list(self, owner=None):
+        return [rule for rule in self.rules.values() if owner is None or rule["owner"] == owner]
+
+    # -----------------------------
+    # Evaluation
+    # -----------------------------
+    def _compile(self):
+        """Condition arrays and the edge state for the current rules and symbols; new rules are armed."""
+        rules = list(self.rules.values())
+        # Rules with the same comparison (e.g. everyone's "MA20 crosses above MA50") share one condition row
+        conditions, self.condition = {}, np.empty(len(rules), dtype=np.intp)
+        for i, r in enumerate(rules):
+            right = r["right"]
+            key = (self.column_position[r["left"]], self.column_position[right] if isinstance(right, str) else -1,
+                   np.nan if isinstance(right, str) else right, r["factor"], r["op"] == "crosses_below")
+            self.condition[i] = conditions.setdefault(key, len(conditions))
+        keys = list(conditions) or [(0, -1, np.nan, 1.0, False)]
+        self.left = np.array([k[0] for k in keys], dtype=np.intp)
+        self.right = np.array([k[1] for k in keys], dtype=np.intp)
+        self.constant = np.array([k[2] for k in keys])
+        self.factor = np.array([k[3] for k in keys])
+        self.below = np.array([k[4] for k in keys], dtype=bool)
+        self.scope = np.ones((len(rules), len(self.symbols)), dtype=bool)
+        for i, rule in enumerate(rules):
+            if rule["symbols"]:
+                self.scope[i] = False
+                self.scope[i, [self.position[s] for s in rule["symbols"] if s in self.position]] = True
+
+        old = {rule_id: row for rule_id, row in zip(self.compiled_ids, self.state)}
+        state = np.full((len(rules), len(self.symbols)), -1, dtype=np.int8)
+        fresh = []
+        for i, rule in enumerate(rules):
+            row = old.get(rule["id"])
+            if row is None:
+                fresh.append(i)
+            else:
+                state[i, :len(row)] = row
+        self.compiled_ids = [rule["id"] for rule in rules]
+        self.rule_list = rules
+        self.descriptions = [describe_rule(rule) for rule in rules]
+        self.owners = np.array([rule["owner"] for rule in rules], dtype=object)
+        self.webhook_rules = {i for i, rule in enumerate(rules) if rule["webhook_url"]}
+        if fresh:
+            fresh = np.array(fresh)
+            state[fresh] = self._truth(self.values, slice(None), fresh)[0]
+        self.state = state
+        self.dirty = False
+
+    def _truth(self, values, symbols, rows=slice(None)):
+        """
+        Truth per rule row and symbol column: 1, 0 or -1 (unknown or out of scope).
+
+        Also returns the left and right values per condition row, for the alerts.
+        """
+        left = values[self.left]
+        right = np.where((self.right >= 0)[:, None], values[self.right] * self.factor[:, None], self.constant[:, None])
+        with np.errstate(invalid="ignore"):
+            holds = np.where(self.below[:, None], left < right, left > right)
+        held = np.where(np.isnan(left) | np.isnan(right), -1, holds).astype(np.int8)
+        truth = np.where(self.scope[rows][:, symbols], held[self.condition[rows]], np.int8(-1))
+        return truth, left, right
+
+    def evaluate(self, frame):
+        """
+        Evaluate all rules on new data and fire alerts on crossings.
+
+        Args:
+            frame: Latest values indexed by symbol (see alert_frame); a tick
+                may carry only the symbols that changed
+
+        Returns:
+            The fired alerts
+        """
+        start = time.perf_counter()
+        with self.lock:
+            added = [s for s in frame.index if s not in self.position]
+            if added:
+                for symbol in added:
+                    self.position[symbol] = len(self.symbols)
+                    self.symbols.append(symbol)
+                self.values = np.hstack([self.values, np.full((len(self.columns), len(added)), np.nan)])
+                self.days = np.r_[self.days, np.full(len(added), np.nan)]
+                self.state = np.hstack([self.state, np.full((len(self.state), len(added)), -1, dtype=np.int8)])
+                self.dirty = True
+            if self.dirty:
+                self._compile()
+
+            symbols = list(frame.index)
+            positions = np.array([self.position[s] for s in symbols], dtype=np.intp)
+            values = frame.reindex(columns=self.columns).to_numpy(dtype=np.float64).T
+            truth, left, right = self._truth(values, positions)
+            rows, cols = np.nonzero((self.state[:, positions] == 0) & (truth == 1))
+            self.state[:, positions] = truth
+            self.values[:, positions] = values
+            if 'tradedate' in frame:
+                self.days[positions] = frame['tradedate'].to_numpy(dtype=np.float64)
+
+            conditions = self.condition[rows]
+            fired = FiredAlerts(self.last_id + 1, self.rule_list, self.descriptions, self.owners, rows,
+                                np.array(symbols, dtype=object)[cols], self.days[positions[cols]],
+                                left[conditions, cols], right[conditions, cols], time.time())
+            self.last_id += len(fired)
+            if len(fired):
+                self.recent.append(fired)
+            batches = {}
+            if self.webhook_rules:
+                hooked = np.flatnonzero(np.isin(rows, list(self.webhook_rules)))
+                for alert in fired.select(positions=hooked):
+                    batches.setdefault(self.rules[alert["rule_id"]]["webhook_url"], []).append(alert)
+        record_alerts(time.perf_counter() - start, len(fired))
+        for url, alerts in batches.items():
+            self.webhooks.submit(self._deliver, url, alerts)
+        return fired
+
+    def since(self, last_id=0, owner=None):
+        """Fired alerts with an id above last_id, oldest first."""
+        with self.lock:
+            batches = [batch for batch in self.recent if batch.last_id > last_id]
+        return [alert for batch in batches for alert in batch.select(last_id, owner)]
+
+    # -----------------------------
+    # Webhook delivery
+    # -----------------------------
+    @staticmethod
+    def _deliver(url, alerts, attempts=3):
+        for attempt in range(attempts):
+            try:
+                if webhooks.post(url, {"alerts": alerts}).ok:
+                    return
+            except ValueError as e:
+                print(f"⚠️  Not delivering {len(alerts)} alerts: {e}")
+                return
+            except requests.RequestException:
+                pass
+            time.sleep(2 ** attempt)
+        print(f"⚠️  Could not deliver {len(alerts)} alerts to {url}")
+
@@ -459,16 +459,24 @@
 
 # ============================================================================================================================
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+from pydantic import BaseModel, Field
 import pandas as pd
+import asyncio
+import threading
+import json
 import os
+import secrets
+import time
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Literal, Union
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -477,21 +485,139 @@ load_dotenv()
 # Add the app directory to the Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from rag_trading_bot import create_rag_bot, analyze_stock
+from rag_trading_bot import analyze_stock, create_rag_bot, load_embeddings
+from llm_backends import configured_backends
+from recommendation import Recommendation, render_markdown
+from semantic_cache import SemanticCache, cache_question
+from alerts import OPERATORS as ALERT_OPERATORS, AlertEngine, alert_frame
+from correlations import track_correlations
+from risk_engine import (HORIZON as RISK_HORIZON, LOOKBACK as RISK_LOOKBACK, METHODS as RISK_METHODS,
+                         PATHS as RISK_PATHS, describe as describe_risk, risk_inputs, simulate as simulate_risk)
+from pattern_search import WINDOWS as PATTERN_WINDOWS, PatternIndex
+from timeframes import TIMEFRAMES, period_starts, timeframe_path
+from dataset import API_COLUMNS, EPOCH, exact_float64, format_day, latest_position, load_stock_data, symbol_exists, to_float, to_int
+from job_queue import FINISHED, JobQueue
+from admission import Rejected, RouteLimit, client_key, request_timeout
+from profiling import RequestProfiler
+from webhooks import check_url as check_webhook_url
+from watchlists import Recommendations, Snapshot, WatchlistStore, summarize as summarize_watchlist
+from http_cache import (HashedStaticFiles, ResponseCache, conditional_response,
+                        make_etag, market_cache_control, snapshot_version)
+from metrics import HTTP_REQUEST_SECONDS, data_load, render_latest, span, stage
+
+# Brotli is optional; without brotli-asgi installed responses are gzip-compressed only
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 # -----------------------------
 # Global variables
 # -----------------------------
 qa_bot: Optional[any] = None
+structured_bot: Optional[any] = None
+embeddings: Optional[any] = None
+semantic_cache: Optional[SemanticCache] = None
 stock_data: Optional[pd.DataFrame] = None
+stock_data_version: Optional[str] = None
+stock_data_modified: Optional[float] = None
+stock_data_lock = threading.Lock()  # one reload (and alert evaluation) at a time: handlers and the data watcher
+
+DATA_FILE = Path(__file__).parent.parent / "data/processed/stock_data_with_indicators.csv"
+
+# Serialized /stocks, /stocks/{symbol} and /indicators bodies for the current data version
+response_cache = ResponseCache()
+
+# Answers to near-duplicate /analyze questions (SEMANTIC_CACHE=0 turns it off). At 0.95 strategies must
+# match almost exactly after normalization; see SemanticCache.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "1") != "0"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", 6 * 3600))
+
+# Per-user watchlists, the latest-day snapshot they are summarized from, and their LLM recommendations
+# (watchlist analyses run as "analyze" jobs on the job queue below)
+WATCHLIST_FILE = Path(os.getenv("WATCHLIST_FILE", Path(__file__).parent.parent / "data/watchlists.json"))
+WATCHLIST_JOB_PRIORITY = -1  # behind interactive POST /jobs/analyze submissions (priority 0 by default)
+watchlists: Optional[WatchlistStore] = None
+snapshot: Optional[Snapshot] = None
+recommendations = Recommendations()
+
+# Persistent queue behind /jobs (POST /jobs/analyze returns at once; results are polled, streamed or pushed)
+JOB_DB = Path(os.getenv("JOB_DB", Path(__file__).parent.parent / "data/jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_EVENT_STREAMS = int(os.getenv("JOB_EVENT_STREAMS", 100))  # concurrent SSE connections (job and alert streams)
+job_queue: Optional[JobQueue] = None
+job_event_streams = 0
+
+# Normalized price windows of every symbol and date behind /stocks/{symbol}/similar (built on first use)
+pattern_index: Optional[PatternIndex] = None
+pattern_index_lock = threading.Lock()
+
+# Edge-triggered alert rules, evaluated on every data reload; a watcher thread polls the data file for changes
+ALERT_RULES_FILE = Path(os.getenv("ALERT_RULES_FILE", Path(__file__).parent.parent / "data/alert_rules.json"))
+ALERT_POLL_SECONDS = float(os.getenv("ALERT_POLL_SECONDS", 60))
+alert_engine: Optional[AlertEngine] = None
+
+# Rolling (or, with CORRELATION_HALFLIFE, exponentially weighted) return correlations behind /correlations and /pairs
+CORRELATION_WINDOW = int(os.getenv("CORRELATION_WINDOW", 60))
+CORRELATION_HALFLIFE = float(os.getenv("CORRELATION_HALFLIFE")) if os.getenv("CORRELATION_HALFLIFE") else None
+correlations = None
+correlations_version: Optional[str] = None
+correlations_lock = threading.Lock()
+
+# Weekly and monthly bars with indicators (timeframes.py, written by the pipeline next to DATA_FILE), by timeframe
+timeframe_data = {}  # timeframe -> (file version, DataFrame)
+
+# Admission control for the expensive routes: a concurrency limit, a bounded queue that turns away (429) requests
+# it could not serve within the client's timeout, and per-client token buckets. Other routes never wait behind
+# them. ADMISSION=0 turns it off.
+ADMISSION_ENABLED = os.getenv("ADMISSION", "1") != "0"
+ANALYZE_CONCURRENCY = int(os.getenv("ANALYZE_CONCURRENCY", 4))
+ANALYZE_QUEUE = int(os.getenv("ANALYZE_QUEUE", 16))
+ANALYZE_CLIENT_RATE = float(os.getenv("ANALYZE_CLIENT_RATE", 0.5))  # /analyze requests per second per client
+ANALYZE_CLIENT_BURST = int(os.getenv("ANALYZE_CLIENT_BURST", 10))
+admission_limits = {
+    ("POST", "/analyze"): RouteLimit("/analyze", ANALYZE_CONCURRENCY, ANALYZE_QUEUE, service_seconds=5.0,
+                                     rate=ANALYZE_CLIENT_RATE, burst=ANALYZE_CLIENT_BURST),
+    ("GET", "/stocks/{symbol}/risk"): RouteLimit("/stocks/{symbol}/risk", 2, 32, service_seconds=0.1, rate=5, burst=20),
+    ("GET", "/stocks/{symbol}/similar"): RouteLimit("/stocks/{symbol}/similar", 2, 32, service_seconds=0.1, rate=5,
+                                                    burst=20),
+}
+admission_routes = None  # [(APIRoute, RouteLimit)], resolved on the first request
+
+# On-demand profiling (profiling.py): PROFILE_SAMPLE_RATE of requests run under a sampling profiler and their folded
+# stacks go to PROFILE_DIR; requests slower than SLOW_REQUEST_SECONDS (0 turns it off) are kept with their stage
+# timings and stacks. /admin/profiling changes both at runtime; the /admin routes need ADMIN_TOKEN.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path(__file__).parent.parent / "data/profiles"))
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 5))
+profiler = RequestProfiler(PROFILE_DIR, sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+                           interval=float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000,
+                           slow_seconds=SLOW_REQUEST_SECONDS or None)
 
 # -----------------------------
 # FastAPI initialization
 # -----------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the background work with the server rather than on the first request that needs it: the job workers
+    (jobs left by a previous process resume) and the alert engine with its data watcher (alerts fire on data
+    updates even when no alert route has been called)
+    """
+    global job_queue
+    get_job_queue()
+    await asyncio.to_thread(get_alert_engine)
+    yield
+    if job_queue is not None:
+        await asyncio.to_thread(job_queue.stop)
+        job_queue = None
+
 app = FastAPI(
     title="NEPSE Trading Bot API",
     description="AI-Powered Stock Analysis API for Nepal Stock Exchange",
     version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -503,36 +629,382 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
+# Response compression (Brotli when available, gzip otherwise)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=500, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Mount static files (content-hashed aliases are served with a long max-age)
 static_path = Path(__file__).parent.parent / "static"
+static_files = None
 if static_path.exists():
-    app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
+    static_files = HashedStaticFiles(directory=str(static_path))
+    app.mount("/static", static_files, name="static")
+
+# Admission control; registered before the metrics middleware so rejections are timed and counted too
+def admission_limit(request):
+    """The RouteLimit of the route a request is for, or None for unlimited routes."""
+    global admission_routes
+    if admission_routes is None:
+        admission_routes = [(route, admission_limits[(method, route.path)])
+                            for route in app.router.routes if isinstance(route, APIRoute)
+                            for method in route.methods if (method, route.path) in admission_limits]
+    for route, limit in admission_routes:
+        if route.matches(request.scope)[0] == Match.FULL:
+            return route, limit
+    return None, None
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    route, limit = admission_limit(request) if ADMISSION_ENABLED else (None, None)
+    if limit is None:
+        return await call_next(request)
+    try:
+        await limit.acquire(client_key(request), request_timeout(request.headers))
+    except Rejected as rejected:
+        request.scope["route"] = route
+        return JSONResponse({"detail": rejected.detail, "reason": rejected.reason}, status_code=429,
+                            headers={"Retry-After": str(rejected.retry_after)})
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        limit.release(time.perf_counter() - start)
+
+# Request latency by route template (and an OpenTelemetry root span when tracing is on); sampled and slow requests
+# are captured by the profiler
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    capture = profiler.begin(request.method, request.url.path) if profiler.enabled else None
+    try:
+        with span(f"{request.method} {request.url.path}"):
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - start)
+        if capture is not None:
+            profiler.end(capture, route, status)
 
 # -----------------------------
 # Helper functions for lazy loading
 # -----------------------------
+def get_embeddings():
+    global embeddings
+    if embeddings is None:
+        embeddings = load_embeddings()
+    return embeddings
+
 def get_qa_bot():
     global qa_bot
     if qa_bot is None:
-        if not os.getenv("GOOGLE_API_KEY"):
-            print("⚠️  Warning: GOOGLE_API_KEY not set!")
+        if not configured_backends():
+            print("⚠️  Warning: no LLM backend configured (set GOOGLE_API_KEY or LLM_BACKEND)!")
         else:
-            qa_bot = create_rag_bot()
+            qa_bot = create_rag_bot(embeddings=get_embeddings())
             print("✅ RAG bot initialized")
     return qa_bot
 
+def get_structured_bot():
+    global structured_bot
+    if structured_bot is None:
+        if not configured_backends():
+            print("⚠️  Warning: no LLM backend configured (set GOOGLE_API_KEY or LLM_BACKEND)!")
+        else:
+            structured_bot = create_rag_bot(embeddings=get_embeddings(), structured=True)
+            print("✅ Structured RAG bot initialized")
+    return structured_bot
+
+def get_semantic_cache():
+    global semantic_cache
+    if semantic_cache is None and SEMANTIC_CACHE_ENABLED:
+        semantic_cache = SemanticCache(get_embeddings(), threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL)
+    return semantic_cache
+
 def get_stock_data():
-    global stock_data
-    if stock_data is None:
+    """Load the processed data, reloading it when the file on disk changes."""
+    global stock_data, stock_data_version, stock_data_modified
+    try:
+        stat = DATA_FILE.stat()
+    except OSError:
+        stat = None
+    version = snapshot_version(stat) if stat else None
+
+    def stale():
+        return stock_data is None or (version is not None and version != stock_data_version)
+
+    if stale():
+        with stock_data_lock:
+            if not stale():
+                return stock_data  # another caller loaded this version while we waited
+            try:
+                with data_load("stock_data"):
+                    df = load_stock_data(DATA_FILE)
+                stock_data = df
+                stock_data_version = version
+                stock_data_modified = stat.st_mtime
+                print(f"✅ Loaded {len(stock_data)} records for {stock_data['symbol'].nunique()} symbols")
+            except Exception as e:
+                print(f"❌ Failed to load stock data: {e}")
+                return stock_data
+            if alert_engine is not None:
+                fired = alert_engine.evaluate(alert_frame(df))
+                print(f"✅ Alert rules evaluated on the new data: {len(fired)} fired")
+    return stock_data
+
+def get_timeframe_data(timeframe):
+    """
+    Bars for a timeframe and their file version, reloading when the file changes.
+
+    Returns:
+        (DataFrame, version), or (None, None) when the bars haven't been built
+    """
+    if timeframe == "daily":
+        return get_stock_data(), stock_data_version
+    path = timeframe_path(DATA_FILE, timeframe)
+    try:
+        version = snapshot_version(path.stat())
+    except OSError:
+        return None, None
+    cached = timeframe_data.get(timeframe)
+    if cached is None or cached[0] != version:
+        with data_load(f"{timeframe}_bars"):
+            df = load_stock_data(path, columns=[*API_COLUMNS, 'days'])
+        cached = timeframe_data[timeframe] = (version, df)
+        print(f"✅ Loaded {len(df)} {timeframe} bars")
+    return cached[1], cached[0]
+
+def get_watchlists():
+    global watchlists
+    if watchlists is None:
+        watchlists = WatchlistStore(WATCHLIST_FILE)
+    return watchlists
+
+def watch_stock_data():
+    """Reload the data (and so evaluate alert rules) when the file changes, without waiting for a request."""
+    while True:
+        time.sleep(ALERT_POLL_SECONDS)
         try:
-            # Use relative path for portability
-            data_file = Path(__file__).parent.parent / "data/processed/stock_data_with_indicators.csv"
-            stock_data = pd.read_csv(data_file)
-            stock_data['tradedate'] = pd.to_datetime(stock_data['tradedate'])
-            print(f"✅ Loaded {len(stock_data)} records for {stock_data['symbol'].nunique()} symbols")
+            get_stock_data()
         except Exception as e:
-            print(f"❌ Failed to load stock data: {e}")
-    return stock_data
+            print(f"❌ Data watcher failed: {e}")
+
+def get_alert_engine():
+    global alert_engine
+    if alert_engine is None:
+        engine = AlertEngine(ALERT_RULES_FILE)
+        get_stock_data()
+        with stock_data_lock:
+            if stock_data is not None:
+                # Arms the rules on the current data; nothing fires until the next update
+                engine.evaluate(alert_frame(stock_data))
+            alert_engine = engine
+        threading.Thread(target=watch_stock_data, name="data-watcher", daemon=True).start()
+        print(f"✅ Alert engine started with {len(engine.rules)} rules")
+    return alert_engine
+
+def with_correlations(df, query):
+    """
+    Run query(tracker) on the return correlations of the current data version.
+
+    New trading days are applied as incremental updates; the lock keeps
+    queries from reading a matrix mid-update.
+    """
+    global correlations, correlations_version
+    with correlations_lock:
+        if correlations is None or correlations_version != stock_data_version:
+            with data_load("correlations"):
+                correlations, applied = track_correlations(df, CORRELATION_WINDOW, CORRELATION_HALFLIFE, correlations)
+            correlations_version = stock_data_version
+            print(f"✅ Correlations {'rebuilt' if applied is None else f'updated with {applied} new days'}"
+                  f" for {len(correlations.symbols)} symbols")
+        return query(correlations)
+
+def get_snapshot(df):
+    """Latest row per symbol, rebuilt when the data version changes."""
+    global snapshot
+    if snapshot is None or snapshot.version != stock_data_version:
+        snapshot = Snapshot(df, stock_data_version)
+    return snapshot
+
+def get_pattern_index(df):
+    """Pattern-similarity index for the current data version (a build takes seconds; callers run it off the event loop)."""
+    global pattern_index
+    with pattern_index_lock:
+        if pattern_index is None or pattern_index.version != stock_data_version:
+            with data_load("pattern_index"):
+                pattern_index = PatternIndex(df, stock_data_version)
+            print(f"✅ Pattern index built: {pattern_index.windows()} windows")
+    return pattern_index
+
+def risk_json(df, symbol, horizon=RISK_HORIZON, paths=RISK_PATHS, method="bootstrap"):
+    """Serialized Monte Carlo risk for a symbol's latest day"""
+    position = latest_position(df, symbol)
+    if position is None:
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    rows = df.iloc[max(0, position - RISK_LOOKBACK):position + 1]
+    with stage("risk"):
+        risk = simulate_risk(risk_inputs(rows[rows['symbol'] == symbol]), paths=paths, horizon=horizon, method=method)
+    if risk is None:
+        raise HTTPException(status_code=422, detail=f"Not enough price history for {symbol}")
+    return json.dumps(risk, separators=(",", ":")).encode()
+
+def get_risk(df, symbol):
+    """Default risk numbers for a symbol on the current data version, or None without enough history."""
+    try:
+        body, _ = response_cache.get_or_build(stock_data_version, ("risk", symbol, RISK_HORIZON, RISK_PATHS, "bootstrap"),
+                                              lambda: risk_json(df, symbol))
+    except HTTPException:
+        return None
+    return json.loads(body)
+
+def cached_analysis(bot, symbol, strategy, output_format):
+    """
+    Analysis for the current data version, reused from the semantic cache when a similar one exists.
+
+    The risk model's VaR and stop/target levels go into the context the LLM's action plan is based on.
+    """
+    version = stock_data_version
+    cache = get_semantic_cache()
+    key = (symbol, output_format)
+    result = None
+    if cache is not None:
+        question = cache_question(strategy)
+        with stage("cache_lookup"):
+            result, vector = cache.lookup(version, key, question)
+    if result is None:
+        df = get_stock_data()
+        risk = get_risk(df, symbol) if df is not None else None
+        result = analyze_stock(bot, symbol, strategy, extra_context=describe_risk(risk))
+        if cache is not None:
+            cache.store(version, key, question, result, vector)
+    if output_format == "structured":
+        # Watchlist summaries show the latest LLM call for the symbol
+        recommendations.record(version, symbol, result)
+    return result
+
+def run_analysis_job(payload):
+    """Job handler for POST /jobs/analyze; raising makes the queue retry."""
+    structured = payload["output_format"] == "structured"
+    bot = get_structured_bot() if structured else get_qa_bot()
+    if bot is None:
+        raise RuntimeError("RAG bot not initialized")
+    if get_stock_data() is None:
+        raise RuntimeError("Stock data not loaded")
+    result = cached_analysis(bot, payload["symbol"], payload["strategy"], payload["output_format"])
+    risk = get_risk(get_stock_data(), payload["symbol"])
+    if structured:
+        return {"analysis": render_markdown(result), "recommendation": result.model_dump(), "risk": risk}
+    return {"analysis": result, "risk": risk}
+
+def get_job_queue():
+    global job_queue
+    if job_queue is None:
+        job_queue = JobQueue(JOB_DB, {"analyze": run_analysis_job}, workers=JOB_WORKERS).start()
+        print(f"✅ Job queue started with {JOB_WORKERS} workers")
+    return job_queue
+
+def pending_analyses(symbols):
+    """Symbols with a structured analysis job queued or running."""
+    busy = {p["symbol"] for p in get_job_queue().active("analyze") if p["output_format"] == "structured"}
+    return [s for s in symbols if s in busy]
+
+def cached_json(request: Request, key, build):
+    """Serve a pre-serialized JSON body for the current data version, honouring validators."""
+    body, etag = response_cache.get_or_build(stock_data_version, key, build)
+    return conditional_response(request, body, etag,
+                                last_modified=stock_data_modified,
+                                cache_control=market_cache_control())
+
+def latest_row(df, symbol):
+    position = latest_position(df, symbol)
+    if position is None:
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    return df.iloc[position]
+
+def stock_info_json(df, symbol):
+    """Serialized StockInfo for a symbol's latest day"""
+    latest = latest_row(df, symbol)
+
+    def safe_float(val, default=0.0): return default if pd.isna(val) else to_float(val)
+    def safe_int(val, default=0): return default if pd.isna(val) else int(val)
+
+    return StockInfo(
+        symbol=latest['symbol'],
+        close=safe_float(latest['close']),
+        volume=safe_int(latest['vol']),
+        rsi=safe_float(latest.get('RSI')),  # 0 when the indicator wasn't computed
+        ma20=safe_float(latest.get('MA20')),
+        ma50=safe_float(latest.get('MA50')),
+        diff_percent=safe_float(latest['diff %']),
+        week_52_high=safe_float(latest['52 weeks high'])
+    ).model_dump_json().encode()
+
+# Response groups of /indicators: {group: {field: column or (column, converter)}}. A processed file built with a
+# subset of indicator_engine.INDICATORS lacks some columns; only the fields whose column exists are served, and
+# a group with none of them is left out.
+INDICATOR_GROUPS = {
+    "moving_averages": {"ma20": "MA20", "ma50": "MA50"},
+    "momentum": {"rsi": "RSI", "macd": "MACD", "macd_signal": "MACD_Signal", "macd_histogram": "MACD_Hist",
+                 "stochastic_k": "STOCH_K", "stochastic_d": "STOCH_D", "mfi": "MFI"},
+    "bollinger_bands": {"upper": "BB_UPPER", "middle": "BB_MID", "lower": "BB_LOWER"},
+}
+EXTENDED_GROUPS = {
+    "trend": {"adx": "ADX", "plus_di": "PLUS_DI", "minus_di": "MINUS_DI", "supertrend": "SUPERTREND",
+              "supertrend_direction": ("SUPERTREND_DIR", to_int), "ichimoku_tenkan": "ICHI_TENKAN",
+              "ichimoku_kijun": "ICHI_KIJUN", "ichimoku_senkou_a": "ICHI_SENKOU_A", "ichimoku_senkou_b": "ICHI_SENKOU_B"},
+    "volatility": {"atr": "ATR"},
+    "volume_indicators": {"obv": "OBV", "vwap_20d": "VWAP20"},
+    "market_context": {"sector": ("sector", lambda value: value), "sector_change_percent": "sector_change %",
+                       "sector_breadth_percent": "sector_breadth %", "market_change_percent": "market_change %",
+                       "rs_vs_sector_20d": "RS_SECTOR_20", "rs_vs_market_20d": "RS_MARKET_20",
+                       "rsi_percentile": "RSI_RANK", "volume_percentile": "VOL_RANK"},
+}
+
+def indicator_group(latest, fields):
+    """{field: value} for the fields whose column latest has (NaN becomes None); None when it has none."""
+    group = {}
+    for field, column in fields.items():
+        column, convert = column if isinstance(column, tuple) else (column, to_float)
+        if column in latest:
+            group[field] = convert(latest[column])
+    return group or None
+
+def indicators_json(df, symbol, timeframe="daily"):
+    """Serialized latest technical indicators for a symbol (on a weekly or monthly df, of its latest bar)"""
+    latest = latest_row(df, symbol)
+
+    def groups(spec):
+        return {name: group for name, fields in spec.items() if (group := indicator_group(latest, fields))}
+
+    body = {
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "date": format_day(latest['tradedate']),
+        "price": {
+            "close": to_float(latest['close']),
+            "open": to_float(latest['open']),
+            "high": to_float(latest['high']),
+            "low": to_float(latest['low']),
+            "vwap": to_float(latest['vwap'])
+        },
+        **groups(INDICATOR_GROUPS),
+        "volume": to_int(latest['vol']),
+        "change_percent": to_float(latest['diff %'])
+    }
+    if timeframe != "daily":
+        # The latest bar may still be open (e.g. mid-week); date is its last trading day so far
+        body["period_start"] = format_day(period_starts(latest['tradedate'], timeframe))
+        body["trading_days"] = to_int(latest['days'])
+    body.update(groups(EXTENDED_GROUPS))
+    return json.dumps(body, separators=(",", ":")).encode()
+
+_index_html: Optional[tuple] = None  # (index.html stat and asset aliases it was built with, body)
 
 # -----------------------------
 # Pydantic models
@@ -540,6 +1012,8 @@ def get_stock_data():
 class AnalysisRequest(BaseModel):
     symbol: str
     strategy: Optional[str] = "multi-strategy"
+    # "structured" asks the model for a Recommendation and renders the markdown server-side
+    output_format: Literal["markdown", "structured"] = "markdown"
 
 class AnalysisResponse(BaseModel):
     symbol: str
@@ -547,6 +1021,8 @@ class AnalysisResponse(BaseModel):
     analysis: str
     success: bool
     error: Optional[str] = None
+    recommendation: Optional[Recommendation] = None
+    risk: Optional[dict] = None  # risk_engine numbers the action plan is based on
 
 class StockInfo(BaseModel):
     symbol: str
@@ -562,19 +1038,60 @@ class StockListResponse(BaseModel):
     symbols: List[str]
     count: int
 
+class JobRequest(AnalysisRequest):
+    priority: int = Field(0, ge=-10, le=10)  # higher runs first
+    webhook_url: Optional[str] = None  # POSTed the finished job
+
+class WatchlistRequest(BaseModel):
+    symbols: List[str]
+
+class WatchlistResponse(BaseModel):
+    id: str
+    symbols: List[str]
+    unknown_symbols: List[str] = []
+
+class AlertRuleRequest(BaseModel):
+    owner: str
+    left: str  # indicator column, or VOL_AVG20
+    op: Literal[ALERT_OPERATORS]
+    right: Union[float, str]  # threshold or column
+    factor: float = Field(1.0, gt=0)  # multiplies a right-hand column, e.g. 3 x VOL_AVG20
+    symbols: List[str] = []  # all symbols when empty
+    name: Optional[str] = None
+    webhook_url: Optional[str] = None  # POSTed the alerts this rule fires
+
+class ProfilingSettings(BaseModel):
+    # Fields left out keep their current value
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)  # fraction of requests profiled
+    interval_ms: Optional[float] = Field(None, ge=1, le=1000)  # between stack samples
+    slow_seconds: Optional[float] = Field(None, ge=0)  # slow-request threshold; 0 turns capture off
+
 # -----------------------------
 # Endpoints
 # -----------------------------
 @app.get("/")
-async def serve_frontend():
-    """Serve the HTML frontend"""
+async def serve_frontend(request: Request):
+    """Serve the HTML frontend, pointing it at content-hashed asset URLs"""
+    global _index_html
     index_file = Path(__file__).parent.parent / "static" / "index.html"
     if index_file.exists():
-        return FileResponse(str(index_file))
+        if static_files is None:
+            return FileResponse(str(index_file))
+        # Rebuilt when index.html or any asset's content hash changes
+        aliases = static_files.refresh()
+        stat = index_file.stat()
+        key = (stat.st_mtime_ns, stat.st_size, tuple(sorted(aliases.items())))
+        if _index_html is None or _index_html[0] != key:
+            html = index_file.read_text(encoding="utf-8")
+            for name in aliases:
+                html = html.replace(f'"/static/{name}"', f'"/static/{aliases[name]}"')
+            _index_html = (key, html.encode("utf-8"))
+        body = _index_html[1]
+        return conditional_response(request, body, make_etag("index", body), media_type="text/html; charset=utf-8")
     return {
         "status": "online",
         "message": "NEPSE Trading Bot API is running",
-        "bot_initialized": qa_bot is not None,
+        "bot_initialized": qa_bot is not None or structured_bot is not None,
         "data_loaded": stock_data is not None
     }
 
@@ -584,47 +1101,267 @@ async def api_status():
     return {
         "status": "online",
         "message": "NEPSE Trading Bot API is running",
-        "bot_initialized": qa_bot is not None,
-        "data_loaded": stock_data is not None
+        "bot_initialized": qa_bot is not None or structured_bot is not None,
+        "data_loaded": stock_data is not None,
+        # Clients key their caches on this; it changes when the processed file does
+        "data_version": stock_data_version,
+        "admission": {limit.name: limit.status() for limit in admission_limits.values()} if ADMISSION_ENABLED else None,
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not secrets.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/profiling")
+async def get_profiling(request: Request):
+    """Profiling settings and the newest stored profiles"""
+    require_admin(request)
+    return profiler.settings()
+
+@app.put("/admin/profiling")
+async def set_profiling(settings: ProfilingSettings, request: Request):
+    """Turn request sampling and slow-request capture on, off or retune them"""
+    require_admin(request)
+    profiler.configure(sample_rate=settings.sample_rate,
+                       interval=settings.interval_ms / 1000 if settings.interval_ms is not None else None,
+                       slow_seconds=... if settings.slow_seconds is None else settings.slow_seconds or None)
+    return profiler.settings()
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str, request: Request):
+    """A sampled request's stacks in the folded format (flamegraph.pl, speedscope, inferno)"""
+    require_admin(request)
+    if name not in profiler.profiles():
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return FileResponse(str(profiler.directory / name), media_type="text/plain; charset=utf-8")
+
+@app.get("/admin/slow-requests")
+async def get_slow_requests(request: Request, limit: int = 20):
+    """The latest requests over the slow-request threshold, with their stage timings and thread stacks"""
+    require_admin(request)
+    return {"slow_seconds": profiler.slow_seconds, "requests": list(profiler.slow)[::-1][:max(limit, 0)]}
+
 @app.get("/stocks", response_model=StockListResponse)
-async def get_stocks():
+async def get_stocks(request: Request):
     df = get_stock_data()
     if df is None:
         raise HTTPException(status_code=503, detail="Stock data not loaded")
-    symbols = sorted(df['symbol'].unique().tolist())
-    return StockListResponse(symbols=symbols, count=len(symbols))
+
+    def build():
+        symbols = df['symbol'].cat.categories.tolist()
+        return StockListResponse(symbols=symbols, count=len(symbols)).model_dump_json().encode()
+
+    return cached_json(request, "stocks", build)
 
 @app.get("/stocks/{symbol}", response_model=StockInfo)
-async def get_stock_info(symbol: str):
+async def get_stock_info(symbol: str, request: Request):
     df = get_stock_data()
     if df is None:
         raise HTTPException(status_code=503, detail="Stock data not loaded")
 
     symbol = symbol.upper()
-    stock_df = df[df['symbol'] == symbol]
-    if stock_df.empty:
-        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
-    latest = stock_df.sort_values('tradedate').iloc[-1]
 
-    def safe_float(val, default=0.0): return default if pd.isna(val) else float(val)
-    def safe_int(val, default=0): return default if pd.isna(val) else int(val)
+    return cached_json(request, ("info", symbol), lambda: stock_info_json(df, symbol))
 
-    return StockInfo(
-        symbol=latest['symbol'],
-        close=safe_float(latest['close']),
-        volume=safe_int(latest['vol']),
-        rsi=safe_float(latest['RSI']),
-        ma20=safe_float(latest['MA20']),
-        ma50=safe_float(latest['MA50']),
-        diff_percent=safe_float(latest['diff %']),
-        week_52_high=safe_float(latest['52 weeks high'])
-    )
+@app.get("/stocks/{symbol}/indicators")
+async def get_indicators(symbol: str, request: Request, timeframe: str = "daily"):
+    """Get latest technical indicators for a stock, on daily, weekly (Sunday-Thursday) or monthly bars"""
+    if timeframe not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"timeframe must be one of {list(TIMEFRAMES)}")
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+
+    symbol = symbol.upper()
+    if timeframe == "daily":
+        return cached_json(request, ("indicators", symbol), lambda: indicators_json(df, symbol))
+
+    bars, version = get_timeframe_data(timeframe)
+    if bars is None:
+        raise HTTPException(status_code=503, detail=f"No {timeframe} bars; run pipeline.py to build them")
+    return cached_json(request, ("indicators", symbol, timeframe, version),
+                       lambda: indicators_json(bars, symbol, timeframe))
+
+@app.get("/stocks/{symbol}/overview")
+async def get_overview(symbol: str, request: Request, strategy: str = "multi-strategy"):
+    """Info, indicators, current signal and any cached analysis for a stock in one response (the dashboard page)"""
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+
+    symbol = symbol.upper()
+    version = stock_data_version
+    info, _ = response_cache.get_or_build(version, ("info", symbol), lambda: stock_info_json(df, symbol))
+    indicators, _ = response_cache.get_or_build(version, ("indicators", symbol), lambda: indicators_json(df, symbol))
+
+    # Rule-based zone, overridden by a structured LLM recommendation for this data version
+    latest = get_snapshot(df).frame.loc[symbol]
+    signal = {"signal": latest['signal'], "signal_source": "rules", "signal_score": to_float(latest['signal_score'], 2),
+              "confidence": None}
+    recommendation = recommendations.current(version, [symbol]).get(symbol)
+    if recommendation is not None:
+        signal.update(signal=recommendation.action, signal_source="llm", confidence=recommendation.confidence)
+    # A markdown analysis already answered for this strategy; never calls the LLM, but embeds the question
+    # (a model call), so off the event loop
+    analysis = None
+    if semantic_cache is not None:
+        analysis = await asyncio.to_thread(semantic_cache.peek, version, (symbol, "markdown"), cache_question(strategy))
+
+    head = json.dumps({
+        "symbol": symbol,
+        "strategy": strategy,
+        "data_version": version,
+        "bot_initialized": qa_bot is not None or structured_bot is not None,
+        "signal": signal,
+        "analysis": analysis,
+        "analysis_pending": bool(pending_analyses([symbol])),
+    }, separators=(",", ":"))
+    # info and indicators are spliced in pre-serialized from the response cache
+    body = head[:-1].encode() + b',"info":' + info + b',"indicators":' + indicators + b'}'
+    # No Last-Modified: the signal and analysis can change within a data version
+    return conditional_response(request, body, make_etag(version, body))
+
+@app.get("/stocks/{symbol}/similar")
+async def get_similar(symbol: str, window: int = 20, k: int = 10, date: Optional[str] = None):
+    """Historical windows (any symbol) most similar to the symbol's recent price, volume and RSI shape, with what followed"""
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+    if window not in PATTERN_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {list(PATTERN_WINDOWS)}")
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+    end_day = None
+    if date is not None:
+        try:
+            end_day = (pd.Timestamp(date).date() - EPOCH).days
+        except ValueError:
+            raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+
+    symbol = symbol.upper()
+    index = await asyncio.to_thread(get_pattern_index, df)
+    try:
+        query, analogues = index.search(symbol, window=window, k=k, end_day=end_day)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found" if end_day is None
+                            else f"Stock {symbol} has no data on {date}")
+    except LookupError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"symbol": symbol, "window": window, "data_version": index.version,
+            **index.describe(query, analogues, window)}
+
+@app.get("/stocks/{symbol}/risk")
+async def get_stock_risk(symbol: str, request: Request, horizon: int = RISK_HORIZON, paths: int = RISK_PATHS,
+                         method: str = "bootstrap"):
+    """Monte Carlo VaR/CVaR and volatility-scaled stop/target levels with their hit probabilities"""
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+    if not 1 <= horizon <= 250:
+        raise HTTPException(status_code=400, detail="horizon must be between 1 and 250 days")
+    if not 1000 <= paths <= 200_000:
+        raise HTTPException(status_code=400, detail="paths must be between 1,000 and 200,000")
+    if method not in RISK_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {list(RISK_METHODS)}")
+
+    symbol = symbol.upper()
+    key = ("risk", symbol, horizon, paths, method)
+    build = lambda: risk_json(df, symbol, horizon, paths, method)
+    if response_cache.get(stock_data_version, key) is None:
+        # A miss runs the simulation (tens of milliseconds, more with many paths), so off the event loop
+        body = await asyncio.to_thread(build)
+        build = lambda: body
+    return cached_json(request, key, build)
+
+@app.get("/correlations/{symbol}")
+async def get_symbol_correlations(symbol: str, request: Request, k: int = 10):
+    """The symbols whose daily returns move most with, and most against, this one's"""
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+    symbol = symbol.upper()
+    if not symbol_exists(df, symbol):
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    # A rebuild takes a while with many symbols; keep it off the event loop
+    await asyncio.to_thread(with_correlations, df, lambda tracker: None)
+
+    def build(tracker):
+        top, bottom = tracker.peers(symbol, k)
+        return json.dumps({
+            "symbol": symbol,
+            "date": tracker.date(),
+            "window": tracker.window,
+            "halflife": tracker.halflife,
+            "correlated": [{"symbol": s, "correlation": round(c, 4)} for s, c in top],
+            "anti_correlated": [{"symbol": s, "correlation": round(c, 4)} for s, c in bottom],
+        }, separators=(",", ":")).encode()
+
+    return cached_json(request, ("correlations", symbol, k), lambda: with_correlations(df, build))
+
+@app.get("/pairs")
+async def get_pairs(request: Request, k: int = 20, negative: bool = False):
+    """Symbol pairs with the highest (or, with negative=true, most negative) return correlation"""
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+    if not 1 <= k <= 500:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 500")
+    await asyncio.to_thread(with_correlations, df, lambda tracker: None)
+
+    def build(tracker):
+        return json.dumps({
+            "date": tracker.date(),
+            "window": tracker.window,
+            "halflife": tracker.halflife,
+            "pairs": [{"a": a, "b": b, "correlation": round(c, 4)} for a, b, c in tracker.pairs(k, negative)],
+        }, separators=(",", ":")).encode()
+
+    return cached_json(request, ("pairs", k, negative), lambda: with_correlations(df, build))
+
+@app.get("/sectors")
+async def get_sectors(request: Request):
+    """Sector performance on the latest trading day"""
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+    if 'sector' not in df.columns:
+        raise HTTPException(status_code=503, detail="Sector data not available; rerun calculate_indicators.py")
+
+    def build():
+        day = df[df['tradedate'] == df['tradedate'].max()]
+        day = day.assign(turnover=exact_float64(day['turnover']))  # sums to the float64 total
+        sectors = day.groupby('sector', observed=True).agg(
+            symbols=('symbol', 'size'),
+            change_percent=('sector_change %', 'first'),
+            breadth_percent=('sector_breadth %', 'first'),
+            turnover=('turnover', 'sum'),
+        ).reset_index()
+        sectors['sector'] = sectors['sector'].astype(str)
+        for column in ('change_percent', 'breadth_percent', 'turnover'):
+            sectors[column] = [to_float(v, 2) for v in sectors[column]]
+        sectors = sectors.sort_values('change_percent', ascending=False)
+        return json.dumps({
+            "date": format_day(day['tradedate'].iloc[0]),
+            "market_change_percent": to_float(day['market_change %'].iloc[0], 2),
+            "sectors": sectors.to_dict(orient="records")
+        }, separators=(",", ":")).encode()
+
+    return cached_json(request, "sectors", build)
 
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze(request: AnalysisRequest):
-    bot = get_qa_bot()
+    structured = request.output_format == "structured"
+    bot = get_structured_bot() if structured else get_qa_bot()
     df = get_stock_data()
     
     if bot is None:
@@ -633,14 +1370,226 @@ async def analyze(request: AnalysisRequest):
         raise HTTPException(status_code=503, detail="Stock data not loaded")
 
     symbol = request.symbol.upper()
-    if symbol not in df['symbol'].values:
+    if not symbol_exists(df, symbol):
         raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
 
     try:
-        analysis_result = analyze_stock(bot, symbol, request.strategy)
-        return AnalysisResponse(symbol=symbol, strategy=request.strategy, analysis=analysis_result, success=True)
+        # Off the event loop, so the cheap routes keep answering while LLM calls are in flight
+        analysis_result, risk = await asyncio.to_thread(
+            lambda: (cached_analysis(bot, symbol, request.strategy, request.output_format), get_risk(df, symbol)))
+        if structured:
+            result = AnalysisResponse(symbol=symbol, strategy=request.strategy, analysis=render_markdown(analysis_result),
+                                      recommendation=analysis_result, risk=risk, success=True)
+        else:
+            result = AnalysisResponse(symbol=symbol, strategy=request.strategy, analysis=analysis_result, risk=risk,
+                                      success=True)
     except Exception as e:
-        return AnalysisResponse(symbol=symbol, strategy=request.strategy, analysis="", success=False, error=str(e))
+        result = AnalysisResponse(symbol=symbol, strategy=request.strategy, analysis="", success=False, error=str(e))
+
+    with stage("serialize"):
+        body = result.model_dump_json()
+    return Response(content=body, media_type="application/json")
+
+def job_or_404(queue, job_id):
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.post("/jobs/analyze", status_code=202)
+async def submit_analysis_job(request: JobRequest):
+    """Queue an analysis and return its job id at once"""
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+    symbol = request.symbol.upper()
+    if not symbol_exists(df, symbol):
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    if request.webhook_url:
+        try:
+            # Resolves the host (blocking DNS), so off the event loop
+            await asyncio.to_thread(check_webhook_url, request.webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    payload = {"symbol": symbol, "strategy": request.strategy, "output_format": request.output_format}
+    job_id = get_job_queue().enqueue("analyze", payload, priority=request.priority, webhook_url=request.webhook_url)
+    return {"id": job_id, "status": "queued", "links": {"self": f"/jobs/{job_id}", "events": f"/jobs/{job_id}/events"}}
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Job counts by status, and the most recently updated jobs (e.g. ?status=dead for the dead letters)"""
+    queue = get_job_queue()
+    return {"counts": queue.counts(), "jobs": queue.list(status, min(limit, 500))}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return job_or_404(get_job_queue(), job_id)
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Requeue a dead-lettered job"""
+    queue = get_job_queue()
+    job_or_404(queue, job_id)
+    if not queue.requeue(job_id):
+        raise HTTPException(status_code=409, detail="Only dead-lettered jobs can be retried")
+    return {"id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events with the job's status until it finishes"""
+    queue = get_job_queue()
+    job_or_404(queue, job_id)
+    if job_event_streams >= JOB_EVENT_STREAMS:
+        raise HTTPException(status_code=503, detail="Too many event streams; poll GET /jobs/{id} instead",
+                            headers={"Retry-After": "5"})
+
+    async def events():
+        global job_event_streams
+        job_event_streams += 1
+        try:
+            last, idle = None, 0.0
+            while not await request.is_disconnected():
+                job = queue.get(job_id)
+                if (job["status"], job["updated_at"]) != last:
+                    last, idle = (job["status"], job["updated_at"]), 0.0
+                    yield f"event: {job['status']}\ndata: {json.dumps(job, separators=(',', ':'))}\n\n"
+                    if job["status"] in FINISHED:
+                        return
+                elif idle >= 15:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+                await asyncio.sleep(0.5)
+                idle += 0.5
+        finally:
+            job_event_streams -= 1
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/alerts/rules", status_code=201)
+async def create_alert_rule(request: AlertRuleRequest):
+    """Register an edge-triggered alert rule; it fires when its condition turns true for a symbol"""
+    try:
+        # Checking a webhook_url resolves its host (blocking DNS), so off the event loop
+        rule, = await asyncio.to_thread(get_alert_engine().add, [request.model_dump()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return rule
+
+@app.get("/alerts/rules")
+async def list_alert_rules(owner: Optional[str] = None):
+    return {"rules": get_alert_engine().list(owner)}
+
+@app.delete("/alerts/rules/{rule_id}")
+async def delete_alert_rule(rule_id: str):
+    if not get_alert_engine().remove(rule_id):
+        raise HTTPException(status_code=404, detail=f"Alert rule {rule_id} not found")
+    return {"deleted": rule_id}
+
+@app.get("/alerts")
+async def list_alerts(owner: Optional[str] = None, after: int = 0):
+    """Recently fired alerts with an id above `after` (poll with the last id seen)"""
+    engine = get_alert_engine()
+    return {"alerts": engine.since(after, owner), "last_id": engine.last_id}
+
+@app.get("/alerts/events")
+async def alert_events(request: Request, owner: Optional[str] = None):
+    """Server-sent events for fired alerts; reconnecting with Last-Event-ID replays the ones missed"""
+    engine = get_alert_engine()
+    if job_event_streams >= JOB_EVENT_STREAMS:
+        raise HTTPException(status_code=503, detail="Too many event streams; poll GET /alerts instead",
+                            headers={"Retry-After": "5"})
+    try:
+        last_id = int(request.headers.get("last-event-id", engine.last_id))
+    except ValueError:
+        last_id = engine.last_id
+
+    async def events():
+        global job_event_streams
+        nonlocal last_id
+        job_event_streams += 1
+        try:
+            idle = 0.0
+            while not await request.is_disconnected():
+                alerts = engine.since(last_id, owner)
+                for alert in alerts:
+                    yield f"id: {alert['id']}\nevent: alert\ndata: {json.dumps(alert, separators=(',', ':'))}\n\n"
+                if alerts:
+                    last_id, idle = alerts[-1]["id"], 0.0
+                elif idle >= 15:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+                await asyncio.sleep(0.5)
+                idle += 0.5
+        finally:
+            job_event_streams -= 1
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def watchlist_or_404(watchlist_id):
+    symbols = get_watchlists().get(watchlist_id)
+    if symbols is None:
+        raise HTTPException(status_code=404, detail=f"Watchlist {watchlist_id} not found")
+    return symbols
+
+@app.put("/watchlist/{watchlist_id}", response_model=WatchlistResponse)
+async def put_watchlist(watchlist_id: str, request: WatchlistRequest):
+    """Create or replace a watchlist"""
+    try:
+        symbols = get_watchlists().put(watchlist_id, request.symbols)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    df = get_stock_data()
+    unknown = [] if df is None else [s for s in symbols if s not in get_snapshot(df).frame.index]
+    return WatchlistResponse(id=watchlist_id, symbols=symbols, unknown_symbols=unknown)
+
+@app.get("/watchlist/{watchlist_id}", response_model=WatchlistResponse)
+async def get_watchlist(watchlist_id: str):
+    return WatchlistResponse(id=watchlist_id, symbols=watchlist_or_404(watchlist_id))
+
+@app.delete("/watchlist/{watchlist_id}")
+async def delete_watchlist(watchlist_id: str):
+    if not get_watchlists().delete(watchlist_id):
+        raise HTTPException(status_code=404, detail=f"Watchlist {watchlist_id} not found")
+    return {"deleted": watchlist_id}
+
+@app.get("/watchlist/{watchlist_id}/summary")
+async def watchlist_summary(watchlist_id: str):
+    """Latest indicators, signals and portfolio aggregates for every symbol in a watchlist"""
+    symbols = watchlist_or_404(watchlist_id)
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+
+    with stage("watchlist_summary"):
+        body = summarize_watchlist(get_snapshot(df), symbols,
+                                   recommendations=recommendations.current(stock_data_version, symbols),
+                                   pending=pending_analyses(symbols))
+        body["id"] = watchlist_id
+        content = json.dumps(body, separators=(",", ":"))
+    return Response(content=content, media_type="application/json")
+
+@app.post("/watchlist/{watchlist_id}/analyze", status_code=202)
+async def analyze_watchlist(watchlist_id: str, strategy: str = "multi-strategy"):
+    """Queue structured LLM analysis jobs for watchlist symbols without a current one; results show up in /summary"""
+    symbols = watchlist_or_404(watchlist_id)
+    df = get_stock_data()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Stock data not loaded")
+    bot = get_structured_bot()
+    if bot is None:
+        raise HTTPException(status_code=503, detail="RAG bot not initialized")
+
+    known = [s for s in symbols if s in get_snapshot(df).frame.index]
+    # At most one job per symbol: skip those with a current recommendation or a job queued or running
+    skip = set(recommendations.current(stock_data_version, known)) | set(pending_analyses(known))
+    queue = get_job_queue()
+    jobs = {symbol: queue.enqueue("analyze", {"symbol": symbol, "strategy": strategy, "output_format": "structured"},
+                                  priority=WATCHLIST_JOB_PRIORITY)
+            for symbol in known if symbol not in skip}
+    return {"id": watchlist_id, "queued": list(jobs), "pending": pending_analyses(known), "jobs": jobs}
 
 # -----------------------------
 # Run app
@@ -0,0 +1,1699 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic_data import write_market_data
+
+STRATEGIES = ["multi-strategy", "trend-following", "mean reversion", "swing trading", "breakout/pullback"]
+
+# -----------------------------
+# Timing helpers
+# -----------------------------
+def summarize(samples):
+    """Latency summary (milliseconds) for a list of durations in seconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "runs": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "p99_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.99))], 3),
+        "min_ms": round(ms[0], 3),
+    }
+
+
+def measure(fn, repeat=3, quiet=True):
+    """Run fn() repeat times; return (summary, last result). Pipeline prints are silenced."""
+    samples, result = [], None
+    for _ in range(repeat):
+        out = io.StringIO() if quiet else sys.stdout
+        with contextlib.redirect_stdout(out):
+            start = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - start)
+    return summarize(samples), result
+
+
+def timeit(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+# -----------------------------
+# Shared state between stages
+# -----------------------------
+class BenchContext:
+    """Lazily builds each stage's inputs so any subset of stages can run on its own."""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = Path(args.workdir or tempfile.mkdtemp(prefix="nepse-bench-"))
+        self.raw_path = self.workdir / "stock_data_ready.csv"
+        self.processed_path = self.workdir / "processed" / "stock_data_with_indicators.csv"
+        self.index_path = self.workdir / "vectorstore" / "faiss_index"
+        self._embeddings = None
+        self._docs = None
+        self._db = None
+
+    def raw(self):
+        if not self.raw_path.exists():
+            write_market_data(str(self.raw_path), self.args.symbols, self.args.days, self.args.seed)
+        return self.raw_path
+
+    def processed(self):
+        if not self.processed_path.exists():
+            from calculate_indicators import calculate_indicators
+            with contextlib.redirect_stdout(io.StringIO()):
+                calculate_indicators(str(self.raw()), str(self.processed_path))
+        return self.processed_path
+
+    def dataset(self):
+        """Multi-year, all-symbol processed data (the other stages use a small one)."""
+        path = self.workdir / f"dataset_{self.args.dataset_symbols}x{self.args.dataset_days}.csv"
+        if not path.exists():
+            from calculate_indicators import calculate_indicators
+            raw = self.workdir / "dataset_raw.csv"
+            write_market_data(str(raw), self.args.dataset_symbols, self.args.dataset_days, self.args.seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                calculate_indicators(str(raw), str(path))
+        return path
+
+    def embeddings(self):
+        if self._embeddings is None:
+            if self.args.embeddings == "fake":
+                from langchain_core.embeddings import DeterministicFakeEmbedding
+                self._embeddings = DeterministicFakeEmbedding(size=384)
+            else:
+                from langchain_huggingface import HuggingFaceEmbeddings
+                self._embeddings = HuggingFaceEmbeddings(
+                    model_name="sentence-transformers/all-MiniLM-L6-v2",
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'normalize_embeddings': True}
+                )
+        return self._embeddings
+
+    def docs(self):
+        if self._docs is None:
+            from rag_data_loader import stock_to_text_chunks
+            self._docs = stock_to_text_chunks(str(self.processed()))
+        return self._docs
+
+    def db(self):
+        if self._db is None:
+            from build_vector_store import build_vector_store
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._db = build_vector_store(str(self.processed()), str(self.index_path),
+                                              embeddings=self.embeddings())
+        return self._db
+
+    def symbols(self, n):
+        import pandas as pd
+        symbols = sorted(pd.read_csv(self.processed(), usecols=["symbol"])["symbol"].unique())
+        return symbols[:n]
+
+    def stub_llm(self, latency=None):
+        from stub_llm import StubChatModel
+        return StubChatModel(latency=self.args.llm_latency if latency is None else latency,
+                             token_latency=self.args.llm_token_latency, replay_path=self.args.replay)
+
+    def api(self, latency=None):
+        """The FastAPI app wired to this run's data, index and a stub LLM."""
+        import api
+        from rag_trading_bot import create_rag_bot
+        self.db()
+        api.DATA_FILE = self.processed()
+        api.stock_data = None
+        api.embeddings = self.embeddings()
+        # Repeated symbols would otherwise be answered from the semantic cache (see the semantic_cache stage)
+        api.SEMANTIC_CACHE_ENABLED = False
+        api.semantic_cache = None
+        # Watchlist analyses and /overview use the job queue, and the server starts it and the alert engine; keep
+        # their files out of data/
+        api.JOB_DB = self.workdir / "api_jobs.sqlite3"
+        api.ALERT_RULES_FILE = self.workdir / "api_alert_rules.json"
+        lift_rate_limits(api)
+        for attr, structured in (("qa_bot", False), ("structured_bot", True)):
+            setattr(api, attr, create_rag_bot(llm=self.stub_llm(latency), embeddings=self.embeddings(),
+                                              vector_store_path=str(self.index_path), structured=structured))
+        return api
+
+
+def lift_rate_limits(api):
+    """One client (this process) drives every stage: no per-client rate limit, and empty buckets."""
+    for limit in api.admission_limits.values():
+        limit.rate = None
+        limit.buckets.clear()
+
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+@benchmark("indicators")
+def bench_indicators(ctx):
+    from calculate_indicators import calculate_indicators
+    raw = str(ctx.raw())
+    out = str(ctx.workdir / "bench_indicators.csv")
+    summary, df = measure(lambda: calculate_indicators(raw, out), ctx.args.repeat)
+    # Share of the run spent on sector/market context
+    from calculate_indicators import add_cross_sectional_features
+    context, _ = measure(lambda: add_cross_sectional_features(df.copy()), ctx.args.repeat)
+    return {**summary, "rows": len(df), "context_median_ms": context["median_ms"]}
+
+
+def legacy_rsi(df):
+    """RSI as calculate_indicators computed it before: per-symbol delta, but rolling means over the whole frame."""
+    delta = df.groupby('symbol')['close'].transform(lambda x: x.diff())
+    avg_gain = delta.clip(lower=0).rolling(14, min_periods=1).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(14, min_periods=1).mean()
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def legacy_indicators(df):
+    """The per-indicator groupby/transform passes calculate_indicators ran before indicator_engine."""
+    import pandas as pd
+    out = pd.DataFrame(index=df.index)
+    close = df.groupby('symbol')['close']
+    out['MA20'] = close.transform(lambda x: x.rolling(20, min_periods=1).mean())
+    out['MA50'] = close.transform(lambda x: x.rolling(50, min_periods=1).mean())
+    out['RSI'] = legacy_rsi(df)
+    out['BB_MID'] = close.transform(lambda x: x.rolling(20, min_periods=1).mean())
+    out['BB_STD'] = close.transform(lambda x: x.rolling(20, min_periods=1).std())
+    out['BB_UPPER'] = out['BB_MID'] + 2 * out['BB_STD']
+    out['BB_LOWER'] = out['BB_MID'] - 2 * out['BB_STD']
+    out['EMA12'] = close.transform(lambda x: x.ewm(span=12, adjust=False).mean())
+    out['EMA26'] = close.transform(lambda x: x.ewm(span=26, adjust=False).mean())
+    out['MACD'] = out['EMA12'] - out['EMA26']
+    out['MACD_Signal'] = out.groupby(df['symbol'])['MACD'].transform(lambda x: x.ewm(span=9, adjust=False).mean())
+    out['MACD_Hist'] = out['MACD'] - out['MACD_Signal']
+    return out
+
+
+@benchmark("indicator_engine")
+def bench_indicator_engine(ctx):
+    import numpy as np
+    import pandas as pd
+    from indicator_engine import CORE_INDICATORS, INDICATORS, Graph, compute_indicators
+    df = pd.read_csv(ctx.raw()).sort_values(by=['symbol', 'tradedate'])
+
+    legacy, expected = measure(lambda: legacy_indicators(df), ctx.args.repeat)
+    core, actual = measure(lambda: compute_indicators(df, CORE_INDICATORS), ctx.args.repeat)
+    # RSI was corrected after the engine landed; the rsi stage covers it
+    for column in expected.columns.drop('RSI'):
+        assert np.allclose(actual[column], expected[column], rtol=1e-9, atol=1e-9, equal_nan=True), column
+
+    # Wall time as indicators are added, and how many graph nodes the planner shares between them
+    scaling = {}
+    names = list(INDICATORS)
+    for k in range(1, len(names) + 1):
+        summary, _ = measure(lambda: compute_indicators(df, names[:k]), ctx.args.repeat)
+        shared = Graph()
+        separate = 0
+        for name in names[:k]:
+            INDICATORS[name]["build"](shared)
+            alone = Graph()
+            INDICATORS[name]["build"](alone)
+            separate += len(alone.nodes)
+        scaling[f"{k}_{names[k - 1]}"] = {"median_ms": summary["median_ms"], "nodes": len(shared.nodes),
+                                          "nodes_without_sharing": separate}
+    return {"rows": len(df), "legacy_core_median_ms": legacy["median_ms"], "engine_core_median_ms": core["median_ms"],
+            "scaling": scaling}
+
+
+@benchmark("rsi")
+def bench_rsi(ctx):
+    import numpy as np
+    import pandas as pd
+    from indicator_engine import compute_indicators
+    df = pd.read_csv(ctx.raw()).sort_values(by=['symbol', 'tradedate'])
+
+    def grouped_sma_rsi():
+        # Correct per-symbol SMA RSI the straightforward way, one groupby/transform per step
+        delta = df.groupby('symbol')['close'].diff()
+        gain = delta.clip(lower=0).groupby(df['symbol']).transform(lambda x: x.rolling(14, min_periods=1).mean())
+        loss = (-delta.clip(upper=0)).groupby(df['symbol']).transform(lambda x: x.rolling(14, min_periods=1).mean())
+        return (100 - 100 * loss / (gain + loss)).where(gain + loss != 0, 50).where(delta.notna() | (gain + loss > 0))
+
+    legacy, old = measure(lambda: legacy_rsi(df), ctx.args.repeat)
+    grouped, reference = measure(grouped_sma_rsi, ctx.args.repeat)
+    sma, new_sma = measure(lambda: compute_indicators(df, ['RSI'], rsi_method='sma')['RSI'], ctx.args.repeat)
+    wilder, new_wilder = measure(lambda: compute_indicators(df, ['RSI'])['RSI'], ctx.args.repeat)
+    assert np.allclose(new_sma, reference.clip(0, 100), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    # Rows the old cross-symbol rolling window got wrong, and values it left as inf/NaN
+    first_rows = df.groupby('symbol').cumcount() < 14
+    wrong = ~np.isclose(old, new_sma, rtol=1e-9, atol=1e-9, equal_nan=True)
+    return {"rows": len(df), "legacy_median_ms": legacy["median_ms"], "grouped_sma_median_ms": grouped["median_ms"],
+            "segmented_sma_median_ms": sma["median_ms"], "segmented_wilder_median_ms": wilder["median_ms"],
+            "legacy_wrong_rows": int(wrong.sum()), "legacy_wrong_in_first_14_rows": int((wrong & first_rows).sum()),
+            "legacy_inf": int(np.isinf(old).sum()), "wilder_inf": int(np.isinf(new_wilder).sum()),
+            # A symbol's first day has no price change yet
+            "wilder_nan": int(new_wilder.isna().sum()), "symbols": int(df['symbol'].nunique())}
+
+
+@benchmark("chunking")
+def bench_chunking(ctx):
+    from rag_data_loader import stock_to_text_chunks
+    path = str(ctx.processed())
+    summary, docs = measure(lambda: stock_to_text_chunks(path), ctx.args.repeat)
+    return {**summary, "documents": len(docs)}
+
+
+@benchmark("indexing")
+def bench_indexing(ctx):
+    from langchain_community.vectorstores import FAISS
+    docs, embeddings = ctx.docs(), ctx.embeddings()
+    summary, _ = measure(lambda: FAISS.from_documents(docs, embedding=embeddings), ctx.args.repeat)
+    return {**summary, "documents": len(docs),
+            "docs_per_second": round(len(docs) / (summary["median_ms"] / 1000), 1)}
+
+
+@benchmark("retrieval")
+def bench_retrieval(ctx):
+    db, embeddings = ctx.db(), ctx.embeddings()
+    queries = [f"Analyze stock {s} for Buy, Sell, or Hold recommendation using a {st} approach."
+               for s in ctx.symbols(20) for st in STRATEGIES[:2]]
+    embed, search = [], []
+    for query in queries:
+        start = time.perf_counter()
+        vector = embeddings.embed_query(query)
+        embed.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        db.similarity_search_by_vector(vector, k=5)
+        search.append(time.perf_counter() - start)
+    return {"embed": summarize(embed), "search": summarize(search), "queries": len(queries)}
+
+
+@benchmark("hybrid_retrieval")
+def bench_hybrid_retrieval(ctx):
+    """Precision@5 for the question's own symbol and query latency, dense-only vs hybrid."""
+    from hybrid_retriever import HybridRetriever, LexicalIndex, lexical_index_path
+    from rag_trading_bot import build_question
+    db, embeddings = ctx.db(), ctx.embeddings()
+    lexical = LexicalIndex.load(lexical_index_path(str(ctx.index_path)))
+    retrievers = {
+        "dense": lambda q, v: db.similarity_search_by_vector(v, k=5),
+        "hybrid_no_filter": HybridRetriever(db, lexical, auto_symbol=False).retrieve,
+        "hybrid": HybridRetriever(db, lexical).retrieve,
+    }
+    queries = [(s, build_question(s, st)) for s in ctx.symbols(20) for st in STRATEGIES[:2]]
+    vectors = [embeddings.embed_query(q) for _, q in queries]
+    results = {}
+    for name, retrieve in retrievers.items():
+        samples, relevant, returned = [], 0, 0
+        for (symbol, question), vector in zip(queries, vectors):
+            start = time.perf_counter()
+            docs = retrieve(question, vector)
+            samples.append(time.perf_counter() - start)
+            relevant += sum(d.metadata["symbol"] == symbol for d in docs)
+            returned += len(docs)
+        results[name] = {**summarize(samples), "precision_at_5": round(relevant / max(returned, 1), 3)}
+    return results
+
+
+@benchmark("analyze")
+def bench_analyze(ctx):
+    from fastapi.testclient import TestClient
+    api = ctx.api()
+    client = TestClient(api.app)
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for symbol in ctx.symbols(ctx.args.requests // 10 or 1):
+            start = time.perf_counter()
+            response = client.post("/analyze", json={"symbol": symbol, "strategy": "multi-strategy"})
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200 and response.json()["success"], response.text
+    return summarize(samples)
+
+
+@benchmark("output_modes")
+def bench_output_modes(ctx):
+    from fastapi.testclient import TestClient
+    from prometheus_client import REGISTRY
+    api = ctx.api()
+    client = TestClient(api.app)
+    symbols = ctx.symbols(ctx.args.requests // 10 or 1)
+    results = {}
+    def tokens():
+        return {kind: REGISTRY.get_sample_value("nepse_llm_tokens_total", {"kind": kind}) or 0
+                for kind in ("input", "output")}
+
+    for mode in ("markdown", "structured"):
+        before = tokens()
+        samples = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for symbol in symbols:
+                start = time.perf_counter()
+                response = client.post("/analyze", json={"symbol": symbol, "strategy": "multi-strategy",
+                                                         "output_format": mode})
+                samples.append(time.perf_counter() - start)
+                assert response.status_code == 200 and response.json()["success"], response.text
+        after = tokens()
+        results[mode] = {**summarize(samples), **{f"{kind}_tokens": round((after[kind] - before[kind]) / len(symbols), 1)
+                                                  for kind in after}}
+    return results
+
+
+@benchmark("llm_backends")
+def bench_llm_backends(ctx):
+    from llm_backends import make_backend, missing_config
+    prompts = [f"Analyze stock SYN{i:04d} for Buy, Sell, or Hold recommendation using a multi-strategy approach."
+               for i in range(ctx.args.requests // 10 or 1)]
+    results = {}
+    for name in ctx.args.llm_backends:
+        problem = None if name == "stub" else missing_config(name)
+        if problem:
+            results[name] = {"skipped": problem}
+            continue
+        llm = ctx.stub_llm() if name == "stub" else make_backend(name)
+        latency, _ = measure(lambda: [llm.invoke(p) for p in prompts[:1]], repeat=len(prompts))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(ctx.args.concurrency) as pool:
+            list(pool.map(llm.invoke, prompts))
+        results[name] = {**latency, "throughput_rps": round(len(prompts) / (time.perf_counter() - start), 2)}
+    return results
+
+
+@benchmark("llm_failover")
+def bench_llm_failover(ctx):
+    """Hedging and failover against simulated backends: a fast primary with a slow tail, a steady secondary."""
+    import random
+    from concurrent.futures import ThreadPoolExecutor as Pool
+    from langchain_core.runnables import RunnableLambda
+    from llm_backends import BackendHealth, BackendRouter
+    rng = random.Random(ctx.args.seed)
+
+    def primary(_, tail=0.10, errors=0.0):
+        roll = rng.random()
+        if roll < errors:
+            time.sleep(0.3)
+            raise RuntimeError("503 from primary")
+        time.sleep(1.0 if roll < errors + tail else 0.05)
+        return "primary"
+
+    def secondary(_):
+        time.sleep(0.12)
+        return "secondary"
+
+    def run(primary_fn, with_secondary=True, **router_kwargs):
+        backends = {"primary": RunnableLambda(primary_fn)}
+        if with_secondary:
+            backends["secondary"] = RunnableLambda(secondary)
+        router = BackendRouter(backends, {name: 5.0 for name in backends},
+                               {name: BackendHealth() for name in backends},
+                               {name: Pool(4) for name in backends}, **router_kwargs)
+        samples, failed, winners = [], 0, {}
+        for i in range(ctx.args.requests // 2 or 1):
+            start = time.perf_counter()
+            try:
+                winner = router.invoke(i)
+                winners[winner] = winners.get(winner, 0) + 1
+            except Exception:
+                failed += 1
+            samples.append(time.perf_counter() - start)
+        return {**summarize(samples), "failed": failed, "answered_by": winners}
+
+    def slow_tail(i):
+        return primary(i)
+
+    def erroring(i):
+        return primary(i, tail=0, errors=0.3)
+
+    return {
+        "slow_tail": {
+            "primary_only": run(slow_tail, with_secondary=False),
+            "hedged_200ms": run(slow_tail, hedge_after=0.2),
+        },
+        "erroring": {
+            "primary_only": run(erroring, with_secondary=False),
+            "retry_on_error": run(erroring, error_threshold=1.0),
+            "health_routed": run(erroring, error_threshold=0.2),
+        },
+    }
+
+
+@benchmark("semantic_cache")
+def bench_semantic_cache(ctx):
+    """Replay a request log through SemanticCache; every miss is one LLM call."""
+    import random
+    from semantic_cache import SemanticCache, cache_question
+    if ctx.args.request_log:
+        with open(ctx.args.request_log, encoding="utf-8") as f:
+            log = [json.loads(line) for line in f if line.strip()]
+    else:
+        # A skewed mix of popular symbols, with the label variants the two frontends send
+        rng = random.Random(ctx.args.seed)
+        symbols = ctx.symbols(20)
+        labels = STRATEGIES + ["Mean Reversion", "swing", "trend following"]
+        log = [{"symbol": rng.choices(symbols, weights=[1 / (i + 1) for i in range(len(symbols))])[0],
+                "strategy": rng.choice(labels)} for _ in range(ctx.args.requests)]
+
+    cache = SemanticCache(ctx.embeddings(), threshold=ctx.args.cache_threshold)
+    hits = cross_strategy = 0
+    lookups = []
+    for request in log:
+        symbol = request["symbol"].upper()
+        strategy = request.get("strategy", "multi-strategy")
+        question = cache_question(strategy)
+        start = time.perf_counter()
+        answer, vector = cache.lookup("replay", symbol, question)
+        lookups.append(time.perf_counter() - start)
+        if answer is None:
+            cache.store("replay", symbol, question, question, vector)
+        else:
+            hits += 1
+            cross_strategy += answer != question
+    return {"requests": len(log), "hit_rate": round(hits / len(log), 3), "llm_calls_saved": hits,
+            "cross_strategy_hits": cross_strategy, "threshold": ctx.args.cache_threshold,
+            "lookup": summarize(lookups)}
+
+
+@benchmark("http_load")
+def bench_http_load(ctx):
+    import requests
+    import uvicorn
+
+    api = ctx.api()
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}"
+    symbols = ctx.symbols(20)
+    plan = []
+    for i in range(ctx.args.requests):
+        symbol = symbols[i % len(symbols)]
+        kind = i % 10
+        if kind == 0:
+            plan.append(("/analyze", "POST", {"symbol": symbol, "strategy": STRATEGIES[i % len(STRATEGIES)]}))
+        elif kind < 4:
+            plan.append(("/stocks", "GET", None))
+        elif kind < 7:
+            plan.append(("/stocks/{symbol}", "GET", symbol))
+        else:
+            plan.append(("/stocks/{symbol}/indicators", "GET", symbol))
+
+    local = threading.local()
+
+    def run(item):
+        route, method, arg = item
+        session = getattr(local, "session", None) or requests.Session()
+        local.session = session
+        start = time.perf_counter()
+        if method == "POST":
+            response = session.post(base + route, json=arg, timeout=120)
+        else:
+            response = session.get(base + route.replace("{symbol}", arg or ""), timeout=120)
+        return route, response.status_code, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=ctx.args.concurrency) as pool:
+            results = list(pool.map(run, plan))
+    elapsed = time.perf_counter() - start
+    server.should_exit = True
+    thread.join(timeout=10)
+
+    by_route = {}
+    for route, status, seconds in results:
+        by_route.setdefault(route, []).append(seconds)
+    return {
+        "requests": len(results),
+        "concurrency": ctx.args.concurrency,
+        "errors": sum(1 for _, status, _ in results if status >= 400),
+        "throughput_rps": round(len(results) / elapsed, 1),
+        "routes": {route: summarize(samples) for route, samples in by_route.items()},
+    }
+
+
+@benchmark("watchlist")
+def bench_watchlist(ctx):
+    from fastapi.testclient import TestClient
+    api = ctx.api()
+    api.WATCHLIST_FILE = ctx.workdir / "watchlists.json"
+    api.watchlists = None
+    api.job_queue = None
+    client = TestClient(api.app)
+    symbols = ctx.symbols(50)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert client.put("/watchlist/bench", json={"symbols": symbols}).status_code == 200
+    # Built once per data version
+    snapshot = timeit(lambda: api.Snapshot(api.get_stock_data(), "bench"))
+    samples = []
+    for _ in range(max(20, ctx.args.repeat)):
+        start = time.perf_counter()
+        response = client.get("/watchlist/bench/summary")
+        samples.append(time.perf_counter() - start)
+    assert response.status_code == 200 and response.json()["portfolio"]["holdings"] == len(symbols)
+
+    # Queue LLM analysis jobs for the whole list and wait for them to land in the summary
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        queued = client.post("/watchlist/bench/analyze").json()["queued"]
+        while api.pending_analyses(symbols):
+            time.sleep(0.01)
+    drained = time.perf_counter() - start
+    portfolio = client.get("/watchlist/bench/summary").json()["portfolio"]
+    api.job_queue.stop()
+    api.job_queue = None
+    return {"symbols": len(symbols), "snapshot_build_ms": round(snapshot * 1000, 3), "summary": summarize(samples),
+            "queued": len(queued), "queue_drain_ms": round(drained * 1000, 1), "llm_signals": portfolio["llm_signals"]}
+
+
+@benchmark("pipeline")
+def bench_pipeline(ctx):
+    import pandas as pd
+    from pipeline import build_pipeline, chunk_partitions, read_chunks
+    from rag_data_loader import stock_to_text_chunks
+
+    work = ctx.workdir / "pipeline"
+    raw = work / "stock_data_ready.csv"
+    os.makedirs(work, exist_ok=True)
+    raw.write_bytes(ctx.raw().read_bytes())
+    paths = {"raw": raw, "processed": work / "processed.csv", "chunks": work / "chunks.jsonl",
+             "vector_store": work / "vectorstore" / "faiss_index", "manifest": work / "manifest.json",
+             "state_path": work / "state.json", "embeddings": ctx.args.embeddings}
+
+    def run(**force):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return build_pipeline(**paths).run(**force)
+
+    def ran(report):
+        return [name for name, entry in report.items() if entry["status"] == "ran"]
+
+    cold = run()
+    noop_ms = timeit(run) * 1000
+    assert not ran(run())
+    # A fresh interpreter, as `python pipeline.py` would be run
+    cli = [sys.executable, str(Path(__file__).parent / "pipeline.py"), "--raw", str(raw),
+           "--processed", str(paths["processed"]), "--chunks", str(paths["chunks"]),
+           "--vector-store", str(paths["vector_store"]), "--manifest", str(paths["manifest"]),
+           "--state", str(paths["state_path"]),
+           "--embeddings", ctx.args.embeddings]
+    cli_noop_ms = timeit(lambda: subprocess.run(cli, check=True, capture_output=True)) * 1000
+    assert cli_noop_ms < 1000, cli_noop_ms
+
+    # Touched but identical input: rehashed, nothing reruns
+    os.utime(raw)
+    touched = run()
+    # Indicators rerun with byte-identical output: downstream stages are cut off
+    forced = run(force=["indicators"])
+
+    # Chunks handed over in memory match a from-file stock_to_text_chunks pass
+    docs = read_chunks(paths["chunks"])
+    reference = stock_to_text_chunks(str(paths["processed"]))
+    assert [(d.page_content, d.metadata) for d in docs] == [(d.page_content, d.metadata) for d in reference]
+
+    # One price changes: everything downstream reruns
+    df = pd.read_csv(raw)
+    df.loc[df.index[-1], 'close'] += 1
+    df.to_csv(raw, index=False)
+    changed = run()
+
+    processed = pd.read_csv(paths["processed"])
+    workers = os.cpu_count() or 1
+    return {
+        "cold": cold, "noop_ms": round(noop_ms, 2), "cli_noop_ms": round(cli_noop_ms, 1),
+        "touched_input_ran": ran(touched), "forced_indicators_ran": ran(forced), "changed_price_ran": ran(changed),
+        "chunks": len(docs), "cpus": workers,
+        "chunk_serial_ms": round(timeit(lambda: chunk_partitions(processed, workers=1)) * 1000, 1),
+        "chunk_pool_ms": round(timeit(lambda: chunk_partitions(processed, workers=max(2, workers))) * 1000, 1),
+    }
+
+
+# The stock-list fallback as the page ran it before (on the main thread) and as it runs now
+PAGE_PARSE_JS = r"""
+const fs = require('fs');
+const [csvPath, manifestPath] = process.argv.slice(1);
+function best(fn) { let ms = Infinity; for (let i = 0; i < 5; i++) { const t = performance.now(); fn(); ms = Math.min(ms, performance.now() - t); } return ms; }
+const csv = fs.readFileSync(csvPath, 'utf8'), json = fs.readFileSync(manifestPath, 'utf8');
+const legacy = best(() => {
+    const lines = csv.split(/\r?\n/).filter(Boolean);
+    const symbolIdx = lines[0].split(',').map(h => h.trim().toLowerCase()).indexOf('symbol');
+    const set = new Set();
+    for (let i = 1; i < lines.length; i++) set.add((lines[i].split(',')[symbolIdx] || '').trim().toUpperCase());
+    return Array.from(set).sort();
+});
+const manifest = best(() => { const m = JSON.parse(json); m.index = new Map(m.symbols.map((s, i) => [s, i])); });
+console.log(JSON.stringify({ legacy_csv_ms: legacy, manifest_ms: manifest }));
+"""
+
+
+@benchmark("manifest")
+def bench_manifest(ctx):
+    import gzip
+    import shutil
+    from manifest import write_manifest
+
+    # Slow 4G as in Lighthouse's mobile profile
+    bandwidth, rtt = 1.6e6 / 8, 0.150
+    node = shutil.which("node")
+    results = {}
+    for name, path in (("recent", ctx.processed()), ("multi_year", ctx.dataset())):
+        manifest_path = ctx.workdir / f"manifest_{name}.json"
+        build_ms = timeit(lambda: write_manifest(str(path), str(manifest_path))) * 1000
+        csv, manifest = path.read_bytes(), manifest_path.read_bytes()
+        result = {"build_ms": round(build_ms, 1), "symbols": len(json.loads(manifest)["symbols"]),
+                  "csv_bytes": len(csv), "csv_gzip_bytes": len(gzip.compress(csv)),
+                  "manifest_bytes": len(manifest), "manifest_gzip_bytes": len(gzip.compress(manifest))}
+        if node:
+            # Main-thread parse time in V8; the browser adds DOM work on top
+            out = subprocess.run([node, "-e", PAGE_PARSE_JS, str(path), str(manifest_path)],
+                                 check=True, capture_output=True, text=True).stdout
+            parse = json.loads(out)
+            result.update({k: round(v, 2) for k, v in parse.items()})
+            for key, size, parse_ms in (("legacy", result["csv_gzip_bytes"], parse["legacy_csv_ms"]),
+                                        ("manifest", result["manifest_gzip_bytes"], parse["manifest_ms"])):
+                result[f"{key}_modelled_tti_ms"] = round((rtt + size / bandwidth) * 1000 + parse_ms, 1)
+        results[name] = result
+    return {"network": "1.6 Mbps, 150 ms RTT", "node": node is not None, **results}
+
+
+@benchmark("dataset_load")
+def bench_dataset_load(ctx):
+    import numpy as np
+    import pandas as pd
+    from fastapi.testclient import TestClient
+    from dataset import load_stock_data
+
+    path = ctx.dataset()
+
+    def legacy():
+        df = pd.read_csv(path)
+        df['tradedate'] = pd.to_datetime(df['tradedate'])
+        return df
+
+    def footprint(df):
+        return round(df.memory_usage(deep=True).sum() / 2 ** 20, 1)
+
+    legacy_load, legacy_df = measure(legacy, ctx.args.repeat)
+    compact_load, compact_df = measure(lambda: load_stock_data(path), ctx.args.repeat)
+    full_df = load_stock_data(path, compact=False)
+
+    # Regression check: every response served from the compact frame must match the float64 one
+    import api
+    api.DATA_FILE = path
+    api.WATCHLIST_FILE = ctx.workdir / "dataset_watchlists.json"
+    api.watchlists = None
+    api.JOB_DB = ctx.workdir / "dataset_jobs.sqlite3"  # the summary reads pending analyses from the job queue
+    api.job_queue = None
+    client = TestClient(api.app)
+    symbols = compact_df['symbol'].cat.categories.tolist()
+    sample = symbols[::max(1, len(symbols) // 100)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert client.put("/watchlist/dataset", json={"symbols": sample}).status_code == 200
+
+    def responses(df):
+        api.stock_data, api.stock_data_version = df, api.snapshot_version(path.stat())
+        api.response_cache.version = api.snapshot = None
+        urls = ["/stocks", "/sectors", "/watchlist/dataset/summary"]
+        urls += [f"/stocks/{s}{suffix}" for s in sample for suffix in ("", "/indicators")]
+        return {url: client.get(url).json() for url in urls}
+
+    mismatches = []
+
+    def compare_values(where, expected, got):
+        if isinstance(expected, dict):
+            assert expected.keys() == got.keys(), where
+            for key in expected:
+                compare_values(f"{where}.{key}", expected[key], got[key])
+        elif isinstance(expected, list):
+            assert len(expected) == len(got), where
+            for i, (a, b) in enumerate(zip(expected, got)):
+                compare_values(f"{where}[{i}]", a, b)
+        elif isinstance(expected, float) and isinstance(got, float) and not where.startswith(("/sectors", "/watchlist")):
+            # Prices and quoted percentages are exact; derived indicators keep ~7 significant digits.
+            # /sectors and /watchlist round to cents and must match exactly (dataset.FLOAT64_COLUMNS)
+            if not np.isclose(expected, got, rtol=1e-6, atol=1e-9):
+                mismatches.append((where, expected, got))
+        elif expected != got:
+            mismatches.append((where, expected, got))
+
+    expected, got = responses(full_df), responses(compact_df)
+    for url in expected:
+        compare_values(url, expected[url], got[url])
+    exact_prices = all(expected[f"/stocks/{s}/indicators"]["price"] == got[f"/stocks/{s}/indicators"]["price"]
+                       for s in sample)
+    assert not mismatches and exact_prices, mismatches[:10]
+    api.stock_data = api.snapshot = None
+    api.job_queue.stop()
+    api.job_queue = None
+    return {
+        "rows": len(compact_df), "symbols": len(symbols),
+        "years": round(ctx.args.dataset_days / 250, 1), "file_mb": round(path.stat().st_size / 2 ** 20, 1),
+        "legacy": {"columns": legacy_df.shape[1], "memory_mb": footprint(legacy_df), "load": legacy_load},
+        "compact": {"columns": compact_df.shape[1], "memory_mb": footprint(compact_df), "load": compact_load,
+                    "dtypes": compact_df.dtypes.astype(str).value_counts().to_dict()},
+        "responses_checked": len(expected), "mismatches": len(mismatches),
+    }
+
+
+def established_connections(port):
+    """Established TCP connections on the server side of port (Linux /proc; None elsewhere)."""
+    count = 0
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if int(fields[1].rsplit(":", 1)[1], 16) == port and fields[3] == "01":
+                        count += 1
+        except OSError:
+            return None
+    return count
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+@benchmark("dashboard")
+def bench_dashboard(ctx):
+    import requests
+    import uvicorn
+    from requests.adapters import HTTPAdapter
+
+    # A live server, as the Streamlit app talks to one over HTTP
+    latency = max(ctx.args.llm_latency, 0.2)
+    api = ctx.api(latency=latency)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+    calls = []
+
+    # main.py's request pattern per rerun before: a fresh connection per call, indicators then analysis in
+    # sequence (the health check used "/", which serves the HTML page once static/ exists; /api/status here)
+    def legacy(symbol, strategy, analyze):
+        for path in ("/api/status", "/stocks", f"/stocks/{symbol}"):
+            calls.append(requests.get(base + path, timeout=30).json())
+        if analyze:
+            calls.append(requests.get(f"{base}/stocks/{symbol}/indicators", timeout=30).json())
+            calls.append(requests.post(base + "/analyze", json={"symbol": symbol, "strategy": strategy},
+                                       timeout=120).json())
+
+    # ...and now: pooled session, results cached per data version (a dict stands in for st.cache_data),
+    # one overview call, the analysis running alongside it
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+    cache = {}
+    pool = ThreadPoolExecutor(max_workers=4)
+
+    def get(key, path, **params):
+        if key not in cache:
+            calls.append(None)
+            cache[key] = session.get(base + path, params=params, timeout=30).json()
+        return cache[key]
+
+    def pooled(symbol, strategy, analyze):
+        version = get(("status",), "/api/status")["data_version"]
+        get(("stocks", version), "/stocks")
+        analysis = None
+        if analyze:
+            calls.append(None)
+            analysis = pool.submit(lambda: session.post(base + "/analyze", json={"symbol": symbol, "strategy": strategy},
+                                                        timeout=120).json())
+        get(("overview", symbol, strategy, version), f"/stocks/{symbol}/overview", strategy=strategy)
+        if analysis is not None:
+            analysis.result()
+
+    # Per symbol: pick it, interact with another widget (same data), then ask for the analysis
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, client in (("before", legacy), ("after", pooled)):
+            samples = {"select": [], "rerun": [], "analyze": []}
+            requests_made = {kind: 0 for kind in samples}
+            for symbol in ctx.symbols(20):
+                for kind, analyze in (("select", False), ("rerun", False), ("analyze", True)):
+                    calls.clear()
+                    start = time.perf_counter()
+                    client(symbol, "multi-strategy", analyze)
+                    samples[kind].append(time.perf_counter() - start)
+                    requests_made[kind] += len(calls)
+            results[name] = {kind: summarize(values) | {"requests": round(requests_made[kind] / len(values), 1)}
+                             for kind, values in samples.items()}
+    server.should_exit = True
+    thread.join(timeout=10)
+    pool.shutdown()
+    return {"llm_latency_s": latency, **results}
+
+
+@benchmark("pattern_search")
+def bench_pattern_search(ctx):
+    import numpy as np
+    from fastapi.testclient import TestClient
+    from dataset import load_stock_data
+    from pattern_search import PatternIndex, window_vectors
+
+    path = ctx.dataset()
+    df = load_stock_data(path)
+    build = {}
+    for name, workers in (("serial", 1), ("parallel", None)):
+        start = time.perf_counter()
+        index = PatternIndex(df, workers=workers)
+        build[f"{name}_s"] = round(time.perf_counter() - start, 2)
+
+    rng = np.random.default_rng(ctx.args.seed)
+    queries = [(index.symbols[i], int(w)) for i, w in zip(rng.integers(len(index.symbols), size=200),
+                                                          rng.choice(list(index.indexes), size=200))]
+    search = summarize([timeit(lambda: index.describe(*index.search(s, window=w), w)) for s, w in queries])
+
+    # FAISS flat search against brute-force distances with the same exclusion rules
+    mismatches = 0
+    for symbol, window in queries[:10]:
+        (s, t), found = index.search(symbol, window=window)
+        vectors = index.indexes[window].reconstruct_n(0, index.indexes[window].ntotal)
+        lo = t - window + 1
+        query = window_vectors(index.close[s:s + 1, lo:t + 1], index.log_volume[s:s + 1, lo:t + 1],
+                               index.rsi[s:s + 1, lo:t + 1], window).reshape(-1)
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        expected, taken = [], {}
+        for i in np.argsort(distances, kind="stable"):
+            row, end = int(index.rows[window][i]), int(index.ends[window][i])
+            if (row == s and abs(end - t) < window) or any(abs(end - o) < window for o in taken.get(row, ())):
+                continue
+            taken.setdefault(row, []).append(end)
+            expected.append((row, end))
+            if len(expected) == len(found):
+                break
+        mismatches += sum(a[:2] != b for a, b in zip(found, expected))
+
+    # Forward returns against the CSV's closes
+    closes = df.groupby('symbol', observed=True)['close'].apply(lambda c: c.to_numpy(dtype=np.float64))
+    (s, t), found = index.search(queries[0][0], window=20)
+    forward_errors = 0
+    for row, end, _ in found:
+        c = closes[index.symbols[row]]
+        for h, value in zip(index.horizons, index.forward[:, row, end]):
+            want = (c[end + h] / c[end] - 1) * 100 if end + h < len(c) else np.nan
+            forward_errors += not (np.isnan(want) and np.isnan(value) or abs(want - value) < 1e-3)
+
+    import api
+    api.DATA_FILE = path
+    api.stock_data = None
+    api.pattern_index = None
+    lift_rate_limits(api)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = TestClient(api.app)
+        first = timeit(lambda: client.get(f"/stocks/{queries[0][0]}/similar").raise_for_status())
+        endpoint = summarize([timeit(lambda: client.get(f"/stocks/{s}/similar", params={"window": w}).raise_for_status())
+                              for s, w in queries])
+    assert search["p95_ms"] < 50 and endpoint["p95_ms"] < 50, (search, endpoint)
+    return {"rows": len(df), "symbols": len(index.symbols), "windows": index.windows(),
+            "index_mb": round(sum(i.ntotal * i.d * 4 for i in index.indexes.values()) / 2 ** 20, 1),
+            "build": build, "search": search, "endpoint_first_request_s": round(first, 2), "endpoint": endpoint,
+            "brute_force_mismatches": mismatches, "forward_return_errors": forward_errors}
+
+
+@benchmark("alerts")
+def bench_alerts(ctx):
+    import numpy as np
+    from alerts import AlertEngine, alert_frame
+    from dataset import load_stock_data
+
+    df = load_stock_data(ctx.dataset())
+    days = np.sort(df['tradedate'].unique())[-21:]
+    frames = [alert_frame(df[df['tradedate'] <= day].reset_index(drop=True)) for day in days]
+    symbols = list(frames[-1].index)
+
+    # The kinds of rules users ask for, with random thresholds; one in ten is scoped to a few symbols
+    rng = np.random.default_rng(ctx.args.seed)
+    templates = [
+        lambda: {"left": "RSI", "op": "crosses_below", "right": float(rng.uniform(20, 40))},
+        lambda: {"left": "RSI", "op": "crosses_above", "right": float(rng.uniform(60, 80))},
+        lambda: {"left": "MA20", "op": str(rng.choice(["crosses_above", "crosses_below"])), "right": "MA50"},
+        lambda: {"left": "close", "op": "crosses_above", "right": "BB_UPPER"},
+        lambda: {"left": "close", "op": "crosses_below", "right": "BB_LOWER"},
+        lambda: {"left": "vol", "op": "crosses_above", "right": "VOL_AVG20", "factor": float(rng.choice([2, 3, 4]))},
+        lambda: {"left": "MACD_Hist", "op": str(rng.choice(["crosses_above", "crosses_below"])), "right": 0},
+        lambda: {"left": "ADX", "op": "crosses_above", "right": float(rng.uniform(20, 40))},
+    ]
+    rules = []
+    for i in range(ctx.args.alert_rules):
+        rule = templates[rng.integers(len(templates))]() | {"owner": f"user{i % 50}"}
+        if rng.random() < 0.1:
+            rule["symbols"] = list(rng.choice(symbols, size=5, replace=False))
+        rules.append(rule)
+    engine = AlertEngine()
+    register = timeit(lambda: engine.add(rules))
+    rules = list(engine.rules.values())
+
+    arm = timeit(lambda: engine.evaluate(frames[0]))
+    samples, fired = [], []
+    for frame in frames[1:]:
+        start = time.perf_counter()
+        fired.append(engine.evaluate(frame))
+        samples.append(time.perf_counter() - start)
+    daily = summarize(samples)
+
+    # A tick: ten symbols' latest values move
+    ticks = []
+    for _ in range(20):
+        tick = frames[-1].iloc[rng.choice(len(symbols), size=10, replace=False)].copy()
+        tick['close'] *= rng.uniform(0.97, 1.03, size=len(tick))
+        ticks.append(timeit(lambda: engine.evaluate(tick)))
+
+    # The same crossings, one rule and symbol at a time
+    def naive(previous, current):
+        def holds(rule, row):
+            left = row.get(rule["left"], np.nan)
+            right = row.get(rule["right"], np.nan) * rule["factor"] if isinstance(rule["right"], str) else rule["right"]
+            if np.isnan(left) or np.isnan(right):
+                return None
+            return left < right if rule["op"] == "crosses_below" else left > right
+
+        found, before = set(), previous.to_dict(orient="index")
+        for symbol, row in current.to_dict(orient="index").items():
+            for rule in rules:
+                if (not rule["symbols"] or symbol in rule["symbols"]) and symbol in before \
+                        and holds(rule, before[symbol]) is False and holds(rule, row) is True:
+                    found.add((rule["id"], symbol))
+        return found
+
+    mismatches, naive_samples = 0, []
+    for i in range(1, 4):
+        start = time.perf_counter()
+        expected = naive(frames[i - 1], frames[i])
+        naive_samples.append(time.perf_counter() - start)
+        mismatches += len(expected ^ {(a["rule_id"], a["symbol"]) for a in fired[i - 1].select()})
+
+    assert mismatches == 0 and daily["p95_ms"] < 100, (mismatches, daily)
+    return {"rules": len(rules), "symbols": len(symbols), "register_ms": round(register * 1000, 1),
+            "first_evaluation_ms": round(arm * 1000, 1), "daily": daily,
+            "fired_per_day": round(statistics.fmean(len(f) for f in fired), 1),
+            "tick_10_symbols": summarize(ticks), "naive_per_day": summarize(naive_samples),
+            "naive_mismatches": mismatches}
+
+
+@benchmark("correlations")
+def bench_correlations(ctx):
+    import numpy as np
+    import pandas as pd
+    from correlations import RollingCorrelation, track_correlations
+    from dataset import load_stock_data
+
+    window, updates = 60, 20
+    rng = np.random.default_rng(ctx.args.seed)
+    results = {}
+    for n in (400, 2000):
+        # Five market factors plus noise; a tenth of the symbols list partway through
+        days = 400
+        returns = (rng.normal(0, 0.01, (days, 5)) @ rng.normal(0, 1, (5, n)) + rng.normal(0, 0.015, (days, n)))
+        listed = np.ones((days, n), dtype=bool)
+        listed[0] = False
+        late = rng.choice(n, size=n // 10, replace=False)
+        listed[:days - 30, late] = False
+        returns = np.where(listed, returns, 0).astype(np.float32)
+        day_numbers = np.arange(days)
+        symbols = [f"S{i:04d}" for i in range(n)]
+
+        result = {}
+        for mode, halflife in (("rolling", None), ("ewm", 30)):
+            tracker = RollingCorrelation(symbols, window, halflife)
+            fit = timeit(lambda: tracker.fit(day_numbers[:-updates], returns[:-updates], listed[:-updates]))
+            samples = []
+            for t in range(days - updates, days):
+                samples.append(timeit(lambda: tracker.update(day_numbers[t], returns[t], listed[t])))
+            matrix = timeit(tracker.correlation)
+            peers = summarize([timeit(lambda: tracker.peers(symbols[i])) for i in rng.integers(n, size=100)])
+            pairs = timeit(lambda: tracker.pairs(20))
+            # Incremental state against a fresh fit on the same history
+            fresh = RollingCorrelation(symbols, window, halflife).fit(day_numbers, returns, listed).correlation()
+            drift = float(np.nanmax(np.abs(tracker.correlation() - fresh)))
+            result[mode] = {"fit_ms": round(fit * 1000, 1), "update": summarize(samples),
+                            "full_matrix_ms": round(matrix * 1000, 1), "peers": peers,
+                            "pairs_ms": round(pairs * 1000, 1), "max_abs_diff_vs_refit": round(drift, 6)}
+            if halflife is None:
+                frame = pd.DataFrame(returns[-window:].astype(np.float64))
+                scratch = timeit(frame.corr)
+                expected = frame.corr().to_numpy()
+                full = np.flatnonzero(listed[-window:].all(axis=0))
+                got = tracker.correlation()[np.ix_(full, full)]
+                result[mode]["pandas_from_scratch_ms"] = round(scratch * 1000, 1)
+                result[mode]["max_abs_diff_vs_pandas"] = round(float(np.abs(got - expected[np.ix_(full, full)]).max()), 6)
+                result[mode]["unlisted_are_nan"] = bool(np.isnan(tracker.correlation()[late[0]]).all())
+        result["matrix_mb"] = round(n * n * 4 / 2 ** 20, 1)
+        results[f"symbols_{n}"] = result
+
+    # The API path: a processed file gaining one trading day
+    df = load_stock_data(ctx.dataset())
+    last_day = df['tradedate'].max()
+    before = df[df['tradedate'] < last_day].reset_index(drop=True)
+    rebuild = timeit(lambda: track_correlations(before, window))
+    tracker, _ = track_correlations(before, window)
+    start = time.perf_counter()
+    tracker, applied = track_correlations(df, window, tracker=tracker)
+    results["dataset_append_one_day"] = {"rebuild_ms": round(rebuild * 1000, 1),
+                                         "incremental_ms": round((time.perf_counter() - start) * 1000, 1),
+                                         "days_applied": applied}
+    for n in (400, 2000):
+        assert results[f"symbols_{n}"]["rolling"]["max_abs_diff_vs_pandas"] < 1e-4, results
+    return {"window": window, **results}
+
+
+@benchmark("risk")
+def bench_risk(ctx):
+    import numpy as np
+    from fastapi.testclient import TestClient
+    from dataset import load_stock_data
+    from risk_engine import LOOKBACK, PATHS, batch_risk, risk_inputs, simulate
+
+    df = load_stock_data(ctx.dataset())
+    codes = df['symbol'].array.codes
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+    inputs = [risk_inputs(df.iloc[max(a, b - LOOKBACK - 1):b]) for a, b in zip(bounds[:50], bounds[1:51])]
+    single = {method: summarize([timeit(lambda: simulate(item, method=method)) for item in inputs])
+              for method in ("bootstrap", "normal")}
+
+    # Normal paths against the closed-form lognormal quantile, and hit probabilities adding up
+    from statistics import NormalDist
+    var_errors, probability_errors = [], 0
+    for item in inputs[:10]:
+        risk = simulate(item, method="normal")
+        returns = np.diff(np.log(item["closes"]))
+        mu, sigma = returns.mean() * risk["horizon_days"], returns.std() * np.sqrt(risk["horizon_days"])
+        analytic = -np.expm1(mu + sigma * NormalDist().inv_cdf(0.05)) * 100
+        var_errors.append(abs(risk["var_95_percent"] - analytic))
+        for level in risk["levels"].values():
+            if level is not None:
+                probability_errors += abs(level["p_target_first"] + level["p_stop_first"] + level["p_neither"] - 1) > 2e-3
+
+    batch = {}
+    for name, workers in (("serial", 1), ("process_pool", None)):
+        start = time.perf_counter()
+        results = batch_risk(df, workers=workers)
+        batch[f"{name}_s"] = round(time.perf_counter() - start, 2)
+    batch["symbols"] = len(results)
+
+    import api
+    api.DATA_FILE = ctx.dataset()
+    api.stock_data = None
+    lift_rate_limits(api)
+    symbols = [item["symbol"] for item in inputs]
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = TestClient(api.app)
+        endpoint = summarize([timeit(lambda: client.get(f"/stocks/{s}/risk").raise_for_status()) for s in symbols])
+        cached = summarize([timeit(lambda: client.get(f"/stocks/{s}/risk").raise_for_status()) for s in symbols])
+    assert single["bootstrap"]["p95_ms"] < 100 and single["normal"]["p95_ms"] < 100, single
+    assert max(var_errors) < 0.5 and probability_errors == 0, (var_errors, probability_errors)
+    return {"paths": PATHS, "single_symbol": single, "batch": batch,
+            "endpoint_first": endpoint, "endpoint_cached": cached,
+            "max_var95_error_vs_analytic_pct_points": round(max(var_errors), 3)}
+
+
+@benchmark("timeframes")
+def bench_timeframes(ctx):
+    import numpy as np
+    import pandas as pd
+    from fastapi.testclient import TestClient
+    from indicator_engine import compute_indicators
+    from timeframes import calculate_timeframes, resample_bars
+
+    df = pd.read_csv(ctx.dataset())
+    results = {}
+    for timeframe, rule in (("weekly", "W-SAT"), ("monthly", "MS")):
+        resample = timeit(lambda: resample_bars(df, timeframe))
+        bars = resample_bars(df, timeframe)
+        indicators = timeit(lambda: compute_indicators(bars))
+
+        # What computing one symbol's bars per request would cost: pandas resample of its daily rows
+        symbols = df['symbol'].unique()[:20]
+        samples, mismatches = [], 0
+        for symbol in symbols:
+            start = time.perf_counter()
+            rows = df[df['symbol'] == symbol].set_index(pd.to_datetime(df.loc[df['symbol'] == symbol, 'tradedate']))
+            ref = rows.resample(rule).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                           'vol': 'sum'}).dropna(subset=['close'])
+            compute_indicators(ref.assign(symbol=symbol))
+            samples.append(time.perf_counter() - start)
+            mine = bars[bars['symbol'] == symbol]
+            columns = ['open', 'high', 'low', 'close', 'vol']
+            mismatches += len(ref) != len(mine) or not np.allclose(ref[columns].to_numpy(), mine[columns].to_numpy())
+        results[timeframe] = {"bars": len(bars), "resample_ms": round(resample * 1000, 1),
+                              "indicators_ms": round(indicators * 1000, 1),
+                              "per_symbol_on_the_fly": summarize(samples), "pandas_resample_mismatches": mismatches}
+
+    processed = ctx.workdir / "timeframes" / "stock_data_with_indicators.csv"
+    os.makedirs(processed.parent, exist_ok=True)
+    processed.write_bytes(ctx.dataset().read_bytes())
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        calculate_timeframes(df, processed)
+        results["stage_s"] = round(time.perf_counter() - start, 2)
+
+    import api
+    api.DATA_FILE = processed
+    api.stock_data = None
+    symbols = df['symbol'].unique()[:50]
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = TestClient(api.app)
+        client.get(f"/stocks/{symbols[0]}/indicators", params={"timeframe": "weekly"}).raise_for_status()
+        results["endpoint_weekly"] = summarize([
+            timeit(lambda: client.get(f"/stocks/{s}/indicators", params={"timeframe": "weekly"}).raise_for_status())
+            for s in symbols])
+    assert results["weekly"]["pandas_resample_mismatches"] == 0 and results["monthly"]["pandas_resample_mismatches"] == 0
+    return results
+
+
+@benchmark("data_quality")
+def bench_data_quality(ctx):
+    import numpy as np
+    import pandas as pd
+    from data_quality import validate_prices
+    from pipeline import build_pipeline
+
+    ctx.dataset()
+    raw = ctx.workdir / "dataset_raw.csv"
+    df = pd.read_csv(raw)
+    validate = min(timeit(lambda: validate_prices(df)) for _ in range(3))
+    clean_report = validate_prices(df)[2]
+
+    # Known faults on disjoint rows that have a previous and next row of the same symbol
+    df = df.sort_values(['symbol', 'tradedate'], ignore_index=True)
+    rng = np.random.default_rng(ctx.args.seed)
+    symbol = df['symbol'].to_numpy()
+    inner = np.flatnonzero((symbol[1:-1] == symbol[:-2]) & (symbol[1:-1] == symbol[2:])) + 1
+    inner = inner[df['prev. close'].to_numpy()[inner] > 100]
+    sizes = {"duplicate": 50, "non_trading_day": 40, "ohlc": 30, "zero_volume": 20, "circuit_breach": 20,
+             "stale_repeat": 20, "bad_value": 10, "prev_close": 30, "dropped": 25}
+    # Spaced out so no two faults touch neighbouring rows
+    picked = rng.permutation(inner[::4])[:sum(sizes.values())]
+    rows, start = {}, 0
+    for name, size in sizes.items():
+        rows[name], start = np.sort(picked[start:start + size]), start + size
+
+    dirty = df.copy()
+    dirty['close'] = dirty['close'].astype(object)
+    dirty.loc[rows["ohlc"], 'high'] = dirty.loc[rows["ohlc"], 'low'] - 1
+    dirty.loc[rows["zero_volume"], 'vol'] = 0
+    dirty.loc[rows["circuit_breach"], 'close'] = (dirty.loc[rows["circuit_breach"], 'prev. close'] * 1.2).round(2)
+    stale = ['open', 'high', 'low', 'close', 'vol', 'prev. close']
+    dirty.loc[rows["stale_repeat"], stale] = dirty.loc[rows["stale_repeat"] - 1, stale].to_numpy()
+    dirty.loc[rows["bad_value"], 'close'] = 'n/a'
+    dirty.loc[rows["prev_close"], 'prev. close'] += 0.5
+    fridays = dirty.loc[rows["non_trading_day"]].copy()
+    fridays['tradedate'] = (pd.to_datetime(fridays['tradedate']) + pd.offsets.Week(weekday=4)).dt.strftime('%Y-%m-%d')
+    dirty = pd.concat([dirty.drop(index=rows["dropped"]), dirty.loc[rows["duplicate"]], fridays],
+                      ignore_index=True)
+    _, quarantined, report = validate_prices(dirty)
+    expected = {name: sizes[name] for name in report["quarantined"]}
+
+    # Share of a cold pipeline run (fake embeddings) spent validating
+    work = ctx.workdir / "data_quality"
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        build_pipeline(raw=raw, processed=work / "processed.csv", chunks=work / "chunks.jsonl",
+                       vector_store=work / "vectorstore" / "faiss_index", manifest=work / "manifest.json",
+                       embeddings="fake", state_path=work / "state.json").run(force=["all"])
+        pipeline = time.perf_counter() - start
+
+    result = {
+        "rows": len(df), "validate_ms": round(validate * 1000, 1), "pipeline_s": round(pipeline, 2),
+        "overhead_percent": round(validate / pipeline * 100, 2),
+        "clean_dataset_quarantined": clean_report["quarantined_rows"],
+        "injected": sizes, "quarantined": report["quarantined"], "gaps": report["gaps"]["count"],
+        "prev_close_mismatches": report["prev_close_mismatches"]["count"],
+        "dtype_drift": sorted(report["schema"]["dtype_drift"]),
+    }
+    assert clean_report["quarantined_rows"] == 0, clean_report
+    assert report["quarantined"] == expected, result
+    assert report["gaps"]["count"] >= sizes["dropped"] and report["prev_close_mismatches"]["count"] >= sizes["prev_close"]
+    assert result["overhead_percent"] < 5, result
+    return result
+
+
+@benchmark("admission")
+def bench_admission(ctx):
+    import requests
+    import uvicorn
+
+    # A live server with a slow stub LLM; /analyze is flooded by more clients than it has slots while two
+    # probes time the cheap routes. Run once without admission control and once with it.
+    latency = max(ctx.args.llm_latency, 1.0)
+    api = ctx.api(latency=latency)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning",
+                                           limit_concurrency=None, backlog=2048))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+    symbols = ctx.symbols(20)
+    flooders, duration, timeout = max(32, ctx.args.concurrency * 2), 8.0, 10.0
+    analyze = api.admission_limits[("POST", "/analyze")]
+
+    def probe(path, stop, samples):
+        session = requests.Session()
+        while not stop.is_set():
+            start = time.perf_counter()
+            assert session.get(base + path, timeout=60).status_code == 200
+            samples.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    def flood(i, stop, outcomes):
+        session = requests.Session()
+        headers = {"X-Request-Timeout": str(timeout)}
+        n = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = session.post(base + "/analyze", json={"symbol": symbols[(i + n) % len(symbols)],
+                                                              "strategy": "multi-strategy"},
+                                    headers=headers, timeout=120)
+            seconds = time.perf_counter() - start
+            outcomes.append((response.status_code, seconds, response.headers.get("Retry-After")))
+            n += 1
+            if response.status_code == 429:
+                time.sleep(min(float(response.headers["Retry-After"]), 1.0))
+
+    def run(enabled):
+        api.ADMISSION_ENABLED = enabled
+        analyze.service_seconds = latency
+        samples = {"/stocks": [], "/api/status": []}
+        outcomes = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            stop = threading.Event()
+            workers = [threading.Thread(target=probe, args=(path, stop, samples[path])) for path in samples]
+            for worker in workers:
+                worker.start()
+            time.sleep(1.0)
+            idle = {path: summarize(values) for path, values in samples.items()}
+            for values in samples.values():
+                values.clear()
+            floods = [threading.Thread(target=flood, args=(i, stop, outcomes)) for i in range(flooders)]
+            for worker in floods:
+                worker.start()
+            time.sleep(duration)
+            stop.set()
+            for worker in workers + floods:
+                worker.join()
+        ok = [seconds for status, seconds, _ in outcomes if status == 200]
+        rejected = [(seconds, retry) for status, seconds, retry in outcomes if status == 429]
+        return {
+            "cheap_idle": idle,
+            "cheap_under_load": {path: summarize(values) for path, values in samples.items()},
+            "analyze": {"ok": len(ok), "rejected_429": len(rejected),
+                        "other": sum(1 for status, _, _ in outcomes if status not in (200, 429)),
+                        "ok_latency": summarize(ok) if ok else None,
+                        "ok_within_timeout": sum(1 for seconds in ok if seconds <= timeout),
+                        "rejection_latency": summarize([seconds for seconds, _ in rejected]) if rejected else None,
+                        "retry_after_set": all(retry is not None for _, retry in rejected)},
+        }
+
+    results = {"llm_latency_s": latency, "flooders": flooders, "duration_s": duration, "client_timeout_s": timeout,
+               "analyze_concurrency": analyze.concurrency, "analyze_queue": analyze.queue,
+               "off": run(False), "on": run(True)}
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Deadline-aware rejection: a client that will only wait 0.5s is turned away at once
+        start = time.perf_counter()
+        response = requests.post(base + "/analyze", json={"symbol": symbols[0], "strategy": "multi-strategy"},
+                                 headers={"X-Request-Timeout": "0.5"}, timeout=60)
+        results["short_deadline"] = {"status": response.status_code, "reason": response.json().get("reason"),
+                                     "ms": round((time.perf_counter() - start) * 1000, 1)}
+        # Per-client token bucket: a burst over the limit from one client, which a new X-Client-Id per request
+        # doesn't get around (buckets are keyed on the address)
+        analyze.rate, analyze.burst = 0.1, 3
+        statuses = [requests.post(base + "/analyze", json={"symbol": symbols[0], "strategy": "multi-strategy"},
+                                  headers={"X-Client-Id": f"bursty-{n}"}, timeout=60) for n in range(6)]
+        results["client_burst"] = {"sent": len(statuses), "ok": sum(r.status_code == 200 for r in statuses),
+                                   "rate_limited": sum(r.json().get("reason") == "rate_limited" for r in statuses
+                                                       if r.status_code == 429)}
+        analyze.rate = None
+    server.should_exit = True
+    thread.join(timeout=10)
+    api.ADMISSION_ENABLED = True
+    return results
+
+
+@benchmark("profiling")
+def bench_profiling(ctx):
+    import statistics as stats
+    from fastapi.testclient import TestClient
+    from profiling import profile_run
+    from rag_data_loader import stock_to_text_chunks
+
+    latency = max(ctx.args.llm_latency, 0.3)
+    api = ctx.api(latency=latency)
+    profiler = api.profiler
+    saved = (profiler.directory, profiler.sample_rate, profiler.interval, profiler.slow_seconds)
+    profiler.directory = ctx.workdir / "profiles"
+    client = TestClient(api.app)
+    modes = {"off": (0.0, None), "slow_capture": (0.0, 5.0), "sampling_all": (1.0, 5.0)}
+
+    # Per-request cost of a cheap route with the hooks off, with slow-request capture (the default) and with
+    # every request sampled; modes are interleaved over rounds so drift hits them alike
+    n, rounds = 300, 9
+    per_request = {mode: [] for mode in modes}
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.get("/stocks")  # data loaded up front, so the /analyze captures below are of the LLM call
+        for _ in range(rounds):
+            for mode, (rate, slow) in modes.items():
+                profiler.configure(rate, slow_seconds=slow)
+                start = time.perf_counter()
+                for _ in range(n):
+                    client.get("/api/status")
+                per_request[mode].append((time.perf_counter() - start) / n * 1e6)
+    off = per_request["off"]
+    noise = (max(off) - min(off)) / stats.median(off) * 100
+    results = {"requests_per_round": n, "rounds": rounds,
+               "per_request_us": {mode: round(stats.median(values), 1) for mode, values in per_request.items()},
+               "overhead_pct": {mode: round((stats.median(values) / stats.median(off) - 1) * 100, 2)
+                                for mode, values in per_request.items() if mode != "off"},
+               "off_round_spread_pct": round(noise, 2)}
+
+    # The middleware hook alone: the enabled check when off, begin/end with slow-request capture on
+    hook_us = {}
+    m = 100000
+    for mode, (rate, slow) in list(modes.items())[:2]:
+        profiler.configure(rate, slow_seconds=slow)
+        start = time.perf_counter()
+        for _ in range(m):
+            capture = profiler.begin("GET", "/api/status") if profiler.enabled else None
+            if capture is not None:
+                profiler.end(capture, "/api/status", 200)
+        hook_us[mode] = round((time.perf_counter() - start) / m * 1e6, 3)
+    results["hook_us"] = hook_us
+
+    # Slow-request capture of /analyze: stage timings and the stacks at the threshold
+    profiler.configure(0.0, slow_seconds=latency / 2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert client.post("/analyze", json={"symbol": ctx.symbols(1)[0], "strategy": "multi-strategy"}).status_code == 200
+    captured = [r for r in profiler.slow if r["route"] == "/analyze"][-1]
+    stacks = "\n".join(line for lines in (captured["stacks"] or {}).values() for line in lines)
+    results["slow_capture"] = {"seconds": captured["seconds"], "stages": sorted(captured["stages"]),
+                               "llm_stage_s": captured["stages"].get("rag.llm", {}).get("seconds"),
+                               "stack_shows_llm": "stub_llm.py" in stacks}
+
+    # A sampled /analyze writes a folded profile with the LLM call in it
+    profiler.configure(1.0, interval=0.005, slow_seconds=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.post("/analyze", json={"symbol": ctx.symbols(2)[1], "strategy": "multi-strategy"})
+    name = profiler.profiles()[0]
+    folded = (profiler.directory / name).read_text(encoding="utf-8")
+    results["sampled_profile"] = {"name": name, "stacks": folded.count("\n"),
+                                  "samples": sum(int(line.rsplit(" ", 1)[1]) for line in folded.splitlines()),
+                                  "shows_llm": "stub_llm.py" in folded}
+
+    # CLI profiling of a pipeline step: the sampler's cost on the run time
+    plain, _ = measure(lambda: stock_to_text_chunks(str(ctx.processed())), repeat=ctx.args.repeat)
+    profiled, _ = measure(lambda: profile_run("stock_to_text_chunks", lambda: stock_to_text_chunks(str(ctx.processed())),
+                                              ctx.workdir / "profiles"), repeat=ctx.args.repeat)
+    results["stock_to_text_chunks"] = {"plain": plain, "profiled": profiled,
+                                       "overhead_pct": round((profiled["median_ms"] / plain["median_ms"] - 1) * 100, 1)}
+
+    profiler.directory = saved[0]
+    profiler.configure(saved[1], saved[2], saved[3])
+    return results
+
+
+@benchmark("job_queue")
+def bench_job_queue(ctx):
+    import requests
+    import uvicorn
+    from job_queue import JobQueue
+
+    # Retries, dead-lettering and priority order on a bare queue
+    attempts = {}
+
+    def flaky(payload):
+        attempts[payload["n"]] = attempts.get(payload["n"], 0) + 1
+        if attempts[payload["n"]] <= payload["failures"]:
+            raise RuntimeError("flaky")
+        return payload["n"]
+
+    queue = JobQueue(ctx.workdir / "queue_check.sqlite3", {"flaky": flaky}, workers=1, backoff=0.01, poll=0.01)
+    low = queue.enqueue("flaky", {"n": 0, "failures": 0})
+    retried = queue.enqueue("flaky", {"n": 1, "failures": 2})
+    dead = queue.enqueue("flaky", {"n": 2, "failures": 5})
+    high = queue.enqueue("flaky", {"n": 3, "failures": 0}, priority=5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        queue.start()
+        while any(queue.get(j)["status"] not in ("succeeded", "dead") for j in (low, retried, dead, high)):
+            time.sleep(0.01)
+        queue.stop()
+    jobs = {name: queue.get(j) for name, j in (("low", low), ("retried", retried), ("dead", dead), ("high", high))}
+    assert jobs["high"]["updated_at"] <= jobs["low"]["updated_at"], "priority order"
+    assert jobs["retried"]["status"] == "succeeded" and jobs["retried"]["attempts"] == 3
+    assert jobs["dead"]["status"] == "dead" and jobs["dead"]["attempts"] == 3
+
+    # Load test: queue analyses over HTTP with a stub LLM, watching server connections and memory
+    api = ctx.api(latency=max(ctx.args.llm_latency, 0.005))
+    api.JOB_DB = ctx.workdir / "jobs.sqlite3"
+    api.job_queue = None
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}"
+    symbols = ctx.symbols(50)
+    local = threading.local()
+    samples = {"connections": [], "rss_mb": []}
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            samples["connections"].append(established_connections(port) or 0)
+            samples["rss_mb"].append(rss_mb())
+            time.sleep(0.05)
+
+    def session():
+        if getattr(local, "session", None) is None:
+            local.session = requests.Session()
+        return local.session
+
+    def submit(i):
+        start = time.perf_counter()
+        body = {"symbol": symbols[i % len(symbols)], "strategy": STRATEGIES[i % len(STRATEGIES)],
+                "priority": 5 if i % 100 == 0 else 0}
+        response = session().post(base + "/jobs/analyze", json=body, timeout=30)
+        return response.json()["id"], time.perf_counter() - start
+
+    rss_before = rss_mb()
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=ctx.args.concurrency) as pool:
+            submitted = list(pool.map(submit, range(ctx.args.jobs)))
+        submit_seconds = time.perf_counter() - start
+        # A few SSE subscribers and pollers, as clients would
+        with requests.get(f"{base}/jobs/{submitted[-1][0]}/events", stream=True, timeout=600) as events:
+            last_event = [line for line in events.iter_lines(decode_unicode=True) if line.startswith("event:")][-1]
+        pending = [job_id for job_id, _ in submitted]
+        while pending:
+            pending = [j for j in pending if session().get(f"{base}/jobs/{j}", timeout=30).json()["status"]
+                       not in ("succeeded", "dead")]
+            time.sleep(0.2)
+    drained = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    counts = session().get(base + "/jobs").json()["counts"]
+    server.should_exit = True
+    thread.join(timeout=10)  # the server's shutdown stops the job queue
+    return {
+        "jobs": len(submitted), "concurrency": ctx.args.concurrency, "workers": api.JOB_WORKERS,
+        "submit": summarize([seconds for _, seconds in submitted]),
+        "submit_total_ms": round(submit_seconds * 1000, 1), "drain_total_ms": round(drained * 1000, 1),
+        "jobs_per_second": round(len(submitted) / drained, 1), "counts": counts, "sse_last_event": last_event,
+        "max_connections": max(samples["connections"]), "rss_before_mb": rss_before,
+        "rss_peak_mb": max(samples["rss_mb"]), "rss_after_mb": rss_mb(),
+        "retry_check": {name: job["attempts"] for name, job in jobs.items()},
+    }
+
+
+@benchmark("format_output")
+def bench_format_output(ctx):
+    from markdown_formatter import format_markdown, format_output_regex
+    llm = ctx.stub_llm(latency=0)
+    corpus = [llm.respond(f"Analyze stock SYN{i:04d} for Buy, Sell, or Hold recommendation using a {st} approach.")
+              for i in range(20) for st in STRATEGIES]
+    # Variants the model produces in the wild: emoji section headers, collapsed spacing
+    variants = [c.replace("##  ", "## 🎯 ") for c in corpus[::5]] + [c.replace("\n\n", "\n") for c in corpus[::5]]
+    replayed = []
+    if ctx.args.replay:
+        with open(ctx.args.replay, encoding="utf-8") as f:
+            replayed = [json.loads(line)["response"] for line in f if line.strip()]
+    for text in corpus + variants + replayed:
+        assert format_markdown(text) == format_output_regex(text), text[:200]
+
+    def per_response(fn, texts):
+        runs = sorted(timeit(lambda: [fn(c) for c in texts]) for _ in range(max(5, ctx.args.repeat)))
+        return round(runs[len(runs) // 2] / len(texts) * 1e6, 2)
+
+    # Median per-response time per corpus. On ordinary responses the two are close and which is faster depends on
+    # the machine; the single pass is there for the pathological case below
+    timings = {}
+    for name, texts in (("stub", corpus), ("variants", variants), ("replay", replayed)):
+        if texts:
+            timings[name] = {"responses": len(texts), "regex_us": per_response(format_output_regex, texts),
+                             "single_pass_us": per_response(format_markdown, texts)}
+
+    # Run-on "1. a 1. a ..." text makes the regex backtrack quadratically
+    pathological = {}
+    for size in (4000, 16000, 64000):
+        text = "1. a " * (size // 5)
+        pathological[f"{size // 1000}k"] = {"regex_ms": round(timeit(lambda: format_output_regex(text)) * 1000, 2),
+                                            "single_pass_ms": round(timeit(lambda: format_markdown(text)) * 1000, 2)}
+    return {**timings, "pathological": pathological}
+
+
+@benchmark("metrics_overhead")
+def bench_metrics_overhead(ctx):
+    from metrics import stage
+    n = 100000
+    start = time.perf_counter()
+    for _ in range(n):
+        with stage("benchmark"):
+            pass
+    return {"stage_overhead_us": round((time.perf_counter() - start) / n * 1e6, 3)}
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=Path(__file__).parent, text=True).strip()
+    except Exception:
+        return None
+
+
+def flatten(results, prefix=""):
+    """Flatten nested results to {"stage.metric": value} for comparison."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, current, threshold=0.10):
+    """Print median/mean latency changes against a baseline run; return the regressions."""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    regressions = []
+    print(f"\nComparing against {baseline.get('commit')} ({baseline.get('timestamp')})")
+    for key in sorted(new):
+        if key not in old or not key.endswith(("median_ms", "mean_ms", "_us")) or not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key]
+        flag = "⚠️ " if change > threshold else "  "
+        print(f"{flag}{key:<55} {old[key]:>10.3f} -> {new[key]:>10.3f} ({change:+.1%})")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the NEPSE trading bot pipeline and API")
+    parser.add_argument("--stages", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Stages to run (default: all)")
+    parser.add_argument("--symbols", type=int, default=50, help="Synthetic symbols")
+    parser.add_argument("--days", type=int, default=120, help="Synthetic trading days per symbol")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions for pipeline stages")
+    parser.add_argument("--requests", type=int, default=200, help="Requests for the HTTP load test")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent HTTP clients")
+    parser.add_argument("--jobs", type=int, default=1000, help="Analyses queued in the job_queue stage")
+    parser.add_argument("--alert-rules", type=int, default=10000, help="Rules registered in the alerts stage")
+    parser.add_argument("--dataset-symbols", type=int, default=300,
+                        help="Symbols in the multi-year data (dataset_load and manifest stages)")
+    parser.add_argument("--dataset-days", type=int, default=1000,
+                        help="Trading days per symbol in the multi-year data")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated LLM latency (seconds)")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0,
+                        help="Simulated decode time per output token (seconds)")
+    parser.add_argument("--llm-backends", nargs="+", default=["stub"],
+                        help="Backends for the llm_backends stage (gemini, openai, llamacpp, stub)")
+    parser.add_argument("--request-log", help="JSONL of {symbol, strategy} requests for the semantic_cache stage")
+    parser.add_argument("--cache-threshold", type=float, default=0.95, help="Semantic cache similarity threshold")
+    parser.add_argument("--replay", help="JSONL of recorded LLM responses to replay")
+    parser.add_argument("--embeddings", choices=["minilm", "fake"], default="minilm",
+                        help="Real MiniLM embeddings or deterministic fake ones")
+    parser.add_argument("--workdir", help="Directory for generated data (default: a temp dir)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    ctx = BenchContext(args)
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "workdir")},
+        "results": {},
+    }
+    for name in args.stages:
+        print(f"⏱️  {name}...")
+        report["results"][name] = BENCHMARKS[name](ctx)
+        print(json.dumps(report["results"][name], indent=2))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed by more than 10%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
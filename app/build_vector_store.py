@@ -2,34 +2,44 @@ import os
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 from rag_data_loader import stock_to_text_chunks
+from hybrid_retriever import LexicalIndex, lexical_index_path
 from dotenv import load_dotenv
 load_dotenv()
 
 def build_vector_store(data_path="data/processed/stock_data_with_indicators.csv", 
                        vector_store_path="vectorstore/faiss_index",
-                       last_n_days=60):
+                       last_n_days=60,
+                       embeddings=None,
+                       docs=None):
     """
-    Build and save FAISS vector store from stock data.
+    Build and save FAISS vector store (and its BM25 index) from stock data.
     
     Args:
         data_path: Path to the CSV file with stock data and indicators
         vector_store_path: Path to save the FAISS index
         last_n_days: Number of recent days to include per stock
+        embeddings: Embedding model to use (default: all-MiniLM-L6-v2 on CPU)
+        docs: Pre-built chunks (default: built from data_path)
+
+    Returns:
+        The FAISS vector store, or None if there were no documents
     """
     
     # Load and convert stock data to documents
-    docs = stock_to_text_chunks(data_path, last_n_days=last_n_days)
+    if docs is None:
+        docs = stock_to_text_chunks(data_path, last_n_days=last_n_days)
     
     if not docs:
         print("❌ No documents found. Please check your data file.")
         return
     
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
+    if embeddings is None:
+        embeddings = HuggingFaceEmbeddings(
+            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True}
+        )
 
     # Create FAISS vector store
     vectorstore = FAISS.from_documents(docs, embedding=embeddings)
@@ -38,6 +48,10 @@ def build_vector_store(data_path="data/processed/stock_data_with_indicators.csv"
     os.makedirs(os.path.dirname(vector_store_path), exist_ok=True)
  
     vectorstore.save_local(vector_store_path)
+
+    # BM25 index over the same documents, in FAISS insertion order
+    LexicalIndex.build(docs).save(lexical_index_path(vector_store_path))
+    return vectorstore
    
 
 if __name__ == "__main__":
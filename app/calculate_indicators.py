@@ -1,43 +1,147 @@
-﻿import pandas as pd
+﻿import argparse
+import pandas as pd
 import os
+from indicator_engine import INDICATORS, RSI_METHODS, compute_indicators
+from sectors import NON_EQUITY_SECTORS, sector_of
+from data_quality import summarize as summarize_validation, validate_prices, validation_paths, write_validation
 
-def calculate_indicators(file_path):
+def calculate_indicators(file_path, output_path='data/processed/stock_data_with_indicators.csv', indicators=None,
+                         rsi_method='wilder', validate=True):
+    """
+    Compute technical indicators and market context for the raw price data.
+
+    The raw rows are validated first (data_quality.validate_prices): rows that
+    would corrupt the rolling windows are left out and written to a
+    quarantine CSV next to output_path, with a JSON report.
+
+    Args:
+        file_path: Raw data CSV
+        output_path: Where to write the processed CSV
+        indicators: Names from indicator_engine.INDICATORS to compute (default: all)
+        rsi_method: RSI smoothing, 'wilder' or 'sma'
+        validate: False computes on the raw rows as they are
+
+    Returns:
+        DataFrame with indicator and context columns
+    """
     print(f'Loading data from {file_path}...')
     df = pd.read_csv(file_path)
+    if validate:
+        print('Validating raw data...')
+        df, quarantined, report = validate_prices(df)
+        write_validation(quarantined, report, *validation_paths(output_path))
+        for line in summarize_validation(report):
+            print(f'   {line}')
     df = df.sort_values(by=['symbol', 'tradedate'])
     
-    print('Calculating Moving Averages...')
-    df['MA20'] = df.groupby('symbol')['close'].transform(lambda x: x.rolling(20, min_periods=1).mean())
-    df['MA50'] = df.groupby('symbol')['close'].transform(lambda x: x.rolling(50, min_periods=1).mean())
-    
-    print('Calculating RSI...')
-    delta = df.groupby('symbol')['close'].transform(lambda x: x.diff())
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(14, min_periods=1).mean()
-    avg_loss = loss.rolling(14, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-    
-    print('Calculating Bollinger Bands...')
-    df['BB_MID'] = df.groupby('symbol')['close'].transform(lambda x: x.rolling(20, min_periods=1).mean())
-    df['BB_STD'] = df.groupby('symbol')['close'].transform(lambda x: x.rolling(20, min_periods=1).std())
-    df['BB_UPPER'] = df['BB_MID'] + 2 * df['BB_STD']
-    df['BB_LOWER'] = df['BB_MID'] - 2 * df['BB_STD']
-    
-    print('Calculating MACD...')
-    df['EMA12'] = df.groupby('symbol')['close'].transform(lambda x: x.ewm(span=12, adjust=False).mean())
-    df['EMA26'] = df.groupby('symbol')['close'].transform(lambda x: x.ewm(span=26, adjust=False).mean())
-    df['MACD'] = df['EMA12'] - df['EMA26']
-    df['MACD_Signal'] = df.groupby('symbol')['MACD'].transform(lambda x: x.ewm(span=9, adjust=False).mean())
-    df['MACD_Hist'] = df['MACD'] - df['MACD_Signal']
+    names = list(INDICATORS) if indicators is None else indicators
+    print(f'Calculating {len(names)} indicators: {", ".join(names)}...')
+    values = compute_indicators(df, names, rsi_method=rsi_method)
+    df[values.columns] = values
+
+    print('Calculating sector and market context...')
+    df = add_cross_sectional_features(df)
     
-    output_dir = 'data/processed'
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, 'stock_data_with_indicators.csv')
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
     df.to_csv(output_path, index=False)
   
     return df
 
+def add_cross_sectional_features(df, window=20):
+    """
+    Add per-day sector and market context to indicator data (one vectorized pass).
+
+    Columns added:
+        sector: NEPSE sector (sectors.sector_of)
+        sector_change %, sector_breadth %: the sector's mean daily change and share of advancing symbols
+        market_change %: mean daily change of equity symbols (an equal-weighted NEPSE proxy)
+        RS_SECTOR_20, RS_MARKET_20: window-day return minus the sector's / market's mean, in points
+        RSI_RANK, VOL_RANK: percentile (0-100) of RSI and volume across all symbols that day
+
+    Args:
+        df: Indicator data sorted by symbol and date
+        window: Lookback in trading days for relative strength
+
+    Returns:
+        df with the context columns
+    """
+    sectors = {symbol: sector_of(symbol) for symbol in df['symbol'].unique()}
+    df['sector'] = df['symbol'].map(sectors)
+    equity = ~df['sector'].isin(NON_EQUITY_SECTORS)
+    day_sector = [df['tradedate'], df['sector']]
+
+    df['sector_change %'] = df.groupby(day_sector)['diff %'].transform('mean')
+    df['sector_breadth %'] = (df['diff %'] > 0).groupby(day_sector).transform('mean') * 100
+    df['market_change %'] = df['tradedate'].map(df.loc[equity].groupby('tradedate')['diff %'].mean())
+
+    ret = df.groupby('symbol')['close'].pct_change(window, fill_method=None) * 100
+    df['RS_SECTOR_20'] = ret - ret.groupby(day_sector).transform('mean')
+    df['RS_MARKET_20'] = ret - df['tradedate'].map(ret[equity].groupby(df.loc[equity, 'tradedate']).mean())
+
+    by_day = df.groupby('tradedate')
+    if 'RSI' in df.columns:
+        df['RSI_RANK'] = by_day['RSI'].rank(pct=True) * 100
+    df['VOL_RANK'] = by_day['vol'].rank(pct=True) * 100
+    return df
+
+def recompute_indicators(data_path='data/processed/stock_data_with_indicators.csv', indicators=('RSI',),
+                         rsi_method='wilder', vector_store_path=None):
+    """
+    Recompute indicators in an already processed file, e.g. after a formula fix.
+
+    The file is replaced atomically, so a running API reloads it on its next
+    request. The market context columns are recomputed too (RSI_RANK depends on
+    RSI). The chunk text embeds indicator values, so pass vector_store_path to
+    rebuild the FAISS and BM25 indexes from the corrected data.
+
+    Args:
+        data_path: Processed CSV from calculate_indicators
+        indicators: Names from indicator_engine.INDICATORS to recompute
+        rsi_method: RSI smoothing, 'wilder' or 'sma'
+        vector_store_path: Vector store to rebuild afterwards (default: leave as is)
+
+    Returns:
+        DataFrame with the recomputed columns
+    """
+    print(f'Loading processed data from {data_path}...')
+    df = pd.read_csv(data_path)
+    df = df.sort_values(by=['symbol', 'tradedate'])
+
+    print(f'Recomputing {", ".join(indicators)}...')
+    values = compute_indicators(df, list(indicators), rsi_method=rsi_method)
+    for column in values.columns:
+        if column in df.columns:
+            old, new = df[column], values[column]
+            changed = ~(((old - new).abs() <= 1e-9 * new.abs().clip(lower=1)) | (old.isna() & new.isna()))
+            print(f'   {column}: {changed.sum()} of {len(df)} rows changed')
+    df[values.columns] = values
+    df = add_cross_sectional_features(df)
+
+    tmp_path = f'{data_path}.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, data_path)
+    print(f'✅ Updated {data_path}')
+
+    if vector_store_path:
+        from build_vector_store import build_vector_store
+        print(f'Rebuilding vector store at {vector_store_path}...')
+        build_vector_store(data_path, vector_store_path)
+    else:
+        print('⚠️  Chunks in the vector store still hold the old values; rebuild it with build_vector_store.py')
+    return df
+
 if __name__ == '__main__':
-    calculate_indicators('data/stock_data_ready.csv')
+    parser = argparse.ArgumentParser(description='Calculate technical indicators for NEPSE price data')
+    parser.add_argument('--indicators', nargs='+', choices=list(INDICATORS), help='Indicators to compute (default: all)')
+    parser.add_argument('--rsi-method', choices=RSI_METHODS, default='wilder')
+    parser.add_argument('--recompute', action='store_true',
+                        help='Recompute --indicators (default: RSI) in the processed file instead of starting from raw data')
+    parser.add_argument('--vector-store', help='With --recompute: vector store to rebuild afterwards')
+    parser.add_argument('--no-validate', action='store_true', help='Skip the data-quality checks and quarantine')
+    args = parser.parse_args()
+    if args.recompute:
+        recompute_indicators(indicators=args.indicators or ['RSI'], rsi_method=args.rsi_method,
+                             vector_store_path=args.vector_store)
+    else:
+        calculate_indicators('data/stock_data_ready.csv', indicators=args.indicators, rsi_method=args.rsi_method,
+                             validate=not args.no_validate)
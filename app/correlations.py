@@ -0,0 +1,253 @@
+import hashlib
+
+import numpy as np
+
+from dataset import format_day
+
+# -----------------------------
+# Daily returns panel
+# -----------------------------
+DEFAULT_WINDOW = 60
+
+
+def daily_returns(df, previous_close=None):
+    """
+    Close-to-close returns of every symbol on a common trading calendar.
+
+    A symbol that did not trade on a day keeps its last close, so its return
+    that day is 0. Before its first close a symbol is not listed.
+
+    Args:
+        df: Frame from dataset.load_stock_data
+        previous_close: Each symbol's close before df's first day, when df only holds new days
+
+    Returns:
+        (days, symbols, returns float32 (days, symbols), listed bool (days, symbols), last close per symbol)
+    """
+    days, row = np.unique(df['tradedate'].to_numpy(), return_inverse=True)
+    symbols = df['symbol'].cat.categories.astype(str).tolist()
+    close = np.full((len(days) + 1, len(symbols)), np.nan)
+    if previous_close is not None:
+        close[0] = previous_close
+    close[row + 1, df['symbol'].array.codes] = df['close'].to_numpy(dtype=np.float64)
+    # Forward fill along days: each cell takes the last row that had a close
+    last = np.where(np.isnan(close), 0, np.arange(len(close))[:, None])
+    np.maximum.accumulate(last, axis=0, out=last)
+    close = close[last, np.arange(len(symbols))]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = close[1:] / close[:-1] - 1
+    listed = np.isfinite(change)
+    returns = np.where(listed, change, 0).astype(np.float32)
+    return days, symbols, returns, listed, close[-1]
+
+
+# -----------------------------
+# Incremental covariance
+# -----------------------------
+class RollingCorrelation:
+    """
+    Rolling or exponentially weighted covariance of daily returns across all symbols.
+
+    The state is a float32 cross-product matrix (n x n), the return sums and
+    per-symbol listing counts. A new day is a rank-2 update in the rolling
+    mode (add the new day, drop the one leaving the window) and a rank-1
+    update in the exponentially weighted mode, O(n^2) rather than the
+    O(window * n^2) of recomputing from scratch. Every `window` rolling
+    updates the sums are recomputed from the buffered returns, so float32
+    rounding from the downdates cannot accumulate.
+
+    A symbol gets correlations once it has been listed for the whole window
+    (rolling) or for `window` days (exponentially weighted).
+    """
+
+    def __init__(self, symbols, window=DEFAULT_WINDOW, halflife=None):
+        """
+        Args:
+            symbols: Column order of the returns passed in
+            window: Rolling window in trading days (minimum history with halflife)
+            halflife: Exponential weighting half-life in days; None for a plain rolling window
+        """
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.position = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.window = window
+        self.halflife = halflife
+        self.decay = None if halflife is None else 0.5 ** (1 / halflife)
+        self.cross = np.zeros((n, n), dtype=np.float32)
+        self.sums = np.zeros(n, dtype=np.float64)
+        self.weight = 0.0
+        self.listed = np.zeros(n, dtype=np.int64)
+        self.buffer = np.zeros((window, n), dtype=np.float32)
+        self.listed_buffer = np.zeros((window, n), dtype=bool)
+        self.count = 0
+        self.day = None
+        self.last_close = None  # set by track_correlations
+        self.digest = None  # history_digest of the rows applied, set by track_correlations
+        self._matrix = None
+        self._upper = None
+
+    def fit(self, days, returns, listed):
+        """Set the state from a history of returns (rows oldest first) in one pass."""
+        self.count, self.day, self._matrix = len(days), days[-1] if len(days) else None, None
+        if self.decay is None:
+            rows = np.arange(max(0, len(days) - self.window), len(days))
+            self.buffer[:] = 0
+            self.listed_buffer[:] = False
+            self.buffer[rows % self.window] = returns[rows]
+            self.listed_buffer[rows % self.window] = listed[rows]
+            self._refresh()
+        else:
+            weights = (1 - self.decay) * self.decay ** np.arange(len(days) - 1, -1, -1)
+            self.cross = ((returns * weights[:, None].astype(np.float32)).T @ returns).astype(np.float32)
+            self.sums = weights @ returns.astype(np.float64)
+            self.weight = float(weights.sum())
+            self.listed = listed.sum(axis=0)
+        return self
+
+    def _refresh(self):
+        self.cross = self.buffer.T @ self.buffer
+        self.sums = self.buffer.sum(axis=0, dtype=np.float64)
+        self.listed = self.listed_buffer.sum(axis=0)
+
+    def update(self, day, returns, listed):
+        """
+        Add one day's returns (zeros where not listed).
+
+        Args:
+            day: Day number the returns belong to
+            returns: (symbols,) float returns
+            listed: (symbols,) bool
+        """
+        x = np.asarray(returns, dtype=np.float32)
+        if self.decay is None:
+            slot = self.count % self.window
+            old = self.buffer[slot].copy()
+            self.cross += np.stack([x, old], axis=1) @ np.stack([x, -old])
+            self.sums += x.astype(np.float64) - old
+            self.listed += listed.astype(np.int64) - self.listed_buffer[slot]
+            self.buffer[slot], self.listed_buffer[slot] = x, listed
+            if slot == self.window - 1:
+                self._refresh()
+        else:
+            d = self.decay
+            self.cross *= np.float32(d)
+            self.cross += np.outer(x * np.float32(1 - d), x)
+            self.sums = d * self.sums + (1 - d) * x
+            self.weight = d * self.weight + (1 - d)
+            self.listed += listed
+        self.count += 1
+        self.day = day
+        self._matrix = None
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def _terms(self):
+        """(mean, a, b) with covariance = a * cross - b * outer(mean, mean)."""
+        if self.decay is None:
+            m = min(self.count, self.window)
+            return self.sums / max(m, 1), 1 / (m - 1) if m > 1 else np.nan, m / (m - 1) if m > 1 else np.nan
+        return self.sums / self.weight, 1 / self.weight, 1.0
+
+    def _valid(self, var):
+        return (self.listed >= self.window) & (var > 0)
+
+    def variances(self):
+        mean, a, b = self._terms()
+        return a * np.diagonal(self.cross) - b * mean * mean
+
+    def correlation_row(self, symbol):
+        """Correlation of a symbol with every symbol (NaN where either lacks history)."""
+        i = self.position[symbol]
+        mean, a, b = self._terms()
+        var = self.variances()
+        valid = self._valid(var)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            row = (a * self.cross[i] - b * mean[i] * mean) / np.sqrt(var[i] * var)
+        row[~valid | ~valid[i]] = np.nan
+        return row.astype(np.float32)
+
+    def correlation(self):
+        """Full float32 correlation matrix, cached until the next update."""
+        if self._matrix is None:
+            mean, a, b = self._terms()
+            cov = self.cross * np.float32(a)
+            cov -= np.outer(b * mean, mean).astype(np.float32)
+            var = np.diagonal(cov).copy()
+            valid = self._valid(var)
+            std = np.where(valid, np.sqrt(np.where(valid, var, 1)), np.nan).astype(np.float32)
+            cov /= std[:, None]
+            cov /= std[None, :]
+            np.clip(cov, -1, 1, out=cov)
+            self._matrix = cov
+        return self._matrix
+
+    def peers(self, symbol, k=10):
+        """The k most and least correlated symbols, as (symbol, correlation) lists."""
+        row = self.correlation_row(symbol)
+        row[self.position[symbol]] = np.nan
+        known = np.flatnonzero(~np.isnan(row))
+        order = known[np.argsort(row[known], kind="stable")]
+        top = [(self.symbols[j], float(row[j])) for j in order[::-1][:k]]
+        bottom = [(self.symbols[j], float(row[j])) for j in order[:k]]
+        return top, bottom
+
+    def pairs(self, k=20, negative=False):
+        """The k pairs with the highest (or most negative) correlation, as (a, b, correlation)."""
+        matrix = self.correlation()
+        if self._upper is None:
+            self._upper = np.triu_indices(len(self.symbols), k=1)
+        i, j = self._upper
+        values = matrix[i, j]
+        values = -values if negative else values
+        known = np.flatnonzero(~np.isnan(values))
+        if len(known) > k:
+            known = known[np.argpartition(-values[known], k - 1)[:k]]
+        known = known[np.argsort(-values[known], kind="stable")]
+        return [(self.symbols[i[n]], self.symbols[j[n]], float(matrix[i[n], j[n]])) for n in known]
+
+    def date(self):
+        return None if self.day is None else format_day(self.day)
+
+
+def history_digest(df, day):
+    """Digest of the symbol, day and close of every row of df up to day."""
+    dates = df['tradedate'].to_numpy()
+    rows = dates <= day
+    every = rows.all()
+    digest = hashlib.sha1()  # a change detector, not a security boundary: the fastest one hashlib has
+    for values in (df['symbol'].array.codes, dates, df['close'].to_numpy()):
+        digest.update(values.tobytes() if every else values[rows].tobytes())
+    return digest.hexdigest()
+
+
+def track_correlations(df, window=DEFAULT_WINDOW, halflife=None, tracker=None):
+    """
+    Correlation tracker for a processed dataset, updated incrementally when possible.
+
+    When df only appends trading days to what tracker has seen (same symbols,
+    same window settings, and the same rows up to its last day, by
+    history_digest), just the rows of the new days are read and applied;
+    otherwise, e.g. after closes were corrected, the tracker is rebuilt from
+    the whole history.
+
+    Returns:
+        (tracker, number of days applied incrementally or None when rebuilt)
+    """
+    symbols = df['symbol'].cat.categories.astype(str).tolist()
+    dates = df['tradedate'].to_numpy()
+    if (tracker is not None and tracker.symbols == symbols and tracker.window == window
+            and tracker.halflife == halflife and tracker.day is not None and (dates == tracker.day).any()
+            and history_digest(df, tracker.day) == tracker.digest):
+        new = df[dates > tracker.day]
+        days, _, returns, listed, tracker.last_close = daily_returns(new, tracker.last_close)
+        for t in range(len(days)):
+            tracker.update(days[t], returns[t], listed[t])
+        tracker.digest = history_digest(df, tracker.day)
+        return tracker, len(days)
+    days, symbols, returns, listed, last_close = daily_returns(df)
+    tracker = RollingCorrelation(symbols, window, halflife).fit(days, returns, listed)
+    tracker.last_close = last_close
+    tracker.digest = None if tracker.day is None else history_digest(df, tracker.day)
+    return tracker, None
@@ -0,0 +1,223 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Raw export layout
+# -----------------------------
+# data/stock_data_ready.csv, as synthetic_data.COLUMNS mirrors it
+RAW_COLUMNS = [
+    'symbol', 'conf.', 'open', 'high', 'low', 'close', 'ltp', 'close - ltp', 'close - ltp %',
+    'vwap', 'vol', 'prev. close', 'turnover', 'trans.', 'diff', 'range', 'diff %', 'range %',
+    'vwap %', '120 days', '180 days', '52 weeks high', '52 weeks low', 'source_file', 'tradedate',
+]
+TEXT_COLUMNS = ('symbol', 'source_file', 'tradedate')
+# What the indicator, market context and bar stages read; a batch without them is rejected
+REQUIRED_COLUMNS = ['symbol', 'tradedate', 'open', 'high', 'low', 'close', 'vwap', 'vol', 'prev. close', 'turnover',
+                    'diff %']
+# How the export writes "no value" (e.g. conf. on thin days); not counted as dtype drift
+MISSING_MARKERS = ('-', '')
+
+# -----------------------------
+# Check settings
+# -----------------------------
+TRADING_WEEKDAYS = (6, 0, 1, 2, 3)  # datetime.weekday(): Sunday=6 .. Thursday=3
+CIRCUIT_LIMIT_PERCENT = 10.0  # NEPSE's daily price band
+CIRCUIT_TOLERANCE_PERCENT = 0.5  # quotes are rounded to the tick, so a move at the limit can read slightly past it
+PRICE_TOLERANCE = 0.011  # prev. close against the prior close (2-decimal quotes)
+MAX_EXAMPLES = 20
+
+# Row checks in precedence order; a quarantined row is labelled with the first it fails
+CHECKS = ("bad_value", "duplicate", "non_trading_day", "ohlc", "zero_volume", "circuit_breach", "stale_repeat")
+
+
+def validation_paths(output_path):
+    """(quarantine CSV, report JSON) written next to the processed file."""
+    path = Path(output_path)
+    return path.with_name(f"{path.stem}_quarantine.csv"), path.with_name(f"{path.stem}_validation.json")
+
+
+def _examples(rows, columns):
+    """The first MAX_EXAMPLES rows as JSON-ready dicts."""
+    return [{k: (None if pd.isna(v) else v.item() if hasattr(v, "item") else v) for k, v in row.items()}
+            for row in rows[columns].head(MAX_EXAMPLES).to_dict("records")]
+
+
+def validate_prices(df):
+    """
+    Vectorized data-quality checks over a batch of raw daily rows.
+
+    Rows are quarantined (first failing check in CHECKS order):
+        bad_value: unparseable symbol, date or price
+        duplicate: repeated (symbol, tradedate); the first row is kept
+        non_trading_day: dated Friday or Saturday
+        ohlc: high < low, open outside high-low, or a price <= 0 (close may
+            sit outside high-low: NEPSE's close is a weighted price)
+        zero_volume: no volume (a halted symbol)
+        circuit_breach: close more than the circuit limit from prev. close
+        stale_repeat: same prices, volume and prev. close as the symbol's
+            previous row (the export repeats the last session on holidays)
+
+    Reported but kept: gaps against the trading calendar (the sessions in
+    the clean batch), prev. close not matching the prior close (a gap or a
+    corporate-action adjustment), and schema drift (missing, unexpected or
+    non-numeric columns).
+
+    Args:
+        df: Raw rows as read from the export CSV
+
+    Returns:
+        (clean rows sorted by symbol and date, quarantined rows with a quarantine_reason column, report dict)
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Raw data is missing required columns {missing}")
+    df = df.reset_index(drop=True)
+    n = len(df)
+    schema = {"missing_columns": [c for c in RAW_COLUMNS if c not in df.columns],
+              "unexpected_columns": [c for c in df.columns if c not in RAW_COLUMNS], "dtype_drift": {}}
+
+    # Schema: numeric columns that arrived as text
+    bad_value = np.zeros(n, dtype=bool)
+    parsed = {}
+    for column in df.columns:
+        if column in TEXT_COLUMNS or pd.api.types.is_numeric_dtype(df[column]):
+            continue
+        values = pd.to_numeric(df[column], errors='coerce')
+        unparsed = values.isna() & df[column].notna() & ~df[column].astype(str).str.strip().isin(MISSING_MARKERS)
+        if unparsed.any():
+            schema["dtype_drift"][column] = {"dtype": str(df[column].dtype), "unparseable": int(unparsed.sum()),
+                                             "examples": df.loc[unparsed, column].astype(str).unique()[:5].tolist()}
+        if column in REQUIRED_COLUMNS:
+            parsed[column] = values
+            bad_value |= unparsed.to_numpy()
+    dates = pd.to_datetime(df['tradedate'], format='%Y-%m-%d', errors='coerce')
+    undated = dates.isna()
+    if undated.any():
+        schema["dtype_drift"]["tradedate"] = {"dtype": str(df['tradedate'].dtype), "unparseable": int(undated.sum()),
+                                              "examples": df.loc[undated, 'tradedate'].astype(str).unique()[:5].tolist()}
+    bad_value |= undated.to_numpy() | df['symbol'].isna().to_numpy()
+
+    # Sort by symbol then date; stable, so duplicates keep their file order
+    codes, symbols = pd.factorize(df['symbol'], sort=True)
+    day = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    order = np.lexsort((day, codes))
+    code, day = codes[order], day[order]
+
+    def column(name):
+        return (parsed[name] if name in parsed else df[name]).to_numpy(dtype=np.float64)[order]
+
+    open_, high, low, close = column('open'), column('high'), column('low'), column('close')
+    vol, prev_close = column('vol'), column('prev. close')
+    bad_value = bad_value[order] | np.isnan(open_) | np.isnan(high) | np.isnan(low) | np.isnan(close)
+
+    # Each row against the one before it in the sorted batch
+    follows = np.r_[False, code[1:] == code[:-1]]
+
+    def same_as_previous(x):
+        return np.r_[False, x[1:] == x[:-1]]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        move = np.abs(close / prev_close - 1) * 100
+        masks = {
+            "bad_value": bad_value,
+            "duplicate": follows & same_as_previous(day),
+            "non_trading_day": ~np.isin((day + 3) % 7, TRADING_WEEKDAYS),  # day 0 was a Thursday (weekday 3)
+            "ohlc": ~((high >= low) & (open_ <= high) & (open_ >= low) & (low > 0) & (close > 0)),
+            "zero_volume": ~(vol > 0),
+            "circuit_breach": (prev_close > 0) & (move > CIRCUIT_LIMIT_PERCENT + CIRCUIT_TOLERANCE_PERCENT),
+            "stale_repeat": follows & same_as_previous(open_) & same_as_previous(high) & same_as_previous(low)
+                            & same_as_previous(close) & same_as_previous(vol) & same_as_previous(prev_close),
+        }
+    reason = np.select([masks[name] for name in CHECKS], CHECKS, default="")
+    keep = reason == ""
+
+    clean = df.iloc[order[keep]].reset_index(drop=True)
+    for name, values in parsed.items():
+        clean[name] = values.to_numpy()[order[keep]]
+    quarantined = df.iloc[order[~keep]].reset_index(drop=True)
+    quarantined['quarantine_reason'] = reason[~keep]
+
+    # Calendar checks on the clean rows: the sessions are the days anything traded
+    code, day, close, prev_close = code[keep], day[keep], close[keep], prev_close[keep]
+    calendar = np.unique(day)
+    session = np.searchsorted(calendar, day)
+    follows = np.r_[False, code[1:] == code[:-1]]
+    skipped = np.r_[0, session[1:] - session[:-1] - 1] * follows
+    gap = skipped > 0
+    last = np.r_[code[1:] != code[:-1], True] if len(code) else np.zeros(0, dtype=bool)
+    behind = last & (session < len(calendar) - 1)
+    mismatch = follows & (np.abs(prev_close - np.r_[np.nan, close[:-1]]) > PRICE_TOLERANCE)
+
+    # Example rows for the report, built only for the flagged rows
+    flagged = np.flatnonzero(gap | behind | mismatch)
+    previous = np.maximum(flagged - 1, 0)
+    frame = pd.DataFrame({"symbol": np.asarray(symbols, dtype=object)[code[flagged]],
+                          "date": day[flagged].astype('datetime64[D]').astype(str),
+                          "previous_date": day[previous].astype('datetime64[D]').astype(str),
+                          "missing_sessions": skipped[flagged], "prev_close": prev_close[flagged],
+                          "prior_close": close[previous]})
+    gap, behind, mismatch_rows = gap[flagged], behind[flagged], mismatch[flagged]
+    report = {
+        "rows": n,
+        "clean_rows": int(keep.sum()),
+        "quarantined_rows": int((~keep).sum()),
+        "quarantined": {name: int((reason == name).sum()) for name in CHECKS},
+        "symbols": len(symbols),
+        "sessions": len(calendar),
+        "first_date": str(calendar[0].astype('datetime64[D]')) if len(calendar) else None,
+        "last_date": str(calendar[-1].astype('datetime64[D]')) if len(calendar) else None,
+        "schema": schema,
+        "gaps": {
+            "count": int(gap.sum()),
+            "missing_sessions": int(skipped.sum()),
+            "symbols": int(len(np.unique(code[flagged[gap]]))),
+            "largest": _examples(frame[gap].sort_values("missing_sessions", ascending=False, kind="stable"),
+                                 ["symbol", "previous_date", "date", "missing_sessions"]),
+        },
+        "behind_latest_session": {"symbols": int(behind.sum()),
+                                  "examples": _examples(frame[behind], ["symbol", "date"])},
+        "prev_close_mismatches": {"count": int(mismatch.sum()), "after_gap": int((mismatch_rows & gap).sum()),
+                                  "examples": _examples(frame[mismatch_rows],
+                                                        ["symbol", "date", "prev_close", "prior_close"])},
+    }
+    return clean, quarantined, report
+
+
+def write_validation(quarantined, report, quarantine_path, report_path):
+    """Write the quarantined rows and the report atomically."""
+    for path, write in ((quarantine_path, lambda p: quarantined.to_csv(p, index=False)),
+                        (report_path, lambda p: Path(p).write_text(json.dumps(report, indent=1), encoding="utf-8"))):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+
+def summarize(report):
+    """One line per quarantine reason and warning, for the pipeline log."""
+    lines = [f"{report['clean_rows']} of {report['rows']} rows passed over {report['sessions']} sessions"]
+    lines += [f"quarantined {count} {name}" for name, count in report["quarantined"].items() if count]
+    if report["gaps"]["count"]:
+        lines.append(f"{report['gaps']['count']} gaps ({report['gaps']['missing_sessions']} missing sessions)")
+    if report["prev_close_mismatches"]["count"]:
+        lines.append(f"{report['prev_close_mismatches']['count']} prev. close mismatches")
+    if any(report["schema"].values()):
+        lines.append(f"schema drift: {report['schema']}")
+    return lines
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Validate a raw NEPSE export without computing indicators')
+    parser.add_argument('path', nargs='?', default='data/stock_data_ready.csv')
+    parser.add_argument('--output', default='data/processed/stock_data_with_indicators.csv',
+                        help='Processed file the quarantine and report are written next to')
+    args = parser.parse_args()
+    _, quarantined, report = validate_prices(pd.read_csv(args.path))
+    write_validation(quarantined, report, *validation_paths(args.output))
+    for line in summarize(report):
+        print(f'   {line}')
@@ -0,0 +1,133 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Compact in-memory processed dataset
+# -----------------------------
+# Columns the API serves; everything else in the processed CSV (source_file, conf., ltp, 120/180 days...) is skipped
+API_COLUMNS = [
+    'symbol', 'tradedate', 'open', 'high', 'low', 'close', 'vwap', 'vol', 'turnover', 'diff %', '52 weeks high',
+    'MA20', 'MA50', 'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist', 'BB_UPPER', 'BB_MID', 'BB_LOWER',
+    'ATR', 'ADX', 'PLUS_DI', 'MINUS_DI', 'STOCH_K', 'STOCH_D', 'MFI', 'OBV', 'VWAP20',
+    'ICHI_TENKAN', 'ICHI_KIJUN', 'ICHI_SENKOU_A', 'ICHI_SENKOU_B', 'SUPERTREND', 'SUPERTREND_DIR',
+    'sector', 'sector_change %', 'sector_breadth %', 'market_change %', 'RS_SECTOR_20', 'RS_MARKET_20',
+    'RSI_RANK', 'VOL_RANK',
+]
+CATEGORY_COLUMNS = ('symbol', 'sector')
+# Derived columns that /sectors and /watchlist round to cents; float32 could move a value sitting on a half-cent
+# to the other side, so they stay float64
+FLOAT64_COLUMNS = ('RSI', 'MA20', 'MA50', 'MACD_Hist', 'RS_MARKET_20', 'sector_change %', 'sector_breadth %',
+                   'market_change %')
+
+EPOCH = date(1970, 1, 1)
+
+# float32 spacing stays below 0.01 under 2**17, so 2-decimal prices survive the round trip exactly
+FLOAT32_EXACT_2DP_LIMIT = 2 ** 17
+
+
+def format_day(day):
+    """'YYYY-MM-DD' for a day number (days since 1970-01-01)."""
+    return (EPOCH + timedelta(days=int(day))).isoformat()
+
+
+def to_float(value, digits=None):
+    """
+    JSON-ready float (None for NaN), optionally rounded.
+
+    float32 goes through its shortest repr, so 507.3 stays 507.3 rather than
+    507.29998779296875, and rounding sees the same decimal the CSV had.
+    """
+    if pd.isna(value):
+        return None
+    value = float(str(value)) if isinstance(value, np.float32) else float(value)
+    return value if digits is None else round(value, digits)
+
+
+def to_int(value):
+    return None if pd.isna(value) else int(value)
+
+
+def exact_float64(values):
+    """
+    float64 copy of a column for aggregation.
+
+    float32 values go through their shortest repr, as in to_float, so a
+    2-decimal column sums and averages to what the float64 CSV values do.
+    """
+    values = np.asarray(values)
+    return values.astype(str).astype(np.float64) if values.dtype == np.float32 else values.astype(np.float64)
+
+
+def _compact_numeric(values):
+    """
+    Smallest dtype that keeps the served values.
+
+    Whole numbers without NaN become int32 (int8 for small codes such as
+    Supertrend's +/-1). Columns quoted to 2 decimals (prices, percentages)
+    become float32 when every value is below 2**17, where float32 can still
+    tell 0.01 steps apart. Derived indicators become float32, which keeps about
+    7 significant digits. Anything else stays float64 (e.g. turnover in the
+    billions).
+    """
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return values.astype(np.float32)
+    largest = np.abs(finite).max()
+    if len(finite) == len(values) and np.array_equal(finite, np.round(finite)):
+        if largest < 128:
+            return values.astype(np.int8)
+        if largest < 2 ** 31:
+            return values.astype(np.int32)
+        return values
+    if np.array_equal(finite, np.round(finite, 2)):
+        return values.astype(np.float32) if largest < FLOAT32_EXACT_2DP_LIMIT else values
+    return values.astype(np.float32) if largest < np.finfo(np.float32).max else values
+
+
+def load_stock_data(path, columns=API_COLUMNS, compact=True):
+    """
+    Load the processed CSV projected to the served columns, with compact dtypes.
+
+    symbol and sector are categoricals. tradedate is an int32 day number (see
+    format_day). Numeric columns are downcast by _compact_numeric. Rows are
+    sorted by symbol then date, so a symbol's rows are contiguous and its
+    latest row is the last one. FLOAT64_COLUMNS are not downcast.
+
+    Args:
+        path: Processed CSV from calculate_indicators
+        columns: Columns to keep (those missing from the file are skipped)
+        compact: False keeps numeric columns as float64 (full-precision reference)
+
+    Returns:
+        DataFrame
+    """
+    wanted = set(columns)
+    df = pd.read_csv(path, usecols=lambda c: c in wanted,
+                     dtype={c: 'category' for c in CATEGORY_COLUMNS})
+    days = (pd.to_datetime(df['tradedate']).to_numpy(dtype='datetime64[D]') - np.datetime64(EPOCH, 'D'))
+    df['tradedate'] = days.astype(np.int32)
+    for column in df.columns:
+        if column in CATEGORY_COLUMNS:
+            df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+        elif column != 'tradedate' and column not in FLOAT64_COLUMNS and compact:
+            df[column] = _compact_numeric(df[column].to_numpy(dtype=np.float64))
+    df = df.sort_values(['symbol', 'tradedate'], ignore_index=True)
+    return df[[c for c in columns if c in df.columns]]
+
+
+def symbol_exists(df, symbol):
+    return symbol in df['symbol'].cat.categories
+
+
+def latest_position(df, symbol):
+    """Row position of a symbol's latest day in a load_stock_data frame, or None."""
+    code = df['symbol'].cat.categories.get_indexer([symbol])[0]
+    if code < 0:
+        return None
+    codes = df['symbol'].array.codes
+    end = np.searchsorted(codes, code, side='right')
+    if end == 0 or codes[end - 1] != code:
+        return None
+    return end - 1
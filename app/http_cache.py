@@ -0,0 +1,187 @@
+import hashlib
+from datetime import datetime, time, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from metrics import record_cache
+
+# NEPSE trades Sunday-Thursday, 11:00-15:00 Nepal time (UTC+05:45).
+NPT = timezone(timedelta(hours=5, minutes=45))
+TRADING_WEEKDAYS = {6, 0, 1, 2, 3}  # datetime.weekday(): Sunday=6 .. Thursday=3
+DATA_REFRESH_TIME = time(15, 30)  # processed data is rebuilt after the close
+REFRESH_GRACE = timedelta(hours=2)  # keep max-age short while a late refresh may land
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+NO_CACHE = "no-cache"
+
+
+def snapshot_version(stat):
+    """Short version id for a data file, derived from its size and mtime."""
+    raw = f"{stat.st_size}:{stat.st_mtime_ns}".encode()
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def next_data_refresh(now=None):
+    """Next trading-day time at which the processed data is expected to change."""
+    now = now or datetime.now(NPT)
+    candidate = datetime.combine(now.astimezone(NPT).date(), DATA_REFRESH_TIME, tzinfo=NPT)
+    while candidate <= now or candidate.weekday() not in TRADING_WEEKDAYS:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def market_cache_control(now=None, min_age=60, max_age=86400):
+    """
+    Cache-Control for data endpoints, tuned to the NEPSE calendar.
+
+    Responses stay fresh until the next expected data refresh (capped at a day),
+    and drop to a short max-age right after a refresh time in case it runs late.
+    """
+    now = now or datetime.now(NPT)
+    last_refresh = next_data_refresh(now - timedelta(days=1))
+    if last_refresh <= now < last_refresh + REFRESH_GRACE:
+        seconds = min_age * 5
+    else:
+        seconds = int((next_data_refresh(now) - now).total_seconds())
+    seconds = max(min_age, min(seconds, max_age))
+    return f"public, max-age={seconds}, must-revalidate"
+
+
+def make_etag(version, body):
+    """Weak ETag so gzip/brotli variants of the same body validate alike."""
+    return f'W/"{version}-{hashlib.md5(body).hexdigest()[:10]}"'
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified(request, etag, last_modified=None):
+    """Evaluate If-None-Match / If-Modified-Since against the current validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def conditional_response(request, body, etag, last_modified=None,
+                         cache_control=NO_CACHE, media_type="application/json"):
+    """Return a 304 when the client's validators match, otherwise the full body."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+class ResponseCache:
+    """Pre-serialized response bodies, dropped as a whole when the data version changes."""
+
+    def __init__(self, name="response"):
+        self.name = name
+        self.version = None
+        self.entries = {}
+
+    def get(self, version, key):
+        """(body, etag) cached for key on this version, or None; not counted as a hit or miss."""
+        return self.entries.get(key) if version == self.version else None
+
+    def get_or_build(self, version, key, build):
+        """
+        Return (body, etag) for key, serializing with build() on a miss.
+
+        build() may raise (e.g. HTTPException for unknown symbols); nothing is cached then.
+        """
+        if version != self.version:
+            self.entries = {}
+            self.version = version
+        entry = self.entries.get(key)
+        record_cache(self.name, entry is not None)
+        if entry is None:
+            body = build()
+            entry = (body, make_etag(version, body))
+            self.entries[key] = entry
+        return entry
+
+
+class HashedStaticFiles(StaticFiles):
+    """
+    StaticFiles that also serves content-hashed aliases such as app.3f2a1c9e04.js.
+
+    Hashed URLs never change content, so they are sent with a one-year immutable
+    max-age; plain URLs keep revalidating with no-cache. A file is re-stat'ed
+    whenever its alias is looked up and rehashed when its mtime or size
+    changed, so files edited or created while the server runs get a new alias,
+    and the old alias of a changed file is a 404 rather than new bytes under
+    an immutable URL.
+    """
+
+    def __init__(self, *, directory, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.root = Path(directory)
+        self.hashed = {}  # name -> hashed alias
+        self.originals = {}  # hashed alias -> name
+        self.stats = {}  # name -> (mtime_ns, size) its alias was computed at
+        self.refresh()
+
+    def _forget(self, name):
+        self.stats.pop(name, None)
+        hashed = self.hashed.pop(name, None)
+        if hashed is not None:
+            self.originals.pop(hashed, None)
+
+    def current(self, name):
+        """Hashed alias of name for its content now, or None when it isn't a file."""
+        path = self.root / name
+        try:
+            stat = path.stat()
+        except OSError:
+            stat = None
+        if stat is None or not path.is_file():
+            self._forget(name)
+            return None
+        if self.stats.get(name) != (stat.st_mtime_ns, stat.st_size):
+            self._forget(name)
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()[:10]
+            suffix = path.suffix
+            hashed = f"{name[:-len(suffix)] if suffix else name}.{digest}{suffix}"
+            self.hashed[name], self.originals[hashed] = hashed, name
+            self.stats[name] = (stat.st_mtime_ns, stat.st_size)
+        return self.hashed[name]
+
+    def refresh(self):
+        """Bring every alias up to date (new files hashed, deleted ones dropped); returns {name: hashed alias}."""
+        names = {path.relative_to(self.root).as_posix() for path in self.root.rglob("*") if path.is_file()}
+        for name in set(self.hashed) - names:
+            self._forget(name)
+        for name in sorted(names):
+            self.current(name)
+        return dict(self.hashed)
+
+    def url_for(self, name, prefix="/static"):
+        return f"{prefix}/{self.current(name) or name}"
+
+    async def get_response(self, path, scope):
+        path = Path(path).as_posix()
+        original = self.originals.get(path)
+        if original is not None and self.current(original) != path:
+            original = None  # the file changed since this alias was handed out: no such file now
+        response = await super().get_response(original or path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE if original else NO_CACHE
+        return response
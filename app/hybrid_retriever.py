@@ -0,0 +1,223 @@
+import json
+import os
+import re
+from collections import Counter
+from datetime import date
+
+import faiss
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+# Reciprocal-rank fusion constant (Cormack et al.); dampens the weight of the very top ranks
+RRF_K = 60
+
+
+def tokenize(text):
+    """Lowercase words, symbols, dates and decimals ("nabil", "2025-11-06", "54.21")."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _day_number(value):
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+# -----------------------------
+# Lexical (BM25) index
+# -----------------------------
+class LexicalIndex:
+    """
+    BM25 inverted index over the chunk text, plus the chunk metadata used for
+    pre-filtering, stored as flat numpy arrays.
+
+    Postings are in CSR layout: the documents containing term t are
+    doc_ids[offsets[t]:offsets[t + 1]], with term frequencies in tfs.
+    Documents are numbered in the order they were added to the FAISS index,
+    so a document number is also its FAISS id. save() writes one .npy file
+    per array and load() memory-maps them, so opening the index costs almost
+    nothing and pages are shared between worker processes.
+    """
+
+    ARRAYS = ("offsets", "doc_ids", "tfs", "doc_len", "symbol_ids", "end_day", "latest_rsi", "period_change")
+
+    def __init__(self, vocab, symbols, arrays, k1=1.5, b=0.75):
+        self.vocab = vocab
+        self.symbols = symbols
+        self.symbol_index = {s: i for i, s in enumerate(symbols)}
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.n_docs = len(self.doc_len)
+        self.avg_len = float(np.mean(self.doc_len)) if self.n_docs else 0.0
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, docs):
+        """Index documents from stock_to_text_chunks, in FAISS insertion order."""
+        vocab, postings, doc_len = {}, [], []
+        symbols, symbol_ids = {}, []
+        end_day, latest_rsi, period_change = [], [], []
+        for n, doc in enumerate(docs):
+            counts = Counter(tokenize(doc.page_content))
+            doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_id = vocab.setdefault(term, len(vocab))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((n, tf))
+            meta = doc.metadata
+            symbol_ids.append(symbols.setdefault(meta["symbol"], len(symbols)))
+            end_day.append(_day_number(meta["end_date"]))
+            latest_rsi.append(meta["latest_rsi"])
+            period_change.append(meta["period_change"])
+
+        lengths = np.array([len(p) for p in postings], dtype=np.int64)
+        flat = [entry for p in postings for entry in p]
+        arrays = {
+            "offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            "doc_ids": np.array([d for d, _ in flat], dtype=np.int32),
+            "tfs": np.array([tf for _, tf in flat], dtype=np.float32),
+            "doc_len": np.array(doc_len, dtype=np.float32),
+            "symbol_ids": np.array(symbol_ids, dtype=np.int32),
+            "end_day": np.array(end_day, dtype=np.int32),
+            "latest_rsi": np.array(latest_rsi, dtype=np.float32),
+            "period_change": np.array(period_change, dtype=np.float32),
+        }
+        return cls(vocab, list(symbols), arrays)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump({"terms": self.vocab, "symbols": self.symbols}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in cls.ARRAYS}
+        return cls(meta["terms"], meta["symbols"], arrays)
+
+    def mask(self, symbol=None, end_date_from=None, end_date_to=None,
+             rsi_min=None, rsi_max=None, period_change_min=None, period_change_max=None):
+        """
+        Boolean mask of documents passing the metadata filters, or None for no filter.
+
+        symbol may be one symbol or a list; unknown symbols match nothing.
+        """
+        mask = None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if symbol is not None:
+            wanted = [symbol] if isinstance(symbol, str) else symbol
+            ids = [self.symbol_index[s] for s in wanted if s in self.symbol_index]
+            narrow(np.isin(self.symbol_ids, ids))
+        if end_date_from is not None:
+            narrow(self.end_day >= _day_number(end_date_from))
+        if end_date_to is not None:
+            narrow(self.end_day <= _day_number(end_date_to))
+        if rsi_min is not None:
+            narrow(self.latest_rsi >= rsi_min)
+        if rsi_max is not None:
+            narrow(self.latest_rsi <= rsi_max)
+        if period_change_min is not None:
+            narrow(self.period_change >= period_change_min)
+        if period_change_max is not None:
+            narrow(self.period_change <= period_change_max)
+        return mask
+
+    def symbols_in(self, text):
+        """Known symbols mentioned in text."""
+        return [t.upper() for t in set(tokenize(text)) if t.upper() in self.symbol_index]
+
+    def search(self, query, k=20, mask=None):
+        """Top-k document numbers by BM25 score, best first (only documents with a match)."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / self.avg_len)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs, tf = self.doc_ids[start:end], self.tfs[start:end]
+            idf = np.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+        if mask is not None:
+            scores[~mask] = 0
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k)[:k]]
+        return hits[np.argsort(-scores[hits], kind="stable")].tolist()
+
+
+# -----------------------------
+# Hybrid retrieval
+# -----------------------------
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of document numbers: score(d) = sum of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            scores[doc] = scores.get(doc, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever:
+    """
+    BM25 and FAISS retrieval fused with reciprocal-rank fusion, both run only
+    over the documents that pass the metadata filters.
+
+    With auto_symbol, a question naming a known symbol is filtered to that
+    symbol. The dense search then runs over just that symbol's chunks through
+    a FAISS ID selector instead of the whole index.
+    """
+
+    def __init__(self, db, lexical, k=5, fetch_k=20, auto_symbol=True):
+        if db.index.ntotal != lexical.n_docs:
+            raise ValueError(f"Lexical index has {lexical.n_docs} documents, FAISS has {db.index.ntotal}; rebuild both")
+        self.db = db
+        self.lexical = lexical
+        self.k = k
+        self.fetch_k = fetch_k
+        self.auto_symbol = auto_symbol
+
+    def filters_for(self, question, filters=None):
+        filters = dict(filters or {})
+        if self.auto_symbol and "symbol" not in filters:
+            mentioned = self.lexical.symbols_in(question)
+            if mentioned:
+                filters["symbol"] = mentioned
+        return filters
+
+    def dense_search(self, vector, k, mask=None):
+        """FAISS ids of the k nearest documents, best first, restricted to mask."""
+        query = np.asarray([vector], dtype=np.float32)
+        params = None
+        if mask is not None:
+            ids = np.flatnonzero(mask).astype(np.int64)
+            if not len(ids):
+                return []
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(ids))
+            k = min(k, len(ids))
+        _, found = self.db.index.search(query, k, params=params)
+        return [int(i) for i in found[0] if i >= 0]
+
+    def lexical_search(self, question, mask=None):
+        return self.lexical.search(question, self.fetch_k, mask)
+
+    def fuse(self, dense, lexical):
+        """Documents for the top-k fused ranks."""
+        store, ids = self.db.docstore, self.db.index_to_docstore_id
+        return [store.search(ids[i]) for i in reciprocal_rank_fusion([dense, lexical])[:self.k]]
+
+    def retrieve(self, question, vector, filters=None):
+        mask = self.lexical.mask(**self.filters_for(question, filters))
+        return self.fuse(self.dense_search(vector, self.fetch_k, mask), self.lexical_search(question, mask))
+
+
+def lexical_index_path(vector_store_path):
+    return os.path.join(vector_store_path, "bm25")
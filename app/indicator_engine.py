@@ -0,0 +1,486 @@
+import warnings
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Segmented layout
+# -----------------------------
+class Segments:
+    """
+    Per-symbol layout for a frame sorted by symbol then date.
+
+    Each column is scattered into a (symbols, max_days) matrix, with row s
+    holding symbol s's history left-aligned and NaN after its last day.
+    Shifts, rolling windows and recursions then run along axis -1 for all
+    symbols at once and never cross a symbol boundary.
+    """
+
+    def __init__(self, symbols):
+        codes, _ = pd.factorize(symbols, sort=False)
+        if len(codes) and np.any(np.diff(codes) < 0):
+            raise ValueError("Frame must be sorted by symbol")
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+        lengths = np.diff(np.r_[starts, len(codes)])
+        self.n = len(codes)
+        self.row = np.repeat(np.arange(len(starts)), lengths)
+        self.col = np.arange(self.n) - np.repeat(starts, lengths)
+        self.shape = (len(starts), int(lengths.max()) if len(lengths) else 0)
+
+    def to_2d(self, values):
+        out = np.full(self.shape, np.nan)
+        out[self.row, self.col] = values
+        return out
+
+    def to_1d(self, matrix):
+        return matrix[self.row, self.col]
+
+
+# -----------------------------
+# Segmented kernels (all operate along the last axis)
+# -----------------------------
+def shift(x, k):
+    out = np.full_like(x, np.nan)
+    if k < x.shape[-1]:
+        out[..., k:] = x[..., :-k] if k else x
+    return out
+
+
+def _window_sums(x, windows):
+    """{window: (sum, count of non-NaN)} from one cumulative sum over x."""
+    valid = ~np.isnan(x)
+    zero = np.zeros(x.shape[:-1] + (1,))
+    cs = np.concatenate([zero, np.cumsum(np.where(valid, x, 0.0), axis=-1)], axis=-1)
+    cn = np.concatenate([zero, np.cumsum(valid, axis=-1)], axis=-1)
+    idx = np.arange(x.shape[-1])
+    out = {}
+    for w in windows:
+        lo = np.maximum(0, idx + 1 - w)
+        out[w] = (cs[..., idx + 1] - cs[..., lo], cn[..., idx + 1] - cn[..., lo])
+    return out
+
+
+def _equal_run(x):
+    """Length of the run of identical values ending at each position (0 at NaN)."""
+    idx = np.arange(x.shape[-1])
+    breaks = np.ones(x.shape, dtype=bool)
+    breaks[..., 1:] = x[..., 1:] != x[..., :-1]  # NaN != NaN: a NaN ends a run
+    run = idx - np.maximum.accumulate(np.where(breaks, idx, 0), axis=-1) + 1
+    return np.where(np.isnan(x), 0, run)
+
+
+def rolling(x, stat, windows, min_periods=1):
+    """
+    Rolling sum/mean/std/max/min for several windows of the same input.
+
+    Sums come from one cumulative sum. The std comes from cumulative sums
+    of x and x² after shifting x by its row mean, which keeps the sum of
+    squares well conditioned on large prices; a window of one repeated value
+    is exactly 0, as in pandas. max/min reduce a strided window view with
+    NaN-ignoring fmax/fmin.
+    """
+    if stat in ("max", "min"):
+        reduce = np.fmax if stat == "max" else np.fmin
+        out = {}
+        for w in windows:
+            padded = np.concatenate([np.full(x.shape[:-1] + (w - 1,), np.nan), x], axis=-1)
+            view = np.lib.stride_tricks.sliding_window_view(padded, w, axis=-1)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                out[w] = reduce.reduce(view, axis=-1)
+            if min_periods > 1:
+                out[w][_window_sums(x, [w])[w][1] < min_periods] = np.nan
+        return out
+
+    if stat == "std":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            x = x - np.nan_to_num(np.nanmean(x, axis=-1, keepdims=True))
+        squares = _window_sums(x * x, windows)
+        run = _equal_run(x)
+    sums = _window_sums(x, windows)
+    out = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for w, (s, n) in sums.items():
+            if stat == "sum":
+                value = s
+            elif stat == "mean":
+                value = s / n
+            else:
+                variance = np.maximum((squares[w][0] - s * s / n) / (n - 1), 0.0)
+                variance[run >= n] = 0.0
+                value = np.sqrt(variance)
+                value[n < 2] = np.nan
+            value[n < max(min_periods, 1)] = np.nan
+            out[w] = value
+    return out
+
+
+def ewm(stack, alphas, warmups):
+    """
+    EWMs with adjust=False (y = (1 - a) * y_prev + a * x) for a stack of
+    inputs with one alpha each.
+
+    Each row starts at its first non-NaN value and carries forward over
+    NaNs. Rows with warmup use a = max(alpha, 1 / n) for their n-th value,
+    i.e. the running mean until 1 / alpha values are in: Wilder's smoothing,
+    seeded with the simple average of the first window. The recursion loops
+    over days once for the whole stack, vectorized across inputs and symbols.
+    """
+    shape = (-1,) + (1,) * (stack.ndim - 2)
+    a = np.asarray(alphas, dtype=float).reshape(shape)
+    warmup = np.asarray(warmups, dtype=bool).reshape(shape)
+    out = np.full_like(stack, np.nan)
+    prev = np.full(stack.shape[:-1], np.nan)
+    count = np.zeros(stack.shape[:-1])
+    for t in range(stack.shape[-1]):
+        x = stack[..., t]
+        valid = ~np.isnan(x)
+        count += valid
+        step = np.where(warmup, np.maximum(a, 1 / np.maximum(count, 1)), a)
+        prev = np.where(np.isnan(prev), x, np.where(valid, prev + step * (x - prev), prev))
+        out[..., t] = prev
+    return out
+
+
+def cumsum(x):
+    return np.where(np.isnan(x), np.nan, np.cumsum(np.nan_to_num(x), axis=-1))
+
+
+def supertrend(hl2, atr, close, multiplier):
+    """Supertrend line and direction (+1 up, -1 down); a loop over days, vectorized across symbols."""
+    upper_basic, lower_basic = hl2 + multiplier * atr, hl2 - multiplier * atr
+    line = np.full_like(close, np.nan)
+    direction = np.full_like(close, np.nan)
+    upper = np.full(close.shape[:-1], np.nan)
+    lower = np.full(close.shape[:-1], np.nan)
+    trend = np.ones(close.shape[:-1])
+    prev_close = np.full(close.shape[:-1], np.nan)
+    for t in range(close.shape[-1]):
+        ub, lb, c = upper_basic[..., t], lower_basic[..., t], close[..., t]
+        # Bands only tighten while price stays inside them
+        upper = np.where(np.isnan(upper) | (ub < upper) | (prev_close > upper), ub, upper)
+        lower = np.where(np.isnan(lower) | (lb > lower) | (prev_close < lower), lb, lower)
+        trend = np.where(c > upper, 1.0, np.where(c < lower, -1.0, trend))
+        valid = ~np.isnan(ub)
+        line[..., t] = np.where(valid, np.where(trend > 0, lower, upper), np.nan)
+        direction[..., t] = np.where(valid, trend, np.nan)
+        prev_close = c
+    return line, direction
+
+
+# -----------------------------
+# Compute graph
+# -----------------------------
+# Elementwise functions usable in graph.map(); keyed by name so nodes stay hashable
+ELEMENTWISE = {
+    "add": np.add,
+    "sub": np.subtract,
+    "mul": np.multiply,
+    "div": lambda a, b: np.divide(a, b, out=np.full_like(a, np.nan), where=b != 0),
+    "abs": np.abs,
+    "max": np.fmax,
+    "min": np.fmin,
+    "pos": lambda a: np.clip(a, 0, None),
+    "neg_part": lambda a: -np.clip(a, None, 0),
+    "sign": lambda a: np.nan_to_num(np.sign(a)),
+    "scale": lambda a, k: a * k,
+    "offset": lambda a, k: a + k,
+    "mean3": lambda a, b, c: (a + b + c) / 3,
+    "mid": lambda a, b: (a + b) / 2,
+    # 100 - 100 / (1 + a / b), written so b == 0 gives 100 and a == b == 0 (no movement) gives 50
+    "index": lambda a, b: np.clip(100 - np.divide(100 * b, a + b, out=np.full_like(a, 50.0), where=(a + b) != 0), 0, 100),
+    "dm": lambda up, down: np.where((up > down) & (up > 0), up, 0.0),
+    "flow_up": lambda f, tp, prev: np.where(tp > prev, f, 0.0),
+    "flow_down": lambda f, tp, prev: np.where(tp < prev, f, 0.0),
+    "pct_b": lambda c, lo, hi: np.divide(c - lo, hi - lo, out=np.full_like(c, np.nan), where=hi != lo) * 100,
+}
+
+
+class Graph:
+    """
+    Builder the indicator definitions use to declare their computation.
+
+    Every method returns a node key. Identical requests (same op, inputs and
+    parameters) return the same key, so shared intermediates such as the
+    20-day mean of close, EMA12 or the true range exist once however many
+    indicators use them.
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self.nodes = {}
+
+    def _node(self, *key):
+        self.nodes.setdefault(key, key)
+        return key
+
+    def col(self, name):
+        return self._node("col", name)
+
+    def map(self, fn, *args):
+        return self._node("map", fn, *args)
+
+    def shift(self, x, k=1):
+        return self._node("shift", x, k)
+
+    def diff(self, x):
+        return self.map("sub", x, self.shift(x))
+
+    def rolling(self, x, stat, window, min_periods=1):
+        return self._node("rolling", x, stat, window, min_periods)
+
+    def sma(self, x, window):
+        return self.rolling(x, "mean", window)
+
+    def ewm(self, x, alpha, warmup=False):
+        return self._node("ewm", x, float(alpha), warmup)
+
+    def ema(self, x, span):
+        return self.ewm(x, 2 / (span + 1))
+
+    def wilder(self, x, window):
+        return self.ewm(x, 1 / window, warmup=True)
+
+    def cumsum(self, x):
+        return self._node("cumsum", x)
+
+    def supertrend(self, hl2, atr, close, multiplier):
+        node = self._node("supertrend", hl2, atr, close, float(multiplier))
+        return self._node("part", node, 0), self._node("part", node, 1)
+
+    # Shared intermediates
+    def high(self):
+        # NEPSE's close is the weighted closing price and can sit outside the traded high/low
+        return self.map("max", self.col("high"), self.col("close"))
+
+    def low(self):
+        return self.map("min", self.col("low"), self.col("close"))
+
+    def true_range(self):
+        high, low, close = self.high(), self.low(), self.col("close")
+        prev_close = self.shift(close)
+        return self.map("max", self.map("sub", high, low),
+                        self.map("max", self.map("abs", self.map("sub", high, prev_close)),
+                                 self.map("abs", self.map("sub", low, prev_close))))
+
+
+def _inputs(key):
+    """Child nodes of a node key."""
+    return [arg for arg in key[1:] if isinstance(arg, tuple)]
+
+
+def plan(outputs):
+    """
+    Group the nodes needed for outputs into waves. Each wave only depends on
+    earlier waves, and within a wave all EWMs run as one stacked recursion
+    and all rolling windows over the same input and statistic share one
+    cumulative sum.
+    """
+    depth = {}
+
+    def visit(key):
+        if key not in depth:
+            depth[key] = 1 + max((visit(child) for child in _inputs(key)), default=-1)
+        return depth[key]
+
+    for key in outputs:
+        visit(key)
+    waves = defaultdict(list)
+    for key, d in depth.items():
+        waves[d].append(key)
+    return [waves[d] for d in sorted(waves)]
+
+
+def execute(waves, segments, frame):
+    values = {}
+    for wave in waves:
+        ewms = [k for k in wave if k[0] == "ewm"]
+        if ewms:
+            stacked = ewm(np.stack([values[k[1]] for k in ewms]), [k[2] for k in ewms], [k[3] for k in ewms])
+            values.update(zip(ewms, stacked))
+
+        rollings = defaultdict(list)
+        for k in wave:
+            if k[0] == "rolling":
+                rollings[(k[1], k[2], k[4])].append(k)
+        for (x, stat, min_periods), keys in rollings.items():
+            results = rolling(values[x], stat, sorted({k[3] for k in keys}), min_periods)
+            for k in keys:
+                values[k] = results[k[3]]
+
+        for k in wave:
+            op = k[0]
+            if op in ("ewm", "rolling"):
+                continue
+            if op == "col":
+                values[k] = segments.to_2d(frame[k[1]].to_numpy(dtype=float))
+            elif op == "map":
+                args = [values[a] if isinstance(a, tuple) else a for a in k[2:]]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    values[k] = ELEMENTWISE[k[1]](*args)
+            elif op == "shift":
+                values[k] = shift(values[k[1]], k[2])
+            elif op == "cumsum":
+                values[k] = cumsum(values[k[1]])
+            elif op == "supertrend":
+                values[k] = supertrend(values[k[1]], values[k[2]], values[k[3]], k[4])
+            elif op == "part":
+                values[k] = values[k[1]][k[2]]
+            else:
+                raise ValueError(f"Unknown node {op}")
+    return values
+
+
+# -----------------------------
+# Indicator registry
+# -----------------------------
+INDICATORS = {}
+
+
+def indicator(name, inputs, window=None):
+    """
+    Register an indicator. The decorated function gets a Graph and returns
+    {output column: node}; inputs and window document what it reads.
+    """
+    def register(fn):
+        INDICATORS[name] = {"inputs": inputs, "window": window, "build": fn}
+        return fn
+    return register
+
+
+@indicator("MA", inputs=["close"], window=50)
+def _ma(g):
+    close = g.col("close")
+    return {"MA20": g.sma(close, 20), "MA50": g.sma(close, 50)}
+
+
+RSI_METHODS = ("wilder", "sma")
+
+
+@indicator("RSI", inputs=["close"], window=14)
+def _rsi(g):
+    # rsi_method: wilder (default) smooths gains/losses Wilder-style, sma takes their 14-day means
+    delta = g.diff(g.col("close"))
+    gain, loss = g.map("pos", delta), g.map("neg_part", delta)
+    if g.params.get("rsi_method", "wilder") == "sma":
+        return {"RSI": g.map("index", g.sma(gain, 14), g.sma(loss, 14))}
+    return {"RSI": g.map("index", g.wilder(gain, 14), g.wilder(loss, 14))}
+
+
+@indicator("BB", inputs=["close"], window=20)
+def _bollinger(g):
+    close = g.col("close")
+    mid, std = g.sma(close, 20), g.rolling(close, "std", 20)
+    band = g.map("scale", std, 2)
+    return {"BB_MID": mid, "BB_STD": std,
+            "BB_UPPER": g.map("add", mid, band), "BB_LOWER": g.map("sub", mid, band)}
+
+
+@indicator("MACD", inputs=["close"], window=26)
+def _macd(g):
+    close = g.col("close")
+    ema12, ema26 = g.ema(close, 12), g.ema(close, 26)
+    macd = g.map("sub", ema12, ema26)
+    signal = g.ema(macd, 9)
+    return {"EMA12": ema12, "EMA26": ema26, "MACD": macd, "MACD_Signal": signal,
+            "MACD_Hist": g.map("sub", macd, signal)}
+
+
+@indicator("ATR", inputs=["high", "low", "close"], window=14)
+def _atr(g):
+    return {"ATR": g.wilder(g.true_range(), 14)}
+
+
+@indicator("ADX", inputs=["high", "low", "close"], window=14)
+def _adx(g):
+    high, low = g.high(), g.low()
+    up, down = g.diff(high), g.map("scale", g.diff(low), -1)
+    atr = g.wilder(g.true_range(), 14)
+    plus_di = g.map("scale", g.map("div", g.wilder(g.map("dm", up, down), 14), atr), 100)
+    minus_di = g.map("scale", g.map("div", g.wilder(g.map("dm", down, up), 14), atr), 100)
+    dx = g.map("scale", g.map("div", g.map("abs", g.map("sub", plus_di, minus_di)),
+                              g.map("add", plus_di, minus_di)), 100)
+    return {"PLUS_DI": plus_di, "MINUS_DI": minus_di, "ADX": g.wilder(dx, 14)}
+
+
+@indicator("STOCH", inputs=["high", "low", "close"], window=14)
+def _stochastic(g):
+    k = g.map("pct_b", g.col("close"), g.rolling(g.low(), "min", 14), g.rolling(g.high(), "max", 14))
+    return {"STOCH_K": k, "STOCH_D": g.sma(k, 3)}
+
+
+@indicator("OBV", inputs=["close", "vol"])
+def _obv(g):
+    direction = g.map("sign", g.diff(g.col("close")))
+    return {"OBV": g.cumsum(g.map("mul", direction, g.col("vol")))}
+
+
+@indicator("MFI", inputs=["high", "low", "close", "vol"], window=14)
+def _mfi(g):
+    tp = g.map("mean3", g.high(), g.low(), g.col("close"))
+    flow, prev = g.map("mul", tp, g.col("vol")), g.shift(tp)
+    up = g.rolling(g.map("flow_up", flow, tp, prev), "sum", 14)
+    down = g.rolling(g.map("flow_down", flow, tp, prev), "sum", 14)
+    return {"MFI": g.map("index", up, down)}
+
+
+@indicator("ICHIMOKU", inputs=["high", "low"], window=52)
+def _ichimoku(g):
+    high, low = g.high(), g.low()
+
+    def midpoint(window):
+        return g.map("mid", g.rolling(high, "max", window), g.rolling(low, "min", window))
+
+    tenkan, kijun = midpoint(9), midpoint(26)
+    # Leading spans are plotted 26 days ahead, so today's row holds the value computed 26 days ago
+    return {"ICHI_TENKAN": tenkan, "ICHI_KIJUN": kijun,
+            "ICHI_SENKOU_A": g.shift(g.map("mid", tenkan, kijun), 26),
+            "ICHI_SENKOU_B": g.shift(midpoint(52), 26)}
+
+
+@indicator("SUPERTREND", inputs=["high", "low", "close"], window=10)
+def _supertrend(g):
+    hl2 = g.map("mid", g.high(), g.low())
+    line, direction = g.supertrend(hl2, g.wilder(g.true_range(), 10), g.col("close"), 3)
+    return {"SUPERTREND": line, "SUPERTREND_DIR": direction}
+
+
+@indicator("VWAP20", inputs=["high", "low", "close", "vol"], window=20)
+def _rolling_vwap(g):
+    tp = g.map("mean3", g.high(), g.low(), g.col("close"))
+    return {"VWAP20": g.map("div", g.rolling(g.map("mul", tp, g.col("vol")), "sum", 20),
+                            g.rolling(g.col("vol"), "sum", 20))}
+
+
+# Columns calculate_indicators has always produced
+CORE_INDICATORS = ["MA", "RSI", "BB", "MACD"]
+
+
+def compute_indicators(df, names=None, rsi_method="wilder"):
+    """
+    Compute registered indicators for a frame sorted by symbol and date.
+
+    Args:
+        df: Price data with symbol and the indicators' input columns
+        names: Indicator names to compute (default: all registered)
+        rsi_method: RSI smoothing, "wilder" or "sma"
+
+    Returns:
+        DataFrame of the output columns, aligned with df's index
+    """
+    names = list(INDICATORS) if names is None else names
+    unknown = [n for n in names if n not in INDICATORS]
+    if unknown:
+        raise ValueError(f"Unknown indicators {unknown}; available: {', '.join(INDICATORS)}")
+    if rsi_method not in RSI_METHODS:
+        raise ValueError(f"Unknown RSI method {rsi_method!r}; choose from {', '.join(RSI_METHODS)}")
+
+    g = Graph(rsi_method=rsi_method)
+    outputs = {}
+    for name in names:
+        outputs.update(INDICATORS[name]["build"](g))
+    segments = Segments(df["symbol"].to_numpy())
+    values = execute(plan(list(outputs.values())), segments, df)
+    return pd.DataFrame({column: segments.to_1d(values[key]) for column, key in outputs.items()}, index=df.index)
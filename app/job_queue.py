@@ -0,0 +1,278 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import webhooks
+from metrics import record_job
+
+# Job states: queued -> running -> succeeded | queued (retry) | dead (out of attempts)
+FINISHED = ("succeeded", "dead")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    webhook_url TEXT,
+    webhook_status TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    lease_until REAL,
+    lease_owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, run_after, created_at);
+"""
+
+
+class JobQueue:
+    """
+    Persistent job queue in SQLite, worked by a thread pool.
+
+    Higher priority runs first, then oldest first. A failing job is retried
+    with exponential backoff until max_attempts, after which it is
+    dead-lettered (status "dead") with its last error. Running jobs hold a
+    lease that a heartbeat thread renews while they run; if the process
+    dies, the lease runs out and the jobs are requeued by the next claim
+    (of this or any other queue on the database) after it, or dead-lettered
+    when they are out of attempts. A worker only records the outcome of a
+    job whose lease it still holds (same owner and attempt), so one that
+    stalled past its lease can't overwrite the run that took the job over.
+    When a job with a webhook_url finishes,
+    the job is POSTed to that URL (webhooks.post).
+
+    Handlers are registered per kind: handler(payload) -> JSON-serializable result.
+    """
+
+    def __init__(self, path, handlers, workers=2, max_attempts=3, backoff=2.0, lease=60.0, poll=0.5):
+        self.path = str(path)
+        self.handlers = handlers
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.poll = poll
+        self.local = threading.local()
+        self.wakeup = threading.Condition()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.held = set()  # ids of the jobs this queue's workers are running
+        self.held_lock = threading.Lock()
+        self.owner = uuid.uuid4().hex  # lease_owner of the jobs this queue claims
+        self.next_sweep = 0.0
+        self.webhooks = ThreadPoolExecutor(max_workers=2, thread_name_prefix="webhook")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self.db()
+        conn.executescript(SCHEMA)
+        if "lease_owner" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")  # databases created before leases had owners
+
+    def db(self):
+        """This thread's connection (SQLite connections can't be shared across threads)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    # -----------------------------
+    # Producer side
+    # -----------------------------
+    def enqueue(self, kind, payload, priority=0, webhook_url=None, max_attempts=None):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.db().execute(
+            "INSERT INTO jobs (id, kind, payload, priority, status, max_attempts, webhook_url, created_at, updated_at, run_after)"
+            " VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), priority, max_attempts or self.max_attempts, webhook_url, now, now, now))
+        record_job(kind, "queued")
+        with self.wakeup:
+            self.wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        row = self.db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._as_dict(row)
+
+    def list(self, status=None, limit=50):
+        query, args = "SELECT * FROM jobs", ()
+        if status:
+            query, args = query + " WHERE status = ?", (status,)
+        rows = self.db().execute(query + " ORDER BY updated_at DESC LIMIT ?", args + (limit,)).fetchall()
+        return [self._as_dict(row) for row in rows]
+
+    def active(self, kind):
+        """Payloads of the kind's queued and running jobs."""
+        rows = self.db().execute("SELECT payload FROM jobs WHERE status IN ('queued', 'running') AND kind = ?",
+                                 (kind,)).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def counts(self):
+        rows = self.db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def requeue(self, job_id):
+        """Give a dead-lettered job a fresh set of attempts."""
+        now = time.time()
+        changed = self.db().execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, updated_at = ?, run_after = ?"
+            " WHERE id = ? AND status = 'dead'", (now, now, job_id)).rowcount
+        if changed:
+            with self.wakeup:
+                self.wakeup.notify()
+        return bool(changed)
+
+    @staticmethod
+    def _as_dict(row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    # -----------------------------
+    # Worker side
+    # -----------------------------
+    def start(self):
+        if self.threads:
+            return self
+        self.sweep()
+        targets = [(self._work, f"job-worker-{n}") for n in range(self.workers)] + [(self._heartbeat, "job-heartbeat")]
+        for target, name in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self, timeout=10):
+        self.stopping.set()
+        with self.wakeup:
+            self.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+        self.webhooks.shutdown(wait=True)
+
+    def sweep(self, conn=None):
+        """Requeue running jobs whose lease ran out (their process died), or dead-letter them if out of attempts."""
+        now = time.time()
+        self.next_sweep = now + self.lease / 4
+        changed = (conn or self.db()).execute(
+            "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'dead' END,"
+            " error = 'Lease expired: the worker running it stopped', lease_until = NULL, lease_owner = NULL,"
+            " updated_at = ?, run_after = ?"
+            " WHERE status = 'running' AND lease_until < ?", (now, now, now)).rowcount
+        if changed:
+            print(f"⚠️  {changed} jobs with an expired lease taken back")
+        return changed
+
+    def claim(self):
+        """Atomically take the next ready job, or None."""
+        conn = self.db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if time.time() >= self.next_sweep:
+                self.sweep(conn)
+            now = time.time()  # after the sweep, so the jobs it requeued are ready
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ?"
+                " ORDER BY priority DESC, run_after, created_at LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ?,"
+                             " lease_until = ?, lease_owner = ? WHERE id = ?",
+                             (now, now + self.lease, self.owner, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return None if row is None else self._as_dict(row) | {"attempts": row["attempts"] + 1}
+
+    def _work(self):
+        while not self.stopping.is_set():
+            job = self.claim()
+            if job is None:
+                with self.wakeup:
+                    self.wakeup.wait(self.poll)
+                continue
+            self.run(job)
+
+    def _heartbeat(self):
+        # Renew the leases of running jobs, so only those of a dead process run out
+        while not self.stopping.wait(self.lease / 4):
+            with self.held_lock:
+                held = list(self.held)
+            if held:
+                self.db().execute(f"UPDATE jobs SET lease_until = ? WHERE status = 'running' AND lease_owner = ?"
+                                  f" AND id IN ({','.join('?' * len(held))})",
+                                  (time.time() + self.lease, self.owner, *held))
+
+    def run(self, job):
+        conn = self.db()
+        start = time.perf_counter()
+        # Only while this worker still holds the lease it claimed the job with
+        held = " WHERE id = ? AND status = 'running' AND lease_owner = ? AND attempts = ?"
+        lease = (job["id"], self.owner, job["attempts"])
+        with self.held_lock:
+            self.held.add(job["id"])
+        try:
+            result = self.handlers[job["kind"]](job["payload"])
+        except Exception as e:
+            now = time.time()
+            if job["attempts"] < job["max_attempts"]:
+                status = "queued"
+                run_after = now + self.backoff * 2 ** (job["attempts"] - 1)
+            else:
+                status, run_after = "dead", now
+            changed = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?, run_after = ?, lease_until = NULL,"
+                " lease_owner = NULL" + held, (status, f"{type(e).__name__}: {e}", now, run_after, *lease)).rowcount
+            if status == "dead" and changed:
+                print(f"❌ Job {job['id']} dead-lettered after {job['attempts']} attempts: {e}")
+        else:
+            status = "succeeded"
+            changed = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ?, lease_until = NULL,"
+                " lease_owner = NULL" + held, (status, json.dumps(result), time.time(), *lease)).rowcount
+        finally:
+            with self.held_lock:
+                self.held.discard(job["id"])
+        if not changed:
+            print(f"⚠️  Job {job['id']} lost its lease while running; its {status} outcome was dropped")
+            record_job(job["kind"], "lease_lost", time.perf_counter() - start)
+            return
+        record_job(job["kind"], "retry" if status == "queued" else status, time.perf_counter() - start)
+        if status in FINISHED and job["webhook_url"]:
+            self.webhooks.submit(self._deliver, job["id"])
+
+    def _deliver(self, job_id, attempts=3):
+        job = self.get(job_id)
+        outcome = None
+        for attempt in range(attempts):
+            try:
+                response = webhooks.post(job["webhook_url"], job)
+                outcome = str(response.status_code)
+                if response.ok:
+                    break
+            except ValueError:
+                outcome = "refused"  # the URL no longer passes webhooks.check_url
+                break
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            time.sleep(2 ** attempt)
+        self.db().execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (outcome, job_id))
@@ -0,0 +1,326 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+from metrics import record_llm_backend, record_llm_failover
+
+# -----------------------------
+# Configuration
+# -----------------------------
+# LLM_BACKEND picks the primary backend (default gemini), LLM_FALLBACK an optional secondary.
+#   gemini:   GOOGLE_API_KEY, GEMINI_MODEL
+#   openai:   OPENAI_BASE_URL, OPENAI_MODEL, OPENAI_API_KEY (any OpenAI-compatible server)
+#   llamacpp: LLAMA_MODEL_PATH (GGUF), LLAMA_N_CTX, LLAMA_N_THREADS, LLAMA_MAX_TOKENS
+#   stub:     STUB_LLM_LATENCY (deterministic offline responses)
+# Routing: LLM_TIMEOUT / LLM_TIMEOUT_<BACKEND>, LLM_HEDGE_AFTER, LLM_P95_THRESHOLD, LLM_ERROR_THRESHOLD
+BACKENDS = ("gemini", "openai", "llamacpp", "stub")
+
+DEFAULT_TIMEOUTS = {"gemini": 60.0, "openai": 60.0, "llamacpp": 120.0, "stub": 10.0}
+
+# Concurrent LLM callers: the API's /analyze slots plus the job workers (see api.py). Each backend gets a pool of
+# twice that, room for one hedged or abandoned (timed-out, still running) call per caller.
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", int(os.getenv("ANALYZE_CONCURRENCY", 4))
+                                + int(os.getenv("JOB_WORKERS", 2))))
+
+
+def _env_float(name, default=None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def backend_timeout(name):
+    """Per-backend timeout: LLM_TIMEOUT_<NAME>, then LLM_TIMEOUT, then the default."""
+    return _env_float(f"LLM_TIMEOUT_{name.upper()}", _env_float("LLM_TIMEOUT", DEFAULT_TIMEOUTS[name]))
+
+
+def missing_config(name):
+    """Why a backend can't be built from the environment, or None when it can."""
+    if name not in BACKENDS:
+        return f"unknown LLM backend {name!r} (choose from {', '.join(BACKENDS)})"
+    if name == "gemini" and not os.getenv("GOOGLE_API_KEY"):
+        return "GOOGLE_API_KEY not set"
+    if name == "llamacpp" and not os.getenv("LLAMA_MODEL_PATH"):
+        return "LLAMA_MODEL_PATH not set"
+    return None
+
+
+def configured_backends():
+    """Backends named in LLM_BACKEND / LLM_FALLBACK that have the config they need."""
+    names = [os.getenv("LLM_BACKEND", "gemini"), os.getenv("LLM_FALLBACK")]
+    available = []
+    for name in filter(None, names):
+        problem = missing_config(name)
+        if problem:
+            print(f"⚠️  Skipping LLM backend {name}: {problem}")
+        elif name not in available:
+            available.append(name)
+    return available
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+def make_backend(name):
+    """Build one chat model from environment settings."""
+    timeout = backend_timeout(name)
+    if name == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp"),
+            temperature=0.2,  # Lower temperature for more consistent formatting
+            timeout=timeout,
+            max_retries=1,
+        )
+    if name == "openai":
+        # Any OpenAI-compatible server: llama.cpp server, vLLM, Ollama, LM Studio...
+        try:
+            from langchain_openai import ChatOpenAI
+        except ImportError:
+            raise ImportError("The openai backend needs langchain-openai: pip install langchain-openai")
+        return ChatOpenAI(
+            base_url=os.getenv("OPENAI_BASE_URL", "http://localhost:8080/v1"),
+            api_key=os.getenv("OPENAI_API_KEY", "not-needed"),
+            model=os.getenv("OPENAI_MODEL", "local-model"),
+            temperature=0.2,
+            timeout=timeout,
+            max_retries=0,
+        )
+    if name == "llamacpp":
+        # In-process quantized GGUF model on CPU
+        try:
+            from langchain_community.chat_models import ChatLlamaCpp
+        except ImportError:
+            raise ImportError("The llamacpp backend needs llama-cpp-python: pip install llama-cpp-python")
+        return ChatLlamaCpp(
+            model_path=os.environ["LLAMA_MODEL_PATH"],
+            n_ctx=int(os.getenv("LLAMA_N_CTX", 8192)),
+            n_threads=int(os.getenv("LLAMA_N_THREADS", os.cpu_count() or 4)),
+            max_tokens=int(os.getenv("LLAMA_MAX_TOKENS", 1024)),
+            temperature=0.2,
+        )
+    if name == "stub":
+        from stub_llm import StubChatModel
+        return StubChatModel(latency=_env_float("STUB_LLM_LATENCY", 0.0))
+    raise ValueError(missing_config(name))
+
+
+def load_llm():
+    """
+    The chat model selected by the environment.
+
+    One configured backend is returned as is; with LLM_FALLBACK set, both are
+    wrapped in a FailoverChatModel. So is a lone llamacpp backend: the
+    in-process model has no request timeout of its own, and the router
+    abandons its calls after backend_timeout("llamacpp") like any other.
+
+    Returns:
+        Chat model, or None when no backend is configured
+    """
+    names = configured_backends()
+    if not names:
+        return None
+    if len(names) == 1 and names[0] != "llamacpp":
+        return make_backend(names[0])
+    return FailoverChatModel(
+        backends={name: make_backend(name) for name in names},
+        timeouts={name: backend_timeout(name) for name in names},
+        hedge_after=_env_float("LLM_HEDGE_AFTER"),
+        p95_threshold=_env_float("LLM_P95_THRESHOLD", 20.0),
+        error_threshold=_env_float("LLM_ERROR_THRESHOLD", 0.2),
+    )
+
+
+# -----------------------------
+# Health tracking and routing
+# -----------------------------
+class BackendHealth:
+    """Rolling latency and error rate over a backend's most recent calls."""
+
+    def __init__(self, window=50):
+        self.calls = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self.lock:
+            self.calls.append((seconds, ok))
+
+    def snapshot(self):
+        """(calls, p95 seconds, error rate) over the window."""
+        with self.lock:
+            calls = list(self.calls)
+        if not calls:
+            return 0, 0.0, 0.0
+        latencies = sorted(seconds for seconds, _ in calls)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        errors = sum(1 for _, ok in calls if not ok)
+        return len(calls), p95, errors / len(calls)
+
+
+class BackendRouter:
+    """
+    Calls an ordered set of runnables with per-backend timeouts, optional
+    hedging and failover.
+
+    The first healthy backend gets the request. If it errors or times out, the
+    next backend is tried. If hedge_after is set and the first backend hasn't
+    answered by then, the next one is started as well and the first answer
+    wins. A backend counts as degraded once its rolling p95 or error rate
+    passes the threshold. Degraded backends move to the back of the order,
+    but every probe_every-th request still goes to them first so they can
+    recover.
+
+    Each backend runs in its own thread pool (pools, by name), so calls
+    abandoned on a slow backend can't starve the others. A backend's timeout
+    runs from when its call starts, not from when it was queued.
+    """
+
+    def __init__(self, backends, timeouts, health, pools, hedge_after=None,
+                 p95_threshold=20.0, error_threshold=0.2, min_calls=10, probe_every=20):
+        self.backends = backends
+        self.timeouts = timeouts
+        self.health = health
+        self.pools = pools
+        self.hedge_after = hedge_after
+        self.p95_threshold = p95_threshold
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.probe_every = probe_every
+        self.requests = itertools.count(1)
+
+    def degraded(self, name):
+        calls, p95, error_rate = self.health[name].snapshot()
+        return calls >= self.min_calls and (p95 > self.p95_threshold or error_rate > self.error_threshold)
+
+    def order(self):
+        names = list(self.backends)
+        if next(self.requests) % self.probe_every == 0:
+            return names
+        healthy = [name for name in names if not self.degraded(name)]
+        if healthy and healthy[0] != names[0]:
+            record_llm_failover("degraded")
+        return healthy + [name for name in names if name not in healthy]
+
+    def _call(self, name, input, started, kwargs):
+        started.append(time.monotonic())
+        start = time.perf_counter()
+        try:
+            result = self.backends[name].invoke(input, **kwargs)
+        except Exception:
+            seconds = time.perf_counter() - start
+            self.health[name].record(seconds, ok=False)
+            record_llm_backend(name, seconds, ok=False)
+            raise
+        seconds = time.perf_counter() - start
+        # An answer that arrives after the timeout was already abandoned: count it as a failure
+        ok = seconds <= self.timeouts[name]
+        self.health[name].record(seconds, ok=ok)
+        record_llm_backend(name, seconds, ok=ok)
+        return result
+
+    def invoke(self, input, **kwargs):
+        waiting = self.order()
+        running = {}  # future -> (backend, [start time once the call is running])
+        errors = []
+
+        def start_next(reason=None):
+            name = waiting.pop(0)
+            if reason:
+                record_llm_failover(reason)
+            started = []
+            running[self.pools[name].submit(self._call, name, input, started, kwargs)] = (name, started)
+
+        def deadline(name, started, now):
+            # A call still queued for a thread can't have timed out yet
+            return (started[0] if started else now) + self.timeouts[name]
+
+        start_next()
+        hedge_at = time.monotonic() + self.hedge_after if self.hedge_after else None
+        while running:
+            now = time.monotonic()
+            wake = min(deadline(name, started, now) for name, started in running.values())
+            if hedge_at is not None and waiting:
+                wake = min(wake, hedge_at)
+            done, _ = wait(running, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, _ = running.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(e)
+                    if waiting and not running:
+                        start_next("error")
+
+            now = time.monotonic()
+            for future, (name, started) in list(running.items()):
+                if started and now >= deadline(name, started, now):
+                    # The call keeps running in its thread; its result is ignored
+                    del running[future]
+                    errors.append(TimeoutError(f"LLM backend {name} timed out after {self.timeouts[name]:.0f}s"))
+                    if waiting and not running:
+                        start_next("timeout")
+            if hedge_at is not None and now >= hedge_at and waiting and running:
+                hedge_at = None
+                start_next("hedge")
+        raise errors[-1]
+
+
+class FailoverChatModel(BaseChatModel):
+    """
+    Chat model that routes each call through a BackendRouter over several
+    chat models (primary first). with_structured_output() routes the
+    backends' own structured runnables and shares the same health stats.
+    """
+
+    backends: dict
+    timeouts: dict
+    hedge_after: Optional[float] = None
+    p95_threshold: float = 20.0
+    error_threshold: float = 0.2
+
+    _health: dict = PrivateAttr(default_factory=dict)
+    _pools: dict = PrivateAttr(default_factory=dict)
+    _router: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        self._health = {name: BackendHealth() for name in self.backends}
+        self._pools = {name: ThreadPoolExecutor(max_workers=2 * LLM_CONCURRENCY, thread_name_prefix=f"llm-{name}")
+                       for name in self.backends}
+        self._router = self._make_router(self.backends)
+
+    def _make_router(self, runnables):
+        return BackendRouter(runnables, self.timeouts, self._health, self._pools, self.hedge_after,
+                             self.p95_threshold, self.error_threshold)
+
+    @property
+    def _llm_type(self):
+        return "failover"
+
+    def health(self):
+        """{backend: {"calls", "p95_seconds", "error_rate", "degraded"}}"""
+        report = {}
+        for name, health in self._health.items():
+            calls, p95, error_rate = health.snapshot()
+            report[name] = {"calls": calls, "p95_seconds": round(p95, 3),
+                            "error_rate": round(error_rate, 3), "degraded": self._router.degraded(name)}
+        return report
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if stop is not None:
+            kwargs["stop"] = stop
+        message = self._router.invoke(messages, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(self, schema, *, include_raw=False, **kwargs):
+        router = self._make_router({name: model.with_structured_output(schema, include_raw=include_raw, **kwargs)
+                                    for name, model in self.backends.items()})
+        return RunnableLambda(router.invoke)
@@ -1,5 +1,7 @@
 import streamlit as st
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 # API Configuration
 API_URL = "http://localhost:8000"
@@ -38,57 +40,153 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Helper functions
+# Status is re-checked every STATUS_TTL seconds; everything else is cached per
+# data version, so a new processed file shows up within STATUS_TTL.
+STATUS_TTL = 30
+STOCK_LIST_TTL = 3600
+# Short, because the overview's signal and cached analysis can change within a data version
+OVERVIEW_TTL = 60
+
+@st.cache_resource
+def get_session():
+    """One pooled HTTP session for every rerun and user of this Streamlit server"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_executor():
+    """Threads for API calls that run alongside the page render"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="api")
+
+def api_get(path, **params):
+    response = get_session().get(f"{API_URL}{path}", params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+# Failed calls raise, and st.cache_data doesn't cache exceptions, so an API
+# restart is picked up on the next rerun
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def fetch_status():
+    return api_get("/api/status")
+
+@st.cache_data(ttl=STOCK_LIST_TTL, show_spinner=False)
+def fetch_stock_list(data_version):
+    return api_get("/stocks")['symbols']
+
+@st.cache_data(ttl=OVERVIEW_TTL, show_spinner=False)
+def fetch_overview(symbol, strategy, data_version):
+    return api_get(f"/stocks/{symbol}/overview", strategy=strategy)
+
 def check_api_health():
     """Check if API is running"""
     try:
-        response = requests.get(f"{API_URL}/", timeout=5)
-        return response.json()
+        return fetch_status()
     except:
         return None
 
-def get_stock_list():
+def get_stock_list(data_version):
     """Get list of all stocks"""
     try:
-        response = requests.get(f"{API_URL}/stocks")
-        if response.status_code == 200:
-            return response.json()['symbols']
-        return []
+        return fetch_stock_list(data_version)
     except:
         return []
 
-def get_stock_info(symbol):
-    """Get stock information"""
+def get_overview(symbol, strategy, data_version):
+    """Stock info, indicators, signal and any cached analysis in one call"""
     try:
-        response = requests.get(f"{API_URL}/stocks/{symbol}")
-        if response.status_code == 200:
-            return response.json()
-        return None
+        return fetch_overview(symbol, strategy, data_version)
     except:
         return None
 
-def get_indicators(symbol):
-    """Get technical indicators"""
+def analyze_stock_api(session, symbol, strategy):
+    """Call API to analyze stock (session from get_session(), resolved on the script thread)"""
     try:
-        response = requests.get(f"{API_URL}/stocks/{symbol}/indicators")
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except:
-        return None
-
-def analyze_stock_api(symbol, strategy):
-    """Call API to analyze stock"""
-    try:
-        response = requests.post(
+        response = session.post(
             f"{API_URL}/analyze",
-            json={"symbol": symbol, "strategy": strategy}
+            json={"symbol": symbol, "strategy": strategy},
+            headers={"X-Request-Timeout": "120"},  # the API turns the request away if it can't answer in time
+            timeout=120
         )
         if response.status_code == 200:
             return response.json()
+        if response.status_code == 429:
+            return {"success": False, "error": f"The server is busy, try again in {response.headers.get('Retry-After', 'a few')} seconds"}
         return None
     except:
         return None
 
+def fmt(value, spec=".2f"):
+    """A number for display; "n/a" when the API had none (null)"""
+    return "n/a" if value is None else format(value, spec)
+
+def show_indicators(indicators):
+    st.markdown("### 📊 Current Technical Indicators")
+
+    # Groups of indicators the processed file wasn't built with are missing, values the API had none for are null
+    averages = indicators.get('moving_averages', {})
+    momentum = indicators.get('momentum', {})
+    bands = indicators.get('bollinger_bands', {})
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown("**📈 Moving Averages**")
+        st.write(f"MA20: Rs. {fmt(averages.get('ma20'))}")
+        st.write(f"MA50: Rs. {fmt(averages.get('ma50'))}")
+
+        st.markdown("**💰 Price**")
+        st.write(f"Close: Rs. {fmt(indicators['price']['close'])}")
+        st.write(f"VWAP: Rs. {fmt(indicators['price']['vwap'])}")
+        st.write(f"Change: {fmt(indicators['change_percent'])}%")
+
+    with col2:
+        st.markdown("**📊 Momentum**")
+        rsi = momentum.get('rsi')
+        if rsi is None:
+            st.write("RSI: n/a")
+        else:
+            rsi_signal = "🔴 Overbought" if rsi > 70 else "🟢 Oversold" if rsi < 30 else "🟡 Neutral"
+            st.write(f"RSI: {fmt(rsi)} ({rsi_signal})")
+        macd, macd_signal = momentum.get('macd'), momentum.get('macd_signal')
+        st.write(f"MACD: {fmt(macd)}")
+        st.write(f"Signal: {fmt(macd_signal)}")
+
+        if macd is not None and macd_signal is not None:
+            macd_trend = "🟢 Bullish" if macd - macd_signal > 0 else "🔴 Bearish"
+            st.write(f"Trend: {macd_trend}")
+
+    with col3:
+        st.markdown("**📉 Bollinger Bands**")
+        st.write(f"Upper: Rs. {fmt(bands.get('upper'))}")
+        st.write(f"Middle: Rs. {fmt(bands.get('middle'))}")
+        st.write(f"Lower: Rs. {fmt(bands.get('lower'))}")
+
+        # BB position
+        close = indicators['price']['close']
+        bb_upper = bands.get('upper')
+        bb_lower = bands.get('lower')
+
+        if None in (close, bb_upper, bb_lower):
+            bb_pos = "n/a"
+        elif close > bb_upper:
+            bb_pos = "🔴 Above Upper (Overbought)"
+        elif close < bb_lower:
+            bb_pos = "🟢 Below Lower (Oversold)"
+        else:
+            bb_pos = "🟡 Within Bands (Normal)"
+        st.write(f"Position: {bb_pos}")
+
+    st.markdown("---")
+
+def show_analysis(analysis):
+    st.markdown("### 💡 AI Analysis & Recommendation")
+    st.markdown(analysis)
+    st.markdown("---")
+    st.warning("⚠️ **Disclaimer**: This is an AI-generated analysis for educational purposes only.")
+
 # Main App
 def main():
     st.markdown('<div class="main-header">📈 NEPSE Multi-Strategy RAG Trading Bot</div>', unsafe_allow_html=True)
@@ -101,11 +199,12 @@ def main():
         st.error("❌ Cannot connect to API. Please make sure the FastAPI server is running on http://localhost:8000")
         st.info("Run: `uvicorn app.api:app --reload` in your terminal")
         st.stop()
+    data_version = api_status.get('data_version')
 
     # Sidebar
     with st.sidebar:
         # Stock selection
-        stocks = get_stock_list()
+        stocks = get_stock_list(data_version)
         if not stocks:
             st.error("No stocks available")
             st.stop()
@@ -120,104 +219,71 @@ def main():
 
     # Main content
     if selected_stock:
-        # Get stock info
-        stock_info = get_stock_info(selected_stock)
+        # Key metrics are drawn above the analysis section once the overview arrives
+        metrics_area = st.container()
+
+        # AI Analysis Section
+        st.markdown("### 🤖 AI-Powered Trading Recommendation")
+        st.info("⏱️ **Note:** Analysis may take 10-30 seconds due to Google API rate limits. Please be patient.")
+
+        analysis_call = None
+        if not api_status.get('bot_initialized'):
+            st.error("❌ RAG Bot not initialized. Please set GOOGLE_API_KEY environment variable and restart the API.")
+        elif st.button("🔍 Get AI Analysis", type="primary", use_container_width=True):
+            # Runs while the overview is fetched and the indicators are drawn
+            # The cached session is looked up here: executor threads have no Streamlit script context
+            analysis_call = get_executor().submit(analyze_stock_api, get_session(), selected_stock, strategy)
+
+        overview = get_overview(selected_stock, strategy, data_version)
+        if not overview:
+            metrics_area.error(f"❌ Could not load {selected_stock}")
+            st.stop()
+        stock_info = overview['info']
 
-        if stock_info:
+        with metrics_area:
             # Display key metrics
             col1, col2, col3, col4 = st.columns(4)
 
             with col1:
-                st.metric("Close Price", f"Rs. {stock_info['close']:.2f}",
-                         f"{stock_info['diff_percent']:.2f}%")
+                diff = stock_info['diff_percent']
+                st.metric("Close Price", f"Rs. {fmt(stock_info['close'])}",
+                         None if diff is None else f"{fmt(diff)}%")
 
             with col2:
-                st.metric("Volume", f"{stock_info['volume']:,}")
+                st.metric("Volume", fmt(stock_info['volume'], ","))
 
             with col3:
                 rsi_value = stock_info['rsi']
-                rsi_status = "Overbought" if rsi_value > 70 else "Oversold" if rsi_value < 30 else "Neutral"
-                st.metric("RSI", f"{rsi_value:.2f}", rsi_status)
+                rsi_status = None if rsi_value is None else (
+                    "Overbought" if rsi_value > 70 else "Oversold" if rsi_value < 30 else "Neutral")
+                st.metric("RSI", fmt(rsi_value), rsi_status)
 
             with col4:
-                st.metric("52W High", f"Rs. {stock_info['week_52_high']:.2f}")
+                st.metric("52W High", f"Rs. {fmt(stock_info['week_52_high'])}")
 
-            st.markdown("---")
+            signal = overview['signal']
+            source = "AI analysis" if signal['signal_source'] == "llm" else "indicator rules"
+            st.caption(f"Current signal: **{signal['signal']}** (from {source})")
 
-            # AI Analysis Section
-            st.markdown("### 🤖 AI-Powered Trading Recommendation")
-            st.info("⏱️ **Note:** Analysis may take 10-30 seconds due to Google API rate limits. Please be patient.")
+            st.markdown("---")
 
-            if not api_status.get('bot_initialized'):
-                st.error("❌ RAG Bot not initialized. Please set GOOGLE_API_KEY environment variable and restart the API.")
+        if analysis_call is not None:
+            st.markdown("---")
+            show_indicators(overview['indicators'])
+            with st.spinner(f"Analyzing {selected_stock} using {strategy} strategy..."):
+                result = analysis_call.result()
+
+            if result and result['success']:
+                show_analysis(result['analysis'])
+            elif result:
+                st.error(f"❌ Analysis failed: {result.get('error', 'Unknown error')}")
             else:
-                if st.button("🔍 Get AI Analysis", type="primary", use_container_width=True):
-                    with st.spinner(f"Analyzing {selected_stock} using {strategy} strategy..."):
-                        # Get indicators for display
-                        indicators = get_indicators(selected_stock)
-                        result = analyze_stock_api(selected_stock, strategy)
-
-                        if result and result['success']:
-                            st.markdown("---")
-
-                            # Show technical indicators first
-                            if indicators:
-                                st.markdown("### 📊 Current Technical Indicators")
-
-                                col1, col2, col3 = st.columns(3)
-
-                                with col1:
-                                    st.markdown("**📈 Moving Averages**")
-                                    st.write(f"MA20: Rs. {indicators['moving_averages']['ma20']:.2f}")
-                                    st.write(f"MA50: Rs. {indicators['moving_averages']['ma50']:.2f}")
-
-                                    st.markdown("**💰 Price**")
-                                    st.write(f"Close: Rs. {indicators['price']['close']:.2f}")
-                                    st.write(f"VWAP: Rs. {indicators['price']['vwap']:.2f}")
-                                    st.write(f"Change: {indicators['change_percent']:.2f}%")
-
-                                with col2:
-                                    st.markdown("**📊 Momentum**")
-                                    rsi = indicators['momentum']['rsi']
-                                    rsi_signal = "🔴 Overbought" if rsi > 70 else "🟢 Oversold" if rsi < 30 else "🟡 Neutral"
-                                    st.write(f"RSI: {rsi:.2f} ({rsi_signal})")
-                                    st.write(f"MACD: {indicators['momentum']['macd']:.2f}")
-                                    st.write(f"Signal: {indicators['momentum']['macd_signal']:.2f}")
-
-                                    macd_hist = indicators['momentum']['macd'] - indicators['momentum']['macd_signal']
-                                    macd_trend = "🟢 Bullish" if macd_hist > 0 else "🔴 Bearish"
-                                    st.write(f"Trend: {macd_trend}")
-
-                                with col3:
-                                    st.markdown("**📉 Bollinger Bands**")
-                                    st.write(f"Upper: Rs. {indicators['bollinger_bands']['upper']:.2f}")
-                                    st.write(f"Middle: Rs. {indicators['bollinger_bands']['middle']:.2f}")
-                                    st.write(f"Lower: Rs. {indicators['bollinger_bands']['lower']:.2f}")
-
-                                    # BB position
-                                    close = indicators['price']['close']
-                                    bb_upper = indicators['bollinger_bands']['upper']
-                                    bb_lower = indicators['bollinger_bands']['lower']
-
-                                    if close > bb_upper:
-                                        bb_pos = "🔴 Above Upper (Overbought)"
-                                    elif close < bb_lower:
-                                        bb_pos = "🟢 Below Lower (Oversold)"
-                                    else:
-                                        bb_pos = "🟡 Within Bands (Normal)"
-                                    st.write(f"Position: {bb_pos}")
-
-                                st.markdown("---")
-
-                            # Show AI analysis
-                            st.markdown("### 💡 AI Analysis & Recommendation")
-                            st.markdown(result['analysis'])
-                            st.markdown("---")
-                            st.warning("⚠️ **Disclaimer**: This is an AI-generated analysis for educational purposes only.")
-                        elif result:
-                            st.error(f"❌ Analysis failed: {result.get('error', 'Unknown error')}")
-                        else:
-                            st.error("❌ Failed to get analysis from API")
+                st.error("❌ Failed to get analysis from API")
+        elif overview['analysis']:
+            # Answered earlier for this strategy and data version; shown without a new LLM call
+            st.markdown("---")
+            show_indicators(overview['indicators'])
+            show_analysis(overview['analysis'])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from dataset import format_day, load_stock_data, to_float, to_int
+
+# -----------------------------
+# Static symbol manifest for the frontend
+# -----------------------------
+MANIFEST_FILE = Path(__file__).parent.parent / "static/manifest.json"
+
+# Latest-row columns, named as in the /stocks/{symbol} response so the page renders either one
+MANIFEST_FIELDS = {'close': 'close', 'diff %': 'diff_percent', 'vol': 'volume', 'RSI': 'rsi', 'MA20': 'ma20',
+                   'MA50': 'ma50', '52 weeks high': 'week_52_high'}
+
+
+def build_manifest(data_path):
+    """
+    Every symbol with its latest row, small enough to ship as a static file.
+
+    The page paints its stock list and metrics from this before the API
+    answers, and falls back to it when the API is down. `latest` is
+    column-oriented (one array per field, aligned with `symbols`), which is
+    about half the size of an object per symbol; a field whose column the
+    file lacks is all null. `version` hashes the processed file's contents.
+
+    Args:
+        data_path: Processed CSV from calculate_indicators
+
+    Returns:
+        JSON-ready dict
+    """
+    df = load_stock_data(data_path, columns=['symbol', 'tradedate', *MANIFEST_FIELDS])
+    codes = df['symbol'].array.codes
+    # Rows are sorted by symbol then date, so each symbol's latest row ends its run
+    latest = df.iloc[np.flatnonzero(np.r_[codes[1:] != codes[:-1], True])]
+    columns = {'date': [format_day(day) for day in latest['tradedate']]}
+    for column, field in MANIFEST_FIELDS.items():
+        if column not in latest.columns:
+            # Indicator the processed file wasn't built with (a subset of indicator_engine.INDICATORS)
+            columns[field] = [None] * len(latest)
+        elif column == 'vol':
+            columns[field] = [to_int(v) for v in latest[column]]
+        else:
+            columns[field] = [to_float(v, 2) for v in latest[column]]
+    digest = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {
+        "version": digest.hexdigest()[:12],
+        "date": max(columns['date'], default=None),
+        "symbols": latest['symbol'].astype(str).tolist(),
+        "latest": columns,
+    }
+
+
+def write_manifest(data_path, path=MANIFEST_FILE):
+    """Build the manifest for data_path and write it atomically to path."""
+    manifest = build_manifest(data_path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return manifest
+
+
+if __name__ == "__main__":
+    manifest = write_manifest(Path(__file__).parent.parent / "data/processed/stock_data_with_indicators.csv")
+    print(f"✅ Manifest with {len(manifest['symbols'])} symbols written to {MANIFEST_FILE}")
@@ -0,0 +1,412 @@
+import re
+
+# -----------------------------
+# Reference implementation
+# -----------------------------
+def format_output_regex(text):
+    """
+    The original six-regex post-processor, kept as the reference that
+    MarkdownFormatter must reproduce exactly. The first pattern backtracks
+    quadratically on long numbered text without colons.
+    """
+    text = re.sub(r'(\d+)\.\s+([^:]+):\s+([^0-9]+?)(?=\d+\.|\n##|\Z)',
+                  r'\1. **\2:**\n   \3\n\n', text)
+    text = re.sub(r'(##[^#\n]+)\n(?!\n)', r'\1\n\n', text)
+    text = re.sub(r'(###[^#\n]+)\n(?!\n)', r'\1\n\n', text)
+    text = re.sub(r'(?<!\n)\n(## [🎯📊💡⚠️🎯🧠])', r'\n\n\1', text)
+    text = re.sub(r'\*\*([^:]+):\*\*(?!\n)', r'**\1:**\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+# -----------------------------
+# Single-pass streaming formatter
+# -----------------------------
+# Tokenizer patterns: plain runs and single characters only, so they never backtrack
+_DIGIT = re.compile(r'\d')
+_CANDIDATE = re.compile(r'(?<!\d)\d+\.\s')
+_DIGITS = re.compile(r'\d*')
+_ASCII_DIGIT = re.compile(r'[0-9]')
+_SPACES = re.compile(r'\s*')
+_SECTION_ICONS = set('🎯📊💡⚠️🧠')
+
+
+class _NeedMore(Exception):
+    """A decision depends on text that has not been streamed in yet."""
+
+
+class _Scanner:
+    """
+    Forward searches over one buffer. Repeated searches for the same token are
+    answered from the previous hit, so a stage's scan stays linear even when
+    many candidates share one far-away colon. Searches that run into the end
+    of a non-final buffer raise _NeedMore.
+    """
+
+    def __init__(self, buf, final):
+        self.buf = buf
+        self.n = len(buf)
+        self.final = final
+        self._memo = {}
+
+    def need_more(self):
+        if not self.final:
+            raise _NeedMore
+
+    def find(self, token, start, hard_end=True):
+        """First index >= start of token (str) or pattern (compiled), or -1."""
+        hit = self._memo.get(token)
+        if hit is not None and hit[0] <= start and (hit[1] == -1 or start <= hit[1]):
+            found = hit[1]
+        else:
+            if isinstance(token, str):
+                found = self.buf.find(token, start)
+            else:
+                match = token.search(self.buf, start)
+                found = match.start() if match else -1
+            self._memo[token] = (start, found)
+        if found == -1 and hard_end:
+            self.need_more()
+        return found
+
+    def run_end(self, pattern, start):
+        """End of the run of pattern (a `x*` regex) starting at start."""
+        end = pattern.match(self.buf, start).end()
+        if end == self.n:
+            self.need_more()
+        return end
+
+
+class _Stage:
+    """Incremental transducer: holds back only the text a future chunk could change."""
+
+    def __init__(self):
+        self.buf = ""
+
+    def feed(self, text, final=False):
+        self.buf += text
+        out, consumed = self.process(self.buf, final)
+        self.buf = self.buf[consumed:]
+        return out
+
+    def process(self, buf, final):
+        raise NotImplementedError
+
+
+class _NumberedItems(_Stage):
+    """
+    `(\\d+)\\.\\s+([^:]+):\\s+([^0-9]+?)(?=\\d+\\.|\\n##|\\Z)` -> `\\1. **\\2:**\\n   \\3\\n\\n`
+
+    The title can't contain a colon, so every candidate between two colons
+    shares the same title end, body and outcome. The scan walks the colons,
+    tries only the candidates before each colon that is followed by
+    whitespace, and decides each body once. The lazy body ends at the first
+    lookahead hit before the next ASCII digit, exactly where the regex engine
+    would stop.
+    """
+
+    def process(self, buf, final):
+        scan = _Scanner(buf, final)
+        bodies = {}
+        n = len(buf)
+        out = []
+        pos = 0
+        prev = -1
+        c = buf.find(':')
+        while c != -1:
+            if c + 1 == n and not final:
+                break
+            if c + 1 < n and buf[c + 1].isspace():
+                p = self._candidate(buf, pos, max(pos, prev + 1), c)
+                while p != -1:
+                    try:
+                        result = self._attempt(scan, bodies, p, c)
+                    except _NeedMore:
+                        out.append(buf[pos:p])
+                        return "".join(out), p
+                    if result is not None:
+                        end, replacement = result
+                        out.append(buf[pos:p])
+                        out.append(replacement)
+                        pos = end
+                        break
+                    # Every start inside this digit run shares the same continuation
+                    p = self._candidate(buf, pos, _DIGITS.match(buf, p).end(), c)
+            prev = c
+            c = buf.find(':', max(c + 1, pos))
+
+        if final:
+            out.append(buf[pos:])
+            return "".join(out), n
+        # Candidates after the last colon wait for a colon (or the end of the text)
+        keep = self._candidate(buf, pos, max(pos, prev + 1), n)
+        if keep == -1:
+            keep = self._partial_candidate(buf, max(pos, prev + 1))
+        out.append(buf[pos:keep])
+        return "".join(out), keep
+
+    @staticmethod
+    def _candidate(buf, pos, start, end):
+        """
+        First `\\d+\\.\\s` start in [start, end). A run right after the previous
+        match (at pos) may begin mid-run; elsewhere only run starts count.
+        """
+        if start == pos and start < end and buf[start].isdecimal():
+            return start
+        match = _CANDIDATE.search(buf, start, end)
+        return match.start() if match else -1
+
+    @staticmethod
+    def _partial_candidate(buf, start):
+        """Start of a trailing `\\d+` or `\\d+.` that more text could complete."""
+        end = len(buf) - 1 if buf.endswith('.') else len(buf)
+        run = end
+        while run > start and buf[run - 1].isdecimal():
+            run -= 1
+        return run if run < end else len(buf)
+
+    def _lookahead(self, scan, e):
+        """(?=\\d+\\.|\\n##|\\Z) at e."""
+        buf, n = scan.buf, scan.n
+        if e == n:
+            scan.need_more()
+            return True
+        if buf[e] == '\n':
+            tail = buf[e:e + 3]
+            if len(tail) < 3 and '\n##'.startswith(tail):
+                scan.need_more()
+            return tail == '\n##'
+        if buf[e].isdecimal():
+            end = scan.run_end(_DIGITS, e)
+            return end < n and buf[end] == '.'
+        return False
+
+    def _body_end(self, scan, s):
+        """End of the lazy `[^0-9]+?` body starting at s, or None."""
+        buf, n = scan.buf, scan.n
+        stop = scan.find(_ASCII_DIGIT, s, hard_end=False)
+        if stop == -1:
+            stop = n
+        heading = scan.find('\n##', s + 1, hard_end=False)
+        if heading == -1 or heading > stop:
+            heading = None
+        # Between s and stop only a heading, a \\d run or the end can satisfy the lookahead
+        e = s + 1
+        while True:
+            digit = scan.find(_DIGIT, e, hard_end=False) if e <= stop else -1
+            if digit == -1 or digit > stop:
+                digit = None
+            if heading is not None and (digit is None or heading < digit):
+                return heading
+            if digit is None:
+                return n if stop == n and self._lookahead(scan, n) else None
+            if self._lookahead(scan, digit):
+                return digit
+            if digit == stop:
+                return None
+            e = _DIGITS.match(buf, digit).end()
+
+    def _attempt(self, scan, bodies, p, c):
+        """Match at p, whose title ends at the colon c; (end, replacement) or None."""
+        buf, n = scan.buf, scan.n
+        q = _DIGITS.match(buf, p).end()
+        if buf[q] != '.':
+            return None
+        w = _SPACES.match(buf, q + 1).end()
+        if w == q + 1:
+            return None
+        if w == c:
+            # [^:]+ needs a character: \\s+ gives one back if it can
+            if w - (q + 1) < 2:
+                return None
+            title_start = w - 1
+        else:
+            title_start = w
+        v = scan.run_end(_SPACES, c + 1)
+        if v == c + 1:
+            return None
+
+        body_start = end = None
+        if v < n and not ('0' <= buf[v] <= '9'):
+            if v not in bodies:
+                bodies[v] = self._body_end(scan, v)
+            end = bodies[v]
+            body_start = v
+        if end is None:
+            # Backtrack \\s+: the body becomes a single whitespace character
+            if v >= c + 3 and self._lookahead(scan, v):
+                body_start, end = v - 1, v
+            elif v >= c + 4 and buf[v - 1] == '\n' and buf.startswith('##', v):
+                body_start, end = v - 2, v - 1
+            else:
+                return None
+        replacement = f"{buf[p:q]}. **{buf[title_start:c]}:**\n   {buf[body_start:end]}\n\n"
+        return end, replacement
+
+
+class _Headings(_Stage):
+    """
+    `(##[^#\\n]+)\\n(?!\\n)` and `(###[^#\\n]+)\\n(?!\\n)` add a blank line after a
+    heading; `(?<!\\n)\\n(## [🎯📊💡⚠️🎯🧠])` adds one before an icon section.
+    The ### rule can never fire after the ## rule, so one line check covers both.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.at_start = True
+
+    @staticmethod
+    def _is_heading(buf, start, end):
+        """`##[^#\\n]+` ends the line buf[start:end]."""
+        h = buf.rfind('#', start, end)
+        return h > start and buf[h - 1] == '#' and h + 1 < end
+
+    def process(self, buf, final):
+        n = len(buf)
+        # A line is settled once its newline has the four characters of lookahead the icon rule needs
+        end = n if final else buf.rfind('\n', 0, max(0, n - 4)) + 1
+        doubled = set()
+
+        # Blank line after headings (only lines containing '##' can qualify)
+        j = buf.find('##', 0, end)
+        while j != -1:
+            i = buf.find('\n', j, end)
+            if i == -1:
+                break
+            if self._is_heading(buf, buf.rfind('\n', 0, j) + 1, i) and buf[i + 1:i + 2] != '\n':
+                doubled.add(i)
+            j = buf.find('##', i + 1, end)
+
+        # Blank line before icon sections that don't already follow a blank line
+        i = buf.find('\n## ', 0, min(n, end + 3))
+        while i != -1:
+            before = buf[i - 1] if i > 0 else ('' if self.at_start else '\n')
+            if (i + 4 < n and buf[i + 4] in _SECTION_ICONS and before != '\n'
+                    and not self._is_heading(buf, buf.rfind('\n', 0, i) + 1, i)):
+                doubled.add(i)
+            i = buf.find('\n## ', i + 1, min(n, end + 3))
+
+        out = []
+        prev = 0
+        for i in sorted(doubled):
+            out.append(buf[prev:i + 1])
+            out.append('\n')
+            prev = i + 1
+        out.append(buf[prev:end])
+        if end > 0:
+            self.at_start = False
+        return "".join(out), end
+
+
+class _BoldLabels(_Stage):
+    """`\\*\\*([^:]+):\\*\\*(?!\\n)` -> `**\\1:**\\n`"""
+
+    def process(self, buf, final):
+        scan = _Scanner(buf, final)
+        n = len(buf)
+        out = []
+        pos = p = 0
+        while True:
+            p = buf.find('**', p)
+            if p == -1:
+                # A trailing '*' may still become the start of '**'
+                keep = n - 1 if not final and buf.endswith('*') else n
+                keep = max(keep, pos)
+                out.append(buf[pos:keep])
+                return "".join(out), keep
+            try:
+                end = self._attempt(scan, p)
+            except _NeedMore:
+                out.append(buf[pos:p])
+                return "".join(out), p
+            if end is None:
+                p += 1
+                continue
+            out.append(buf[pos:end])
+            out.append('\n')
+            pos = p = end
+
+    def _attempt(self, scan, p):
+        buf, n = scan.buf, scan.n
+        if p + 2 >= n:
+            scan.need_more()
+            return None
+        if buf[p + 2] == ':':
+            return None
+        c = scan.find(':', p + 2)
+        if c == -1:
+            return None
+        closing = buf[c + 1:c + 3]
+        if closing != '**':
+            if len(closing) < 2 and '**'.startswith(closing):
+                scan.need_more()
+            return None
+        if c + 3 == n:
+            scan.need_more()
+            return c + 3
+        return None if buf[c + 3] == '\n' else c + 3
+
+
+class _Whitespace(_Stage):
+    """`\\n{3,}` -> `\\n\\n`, then strip()."""
+
+    _blank_lines = re.compile(r'\n{3,}')
+
+    def __init__(self):
+        super().__init__()
+        self.started = False
+
+    def process(self, buf, final):
+        if not self.started:
+            stripped = buf.lstrip()
+            if not stripped:
+                return "", len(buf)
+            self.started = True
+            skipped = len(buf) - len(stripped)
+            out, consumed = self.process(stripped, final)
+            return out, skipped + consumed
+        # Trailing whitespace is held back until something follows it (or dropped at the end)
+        body = buf.rstrip()
+        return self._blank_lines.sub('\n\n', body), len(buf) if final else len(body)
+
+
+class MarkdownFormatter:
+    """
+    Incremental version of format_output_regex.
+
+    Text can be fed in arbitrary streamed chunks; each call returns the part of
+    the formatted output that is already final, and close() returns the rest.
+    The concatenated output is identical to format_output_regex(full_text), and
+    every stage runs in linear time.
+    """
+
+    def __init__(self):
+        self.stages = [_NumberedItems(), _Headings(), _BoldLabels(), _Whitespace()]
+
+    def _run(self, text, final):
+        for stage in self.stages:
+            text = stage.feed(text, final)
+        return text
+
+    def feed(self, chunk):
+        return self._run(chunk, final=False)
+
+    def close(self):
+        return self._run("", final=True)
+
+
+def format_markdown(text):
+    """Format a complete LLM response in one pass."""
+    return MarkdownFormatter()._run(text, final=True)
+
+
+def format_stream(chunks):
+    """Yield formatted output as streamed chunks arrive."""
+    formatter = MarkdownFormatter()
+    for chunk in chunks:
+        out = formatter.feed(chunk)
+        if out:
+            yield out
+    out = formatter.close()
+    if out:
+        yield out
@@ -0,0 +1,158 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# -----------------------------
+# Prometheus metrics
+# -----------------------------
+# Buckets span cheap cached lookups (ms) up to slow LLM round trips (tens of seconds)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "nepse_http_request_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+RAG_STAGE_SECONDS = Histogram(
+    "nepse_rag_stage_seconds", "Time spent in each stage of the RAG pipeline",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+DATA_LOAD_SECONDS = Histogram(
+    "nepse_data_load_seconds", "Time spent loading datasets and indexes",
+    ["dataset"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "nepse_llm_tokens_total", "LLM tokens consumed", ["kind"],
+)
+LLM_ERRORS = Counter(
+    "nepse_llm_errors_total", "Failed LLM calls", ["reason"],
+)
+LLM_BACKEND_SECONDS = Histogram(
+    "nepse_llm_backend_seconds", "LLM call latency by backend and outcome",
+    ["backend", "outcome"], buckets=LATENCY_BUCKETS,
+)
+LLM_FAILOVERS = Counter(
+    "nepse_llm_failovers_total", "Requests sent to a secondary LLM backend", ["reason"],
+)
+CACHE_LOOKUPS = Counter(
+    "nepse_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"],
+)
+JOB_EVENTS = Counter(
+    "nepse_jobs_total", "Background jobs queued and finished, by kind and status", ["kind", "status"],
+)
+JOB_RUN_SECONDS = Histogram(
+    "nepse_job_run_seconds", "Background job run time by kind and status",
+    ["kind", "status"], buckets=LATENCY_BUCKETS,
+)
+ALERT_EVALUATION_SECONDS = Histogram(
+    "nepse_alert_evaluation_seconds", "Time to evaluate all alert rules on a data update", buckets=LATENCY_BUCKETS,
+)
+ALERTS_FIRED = Counter(
+    "nepse_alerts_fired_total", "Alerts fired by rule crossings",
+)
+ADMISSION_REJECTIONS = Counter(
+    "nepse_admission_rejections_total", "Requests turned away with 429 by route and reason", ["route", "reason"],
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "nepse_admission_queue_seconds", "Time admitted requests waited for a slot", ["route"], buckets=LATENCY_BUCKETS,
+)
+
+# Timed stages of the request being captured (profiling.py); None outside a capture. asyncio.to_thread copies the
+# context, so stages run in worker threads are collected too.
+request_stages: ContextVar = ContextVar("request_stages", default=None)
+
+# -----------------------------
+# Optional OpenTelemetry tracing
+# -----------------------------
+tracer = None
+if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({"service.name": "nepse-trading-bot"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+        tracer = trace.get_tracer("nepse-trading-bot")
+        print(f"✅ Exporting traces to {os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')}")
+    except ImportError:
+        print("⚠️  OTEL_EXPORTER_OTLP_ENDPOINT set but opentelemetry is not installed; tracing disabled")
+
+
+def span(name):
+    """Start an OpenTelemetry span, or do nothing when tracing is disabled."""
+    return tracer.start_as_current_span(name) if tracer is not None else nullcontext()
+
+
+@contextmanager
+def _timed(histogram, label, span_name):
+    start = time.perf_counter()
+    try:
+        with span(span_name):
+            yield
+    finally:
+        seconds = time.perf_counter() - start
+        histogram.labels(label).observe(seconds)
+        stages = request_stages.get()
+        if stages is not None:
+            stages.append((span_name, seconds))
+
+
+def stage(name):
+    """Time one RAG pipeline stage (embed, search, prompt, llm, format, serialize)."""
+    return _timed(RAG_STAGE_SECONDS, name, f"rag.{name}")
+
+
+def data_load(name):
+    """Time a dataset or index load."""
+    return _timed(DATA_LOAD_SECONDS, name, f"load.{name}")
+
+
+def record_llm_usage(message):
+    """Count input/output tokens from a chat model response's usage metadata."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(kind.removesuffix("_tokens")).inc(usage[kind])
+
+
+def record_llm_error(error):
+    """Count a failed LLM call, separating provider rate limits from other errors."""
+    text = f"{type(error).__name__} {error}"
+    rate_limited = "429" in text or "ResourceExhausted" in text or "rate limit" in text.lower()
+    LLM_ERRORS.labels("rate_limited" if rate_limited else "error").inc()
+
+
+def record_llm_backend(backend, seconds, ok):
+    LLM_BACKEND_SECONDS.labels(backend, "ok" if ok else "error").observe(seconds)
+
+
+def record_llm_failover(reason):
+    """Count a request routed to a secondary backend (hedge, error, timeout or degraded)."""
+    LLM_FAILOVERS.labels(reason).inc()
+
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_job(kind, status, seconds=None):
+    """Count a job event (queued, succeeded, retry, dead, lease_lost) and time the runs."""
+    JOB_EVENTS.labels(kind, status).inc()
+    if seconds is not None:
+        JOB_RUN_SECONDS.labels(kind, status).observe(seconds)
+
+
+def record_alerts(seconds, fired):
+    ALERT_EVALUATION_SECONDS.observe(seconds)
+    ALERTS_FIRED.inc(fired)
+
+
+def render_latest():
+    """Current metrics in the Prometheus text exposition format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,205 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+from dataset import format_day, to_float
+from indicator_engine import Segments
+
+# -----------------------------
+# Pattern windows
+# -----------------------------
+WINDOWS = (10, 20)
+HORIZONS = (5, 10, 20)
+
+# Distance weights. Close and log volume are z-normalized within each window,
+# so only their shape counts; RSI is already bounded and keeps its level.
+CLOSE_WEIGHT = 1.0
+VOLUME_WEIGHT = 0.5
+RSI_WEIGHT = 0.5
+
+
+def _znorm(view):
+    mean = view.mean(axis=-1, keepdims=True)
+    std = view.std(axis=-1, keepdims=True)
+    # A flat window (e.g. no trades) becomes all zeros instead of NaN
+    return (view - mean) / np.where(std > 0, std, 1.0)
+
+
+def window_vectors(close, log_volume, rsi, window):
+    """
+    Pattern vectors for every complete window along the last axis.
+
+    Args:
+        close, log_volume, rsi: (symbols, days) matrices
+        window: Window length in days
+
+    Returns:
+        float32 array (symbols, days - window + 1, 3 * window); windows
+        touching a NaN have NaN entries
+    """
+    if close.shape[-1] < window:
+        return np.empty(close.shape[:-1] + (0, 3 * window), dtype=np.float32)
+    views = [np.lib.stride_tricks.sliding_window_view(x, window, axis=-1) for x in (close, log_volume, rsi)]
+    with np.errstate(invalid="ignore"):
+        parts = [_znorm(views[0]) * CLOSE_WEIGHT, _znorm(views[1]) * VOLUME_WEIGHT,
+                 (views[2] - 50.0) / 50.0 * RSI_WEIGHT]
+    return np.concatenate(parts, axis=-1).astype(np.float32)
+
+
+class PatternIndex:
+    """
+    Exact nearest-neighbour search over normalized windows of every symbol and date.
+
+    For each window length there is one FAISS flat L2 index holding the
+    windows whose shortest forward return is known, i.e. historical analogues
+    with an outcome, and the day each one's longest forward return settles
+    on (its symbol's last day when the data ends sooner). Vectors are built over symbol partitions in a thread
+    pool (the numpy work releases the GIL).
+    """
+
+    def __init__(self, df, version=None, windows=WINDOWS, horizons=HORIZONS, workers=None):
+        """
+        Args:
+            df: Frame from dataset.load_stock_data (sorted by symbol then date)
+            version: Data version the index was built from
+            windows: Window lengths to index
+            horizons: Forward-return horizons in trading days
+            workers: Threads for building vectors (default: one per CPU)
+        """
+        self.version = version
+        self.horizons = tuple(horizons)
+        segments = Segments(df['symbol'].to_numpy())
+        self.symbols = list(dict.fromkeys(df['symbol'].astype(str)))
+        self.position = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.days = segments.to_2d(df['tradedate'].to_numpy(dtype=np.float64))
+        self.close = segments.to_2d(df['close'].to_numpy(dtype=np.float64))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.log_volume = np.log1p(segments.to_2d(df['vol'].to_numpy(dtype=np.float64)))
+        self.rsi = segments.to_2d(df['RSI'].to_numpy(dtype=np.float64))
+        self.lengths = np.bincount(segments.row, minlength=len(self.symbols))
+
+        # Forward returns in percent, aligned with the day a window ends on
+        self.forward = np.full((len(self.horizons),) + self.close.shape, np.nan, dtype=np.float32)
+        for i, h in enumerate(self.horizons):
+            if h < self.close.shape[1]:
+                self.forward[i, :, :-h] = (self.close[:, h:] / self.close[:, :-h] - 1) * 100
+
+        workers = workers or os.cpu_count() or 1
+        bounds = np.linspace(0, len(self.symbols), min(len(self.symbols), workers * 4) + 1).astype(int)
+        self.indexes, self.rows, self.ends, self.settled = {}, {}, {}, {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for window in windows:
+                parts = list(pool.map(lambda b: self._partition(window, b[0], b[1]), zip(bounds, bounds[1:])))
+                vectors = np.concatenate([p[0] for p in parts]) if parts else np.empty((0, 3 * window), np.float32)
+                index = faiss.IndexFlatL2(3 * window)
+                index.add(vectors)
+                self.indexes[window] = index
+                self.rows[window] = np.concatenate([p[1] for p in parts]) if parts else np.empty(0, np.int32)
+                self.ends[window] = np.concatenate([p[2] for p in parts]) if parts else np.empty(0, np.int32)
+                rows, ends = self.rows[window], self.ends[window]
+                last = np.minimum(ends + max(self.horizons, default=0), self.lengths[rows] - 1)
+                self.settled[window] = self.days[rows, last]
+
+    def _partition(self, window, lo, hi):
+        """Indexable vectors of symbols lo..hi with their (symbol, end day) positions."""
+        vectors = window_vectors(self.close[lo:hi], self.log_volume[lo:hi], self.rsi[lo:hi], window)
+        known = np.isfinite(vectors).all(axis=-1) & np.isfinite(self.forward[0, lo:hi, window - 1:])
+        rows, starts = np.nonzero(known)
+        return vectors[rows, starts], (rows + lo).astype(np.int32), (starts + window - 1).astype(np.int32)
+
+    def windows(self):
+        return {window: index.ntotal for window, index in self.indexes.items()}
+
+    def search(self, symbol, window=20, k=10, end_day=None):
+        """
+        Top-k historical analogues of a symbol's window.
+
+        The query symbol's own overlapping windows are excluded, and so are
+        further matches within one window length of an analogue already
+        taken for the same symbol (neighbouring days look alike). With
+        end_day, only analogues whose longest forward return had settled by
+        that day are searched, whatever their symbol, so a past query sees
+        no outcome from its future.
+
+        Args:
+            symbol: Query symbol
+            window: Window length (one of the indexed ones)
+            k: Number of analogues
+            end_day: Day number the query window ends on (default: the symbol's latest day)
+
+        Returns:
+            (query (symbol row, end column), [(symbol row, end column, squared distance)])
+        """
+        if window not in self.indexes:
+            raise ValueError(f"Window must be one of {sorted(self.indexes)}")
+        s = self.position.get(symbol)
+        if s is None:
+            raise KeyError(symbol)
+        if end_day is None:
+            t = int(self.lengths[s]) - 1
+        else:
+            matches = np.flatnonzero(self.days[s] == end_day)
+            if not len(matches):
+                raise KeyError(f"{symbol} has no data on {format_day(end_day)}")
+            t = int(matches[0])
+        if t + 1 < window:
+            raise LookupError(f"{symbol} has fewer than {window} days of history")
+        lo = t - window + 1
+        query = window_vectors(self.close[s:s + 1, lo:t + 1], self.log_volume[s:s + 1, lo:t + 1],
+                               self.rsi[s:s + 1, lo:t + 1], window).reshape(1, -1)
+        if not np.isfinite(query).all():
+            raise LookupError(f"{symbol}'s window ending {format_day(self.days[s, t])} has missing values")
+
+        index = self.indexes[window]
+        params, total = None, index.ntotal
+        if end_day is not None:
+            allowed = self.settled[window] <= end_day
+            total, bitmap = int(allowed.sum()), np.packbits(allowed, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(allowed), faiss.swig_ptr(bitmap))
+            params = faiss.SearchParameters(sel=selector)
+        if total == 0:
+            return (s, t), []
+        fetch = min(total, k * 8 + 2 * window)
+        while True:
+            distances, ids = index.search(query, fetch, params=params)
+            found, taken = [], {}
+            for distance, i in zip(distances[0], ids[0]):
+                if i < 0:
+                    break
+                row, end = int(self.rows[window][i]), int(self.ends[window][i])
+                if row == s and abs(end - t) < window:
+                    continue
+                if any(abs(end - other) < window for other in taken.get(row, ())):
+                    continue
+                taken.setdefault(row, []).append(end)
+                found.append((row, end, float(distance)))
+                if len(found) == k:
+                    break
+            if len(found) == k or fetch >= total:
+                return (s, t), found
+            fetch = min(total, fetch * 4)
+
+    def describe(self, query, analogues, window):
+        """JSON-ready analogues with forward returns, and the outlook they imply."""
+        def span(row, end):
+            return {"start_date": format_day(self.days[row, end - window + 1]), "end_date": format_day(self.days[row, end])}
+
+        labels = [f"{h}d" for h in self.horizons]
+        items = []
+        for row, end, distance in analogues:
+            returns = self.forward[:, row, end]
+            items.append({"symbol": self.symbols[row], **span(row, end), "distance": round(float(np.sqrt(distance)), 4),
+                          "forward_returns_percent": {label: to_float(r, 2) for label, r in zip(labels, returns)}})
+        outlook = {}
+        for i, label in enumerate(labels):
+            values = np.array([self.forward[i, row, end] for row, end, _ in analogues], dtype=np.float64)
+            values = values[np.isfinite(values)]
+            outlook[label] = {
+                "count": int(len(values)),
+                "mean_percent": round(float(values.mean()), 2) if len(values) else None,
+                "median_percent": round(float(np.median(values)), 2) if len(values) else None,
+                "positive_percent": round(float((values > 0).mean() * 100), 1) if len(values) else None,
+            }
+        return {"query": span(*query), "analogues": items, "outlook": outlook}
@@ -0,0 +1,329 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+# Stage modules (pandas, langchain, FAISS) are imported inside the stages, so a
+# run where nothing changed only hashes and stats files.
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIR = Path(__file__).resolve().parent
+
+RAW_FILE = ROOT / "data/stock_data_ready.csv"
+PROCESSED_FILE = ROOT / "data/processed/stock_data_with_indicators.csv"
+CHUNKS_FILE = ROOT / "data/processed/chunks.jsonl"
+VECTOR_STORE = ROOT / "vectorstore/faiss_index"
+MANIFEST_FILE = ROOT / "static/manifest.json"
+STATE_FILE = ROOT / "data/pipeline_state.json"
+
+EMBEDDINGS = ("minilm", "fake")
+
+
+# -----------------------------
+# Content hashing
+# -----------------------------
+class Hasher:
+    """
+    sha256 of files and directory trees.
+
+    Digests are memoized by (size, mtime_ns), so a file that hasn't been
+    touched is only stat'ed, not re-read.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = {} if memo is None else memo  # path -> [size, mtime_ns, digest]
+
+    def file(self, path):
+        stat = os.stat(path)
+        entry = self.memo.get(str(path))
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.memo[str(path)] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def digest(self, path):
+        """Digest of a file or directory tree, or None if it doesn't exist."""
+        path = Path(path)
+        if path.is_file():
+            return self.file(path)
+        if path.is_dir():
+            combined = hashlib.sha256()
+            for file in sorted(p for p in path.rglob("*") if p.is_file()):
+                combined.update(f"{file.relative_to(path).as_posix()}\0{self.file(file)}\n".encode())
+            return combined.hexdigest()
+        return None
+
+
+# -----------------------------
+# DAG
+# -----------------------------
+class Stage:
+    """
+    One pipeline step: run(pipeline) reads `inputs` and writes `outputs`.
+
+    The stage's key hashes its input contents, the source of the modules it
+    runs (`code`, relative to app/) and its params; the stage is skipped
+    while the key and its outputs are unchanged.
+    """
+
+    def __init__(self, name, run, inputs, outputs, code=(), params=None):
+        self.name = name
+        self.run = run
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.code = list(code)
+        self.params = params or {}
+
+    def key(self, hasher):
+        inputs = {}
+        for path in self.inputs:
+            inputs[str(path)] = hasher.digest(path)
+            if inputs[str(path)] is None:
+                raise FileNotFoundError(f"{self.name}: input {path} not found")
+        code = {name: hasher.file(APP_DIR / name) for name in self.code}
+        blob = json.dumps({"inputs": inputs, "code": code, "params": self.params}, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, skipping those whose key and outputs are unchanged.
+
+    A stage that ran in this process leaves its result in `memory` (keyed by
+    output path), so the next stage doesn't parse the file it just wrote.
+    Because keys hash input contents, a stage that reruns but writes identical
+    output doesn't rerun the stages after it.
+    """
+
+    def __init__(self, stages, state_path=STATE_FILE, workers=None):
+        self.stages = self.order(stages)
+        self.state_path = Path(state_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.memory = {}
+
+    @staticmethod
+    def order(stages):
+        """Topological order: a stage comes after the stages producing its inputs."""
+        producers = {str(path): stage.name for stage in stages for path in stage.outputs}
+        by_name = {stage.name: stage for stage in stages}
+        ordered, visiting = [], set()
+
+        def visit(stage):
+            if stage in ordered:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"Pipeline has a cycle through {stage.name}")
+            visiting.add(stage.name)
+            for path in stage.inputs:
+                if str(path) in producers:
+                    visit(by_name[producers[str(path)]])
+            visiting.discard(stage.name)
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
+
+    def value(self, path, read):
+        """The in-memory result for path from this run, else read(path)."""
+        path = str(path)
+        return self.memory[path] if path in self.memory else read(path)
+
+    def _load_state(self):
+        if self.state_path.exists():
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {"files": {}, "stages": {}}
+
+    def _save_state(self, state):
+        os.makedirs(self.state_path.parent, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def run(self, force=()):
+        """
+        Run the stages that are out of date.
+
+        Args:
+            force: Stage names to rerun regardless ("all" for every stage)
+
+        Returns:
+            {stage: {"status": "ran" | "skipped", "seconds": float}}
+        """
+        state = self._load_state()
+        hasher = Hasher(state["files"])
+        report = {}
+        for stage in self.stages:
+            start = time.perf_counter()
+            key = stage.key(hasher)
+            previous = state["stages"].get(stage.name, {})
+            outputs = {str(path): hasher.digest(path) for path in stage.outputs}
+            fresh = (stage.name not in force and "all" not in force and previous.get("key") == key
+                     and None not in outputs.values() and outputs == previous.get("outputs"))
+            if not fresh:
+                print(f"▶️  {stage.name}...")
+                stage.run(self)
+                outputs = {str(path): hasher.digest(path) for path in stage.outputs}
+                state["stages"][stage.name] = {"key": key, "outputs": outputs, "finished_at": time.time()}
+                self._save_state(state)
+            seconds = time.perf_counter() - start
+            report[stage.name] = {"status": "skipped" if fresh else "ran", "seconds": round(seconds, 3)}
+            print(f"{'⏭️ ' if fresh else '✅'} {stage.name:<12} {report[stage.name]['status']:<8} {seconds:8.3f}s")
+        # Keeps the file memo in step when nothing ran (e.g. a touched but identical input)
+        self._save_state(state)
+        return report
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+def chunk_partitions(df, last_n_days=60, workers=1):
+    """
+    rag_data_loader chunks for every symbol, built over symbol partitions in a process pool.
+
+    Partitions are contiguous runs of symbols, so the documents come out in
+    the same order as a single stock_to_text_chunks pass.
+    """
+    import numpy as np
+    from rag_data_loader import frame_to_text_chunks
+
+    df = df.sort_values(by=['symbol', 'tradedate'])
+    starts = np.flatnonzero(df['symbol'].ne(df['symbol'].shift()).to_numpy())
+    if workers <= 1 or len(starts) < 2:
+        return frame_to_text_chunks(df, last_n_days)
+    cuts = [int(group[0]) for group in np.array_split(starts, min(workers * 4, len(starts)))] + [len(df)]
+    parts = [df.iloc[a:b] for a, b in zip(cuts, cuts[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [doc for docs in pool.map(frame_to_text_chunks, parts, repeat(last_n_days)) for doc in docs]
+
+
+def write_chunks(docs, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}) + "\n")
+    os.replace(tmp_path, path)
+
+
+def read_chunks(path):
+    from langchain_core.documents import Document
+    with open(path, encoding="utf-8") as f:
+        return [Document(**json.loads(line)) for line in f if line.strip()]
+
+
+def load_embeddings(name):
+    """Embedding model for the index stage; "fake" is deterministic and needs no download."""
+    if name == "fake":
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=384)
+    return None  # build_vector_store's default MiniLM
+
+
+def build_pipeline(raw=RAW_FILE, processed=PROCESSED_FILE, chunks=CHUNKS_FILE, vector_store=VECTOR_STORE,
+                   manifest=MANIFEST_FILE, rsi_method="wilder", last_n_days=60, embeddings="minilm",
+                   state_path=STATE_FILE, workers=None):
+    """
+    The indicators -> chunks -> index pipeline, plus weekly/monthly bars and the frontend's manifest from the
+    processed data. The indicators stage validates the raw rows first and quarantines the bad ones.
+
+    Args:
+        raw: Raw price CSV
+        processed: Processed CSV with indicators (what the API serves)
+        chunks: JSONL of text chunks
+        vector_store: FAISS index directory (the BM25 index is saved inside it)
+        manifest: Static JSON of symbols and latest rows for the frontend
+        rsi_method: RSI smoothing, 'wilder' or 'sma'
+        last_n_days: Days per symbol in the chunks
+        embeddings: "minilm" or "fake"
+        state_path: Where stage keys and file digests are kept
+        workers: Processes for per-symbol work (default: one per CPU)
+
+    Returns:
+        Pipeline
+    """
+    # data_quality.validation_paths: the quarantined raw rows and the validation report
+    processed = Path(processed)
+    quarantine, validation = (processed.with_name(f"{processed.stem}_quarantine.csv"),
+                              processed.with_name(f"{processed.stem}_validation.json"))
+
+    def indicators(pipeline):
+        from calculate_indicators import calculate_indicators
+        pipeline.memory[str(processed)] = calculate_indicators(str(raw), str(processed), rsi_method=rsi_method)
+
+    def chunk(pipeline):
+        import pandas as pd
+        # Parsed as stock_to_text_chunks does, so the chunks don't depend on whether the frame was in memory
+        df = pipeline.value(processed, lambda path: pd.read_csv(path, float_precision='round_trip'))
+        docs = chunk_partitions(df, last_n_days, pipeline.workers)
+        write_chunks(docs, chunks)
+        pipeline.memory[str(chunks)] = docs
+
+    def index(pipeline):
+        from build_vector_store import build_vector_store
+        build_vector_store(vector_store_path=str(vector_store), embeddings=load_embeddings(embeddings),
+                           docs=pipeline.value(chunks, read_chunks))
+
+    # timeframes.timeframe_path, spelled out so a run that skips every stage doesn't import pandas
+    bar_files = {timeframe: processed.with_name(f"{processed.stem}_{timeframe}{processed.suffix}")
+                 for timeframe in ("weekly", "monthly")}
+
+    def bars(pipeline):
+        import pandas as pd
+        from timeframes import calculate_timeframes
+        df = pipeline.value(processed, pd.read_csv)
+        frames = calculate_timeframes(df, processed, timeframes=list(bar_files), rsi_method=rsi_method)
+        for timeframe, frame in frames.items():
+            pipeline.memory[str(bar_files[timeframe])] = frame
+
+    def static_manifest(pipeline):
+        from manifest import write_manifest
+        write_manifest(str(processed), str(manifest))
+
+    stages = [
+        Stage("indicators", indicators, inputs=[raw], outputs=[processed, quarantine, validation],
+              code=["calculate_indicators.py", "data_quality.py", "indicator_engine.py", "sectors.py"],
+              params={"rsi_method": rsi_method}),
+        Stage("chunks", chunk, inputs=[processed], outputs=[chunks],
+              code=["rag_data_loader.py"], params={"last_n_days": last_n_days}),
+        Stage("index", index, inputs=[chunks], outputs=[vector_store],
+              code=["build_vector_store.py", "hybrid_retriever.py"], params={"embeddings": embeddings}),
+        Stage("timeframes", bars, inputs=[processed], outputs=list(bar_files.values()),
+              code=["timeframes.py", "indicator_engine.py"], params={"rsi_method": rsi_method}),
+        Stage("manifest", static_manifest, inputs=[processed], outputs=[manifest], code=["manifest.py", "dataset.py"]),
+    ]
+    return Pipeline(stages, state_path=state_path, workers=workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the data pipeline (indicators -> chunks -> index, weekly/monthly "
+                                                 "bars and the frontend manifest), skipping stages whose inputs "
+                                                 "haven't changed")
+    parser.add_argument("--raw", default=RAW_FILE, type=Path)
+    parser.add_argument("--processed", default=PROCESSED_FILE, type=Path)
+    parser.add_argument("--chunks", default=CHUNKS_FILE, type=Path)
+    parser.add_argument("--vector-store", default=VECTOR_STORE, type=Path)
+    parser.add_argument("--manifest", default=MANIFEST_FILE, type=Path)
+    parser.add_argument("--state", default=STATE_FILE, type=Path, help="Stage keys and file digests")
+    parser.add_argument("--rsi-method", choices=["wilder", "sma"], default="wilder")
+    parser.add_argument("--last-n-days", type=int, default=60)
+    parser.add_argument("--embeddings", choices=EMBEDDINGS, default="minilm")
+    parser.add_argument("--workers", type=int, help="Processes for per-symbol work (default: one per CPU)")
+    parser.add_argument("--force", nargs="+", default=(), choices=["indicators", "chunks", "index", "timeframes", "manifest",
+                                                                      "all"],
+                        help="Rerun these stages even if unchanged")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    build_pipeline(args.raw.resolve(), args.processed.resolve(), args.chunks.resolve(), args.vector_store.resolve(),
+                   args.manifest.resolve(), rsi_method=args.rsi_method, last_n_days=args.last_n_days,
+                   embeddings=args.embeddings, state_path=args.state, workers=args.workers).run(force=args.force)
+    print(f"✅ Pipeline finished in {time.perf_counter() - start:.3f}s")
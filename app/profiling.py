@@ -0,0 +1,280 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from metrics import request_stages
+
+# -----------------------------
+# Profiling settings
+# -----------------------------
+DEFAULT_INTERVAL = 0.005  # seconds between stack samples
+MAX_PROFILES = 200  # folded profiles kept on disk (oldest deleted first)
+MAX_SLOW_REQUESTS = 100  # slow-request captures kept in memory
+MAX_FRAMES = 40  # innermost frames kept per captured stack
+# Leaf frames of threads that are waiting for work rather than doing it (pool workers, the event loop's select)
+IDLE_LEAVES = {("threading.py", "wait"), ("selectors.py", "select"), ("thread.py", "_worker"), ("queue.py", "get"),
+               ("threading.py", "_wait_for_tstate_lock")}
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_LEAVES
+
+
+def fold(frame):
+    """A stack as one line of the folded format (root first, ';'-separated) that flame graph tools read."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def thread_stacks(skip=()):
+    """{thread name: innermost MAX_FRAMES frames as 'file:line in function'} for every busy thread."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = {}
+    for ident, frame in sys._current_frames().items():
+        if ident in skip or _idle(frame):
+            continue
+        lines = []
+        while frame is not None and len(lines) < MAX_FRAMES:
+            lines.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}")
+            frame = frame.f_back
+        stacks[names.get(ident, str(ident))] = lines[::-1]
+    return stacks
+
+
+class Sampler:
+    """
+    Statistical profiler: a background thread samples the Python stacks of
+    every busy thread (or only the given ones) each interval seconds and
+    counts them in folded form.
+
+    Args:
+        interval: Seconds between samples
+        threads: Thread idents to sample (default: all but idle ones)
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, threads=None):
+        self.interval = interval
+        self.threads = threads
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.threads is not None and ident not in self.threads) or _idle(frame):
+                    continue
+                self.stacks[fold(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def folded(self):
+        """Collapsed stacks, one 'frame;frame;... count' line each (flamegraph.pl, speedscope, inferno)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, n=15):
+        """[(function, share of samples)] by samples in which it was the innermost frame."""
+        total = sum(self.stacks.values()) or 1
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [(name, count / total) for name, count in leaves.most_common(n)]
+
+
+def write_folded(sampler, path):
+    """Write a sampler's folded stacks atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    Path(tmp_path).write_text(sampler.folded(), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class RequestProfiler:
+    """
+    Per-request profiling hooks for the API's metrics middleware.
+
+    A sample_rate fraction of requests run under a Sampler (one at a time; it
+    samples every busy thread, so work from overlapping requests shows up
+    too) and their folded stacks are written to directory. Requests slower
+    than slow_seconds are kept in memory with their stage timings
+    (metrics.stage and data_load) and, taken by a watchdog as they cross the
+    threshold, the stacks of every busy thread.
+
+    With sample_rate 0 and slow_seconds None, enabled is False and begin()
+    is never called.
+
+    Args:
+        directory: Where sampled profiles are written
+        sample_rate: Fraction of requests to profile (0-1)
+        interval: Seconds between stack samples
+        slow_seconds: Latency threshold for slow-request capture (None: off)
+    """
+
+    def __init__(self, directory, sample_rate=0.0, interval=DEFAULT_INTERVAL, slow_seconds=None):
+        self.directory = Path(directory)
+        self.slow = deque(maxlen=MAX_SLOW_REQUESTS)
+        self.sampler = None
+        self.inflight = {}
+        self.watchdog = None
+        self.tick = threading.Event()  # never set; the watchdog waits on it so samplers see it as idle
+        self.lock = threading.Lock()
+        self.configure(sample_rate, interval, slow_seconds)
+
+    def configure(self, sample_rate=None, interval=None, slow_seconds=...):
+        """Change the settings; arguments left out keep their value (slow_seconds=None turns capture off)."""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if interval is not None:
+            self.interval = interval
+        if slow_seconds is not ...:
+            self.slow_seconds = slow_seconds
+        self.enabled = self.sample_rate > 0 or self.slow_seconds is not None
+
+    def settings(self):
+        return {"sample_rate": self.sample_rate, "interval_ms": self.interval * 1000,
+                "slow_seconds": self.slow_seconds, "profiles": self.profiles()[:20]}
+
+    def begin(self, method, path):
+        """Start capturing a request; pass the result to end()."""
+        capture = {"method": method, "path": path, "start": time.perf_counter(), "stages": [], "sampler": None,
+                   "stacks": None}
+        capture["token"] = request_stages.set(capture["stages"])
+        if self.sample_rate and random.random() < self.sample_rate:
+            with self.lock:
+                if self.sampler is None:
+                    self.sampler = capture["sampler"] = Sampler(self.interval).start()
+        if self.slow_seconds is not None:
+            with self.lock:
+                self.inflight[id(capture)] = capture
+                if self.watchdog is None:
+                    self.watchdog = threading.Thread(target=self._watch, name="slow-request-watchdog", daemon=True)
+                    self.watchdog.start()
+        return capture
+
+    def end(self, capture, route, status):
+        """Finish a capture: write its profile and keep it if it was slow."""
+        seconds = time.perf_counter() - capture["start"]
+        request_stages.reset(capture["token"])
+        self.inflight.pop(id(capture), None)
+        profile = None
+        if capture["sampler"] is not None:
+            capture["sampler"].stop()
+            with self.lock:
+                self.sampler = None
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+            label = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+            profile = f"{stamp}-{capture['method']}-{label}-{seconds * 1000:.0f}ms.folded"
+            write_folded(capture["sampler"], self.directory / profile)
+            self._prune()
+        if self.slow_seconds is not None and seconds >= self.slow_seconds:
+            stages = {}
+            for name, stage_seconds in capture["stages"]:
+                total = stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+                total["calls"] += 1
+                total["seconds"] = round(total["seconds"] + stage_seconds, 6)
+            self.slow.append({"time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                              "method": capture["method"], "path": capture["path"], "route": route, "status": status,
+                              "seconds": round(seconds, 6), "stages": stages, "stacks": capture["stacks"],
+                              "profile": profile})
+
+    def _watch(self):
+        # Snapshot the stacks once for each request as it crosses the threshold
+        own = threading.get_ident()
+        while True:
+            slow_seconds = self.slow_seconds
+            self.tick.wait(min(slow_seconds / 4, 0.5) if slow_seconds else 0.5)
+            if slow_seconds is None:
+                continue
+            now = time.perf_counter()
+            late = [c for c in list(self.inflight.values()) if c["stacks"] is None and now - c["start"] >= slow_seconds]
+            if late:
+                stacks = thread_stacks(skip={own})
+                for capture in late:
+                    capture["stacks"] = stacks
+
+    def profiles(self):
+        """Stored profile file names, newest first."""
+        if not self.directory.exists():
+            return []
+        return sorted((p.name for p in self.directory.glob("*.folded")), reverse=True)
+
+    def _prune(self):
+        for name in self.profiles()[MAX_PROFILES:]:
+            (self.directory / name).unlink(missing_ok=True)
+
+
+# -----------------------------
+# Profiling pipeline runs
+# -----------------------------
+def profile_run(name, fn, output_dir, interval=DEFAULT_INTERVAL):
+    """
+    Run fn() under a Sampler limited to the calling thread; write the folded stacks and print the hottest frames.
+
+    Returns:
+        (fn's result, path of the folded profile)
+    """
+    sampler = Sampler(interval, threads={threading.get_ident()}).start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        sampler.stop()
+    seconds = time.perf_counter() - start
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    path = Path(output_dir) / f"{stamp}-{name}.folded"
+    write_folded(sampler, path)
+    print(f"✅ {name}: {seconds:.2f}s, {sampler.samples} samples, profile written to {path}")
+    for frame, share in sampler.top():
+        print(f"   {share:6.1%}  {frame}")
+    return result, path
+
+
+if __name__ == '__main__':
+    import argparse
+    import tempfile
+    parser = argparse.ArgumentParser(description='Profile a data pipeline step and write flame-graph-ready stacks')
+    parser.add_argument('step', choices=['calculate_indicators', 'stock_to_text_chunks', 'build_vector_store'])
+    parser.add_argument('--raw', default='data/stock_data_ready.csv', help='Raw CSV for calculate_indicators')
+    parser.add_argument('--data', default='data/processed/stock_data_with_indicators.csv',
+                        help='Processed CSV for stock_to_text_chunks and build_vector_store')
+    parser.add_argument('--output', default='data/profiles', help='Directory for the folded profile')
+    parser.add_argument('--interval-ms', type=float, default=DEFAULT_INTERVAL * 1000)
+    args = parser.parse_args()
+
+    # Outputs go to a scratch directory so profiling never replaces the served data or index
+    with tempfile.TemporaryDirectory() as scratch:
+        if args.step == 'calculate_indicators':
+            from calculate_indicators import calculate_indicators
+            run = lambda: calculate_indicators(args.raw, output_path=os.path.join(scratch, Path(args.data).name))
+        elif args.step == 'stock_to_text_chunks':
+            from rag_data_loader import stock_to_text_chunks
+            run = lambda: stock_to_text_chunks(args.data)
+        else:
+            from build_vector_store import build_vector_store
+            run = lambda: build_vector_store(args.data, vector_store_path=os.path.join(scratch, 'faiss_index'))
+        profile_run(args.step, run, args.output, interval=args.interval_ms / 1000)
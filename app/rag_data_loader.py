@@ -14,13 +14,52 @@ def stock_to_text_chunks(file_path, last_n_days=60, chunk_size=5):
     Returns:
         List of Document objects containing stock information
     """
-    df = pd.read_csv(file_path)
+    # round_trip: the exact floats calculate_indicators wrote (the default parser can be an ulp off,
+    # enough to flip a :.2f on a half-cent)
+    return frame_to_text_chunks(pd.read_csv(file_path, float_precision='round_trip'), last_n_days, chunk_size)
 
+def frame_to_text_chunks(df, last_n_days=60, chunk_size=5):
+    """
+    stock_to_text_chunks for an already loaded DataFrame (e.g. one partition of symbols).
+
+    Returns:
+        List of Document objects, by symbol then date
+    """
     # Sort by symbol and date
     df = df.sort_values(by=['symbol', 'tradedate'])
 
     docs = []
     symbols = df['symbol'].unique()
+    # Sector/market context columns from calculate_indicators (absent in older processed files)
+    has_context = 'sector' in df.columns
+    # Indicator columns present; only a subset may have been computed (calculate_indicators --indicators)
+    has = set(df.columns)
+
+    def indicator_lines(latest):
+        """'- ...' lines for the indicators present, one per group, parts of a line joined with ' | '."""
+        lines = [
+            [f"MA20: {latest['MA20']:.2f}" if 'MA20' in has else None,
+             f"MA50: {latest['MA50']:.2f}" if 'MA50' in has else None],
+            [f"RSI: {latest['RSI']:.2f}" if 'RSI' in has else None],
+            [f"Bollinger Bands: Upper={latest['BB_UPPER']:.2f}, Mid={latest['BB_MID']:.2f}, Lower={latest['BB_LOWER']:.2f}"
+             if 'BB_MID' in has else None],
+            [f"MACD: {latest['MACD']:.2f}" if 'MACD' in has else None,
+             f"Signal: {latest['MACD_Signal']:.2f}" if 'MACD' in has else None,
+             f"Histogram: {latest['MACD_Hist']:.2f}" if 'MACD' in has else None],
+            [f"ATR(14): {latest['ATR']:.2f}" if 'ATR' in has else None,
+             f"ADX(14): {latest['ADX']:.2f} (+DI {latest['PLUS_DI']:.2f}, -DI {latest['MINUS_DI']:.2f})"
+             if 'ADX' in has else None],
+            [f"Stochastic: %K={latest['STOCH_K']:.2f}, %D={latest['STOCH_D']:.2f}" if 'STOCH_K' in has else None,
+             f"MFI(14): {latest['MFI']:.2f}" if 'MFI' in has else None,
+             f"OBV: {latest['OBV']:.0f}" if 'OBV' in has else None],
+            [f"Ichimoku: Tenkan={latest['ICHI_TENKAN']:.2f}, Kijun={latest['ICHI_KIJUN']:.2f}, "
+             f"Senkou A={latest['ICHI_SENKOU_A']:.2f}, Senkou B={latest['ICHI_SENKOU_B']:.2f}"
+             if 'ICHI_KIJUN' in has else None],
+            [f"Supertrend(10,3): {latest['SUPERTREND']:.2f} ({'Up' if latest['SUPERTREND_DIR'] > 0 else 'Down'})"
+             if 'SUPERTREND' in has else None,
+             f"VWAP(20d): {latest['VWAP20']:.2f}" if 'VWAP20' in has else None],
+        ]
+        return [f"- {' | '.join(filter(None, parts))}" for parts in lines if any(parts)]
 
 
     for symbol in symbols:
@@ -46,6 +85,8 @@ def stock_to_text_chunks(file_path, last_n_days=60, chunk_size=5):
             avg_volume = chunk_df['vol'].mean()
             price_change = ((latest['close'] - chunk_df.iloc[0]['close']) / chunk_df.iloc[0]['close']) * 100
 
+            indicators = "\n".join(indicator_lines(latest))
+
             # Build chunk document
             doc_text = f"""Stock: {symbol}
 Period: {start_date} to {end_date} ({len(chunk_df)} days)
@@ -56,22 +97,28 @@ Close: {latest['close']:.2f} | Open: {latest['open']:.2f} | High: {latest['high'
 Volume: {latest['vol']} | VWAP: {latest['vwap']:.2f}
 
 Technical Indicators:
-- MA20: {latest['MA20']:.2f} | MA50: {latest['MA50']:.2f}
-- RSI: {latest['RSI']:.2f}
-- Bollinger Bands: Upper={latest['BB_UPPER']:.2f}, Mid={latest['BB_MID']:.2f}, Lower={latest['BB_LOWER']:.2f}
-- MACD: {latest['MACD']:.2f} | Signal: {latest['MACD_Signal']:.2f} | Histogram: {latest['MACD_Hist']:.2f}
+{indicators}
 
 Price Analysis:
 - Period Change: {price_change:.2f}%
 - 52W High: {latest['52 weeks high']:.2f} | 52W Low: {latest['52 weeks low']:.2f}
 - Avg Volume: {avg_volume:.0f}
-
+"""
+            if has_context:
+                doc_text += f"""
+Market Context:
+- Sector: {latest['sector']} | Sector Change: {latest['sector_change %']:.2f}% | Sector Breadth: {latest['sector_breadth %']:.0f}% advancing
+- Market Change: {latest['market_change %']:.2f}%
+- Relative Strength (20d): vs Sector {latest['RS_SECTOR_20']:+.2f} pts | vs Market {latest['RS_MARKET_20']:+.2f} pts
+- Percentile Today: {f"RSI {latest['RSI_RANK']:.0f} | " if 'RSI_RANK' in has else ""}Volume {latest['VOL_RANK']:.0f}
+"""
+            doc_text += """
 === DAILY DATA ==="""
 
             # Add each day's data
             for _, row in chunk_df.iterrows():
                 doc_text += f"""
-{row['tradedate']}: Close={row['close']:.2f}, Vol={row['vol']}, RSI={row['RSI']:.2f}, MA20={row['MA20']:.2f}, Change={row['diff %']:.2f}%"""
+{row['tradedate']}: Close={row['close']:.2f}, Vol={row['vol']}, {f"RSI={row['RSI']:.2f}, " if 'RSI' in has else ""}{f"MA20={row['MA20']:.2f}, " if 'MA20' in has else ""}Change={row['diff %']:.2f}%"""
 
             # Add metadata for filtering
             metadata = {
@@ -79,9 +126,11 @@ Price Analysis:
                 "start_date": str(start_date),
                 "end_date": str(end_date),
                 "latest_close": float(latest['close']),
-                "latest_rsi": float(latest['RSI']),
+                "latest_rsi": float(latest['RSI']) if 'RSI' in has else None,
                 "period_change": float(price_change)
             }
+            if has_context:
+                metadata["sector"] = latest['sector']
 
             docs.append(Document(page_content=doc_text.strip(), metadata=metadata))
 
@@ -1,65 +1,94 @@
 
 import os
-import re
+from operator import itemgetter
 from langchain_community.vectorstores import FAISS
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
+from hybrid_retriever import HybridRetriever, LexicalIndex, lexical_index_path
+from llm_backends import load_llm
+from markdown_formatter import format_markdown
+from recommendation import Recommendation
+from metrics import data_load, record_llm_error, record_llm_usage, stage
 
 def format_output(text):
     """
     Post-process the LLM output to ensure proper formatting.
+
+    Single-pass equivalent of the original regex chain (kept as
+    markdown_formatter.format_output_regex); see markdown_formatter for the rules.
     """
-    # Fix numbered lists that are in paragraphs
-    # Pattern: "1. Title: text 2. Title:" -> "1. Title:\n   text\n\n2. Title:"
-    text = re.sub(r'(\d+)\.\s+([^:]+):\s+([^0-9]+?)(?=\d+\.|\n##|\Z)', 
-                  r'\1. **\2:**\n   \3\n\n', text)
-    
-    # Ensure proper spacing after headers
-    text = re.sub(r'(##[^#\n]+)\n(?!\n)', r'\1\n\n', text)
-    text = re.sub(r'(###[^#\n]+)\n(?!\n)', r'\1\n\n', text)
-    
-    # Ensure double line breaks before major sections
-    text = re.sub(r'(?<!\n)\n(## [🎯📊💡⚠️🎯🧠])', r'\n\n\1', text)
-    
-    # Fix bullet points spacing
-    text = re.sub(r'\*\*([^:]+):\*\*(?!\n)', r'**\1:**\n', text)
-    
-    # Remove excessive blank lines (more than 2)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    
-    return text.strip()
+    return format_markdown(text)
+
+def load_embeddings():
+    """The sentence-transformers model the FAISS index was built with."""
+    with data_load("embeddings"):
+        return HuggingFaceEmbeddings(
+            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True}
+        )
+
+# Structured-output mode: the layout lives in the Recommendation schema, not the prompt
+STRUCTURED_PROMPT = ChatPromptTemplate.from_template("""
+You are an expert NEPSE (Nepal Stock Exchange) trading analyst.
 
-def create_rag_bot():
+Context: {context}
+
+Question: {question}
+
+Return the recommendation in the requested schema. Cover Moving Averages (MA20, MA50),
+RSI, MACD and Bollinger Bands using the exact values from the context. Keep each
+detail to one or two sentences. When the context has a QUANTITATIVE RISK MODEL, base
+the action plan's stop loss and target price on its levels.
+""")
+
+def create_rag_bot(llm=None, embeddings=None, vector_store_path="vectorstore/faiss_index", structured=False):
     """
     Create a RAG-based trading bot using FAISS and Google Gemini.
-    
+
+    Args:
+        llm: Chat model to use (default: the backend selected by LLM_BACKEND / LLM_FALLBACK,
+            Gemini 2.0 Flash unless configured otherwise)
+        embeddings: Embedding model matching the index (default: all-MiniLM-L6-v2)
+        vector_store_path: Path of the saved FAISS index
+        structured: Return a Recommendation through the model's schema-constrained
+            output instead of formatted markdown
+
     Returns:
         RetrievalQA chain for answering queries
     """
    
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
+    if embeddings is None:
+        embeddings = load_embeddings()
 
     # Load FAISS vector store
-    db = FAISS.load_local("vectorstore/faiss_index", embeddings, allow_dangerous_deserialization=True)
-    
-    # Create retriever
-    retriever = db.as_retriever(search_kwargs={"k": 5})
+    with data_load("faiss_index"):
+        db = FAISS.load_local(vector_store_path, embeddings, allow_dangerous_deserialization=True)
+
+    # BM25 + metadata filters over the same chunks, fused with the dense results
+    hybrid = None
+    lexical_path = lexical_index_path(vector_store_path)
+    if os.path.isdir(lexical_path):
+        with data_load("lexical_index"):
+            hybrid = HybridRetriever(db, LexicalIndex.load(lexical_path))
+    else:
+        print(f"⚠️  No lexical index at {lexical_path}; using dense retrieval only (rerun build_vector_store.py)")
     
     # Initialize LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-exp",
-        temperature=0.2,  # Lower temperature for more consistent formatting
-    )
+    if llm is None:
+        llm = load_llm()
+        if llm is None:
+            raise RuntimeError("No LLM backend configured (see LLM_BACKEND in llm_backends.py)")
     
-    # Create prompt template with strict formatting
-    prompt = ChatPromptTemplate.from_template("""
+    if structured:
+        # include_raw keeps the AIMessage so token usage can still be recorded
+        prompt = STRUCTURED_PROMPT
+        llm = llm.with_structured_output(Recommendation, include_raw=True)
+    else:
+        # Create prompt template with strict formatting
+        prompt = ChatPromptTemplate.from_template("""
 You are an expert NEPSE (Nepal Stock Exchange) trading analyst.
 
 Context: {context}
@@ -156,9 +185,9 @@ Provide analysis in this EXACT format. Each numbered point MUST start on a new l
 
 1. **Entry Price:** [Price]
 
-2. **Stop Loss Level:** [Price]
+2. **Stop Loss Level:** [Price - from the QUANTITATIVE RISK MODEL levels when the context has them]
 
-3. **Target Price:** [Price]
+3. **Target Price:** [Price - from the QUANTITATIVE RISK MODEL levels when the context has them]
 
 4. **Time Horizon:** [Timeframe]
 
@@ -178,22 +207,63 @@ Answer:
     def format_docs(docs):
         return "\n\n".join(doc.page_content for doc in docs)
 
-    # Create RAG chain with post-processing
+    # The chain takes a question, or {"question", "extra_context"} to append e.g. the risk model's numbers
+    def as_inputs(value):
+        return value if isinstance(value, dict) else {"question": value}
+
+    # Retrieval split into its two stages (dense-only is the same as db.as_retriever(search_kwargs={"k": 5}))
+    def retrieve(inputs):
+        question = inputs["question"]
+        with stage("embed"):
+            vector = embeddings.embed_query(question)
+        with stage("search"):
+            if hybrid is not None:
+                docs = hybrid.retrieve(question, vector)
+            else:
+                docs = db.similarity_search_by_vector(vector, k=5)
+        context = format_docs(docs)
+        if inputs.get("extra_context"):
+            context += "\n\n" + inputs["extra_context"]
+        return context
+
+    def build_prompt(inputs):
+        with stage("prompt"):
+            return prompt.invoke(inputs)
+
+    def call_llm(prompt_value):
+        with stage("llm"):
+            try:
+                message = llm.invoke(prompt_value)
+            except Exception as e:
+                record_llm_error(e)
+                raise
+        record_llm_usage(message["raw"] if structured else message)
+        return message
+
+    parser = StrOutputParser()
+
+    def post_process(message):
+        with stage("format"):
+            if structured:
+                if message["parsed"] is None:
+                    raise ValueError(f"Model output did not match the schema: {message['parsing_error']}")
+                return message["parsed"]
+            return format_output(parser.invoke(message))
+
+    # Create RAG chain with post-processing, timing each stage
     rag_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-        | format_output  # Add post-processing here
+        RunnableLambda(as_inputs)
+        | {"context": RunnableLambda(retrieve), "question": itemgetter("question")}
+        | RunnableLambda(build_prompt)
+        | RunnableLambda(call_llm)
+        | RunnableLambda(post_process)
     )
 
     return rag_chain
 
-def analyze_stock(rag_chain, symbol, strategy="multi-strategy"):
-    """
-    Analyze a stock using the RAG bot.
-    """
-    question = f"""
+def build_question(symbol, strategy="multi-strategy"):
+    """The question analyze_stock sends to the RAG chain."""
+    return f"""
 Analyze stock {symbol} for Buy, Sell, or Hold recommendation using a {strategy} approach.
 
 Consider these strategies:
@@ -210,7 +280,18 @@ Provide:
 5. Action plan with entry/exit points
 """
 
-    result = rag_chain.invoke(question)
+def analyze_stock(rag_chain, symbol, strategy="multi-strategy", extra_context=None):
+    """
+    Analyze a stock using the RAG bot.
+
+    extra_context (e.g. risk_engine.describe output) is appended to the
+    retrieved context; retrieval still uses the question alone.
+
+    Returns formatted markdown, or a Recommendation when the chain was created
+    with structured=True.
+    """
+    question = build_question(symbol, strategy)
+    result = rag_chain.invoke({"question": question, "extra_context": extra_context} if extra_context else question)
     return result
 
 if __name__ == "__main__":
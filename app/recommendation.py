@@ -0,0 +1,83 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field
+
+# -----------------------------
+# Structured recommendation schema
+# -----------------------------
+# Field descriptions are sent to the model as part of the JSON schema, so they
+# replace the layout instructions of the markdown prompt.
+class Finding(BaseModel):
+    label: str = Field(description="Short title, e.g. 'Current RSI' or 'Liquidity Risk'")
+    detail: str = Field(description="One or two sentences")
+
+
+class IndicatorAnalysis(BaseModel):
+    indicator: str = Field(description="Indicator name, e.g. 'RSI (Relative Strength Index)'")
+    findings: List[Finding] = Field(description="2-3 labelled observations about the indicator")
+    decision_support: str = Field(description="How this indicator supports the recommended action")
+
+
+class ActionPlan(BaseModel):
+    entry_price: float = Field(description="Entry price in Rs.")
+    stop_loss: float = Field(description="Stop loss level in Rs.")
+    target_price: float = Field(description="Target price in Rs.")
+    time_horizon: str = Field(description="e.g. '2-4 weeks'")
+
+
+class Recommendation(BaseModel):
+    """A trading recommendation as returned by the model in structured-output mode."""
+
+    action: Literal["BUY", "SELL", "HOLD"]
+    confidence: int = Field(ge=0, le=100, description="Confidence in percent")
+    indicators: List[IndicatorAnalysis] = Field(
+        description="Moving Averages (MA20, MA50), RSI, MACD and Bollinger Bands, in that order")
+    reasons: List[Finding] = Field(description="4-5 reasons for the action")
+    risks: List[Finding] = Field(description="4 risk factors")
+    action_plan: ActionPlan
+    summary: str = Field(description="2-3 sentence final insight")
+
+
+# -----------------------------
+# Markdown view
+# -----------------------------
+def _keycap(n):
+    return f"{n}️⃣" if n < 10 else f"{n}."
+
+
+def _numbered(findings, separate_detail=False):
+    sep = "\n   " if separate_detail else " "
+    return [f"{i}. **{f.label}:**{sep}{f.detail}\n" for i, f in enumerate(findings, 1)]
+
+
+def render_markdown(rec: Recommendation):
+    """
+    Render a Recommendation in the same layout the markdown prompt asks for,
+    so clients that display `analysis` work unchanged.
+    """
+    lines = [
+        "## RECOMMENDATION\n",
+        f"**Action:** {rec.action}\n",
+        f"**Confidence Level:** {rec.confidence}%\n",
+        "## TECHNICAL INDICATOR ANALYSIS\n",
+    ]
+    for i, ind in enumerate(rec.indicators, 1):
+        lines.append(f"### {_keycap(i)} {ind.indicator}\n")
+        lines += _numbered(ind.findings + [Finding(label="Decision Support", detail=ind.decision_support)])
+
+    lines.append(f"## WHY {rec.action}?\n")
+    lines += _numbered(rec.reasons, separate_detail=True)
+    lines.append("## RISK FACTORS\n")
+    lines += _numbered(rec.risks, separate_detail=True)
+
+    plan = rec.action_plan
+    lines += [
+        "## ACTION PLAN\n",
+        f"1. **Entry Price:** Rs. {plan.entry_price:.2f}\n",
+        f"2. **Stop Loss Level:** Rs. {plan.stop_loss:.2f}\n",
+        f"3. **Target Price:** Rs. {plan.target_price:.2f}\n",
+        f"4. **Time Horizon:** {plan.time_horizon}\n",
+        "## FINAL INSIGHT\n",
+        rec.summary,
+    ]
+    return "\n".join(lines)
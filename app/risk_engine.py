@@ -0,0 +1,195 @@
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from dataset import format_day, to_float
+
+# -----------------------------
+# Simulation settings
+# -----------------------------
+PATHS = 100_000
+HORIZON = 20  # trading days
+LOOKBACK = 250  # daily returns the paths are drawn from
+CONFIDENCE_LEVELS = (0.95, 0.99)
+ATR_MULTIPLE = 2.0  # ATR stop distance
+REWARD_MULTIPLE = 2.0  # target distance as a multiple of the stop distance
+METHODS = ("bootstrap", "normal")
+
+
+def risk_inputs(rows):
+    """
+    What simulate() needs from one symbol's rows (sorted by date).
+
+    Returns:
+        dict with the last LOOKBACK + 1 closes, the latest close, ATR,
+        Bollinger bands and date
+    """
+    latest = rows.iloc[-1]
+    return {
+        "symbol": str(latest['symbol']),
+        "day": int(latest['tradedate']),
+        "closes": rows['close'].to_numpy(dtype=np.float64)[-(LOOKBACK + 1):],
+        "close": float(latest['close']),
+        "atr": float(latest['ATR']) if 'ATR' in rows else np.nan,
+        "bb_upper": float(latest['BB_UPPER']) if 'BB_UPPER' in rows else np.nan,
+        "bb_lower": float(latest['BB_LOWER']) if 'BB_LOWER' in rows else np.nan,
+    }
+
+
+def _percent(x):
+    return round(float(x) * 100, 2)
+
+
+def simulate(inputs, paths=PATHS, horizon=HORIZON, method="bootstrap", seed=None):
+    """
+    Monte Carlo risk of holding a symbol for `horizon` trading days.
+
+    Daily log returns are drawn from the symbol's last LOOKBACK days, either
+    resampled as they were (bootstrap, keeps fat tails) or from a normal with
+    their mean and volatility. All paths are simulated at once as a
+    (paths, horizon) float32 array.
+
+    Stops sit ATR_MULTIPLE ATRs, or half the Bollinger band width, below the
+    close; targets REWARD_MULTIPLE times as far above. For each pair the
+    paths tell how often the target is reached first, the stop is reached
+    first, or neither within the horizon (closing prices, long side).
+
+    Args:
+        inputs: dict from risk_inputs
+        paths: Number of simulated paths
+        horizon: Holding period in trading days
+        method: "bootstrap" or "normal"
+        seed: Random seed (default: derived from the symbol and date, so the same data gives the same numbers)
+
+    Returns:
+        JSON-ready dict, or None with fewer than 20 returns of history
+    """
+    closes = inputs["closes"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(closes))
+    returns = returns[np.isfinite(returns)].astype(np.float32)
+    if len(returns) < 20:
+        return None
+    if seed is None:
+        seed = zlib.crc32(f"{inputs['symbol']}|{inputs['day']}|{method}".encode())
+    rng = np.random.default_rng(seed)
+    if method == "bootstrap":
+        steps = returns[rng.integers(len(returns), size=(paths, horizon))]
+    else:
+        steps = rng.standard_normal((paths, horizon), dtype=np.float32)
+        steps *= returns.std()
+        steps += returns.mean()
+    np.cumsum(steps, axis=1, out=steps)
+    final = np.expm1(steps[:, -1])
+
+    tail = {}
+    for level in CONFIDENCE_LEVELS:
+        cutoff = np.quantile(final, 1 - level)
+        name = f"{round(level * 100)}"
+        tail[f"var_{name}_percent"] = _percent(-cutoff)
+        tail[f"cvar_{name}_percent"] = _percent(-final[final <= cutoff].mean())
+
+    close = inputs["close"]
+    levels = {}
+    for name, distance in (("atr", ATR_MULTIPLE * inputs["atr"]),
+                           ("bollinger", (inputs["bb_upper"] - inputs["bb_lower"]) / 2)):
+        stop, target = close - distance, close + REWARD_MULTIPLE * distance
+        if not np.isfinite(distance) or distance <= 0 or stop <= 0:
+            levels[name] = None
+            continue
+        up, down = np.float32(np.log(target / close)), np.float32(np.log(stop / close))
+        # First step at or beyond each level (horizon when never)
+        hit = steps >= up
+        first_up = np.where(hit.any(axis=1), hit.argmax(axis=1), horizon)
+        np.less_equal(steps, down, out=hit)
+        first_down = np.where(hit.any(axis=1), hit.argmax(axis=1), horizon)
+        target_first = float(np.mean(first_up < first_down))
+        stop_first = float(np.mean(first_down < first_up))
+        levels[name] = {
+            "stop": round(stop, 2), "target": round(target, 2),
+            "stop_percent": _percent(-distance / close), "target_percent": _percent(REWARD_MULTIPLE * distance / close),
+            "p_target_first": round(target_first, 3), "p_stop_first": round(stop_first, 3),
+            "p_neither": round(1 - target_first - stop_first, 3),
+        }
+
+    quantiles = np.quantile(final, [0.05, 0.5, 0.95])
+    return {
+        "symbol": inputs["symbol"],
+        "date": format_day(inputs["day"]),
+        "close": to_float(close, 2),
+        "method": method,
+        "paths": paths,
+        "horizon_days": horizon,
+        "history_days": len(returns),
+        "daily_volatility_percent": _percent(returns.std()),
+        "expected_return_percent": _percent(final.mean()),
+        "return_quantiles_percent": {"p5": _percent(quantiles[0]), "p50": _percent(quantiles[1]),
+                                     "p95": _percent(quantiles[2])},
+        **tail,
+        "levels": levels,
+    }
+
+
+def describe(risk):
+    """Plain-text summary of a simulate() result for the LLM context."""
+    if risk is None:
+        return ""
+    lines = [
+        f"QUANTITATIVE RISK MODEL for {risk['symbol']} ({risk['method']} Monte Carlo, {risk['paths']:,} paths "
+        f"over {risk['horizon_days']} trading days from {risk['history_days']} daily returns, close Rs. {risk['close']}):",
+        f"- 95% VaR {risk['var_95_percent']}%, CVaR {risk['cvar_95_percent']}%; "
+        f"99% VaR {risk['var_99_percent']}%, CVaR {risk['cvar_99_percent']}%",
+        f"- Daily volatility {risk['daily_volatility_percent']}%; {risk['horizon_days']}-day return "
+        f"5th/50th/95th percentile {risk['return_quantiles_percent']['p5']}% / "
+        f"{risk['return_quantiles_percent']['p50']}% / {risk['return_quantiles_percent']['p95']}%",
+    ]
+    labels = {"atr": f"{ATR_MULTIPLE:g} x ATR", "bollinger": "half Bollinger width"}
+    for name, level in risk["levels"].items():
+        if level is not None:
+            lines.append(f"- Stop Rs. {level['stop']} / target Rs. {level['target']} ({labels[name]}): "
+                         f"target first in {level['p_target_first']:.0%} of paths, stop first in "
+                         f"{level['p_stop_first']:.0%}, neither in {level['p_neither']:.0%}")
+    lines.append("Base the ACTION PLAN stop loss and target on these levels.")
+    return "\n".join(lines)
+
+
+# -----------------------------
+# All symbols
+# -----------------------------
+def _simulate_all(inputs, kwargs):
+    return [simulate(item, **kwargs) for item in inputs]
+
+
+def batch_risk(df, symbols=None, workers=None, **kwargs):
+    """
+    simulate() for many symbols, over symbol partitions in a process pool.
+
+    Args:
+        df: Frame from dataset.load_stock_data (sorted by symbol then date)
+        symbols: Symbols to simulate (default: all)
+        workers: Processes (default: one per CPU; 1 runs in this process)
+        **kwargs: Passed to simulate()
+
+    Returns:
+        {symbol: result or None}
+    """
+    codes = df['symbol'].array.codes
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+    wanted = None if symbols is None else set(symbols)
+    inputs = []
+    for a, b in zip(bounds, bounds[1:]):
+        rows = df.iloc[max(a, b - LOOKBACK - 1):b]
+        if wanted is None or str(rows['symbol'].iat[0]) in wanted:
+            inputs.append(risk_inputs(rows))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(inputs) < 2:
+        results = _simulate_all(inputs, kwargs)
+    else:
+        parts = np.array_split(np.arange(len(inputs)), min(workers * 4, len(inputs)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = pool.map(_simulate_all, [[inputs[i] for i in part] for part in parts], repeat(kwargs))
+            results = [result for chunk in chunks for result in chunk]
+    return {item["symbol"]: result for item, result in zip(inputs, results)}
@@ -0,0 +1,59 @@
+import re
+
+# -----------------------------
+# NEPSE sector classification
+# -----------------------------
+# Listed companies by NEPSE sector. Debentures, promoter shares and mutual fund
+# units are recognised by their symbol suffixes below unless listed here.
+SECTOR_SYMBOLS = {
+    "Commercial Banks": "ADBL CZBIL EBL GBIME HBL KBL LSL MBL NABIL NBL NICA NIMB NMB PCBL PRVU SANIMA SBI SBL SCB",
+    "Development Banks": "CORBL EDBL GBBL GRDBL JBBL KSBBL LBBL MDB MLBL MNBBL NABBC SADBL SAPDBL SHINE SINDU",
+    "Finance": "BFC CFCL GFCL GMFIL GUFL ICFC JFL MFIL MPFL NFS PFL PROFL RLFL SFCL SIFC",
+    "Microfinance": (
+        "ACLBSL ALBSL ANLB AVYAN CBBL CYCL DDBL DLBS FMDBL FOWAD GBLBS GILB GLBSL GMFBS HLBSL ILBS JBLB "
+        "JSLBB KMCDB LLBS MATRI MERO MLBBL MLBS MLBSL MSLB NADEP NESDO NICLBSL NMBMF NMFBS NMLBBL NUBL "
+        "RSDC SAMAJ SHLB SKBBL SLBBL SLBSL SMATA SMB SMFBS SMPDA SWBBL SWMF ULBSL UNLB USLB VLBS WNLB"
+    ),
+    "Life Insurance": "ALICL CLI CREST GMLI HLI ILI LICN NLIC NLICL PMLI RNLI SJLIC SNLI SRLI",
+    "Non-Life Insurance": "HEI HRL IGI NICL NIL NLG NMIC NRIC PRIN RBCL SALICO SGIC SICL SPIL UAIL",
+    "Hydropower": (
+        "AHL AHPC AKJCL AKPL API BARUN BEDC BGWT BHCL BHDC BHL BHPL BNHC BPCL CHCL CHL CKHL DHEL DHPL "
+        "DOLTI DORDI EHPL GHL GLH GVL HDHPC HHL HIMSTAR HPPL HURJA IHL JOSHI KBSH KKHC KPCL LEC MABEL "
+        "MAKAR MANDU MBJC MCHL MEHL MEL MEN MHCL MHL MHNL MKHC MKHL MKJC MMKJL MSHL NGPL NHDL NHPC NYADI "
+        "PHCL PMHPL PPCL PPL PURE RADHI RAWA RFPL RHGCL RHPL RIDI RURU SAHAS SANVI SGHC SHEL SHPC SIKLES "
+        "SJCL SMH SMHL SMJC SPC SPDL SPHL SPL SSHL TAMOR TPC TSHL TVCL UHEWA ULHC UMHL UMRH UNHPL UPCL "
+        "UPPER USHEC USHL VLUCL"
+    ),
+    "Manufacturing And Processing": "BNL BNT GCIL HDL OMPL SARBTM SHIVM SONA UNL",
+    "Hotels And Tourism": "CGH CITY KDL OHL SHL TRH",
+    "Trading": "BBC STC",
+    "Investment": "CHDC CIT ENL HATHY HIDCL NIFRA NRN",
+    "Mutual Fund": (
+        "C30MF CMF2 GBIMESY2 GIBF1 GSY H8020 HLICF KDBY KEF KSY LUK LVF2 MBLEF MMF1 MNMF1 NBF2 NBF3 NIBLGF "
+        "NIBLSTF NIBSF2 NICBF NICFC NICGF2 NICSF NMB50 NMBHF2 NSIF2 PRSF PSF RMF1 RMF2 RSY SAGF SBCF "
+        "SEF SFEF SFMF SIGS2 SIGS3 SLCF"
+    ),
+    "Debenture": "BOKD86KA NIFRAGED SCBD",
+    "Others": "MKCL NRM NTC NWCL TTL",
+}
+
+SECTOR_MAP = {symbol: sector for sector, symbols in SECTOR_SYMBOLS.items() for symbol in symbols.split()}
+
+# Sectors that make up the equity market (the NEPSE index excludes bonds and fund units)
+NON_EQUITY_SECTORS = {"Debenture", "Mutual Fund", "Promoter Share"}
+
+# Bond symbols: issuer + D/EB/UR + maturity year(s), e.g. NABILD87, NICAD85/86, EBLEB89, NMBD2085
+DEBENTURE_PATTERN = re.compile(r"(D|EB|UR)\d{2,4}(/\d{2})?$")
+
+
+def sector_of(symbol):
+    """NEPSE sector for a symbol ("Others" when unknown)."""
+    symbol = symbol.upper()
+    if symbol in SECTOR_MAP:
+        return SECTOR_MAP[symbol]
+    if DEBENTURE_PATTERN.search(symbol):
+        return "Debenture"
+    # Promoter shares: the ordinary symbol plus P or PO (CZBILP, NMBPO)
+    if symbol.endswith("PO") or (symbol.endswith("P") and symbol[:-1] in SECTOR_MAP):
+        return "Promoter Share"
+    return "Others"
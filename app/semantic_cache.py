@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+from metrics import record_cache
+
+
+def cache_question(strategy):
+    """
+    The text the cache embeds for an analysis request: the strategy, normalized.
+
+    The rest of the question (rag_trading_bot.build_question) is a template shared by every request, so
+    embedding it would make every strategy for a symbol look alike; the symbol is part of the key.
+    """
+    return " ".join(strategy.lower().replace("-", " ").replace("_", " ").split())
+
+
+class SemanticCache:
+    """
+    Answers to past questions, matched by embedding similarity.
+
+    Entries are partitioned by key (symbol and output format); each partition
+    has a small inner-product FAISS index over normalized question
+    embeddings. For analyses the embedded question is only the normalized
+    strategy (cache_question), not the full prompt. A question hits when its
+    nearest cached question in the same partition has cosine similarity
+    >= threshold and hasn't outlived the TTL. The whole cache is dropped when
+    the data version changes. Beyond max_entries the least recently used
+    entry is evicted.
+
+    Strategies are a word or two, so at the default threshold of 0.95 the
+    cache is in effect exact-match on the normalized strategy ("swing" and
+    "Swing-Trading" may miss each other); lower the threshold to let
+    paraphrases share answers.
+    """
+
+    def __init__(self, embeddings, threshold=0.95, max_entries=512, ttl=6 * 3600, name="semantic"):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self.version = None
+        self.partitions = {}        # key -> faiss.IndexIDMap2
+        self.entries = OrderedDict()  # id -> (key, question, answer, created), least recently used first
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def embed(self, question):
+        vector = np.asarray([self.embeddings.embed_query(question)], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _reset(self, version):
+        self.partitions = {}
+        self.entries = OrderedDict()
+        self.version = version
+
+    def _remove(self, entry_id):
+        key = self.entries.pop(entry_id)[0]
+        self.partitions[key].remove_ids(np.array([entry_id], dtype="int64"))
+
+    def lookup(self, version, key, question):
+        """
+        Find a cached answer for a question similar to this one.
+
+        Returns:
+            (answer or None, question vector); pass the vector on to store()
+        """
+        vector = self.embed(question)
+        with self.lock:
+            if version != self.version:
+                self._reset(version)
+            answer = self._match(key, vector)
+        record_cache(self.name, answer is not None)
+        return answer, vector
+
+    def peek(self, version, key, question):
+        """
+        lookup() for display only: not counted in the hit rate, and the
+        question isn't embedded when nothing is cached under key.
+
+        Returns:
+            The cached answer or None
+        """
+        with self.lock:
+            if version != self.version or key not in self.partitions or not self.partitions[key].ntotal:
+                return None
+        vector = self.embed(question)
+        with self.lock:
+            return self._match(key, vector) if version == self.version else None
+
+    def _match(self, key, vector):
+        """Answer of the nearest fresh entry in key's partition (the lock must be held)."""
+        index = self.partitions.get(key)
+        if index is None or not index.ntotal:
+            return None
+        scores, ids = index.search(vector, 1)
+        entry_id = int(ids[0][0])
+        if scores[0][0] < self.threshold or entry_id not in self.entries:
+            return None
+        if time.time() - self.entries[entry_id][3] > self.ttl:
+            self._remove(entry_id)
+            return None
+        self.entries.move_to_end(entry_id)
+        return self.entries[entry_id][2]
+
+    def store(self, version, key, question, answer, vector=None):
+        if vector is None:
+            vector = self.embed(question)
+        with self.lock:
+            if version != self.version:
+                self._reset(version)
+            index = self.partitions.get(key)
+            if index is None:
+                index = self.partitions[key] = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            entry_id = self.next_id
+            self.next_id += 1
+            index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self.entries[entry_id] = (key, question, answer, time.time())
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def __len__(self):
+        return len(self.entries)
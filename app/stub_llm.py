@@ -0,0 +1,223 @@
+import hashlib
+import json
+import re
+import time
+from typing import Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+QUESTION_PATTERN = re.compile(r"Analyze stock (\S+) for .*? using a (.+?) approach")
+
+RESPONSE_TEMPLATE = """##  RECOMMENDATION
+
+**Action:** {action}
+
+**Confidence Level:** {confidence}%
+
+##  TECHNICAL INDICATOR ANALYSIS
+
+### 1️⃣ Moving Averages (MA20, MA50)
+
+1. **Current Values:** MA20 is Rs. {ma20} and MA50 is Rs. {ma50}.
+2. **Trend Direction:** The short-term average is {trend} the long-term average.
+3. **Signal:** {cross}
+4. **Decision Support:** This supports a {action} stance for a {strategy} approach.
+### 2️⃣ RSI (Relative Strength Index)
+1. **Current RSI:** {rsi}
+2. **Interpretation:** {rsi_zone}
+3. **Market Condition:** Momentum is {momentum}.
+4. **Decision Support:** RSI is consistent with the {action} call.
+
+### 3️⃣ MACD (Moving Average Convergence Divergence)
+
+1. MACD Position: MACD is {macd_side} the signal line. 2. Crossover: {macd_cross} 3. Momentum: Momentum is {momentum}. 4. Decision Support: MACD agrees with the broader trend.
+
+### 4️⃣ Bollinger Bands
+
+1. **Volatility:** Bands are {volatility}.
+2. **Breakout Potential:** {breakout}
+3. **Decision Support:** Price sits inside the bands, so no extreme is signalled.
+##  WHY {action}?
+1. **Trend:** {symbol} is trading {trend} its MA50.
+2. **Momentum:** RSI of {rsi} leaves room in both directions.
+3. **Volume:** Recent volume is in line with its average.
+4. **Sector:** Peers have moved in a similar range this week.
+
+
+
+##  RISK FACTORS
+
+1. **Market Risk:** Broad NEPSE sell-offs can override stock-level signals.
+2. **Liquidity Risk:** Thin order books can widen spreads.
+3. **Policy Risk:** NRB directives can move the whole sector.
+4. **Data Risk:** Indicators lag price and can whipsaw.
+
+##  ACTION PLAN
+
+1. **Entry Price:** Rs. {entry}
+2. **Stop Loss Level:** Rs. {stop}
+3. **Target Price:** Rs. {target}
+4. **Time Horizon:** {horizon}
+
+##  FINAL INSIGHT
+
+{symbol} shows a {trend_word} setup on daily data. Size positions for NEPSE volatility and review the call after the next few sessions.
+"""
+
+
+def _approx_tokens(text):
+    # Roughly four characters per token for English text
+    return max(1, len(text) // 4)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for Gemini used by benchmarks and load tests.
+
+    Responses follow the prompt's markdown layout and depend only on the symbol
+    and strategy in the question, so repeated runs produce identical output.
+    When replay_path points at a JSONL file of {"symbol", "strategy", "response"}
+    records, matching recorded responses are returned instead.
+    """
+
+    latency: float = 0.0
+    # Seconds per output token, to model decode time when comparing response sizes
+    token_latency: float = 0.0
+    replay_path: Optional[str] = None
+
+    _recorded: dict = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context):
+        if self.replay_path:
+            with open(self.replay_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        key = (record["symbol"].upper(), record.get("strategy"))
+                        self._recorded[key] = record["response"]
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    @staticmethod
+    def _parse_question(prompt):
+        match = QUESTION_PATTERN.search(prompt)
+        return (match.group(1).upper(), match.group(2)) if match else ("UNKNOWN", "multi-strategy")
+
+    @staticmethod
+    def _values(symbol, strategy):
+        seed = int(hashlib.sha1(f"{symbol}|{strategy}".encode()).hexdigest(), 16)
+        price = 100 + seed % 900
+        rsi = 20 + seed % 60
+        bullish = seed % 3 == 0
+        bearish = seed % 3 == 1
+        action = "BUY" if bullish else "SELL" if bearish else "HOLD"
+        return dict(
+            symbol=symbol,
+            strategy=strategy,
+            action=action,
+            confidence=55 + seed % 35,
+            ma20=f"{price * 1.01:.2f}",
+            ma50=f"{price * 0.99:.2f}",
+            trend="above" if bullish else "below",
+            trend_word="bullish" if bullish else "bearish" if bearish else "neutral",
+            cross="Golden Cross" if bullish else "Death Cross" if bearish else "No Signal",
+            rsi=f"{rsi:.2f}",
+            rsi_zone="Overbought (>70)" if rsi > 70 else "Oversold (<30)" if rsi < 30 else "Neutral (30-70)",
+            momentum="strengthening" if bullish else "weakening",
+            macd_side="above" if bullish else "below",
+            macd_cross="Bullish Crossover" if bullish else "No Crossover",
+            volatility="contracting" if seed % 2 else "expanding",
+            breakout="Medium breakout potential",
+            entry=f"{price:.2f}",
+            stop=f"{price * 0.93:.2f}",
+            target=f"{price * 1.12:.2f}",
+            horizon="2-4 weeks",
+        )
+
+    def respond(self, prompt):
+        symbol, strategy = self._parse_question(prompt)
+        recorded = self._recorded.get((symbol, strategy)) or self._recorded.get((symbol, None))
+        if recorded is not None:
+            return recorded
+        return RESPONSE_TEMPLATE.format(**self._values(symbol, strategy))
+
+    def respond_structured(self, prompt):
+        """The same analysis as respond(), as a dict matching recommendation.Recommendation."""
+        v = self._values(*self._parse_question(prompt))
+
+        def finding(label, detail):
+            return {"label": label, "detail": detail}
+
+        return {
+            "action": v["action"],
+            "confidence": v["confidence"],
+            "indicators": [
+                {"indicator": "Moving Averages (MA20, MA50)",
+                 "findings": [finding("Current Values", f"MA20 is Rs. {v['ma20']} and MA50 is Rs. {v['ma50']}."),
+                              finding("Trend Direction", f"The short-term average is {v['trend']} the long-term average."),
+                              finding("Signal", v["cross"])],
+                 "decision_support": f"This supports a {v['action']} stance for a {v['strategy']} approach."},
+                {"indicator": "RSI (Relative Strength Index)",
+                 "findings": [finding("Current RSI", v["rsi"]),
+                              finding("Interpretation", v["rsi_zone"]),
+                              finding("Market Condition", f"Momentum is {v['momentum']}.")],
+                 "decision_support": f"RSI is consistent with the {v['action']} call."},
+                {"indicator": "MACD (Moving Average Convergence Divergence)",
+                 "findings": [finding("MACD Position", f"MACD is {v['macd_side']} the signal line."),
+                              finding("Crossover", v["macd_cross"]),
+                              finding("Momentum", f"Momentum is {v['momentum']}.")],
+                 "decision_support": "MACD agrees with the broader trend."},
+                {"indicator": "Bollinger Bands",
+                 "findings": [finding("Volatility", f"Bands are {v['volatility']}."),
+                              finding("Breakout Potential", v["breakout"])],
+                 "decision_support": "Price sits inside the bands, so no extreme is signalled."},
+            ],
+            "reasons": [
+                finding("Trend", f"{v['symbol']} is trading {v['trend']} its MA50."),
+                finding("Momentum", f"RSI of {v['rsi']} leaves room in both directions."),
+                finding("Volume", "Recent volume is in line with its average."),
+                finding("Sector", "Peers have moved in a similar range this week."),
+            ],
+            "risks": [
+                finding("Market Risk", "Broad NEPSE sell-offs can override stock-level signals."),
+                finding("Liquidity Risk", "Thin order books can widen spreads."),
+                finding("Policy Risk", "NRB directives can move the whole sector."),
+                finding("Data Risk", "Indicators lag price and can whipsaw."),
+            ],
+            "action_plan": {"entry_price": float(v["entry"]), "stop_loss": float(v["stop"]),
+                            "target_price": float(v["target"]), "time_horizon": v["horizon"]},
+            "summary": (f"{v['symbol']} shows a {v['trend_word']} setup on daily data. Size positions for "
+                        "NEPSE volatility and review the call after the next few sessions."),
+        }
+
+    def _message(self, prompt, text):
+        input_tokens, output_tokens = _approx_tokens(prompt), _approx_tokens(text)
+        delay = self.latency + self.token_latency * output_tokens
+        if delay:
+            time.sleep(delay)
+        return AIMessage(content=text, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+
+    def with_structured_output(self, schema, *, include_raw=False, **kwargs):
+        """Schema-constrained output: the response is compact JSON parsed into schema."""
+        def generate(prompt_value):
+            prompt = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+            data = self.respond_structured(prompt)
+            message = self._message(prompt, json.dumps(data, separators=(",", ":")))
+            parsed = schema.model_validate(data)
+            return {"raw": message, "parsed": parsed, "parsing_error": None} if include_raw else parsed
+        return RunnableLambda(generate)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = "\n".join(str(m.content) for m in messages)
+        message = self._message(prompt, self.respond(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,115 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Same column layout as data/stock_data_ready.csv
+COLUMNS = [
+    'symbol', 'conf.', 'open', 'high', 'low', 'close', 'ltp', 'close - ltp', 'close - ltp %',
+    'vwap', 'vol', 'prev. close', 'turnover', 'trans.', 'diff', 'range', 'diff %', 'range %',
+    'vwap %', '120 days', '180 days', '52 weeks high', '52 weeks low', 'source_file', 'tradedate',
+]
+
+# NEPSE trades Sunday to Thursday
+NEPSE_WEEKMASK = 'Sun Mon Tue Wed Thu'
+
+
+def trading_days(n_days, end='2025-11-06'):
+    """The last n_days NEPSE trading days up to end (holidays are not modelled)."""
+    return pd.bdate_range(end=end, periods=n_days, freq='C', weekmask=NEPSE_WEEKMASK)
+
+
+def generate_market_data(n_symbols=50, n_days=60, seed=42, end='2025-11-06'):
+    """
+    Generate a NEPSE-like daily dataset for benchmarks.
+
+    Prices follow a per-symbol geometric random walk with NEPSE's +/-10% circuit
+    limit; volumes are log-normal. Every derived column of the raw export is filled
+    in so the output can go straight into calculate_indicators.
+
+    Args:
+        n_symbols: Number of symbols
+        n_days: Number of trading days per symbol
+        seed: Random seed (same seed, same data)
+        end: Last trading date
+
+    Returns:
+        DataFrame sorted by tradedate, then symbol
+    """
+    rng = np.random.default_rng(seed)
+    dates = trading_days(n_days, end)
+    symbols = np.array([f"SYN{i:04d}" for i in range(n_symbols)])
+
+    # Prices: (days, symbols) matrix of compounded daily returns
+    start_price = rng.lognormal(mean=6.0, sigma=0.8, size=n_symbols).round(1)
+    vol = rng.uniform(0.01, 0.035, size=n_symbols)
+    drift = rng.normal(0.0002, 0.0008, size=n_symbols)
+    returns = np.clip(rng.normal(drift, vol, size=(n_days, n_symbols)), -0.1, 0.1)
+    close = (start_price * np.exp(np.cumsum(np.log1p(returns), axis=0))).round(2)
+    prev_close = np.vstack([start_price, close[:-1]])
+
+    open_ = (prev_close * (1 + rng.normal(0, vol / 3, size=close.shape))).round(2)
+    spread = np.abs(rng.normal(0, vol, size=close.shape)) * close
+    high = (np.maximum(open_, close) + spread * rng.uniform(0, 1, size=close.shape)).round(2)
+    low = (np.minimum(open_, close) - spread * rng.uniform(0, 1, size=close.shape)).round(2)
+    vwap = ((high + low + close) / 3).round(2)
+    ltp = (close * (1 + rng.normal(0, 0.002, size=close.shape))).round(2)
+    volume = rng.lognormal(mean=9, sigma=1.2, size=close.shape).round()
+    trans = np.maximum(1, (volume / rng.uniform(50, 300, size=close.shape)).astype(int))
+
+    frame = pd.DataFrame(close, index=dates, columns=symbols)
+    ma120 = frame.rolling(120, min_periods=1).mean().to_numpy().round(2)
+    ma180 = frame.rolling(180, min_periods=1).mean().to_numpy().round(2)
+    high52 = pd.DataFrame(high, index=dates).rolling(250, min_periods=1).max().to_numpy()
+    low52 = pd.DataFrame(low, index=dates).rolling(250, min_periods=1).min().to_numpy()
+
+    diff = (close - prev_close).round(2)
+    df = pd.DataFrame({
+        'symbol': np.tile(symbols, n_days),
+        'conf.': rng.uniform(10, 60, size=close.size).round(2),
+        'open': open_.ravel(),
+        'high': high.ravel(),
+        'low': low.ravel(),
+        'close': close.ravel(),
+        'ltp': ltp.ravel(),
+        'close - ltp': (close - ltp).round(2).ravel(),
+        'close - ltp %': ((close - ltp) / ltp * 100).round(2).ravel(),
+        'vwap': vwap.ravel(),
+        'vol': volume.ravel(),
+        'prev. close': prev_close.ravel(),
+        'turnover': (vwap * volume).round(2).ravel(),
+        'trans.': trans.ravel(),
+        'diff': diff.ravel(),
+        'range': (high - low).round(2).ravel(),
+        'diff %': (diff / prev_close * 100).round(2).ravel(),
+        'range %': ((high - low) / low * 100).round(2).ravel(),
+        'vwap %': ((close - vwap) / vwap * 100).round(2).ravel(),
+        '120 days': ma120.ravel(),
+        '180 days': ma180.ravel(),
+        '52 weeks high': high52.ravel(),
+        '52 weeks low': low52.ravel(),
+        'source_file': np.repeat(dates.strftime('%m_%d_%Y.csv'), n_symbols),
+        'tradedate': np.repeat(dates.strftime('%Y-%m-%d'), n_symbols),
+    })
+    return df[COLUMNS]
+
+
+def write_market_data(path, n_symbols=50, n_days=60, seed=42):
+    """Generate a dataset and write it in the raw export's CSV format."""
+    df = generate_market_data(n_symbols, n_days, seed)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df.to_csv(path, index=False)
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic NEPSE-like stock data')
+    parser.add_argument('--symbols', type=int, default=400)
+    parser.add_argument('--days', type=int, default=750)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='data/synthetic/stock_data_ready.csv')
+    args = parser.parse_args()
+
+    df = write_market_data(args.output, args.symbols, args.days, args.seed)
+    print(f"✅ Wrote {len(df)} rows for {args.symbols} symbols x {args.days} days to {args.output}")
@@ -0,0 +1,105 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from indicator_engine import compute_indicators
+
+# -----------------------------
+# Bar timeframes
+# -----------------------------
+TIMEFRAMES = ("daily", "weekly", "monthly")
+RESAMPLED = ("weekly", "monthly")
+
+# NEPSE trades Sunday to Thursday. Day 0 (1970-01-01) was a Thursday, so (day + 4) % 7 is 0 on Sundays.
+WEEK_OFFSET = 4
+
+
+def period_starts(days, timeframe):
+    """First calendar day (day number) of the NEPSE week (from Sunday) or month each day number falls in."""
+    days = np.asarray(days, dtype=np.int64)
+    if timeframe == "weekly":
+        return days - (days + WEEK_OFFSET) % 7
+    if timeframe == "monthly":
+        return days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    raise ValueError(f"Unknown timeframe {timeframe!r}; choose from {', '.join(RESAMPLED)}")
+
+
+def timeframe_path(processed_path, timeframe):
+    """Where the bars of a timeframe are stored next to the processed daily CSV."""
+    path = Path(processed_path)
+    return path if timeframe == "daily" else path.with_name(f"{path.stem}_{timeframe}{path.suffix}")
+
+
+def resample_bars(df, timeframe):
+    """
+    OHLCV bars per symbol and week or month, in one groupby over the daily rows.
+
+    A bar is dated by its last trading day, so the current week or month is a
+    partial bar as of the latest data. vwap is the volume-weighted mean of the
+    daily vwap, diff % the change from the previous bar's close, and days the
+    number of trading days in the bar.
+
+    Args:
+        df: Daily rows sorted by symbol and date (tradedate as 'YYYY-MM-DD')
+        timeframe: "weekly" or "monthly"
+
+    Returns:
+        DataFrame of bars sorted by symbol and date, with the daily file's column names
+    """
+    days = pd.to_datetime(df['tradedate']).to_numpy(dtype='datetime64[D]').astype(np.int64)
+    period = period_starts(days, timeframe)
+    frame = pd.DataFrame({
+        'symbol': df['symbol'].to_numpy(), 'period': period, 'tradedate': df['tradedate'].to_numpy(),
+        'open': df['open'].to_numpy(), 'high': df['high'].to_numpy(), 'low': df['low'].to_numpy(),
+        'close': df['close'].to_numpy(), 'vol': df['vol'].to_numpy(), 'turnover': df['turnover'].to_numpy(),
+        'vwap_volume': (df['vwap'] * df['vol']).to_numpy(),
+    })
+    bars = frame.groupby(['symbol', 'period'], sort=True, observed=True).agg(
+        tradedate=('tradedate', 'last'), days=('close', 'size'), open=('open', 'first'), high=('high', 'max'),
+        low=('low', 'min'), close=('close', 'last'), vol=('vol', 'sum'), turnover=('turnover', 'sum'),
+        vwap_volume=('vwap_volume', 'sum'),
+    ).reset_index()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bars['vwap'] = np.where(bars['vol'] > 0, bars['vwap_volume'] / bars['vol'], np.nan).round(2)
+    bars['diff %'] = (bars.groupby('symbol', observed=True)['close'].pct_change(fill_method=None) * 100).round(2)
+    return bars[['symbol', 'tradedate', 'days', 'open', 'high', 'low', 'close', 'vwap', 'vol', 'turnover', 'diff %']]
+
+
+def calculate_timeframes(df, processed_path, timeframes=RESAMPLED, indicators=None, rsi_method='wilder'):
+    """
+    Weekly and monthly bars with indicators, written next to the processed daily CSV.
+
+    The indicator engine runs on the bars as it does on days, so on weekly
+    bars MA20 is the 20-week average, RSI the 14-week RSI, and so on.
+
+    Args:
+        df: Processed daily rows (from calculate_indicators)
+        processed_path: The processed daily CSV; bars go to timeframe_path(processed_path, timeframe)
+        timeframes: Timeframes to build
+        indicators: Names from indicator_engine.INDICATORS (default: all)
+        rsi_method: RSI smoothing, 'wilder' or 'sma'
+
+    Returns:
+        {timeframe: DataFrame}
+    """
+    df = df.sort_values(by=['symbol', 'tradedate'])
+    results = {}
+    for timeframe in timeframes:
+        bars = resample_bars(df, timeframe)
+        values = compute_indicators(bars, indicators, rsi_method=rsi_method)
+        bars[values.columns] = values
+
+        path = timeframe_path(processed_path, timeframe)
+        tmp_path = f'{path}.tmp'
+        bars.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        print(f'✅ {len(bars)} {timeframe} bars written to {path}')
+        results[timeframe] = bars
+    return results
+
+
+if __name__ == '__main__':
+    processed = Path(__file__).parent.parent / 'data/processed/stock_data_with_indicators.csv'
+    calculate_timeframes(pd.read_csv(processed), processed)
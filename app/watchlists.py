@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dataset import exact_float64, format_day, to_float
+
+WATCHLIST_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+MAX_SYMBOLS = 200
+
+# Latest-day columns carried into a watchlist summary (those missing from older processed files are skipped)
+SNAPSHOT_COLUMNS = ['tradedate', 'sector', 'close', 'diff %', 'vol', 'RSI', 'MA20', 'MA50', 'MACD_Hist',
+                    'SUPERTREND_DIR', 'RS_MARKET_20']
+
+
+# -----------------------------
+# Storage
+# -----------------------------
+class WatchlistStore:
+    """Watchlists (id -> ordered symbols) kept in memory and persisted to one JSON file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.lists = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.lists = json.load(f)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.lists, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get(self, watchlist_id):
+        return self.lists.get(watchlist_id)
+
+    def put(self, watchlist_id, symbols):
+        """Store a watchlist (symbols upper-cased, duplicates dropped) and return it."""
+        if not WATCHLIST_ID.match(watchlist_id):
+            raise ValueError("Watchlist id must be 1-64 letters, digits, '_', '-' or '.'")
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        if len(symbols) > MAX_SYMBOLS:
+            raise ValueError(f"A watchlist holds at most {MAX_SYMBOLS} symbols")
+        with self.lock:
+            self.lists[watchlist_id] = symbols
+            self._save()
+        return symbols
+
+    def delete(self, watchlist_id):
+        with self.lock:
+            if self.lists.pop(watchlist_id, None) is None:
+                return False
+            self._save()
+        return True
+
+
+# -----------------------------
+# Latest snapshot and fast-path signals
+# -----------------------------
+def rule_signals(frame):
+    """
+    Rule-based BUY/SELL/HOLD zones from the latest indicators, for all rows at once.
+
+    Each available rule votes +1/-1: RSI below 30 / above 70, MACD histogram
+    sign, close vs MA20, MA20 vs MA50 and the Supertrend direction. The score is
+    the mean vote; >= 0.5 is BUY, <= -0.5 is SELL.
+
+    Returns:
+        (score array, zone array)
+    """
+    def vote(bullish, bearish, known):
+        return np.where(known, np.where(bullish, 1.0, np.where(bearish, -1.0, 0.0)), np.nan)
+
+    rsi = frame['RSI'].to_numpy(dtype=float)
+    votes = [vote(rsi < 30, rsi > 70, ~np.isnan(rsi) & ((rsi < 30) | (rsi > 70)))]
+    for a, b in (('close', 'MA20'), ('MA20', 'MA50')):
+        x, y = frame[a].to_numpy(dtype=float), frame[b].to_numpy(dtype=float)
+        votes.append(vote(x > y, x < y, ~np.isnan(x - y)))
+    for column in ('MACD_Hist', 'SUPERTREND_DIR'):
+        if column in frame:
+            x = frame[column].to_numpy(dtype=float)
+            votes.append(vote(x > 0, x < 0, ~np.isnan(x)))
+    votes = np.vstack(votes)
+    counted = (~np.isnan(votes)).sum(axis=0)
+    score = np.divide(np.nansum(votes, axis=0), counted, out=np.zeros(len(frame)), where=counted > 0)
+    zone = np.where(score >= 0.5, "BUY", np.where(score <= -0.5, "SELL", "HOLD"))
+    return score, zone
+
+
+class Snapshot:
+    """Latest row of every symbol for one data version, indexed by symbol, with fast-path signals."""
+
+    def __init__(self, df, version):
+        self.version = version
+        latest = df.sort_values(['symbol', 'tradedate']).drop_duplicates('symbol', keep='last').set_index('symbol')
+        latest.index = latest.index.astype(str)
+        frame = latest[[c for c in SNAPSHOT_COLUMNS if c in latest.columns]].copy()
+        # float32 prices and changes as their CSV decimals, so portfolio averages match the float64 data
+        for column in frame.columns[frame.dtypes == np.float32]:
+            frame[column] = exact_float64(frame[column])
+        frame['signal_score'], frame['signal'] = rule_signals(frame)
+        self.frame = frame
+
+
+def _clean(value):
+    if isinstance(value, (float, np.floating)):
+        return to_float(value, 2)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def summarize(snapshot, symbols, recommendations=None, pending=()):
+    """
+    Latest indicators, signals and portfolio aggregates for a watchlist.
+
+    Args:
+        snapshot: Snapshot of the current data
+        symbols: Watchlist symbols
+        recommendations: {symbol: Recommendation} from LLM analyses of this data version
+        pending: Symbols with an LLM analysis queued or running
+
+    Returns:
+        JSON-ready dict with "holdings" and "portfolio"
+    """
+    recommendations = recommendations or {}
+    rows = snapshot.frame.reindex(symbols)
+    known = rows['close'].notna().to_numpy()
+    rows = rows[known]
+
+    # An LLM recommendation for this data version overrides the rule-based zone
+    signal = rows['signal'].to_numpy(dtype=object)
+    source = np.full(len(rows), "rules", dtype=object)
+    confidence = np.full(len(rows), None, dtype=object)
+    for i, symbol in enumerate(rows.index):
+        rec = recommendations.get(symbol)
+        if rec is not None:
+            signal[i], source[i], confidence[i] = rec.action, "llm", rec.confidence
+    pending = set(pending)
+
+    columns = {'close': 'close', 'diff %': 'change_percent', 'vol': 'volume', 'RSI': 'rsi', 'MA20': 'ma20',
+               'MA50': 'ma50', 'MACD_Hist': 'macd_histogram', 'RS_MARKET_20': 'rs_vs_market_20d',
+               'signal_score': 'signal_score'}
+    columns = {k: v for k, v in columns.items() if k in rows.columns}
+    values = {name: rows[column].to_numpy() for column, name in columns.items()}
+    has_sector = 'sector' in rows.columns
+    holdings = []
+    for i, symbol in enumerate(rows.index):
+        holding = {"symbol": symbol}
+        if has_sector:
+            holding["sector"] = rows['sector'].iat[i]
+        holding.update({name: _clean(v[i]) for name, v in values.items()})
+        holding.update({"signal": signal[i], "signal_source": source[i], "confidence": confidence[i],
+                        "analysis_pending": symbol in pending})
+        holdings.append(holding)
+
+    zones = pd.Series(signal, dtype=object).value_counts()
+    portfolio = {
+        "holdings": len(rows),
+        "average_rsi": _clean(rows['RSI'].mean()),
+        "average_change_percent": _clean(rows['diff %'].mean()) if 'diff %' in rows else None,
+        "advancing": int((rows['diff %'] > 0).sum()) if 'diff %' in rows else None,
+        "zones": {zone: int(zones.get(zone, 0)) for zone in ("BUY", "HOLD", "SELL")},
+        "llm_signals": int((source == "llm").sum()),
+    }
+    if has_sector:
+        # Equal-weighted: each holding counts once
+        exposure = rows['sector'].value_counts(normalize=True) * 100
+        portfolio["sector_exposure_percent"] = {sector: round(float(p), 1) for sector, p in exposure.items()}
+    return {
+        "date": format_day(rows['tradedate'].max()) if len(rows) else None,
+        "portfolio": portfolio,
+        "holdings": holdings,
+        "unknown_symbols": [s for s, ok in zip(symbols, known) if not ok],
+    }
+
+
+# -----------------------------
+# LLM recommendations
+# -----------------------------
+class Recommendations:
+    """
+    Latest structured LLM recommendation per symbol, with the data version it
+    was computed on; a newer data version makes it stale.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = {}  # symbol -> (version, Recommendation)
+
+    def record(self, version, symbol, recommendation):
+        with self.lock:
+            self.results[symbol] = (version, recommendation)
+
+    def current(self, version, symbols):
+        """{symbol: Recommendation} for symbols analyzed on this data version."""
+        with self.lock:
+            found = {s: self.results.get(s) for s in symbols}
+        return {s: entry[1] for s, entry in found.items() if entry is not None and entry[0] == version}
@@ -0,0 +1,58 @@
+import ipaddress
+import os
+import socket
+from urllib.parse import urlsplit
+
+import requests
+
+# -----------------------------
+# Webhook settings
+# -----------------------------
+# Hosts webhooks may be sent to, comma-separated (e.g. "hooks.example.com,10.0.0.5"). When set, only these hosts
+# are allowed, wherever they point; when empty, any host that resolves only to public addresses is.
+ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()}
+TIMEOUT = 10
+
+
+def check_url(url, allowed_hosts=None):
+    """
+    url if webhooks may be sent to it, otherwise ValueError.
+
+    It must be http(s). Without an allowlist every address its host resolves
+    to must be public: loopback, private, link-local (cloud metadata),
+    shared and reserved ranges are refused, so a webhook can't be aimed at
+    the server itself or its network.
+    """
+    allowed_hosts = ALLOWED_HOSTS if allowed_hosts is None else allowed_hosts
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise ValueError("webhook_url is not a valid URL") from None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f"webhook_url host {host} is not in WEBHOOK_ALLOWED_HOSTS")
+        return url
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"webhook_url host {host} does not resolve") from None
+    for address in addresses:
+        if not ipaddress.ip_address(address.split("%", 1)[0]).is_global:
+            raise ValueError(f"webhook_url host {host} resolves to a non-public address ({address})")
+    return url
+
+
+def post(url, payload):
+    """
+    POST payload as JSON to a webhook; returns the response.
+
+    The URL is checked again at delivery (DNS may have changed since it was
+    accepted) and redirects are not followed. Raises ValueError when the URL
+    is refused and requests.RequestException when the request fails.
+    """
+    check_url(url)
+    return requests.post(url, json=payload, timeout=TIMEOUT, allow_redirects=False)
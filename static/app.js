@@ -2,9 +2,15 @@
 // const API_URL = 'http://localhost:8000';
 const API_URL = window.location.origin;
 
+// Symbols and latest rows written by the data pipeline, and the last-resort CSV
+const MANIFEST_URL = '/static/manifest.json';
+const CSV_URL = 'data/processed/stock_data_with_indicators.csv';
+const CSV_WORKER_URL = '/static/csv-worker.js';
+
 // State
 let currentStock = null;
 let apiStatus = null;
+let manifest = null;
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
@@ -60,62 +66,45 @@ function updateStatusIndicator(online, botInitialized) {
 }
 
 // Load stocks
+// First paint comes from the static manifest (a few KB: symbols plus each one's
+// latest row), written by the data pipeline; the API's list replaces it when it
+// answers. Without either, the processed CSV is parsed in a Web Worker so the
+// page stays responsive.
 async function loadStocks() {
     const select = document.getElementById('stock-select');
     if (!select) return;
     select.innerHTML = '<option value="">Loading stocks...</option>';
 
+    let listedFromApi = false;
+    const manifestLoad = loadManifest().then(loaded => {
+        if (loaded && !listedFromApi) fillStockOptions(loaded.symbols);
+        return loaded;
+    });
+
     // First try the API
     try {
         const response = await fetch(`${API_URL}/stocks`);
         if (response.ok) {
             const data = await response.json();
             if (data && Array.isArray(data.symbols) && data.symbols.length) {
-                select.innerHTML = '<option value="">Select a stock...</option>';
-                data.symbols.forEach(stock => {
-                    const option = document.createElement('option');
-                    option.value = stock;
-                    option.textContent = stock;
-                    select.appendChild(option);
-                });
+                listedFromApi = true;
+                fillStockOptions(data.symbols);
                 return;
             }
         }
     } catch (err) {
-        console.warn('API /stocks fetch failed, will try local CSV fallback:', err);
+        console.warn('API /stocks fetch failed, falling back to the static manifest:', err);
     }
 
-    // Fallback: try loading local CSV (useful when API isn't running)
-    try {
-        const csvResp = await fetch('data/processed/stock_data_with_indicators.csv');
-        if (!csvResp.ok) throw new Error('CSV not found');
-        const text = await csvResp.text();
-        const lines = text.split(/\r?\n/).filter(Boolean);
-        if (lines.length < 2) throw new Error('CSV empty');
-
-        const header = lines[0].split(',').map(h => h.trim().toLowerCase());
-        const symbolIdx = header.indexOf('symbol');
-        if (symbolIdx === -1) throw new Error('symbol column not found in CSV');
-
-        const set = new Set();
-        const input = document.getElementById('stock-select');
-        const datalist = document.getElementById('stock-options');
-        
-        for (let i = 1; i < lines.length; i++) {
-            const cols = lines[i].split(',');
-            const sym = (cols[symbolIdx] || '').trim();
-            if (sym) set.add(sym.toUpperCase());
-        }
+    // Offline fallback: the manifest already filled the list
+    if (await manifestLoad) return;
 
-        const symbols = Array.from(set).sort();
-        if (symbols.length) {
-            input.placeholder = "Type or select a stock...";
-            datalist.innerHTML = ''; // Clear any existing options
-            symbols.forEach(stock => {
-                const option = document.createElement('option');
-                option.value = stock;
-                datalist.appendChild(option);
-            });
+    // Last resort: parse the local CSV off the main thread (useful when neither is served)
+    try {
+        const parsed = await parseCsvInWorker(CSV_URL);
+        if (parsed.symbols.length) {
+            manifest = parsed;
+            fillStockOptions(parsed.symbols);
             return;
         }
     } catch (err) {
@@ -123,11 +112,76 @@ async function loadStocks() {
     }
 
     // If we reached here nothing worked
-    input.placeholder = "No stocks available";
-    datalist.innerHTML = ''; // Clear any existing options
+    select.innerHTML = '<option value="">No stocks available</option>';
     showError('Failed to load stock list. Start the API or ensure data CSV exists.');
 }
 
+// Fetch the static manifest and index it by symbol
+async function loadManifest() {
+    try {
+        const response = await fetch(MANIFEST_URL);
+        if (!response.ok) return null;
+        const data = await response.json();
+        data.index = new Map(data.symbols.map((symbol, i) => [symbol, i]));
+        manifest = data;
+        return data;
+    } catch (err) {
+        console.warn('Static manifest unavailable:', err);
+        return null;
+    }
+}
+
+// A symbol's latest row from the manifest, shaped like the /stocks/{symbol} response
+function manifestRow(symbol) {
+    if (!manifest || !manifest.index.has(symbol)) return null;
+    const i = manifest.index.get(symbol);
+    const row = { symbol };
+    for (const [field, values] of Object.entries(manifest.latest)) {
+        row[field] = values[i];
+    }
+    return row;
+}
+
+// Parse the processed CSV in a Web Worker; resolves to a manifest-shaped object
+function parseCsvInWorker(url) {
+    return new Promise((resolve, reject) => {
+        const worker = new Worker(CSV_WORKER_URL);
+        worker.onmessage = (event) => {
+            worker.terminate();
+            if (event.data.error) {
+                reject(new Error(event.data.error));
+                return;
+            }
+            const data = event.data;
+            data.index = new Map(data.symbols.map((symbol, i) => [symbol, i]));
+            resolve(data);
+        };
+        worker.onerror = (event) => {
+            worker.terminate();
+            reject(new Error(event.message));
+        };
+        worker.postMessage({ url: new URL(url, window.location.href).href });
+    });
+}
+
+// Replace the stock options, keeping the current selection
+function fillStockOptions(symbols) {
+    const select = document.getElementById('stock-select');
+    const fragment = document.createDocumentFragment();
+    const placeholder = document.createElement('option');
+    placeholder.value = '';
+    placeholder.textContent = 'Select a stock...';
+    fragment.appendChild(placeholder);
+    symbols.forEach(stock => {
+        const option = document.createElement('option');
+        option.value = stock;
+        option.textContent = stock;
+        fragment.appendChild(option);
+    });
+    select.replaceChildren(fragment);
+    if (currentStock) select.value = currentStock;
+}
+
 // Setup event listeners
 function setupEventListeners() {
     const stockSelect = document.getElementById('stock-select');
@@ -151,8 +205,12 @@ function setupEventListeners() {
 
 // Load stock info
 async function loadStockInfo(symbol) {
+    // Paint the manifest's snapshot at once; the API's answer replaces it
+    const snapshot = manifestRow(symbol);
+    if (snapshot && Object.values(snapshot).every(value => value !== null)) displayStockMetrics(snapshot);
     try {
         const response = await fetch(`${API_URL}/stocks/${symbol}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
         const data = await response.json();
         
         displayStockMetrics(data);
@@ -266,40 +324,52 @@ function displayResults(indicators, analysis) {
     displayAnalysis(analysis);
 }
 
+// A number with 2 decimals, or n/a when the API had none (null, or a group of indicators the data lacks)
+function fmt(value, prefix = '', suffix = '') {
+    return value == null ? 'n/a' : `${prefix}${value.toFixed(2)}${suffix}`;
+}
+
 // Display indicators
 function displayIndicators(indicators) {
+    const averages = indicators.moving_averages || {};
+    const momentum = indicators.momentum || {};
+    const bands = indicators.bollinger_bands || {};
+
     // Moving Averages & Price
-    document.getElementById('ind-ma20').textContent = `Rs. ${indicators.moving_averages.ma20.toFixed(2)}`;
-    document.getElementById('ind-ma50').textContent = `Rs. ${indicators.moving_averages.ma50.toFixed(2)}`;
-    document.getElementById('ind-close').textContent = `Rs. ${indicators.price.close.toFixed(2)}`;
-    document.getElementById('ind-vwap').textContent = `Rs. ${indicators.price.vwap.toFixed(2)}`;
-    document.getElementById('ind-change').textContent = `${indicators.change_percent.toFixed(2)}%`;
+    document.getElementById('ind-ma20').textContent = fmt(averages.ma20, 'Rs. ');
+    document.getElementById('ind-ma50').textContent = fmt(averages.ma50, 'Rs. ');
+    document.getElementById('ind-close').textContent = fmt(indicators.price.close, 'Rs. ');
+    document.getElementById('ind-vwap').textContent = fmt(indicators.price.vwap, 'Rs. ');
+    document.getElementById('ind-change').textContent = fmt(indicators.change_percent, '', '%');
     
     // Momentum
-    const rsi = indicators.momentum.rsi;
+    const rsi = momentum.rsi;
     let rsiSignal = ' Neutral';
     if (rsi > 70) rsiSignal = ' Overbought';
     else if (rsi < 30) rsiSignal = ' Oversold';
     
-    document.getElementById('ind-rsi').textContent = `${rsi.toFixed(2)} (${rsiSignal})`;
-    document.getElementById('ind-macd').textContent = indicators.momentum.macd.toFixed(2);
-    document.getElementById('ind-signal').textContent = indicators.momentum.macd_signal.toFixed(2);
+    document.getElementById('ind-rsi').textContent = rsi == null ? 'n/a' : `${rsi.toFixed(2)} (${rsiSignal})`;
+    document.getElementById('ind-macd').textContent = fmt(momentum.macd);
+    document.getElementById('ind-signal').textContent = fmt(momentum.macd_signal);
     
-    const macdHist = indicators.momentum.macd - indicators.momentum.macd_signal;
-    const macdTrend = macdHist > 0 ? ' Bullish' : ' Bearish';
+    let macdTrend = 'n/a';
+    if (momentum.macd != null && momentum.macd_signal != null) {
+        macdTrend = momentum.macd - momentum.macd_signal > 0 ? ' Bullish' : ' Bearish';
+    }
     document.getElementById('ind-trend').textContent = macdTrend;
     
     // Bollinger Bands
-    document.getElementById('ind-bb-upper').textContent = `Rs. ${indicators.bollinger_bands.upper.toFixed(2)}`;
-    document.getElementById('ind-bb-middle').textContent = `Rs. ${indicators.bollinger_bands.middle.toFixed(2)}`;
-    document.getElementById('ind-bb-lower').textContent = `Rs. ${indicators.bollinger_bands.lower.toFixed(2)}`;
+    document.getElementById('ind-bb-upper').textContent = fmt(bands.upper, 'Rs. ');
+    document.getElementById('ind-bb-middle').textContent = fmt(bands.middle, 'Rs. ');
+    document.getElementById('ind-bb-lower').textContent = fmt(bands.lower, 'Rs. ');
     
     const close = indicators.price.close;
-    const bbUpper = indicators.bollinger_bands.upper;
-    const bbLower = indicators.bollinger_bands.lower;
+    const bbUpper = bands.upper;
+    const bbLower = bands.lower;
     
     let bbPos = ' Within Bands (Normal)';
-    if (close > bbUpper) bbPos = ' Above Upper (Overbought)';
+    if (close == null || bbUpper == null || bbLower == null) bbPos = 'n/a';
+    else if (close > bbUpper) bbPos = ' Above Upper (Overbought)';
     else if (close < bbLower) bbPos = ' Below Lower (Oversold)';
     
     document.getElementById('ind-bb-pos').textContent = bbPos;
@@ -0,0 +1,73 @@
+// Parses the processed CSV off the main thread (app.js's last-resort fallback).
+// Streams the file and keeps only each symbol's latest row, then posts back an
+// object shaped like /static/manifest.json: { symbols, latest: { field: [...] } }.
+
+// CSV column -> manifest field (as in the /stocks/{symbol} response)
+const FIELDS = {
+    'close': 'close',
+    'diff %': 'diff_percent',
+    'vol': 'volume',
+    'rsi': 'rsi',
+    'ma20': 'ma20',
+    'ma50': 'ma50',
+    '52 weeks high': 'week_52_high',
+};
+
+function toNumber(text) {
+    const value = parseFloat(text);
+    return Number.isFinite(value) ? value : null;
+}
+
+self.onmessage = async (event) => {
+    try {
+        const response = await fetch(event.data.url);
+        if (!response.ok) throw new Error(`CSV not found (HTTP ${response.status})`);
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const latest = new Map();  // symbol -> [tradedate, columns]
+        let header = null;
+        let columns = null;
+        let pending = '';
+
+        const handleLine = (line) => {
+            if (!line) return;
+            const cols = line.split(',');
+            if (header === null) {
+                header = cols.map(h => h.trim().toLowerCase());
+                if (!header.includes('symbol')) throw new Error('symbol column not found in CSV');
+                columns = {
+                    symbol: header.indexOf('symbol'),
+                    tradedate: header.indexOf('tradedate'),
+                    fields: Object.entries(FIELDS).map(([column, field]) => [header.indexOf(column), field]),
+                };
+                return;
+            }
+            const symbol = (cols[columns.symbol] || '').trim().toUpperCase();
+            if (!symbol) return;
+            const date = cols[columns.tradedate] || '';
+            const seen = latest.get(symbol);
+            // ISO dates compare correctly as strings
+            if (!seen || date >= seen[0]) latest.set(symbol, [date, cols]);
+        };
+
+        for (;;) {
+            const { done, value } = await reader.read();
+            pending += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = pending.split(/\r?\n/);
+            pending = done ? '' : lines.pop();
+            lines.forEach(handleLine);
+            if (done) break;
+        }
+        if (header === null) throw new Error('CSV empty');
+
+        const symbols = Array.from(latest.keys()).sort();
+        const result = { symbols, latest: { date: symbols.map(s => latest.get(s)[0]) } };
+        for (const [index, field] of columns.fields) {
+            result.latest[field] = symbols.map(s => (index === -1 ? null : toNumber(latest.get(s)[1][index])));
+        }
+        self.postMessage(result);
+    } catch (error) {
+        self.postMessage({ error: error.message });
+    }
+};
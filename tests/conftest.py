@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app modules import each other by name, as when run from app/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from admission import Rejected, RouteLimit, client_key, request_timeout
+
+
+def request(host, headers=()):
+    return Request({"type": "http", "method": "POST", "path": "/analyze", "client": (host, 50000),
+                    "headers": [(name.encode(), value.encode()) for name, value in headers]})
+
+
+def test_client_key_is_the_peer_address():
+    assert client_key(request("203.0.113.7")) == "203.0.113.7"
+    assert client_key(request("203.0.113.7", [("x-client-id", "someone-else")])) == "203.0.113.7"
+
+
+def test_rotating_client_ids_share_one_bucket():
+    limit = RouteLimit("/analyze", concurrency=10, queue=10, service_seconds=0.01, rate=0.01, burst=3)
+
+    async def burst():
+        outcomes = []
+        for n in range(6):
+            try:
+                await limit.acquire(client_key(request("203.0.113.7", [("x-client-id", f"id-{n}")])), timeout=30)
+                limit.release()
+                outcomes.append("ok")
+            except Rejected as rejected:
+                outcomes.append(rejected.reason)
+        return outcomes
+
+    assert asyncio.run(burst()) == ["ok"] * 3 + ["rate_limited"] * 3
+    assert asyncio.run(limit.acquire(client_key(request("198.51.100.2")), timeout=30)) is None
+
+
+@pytest.mark.parametrize("header, expected", [("2.5", 2.5), ("nan", 30.0), ("-1", 30.0), ("soon", 30.0)])
+def test_request_timeout(header, expected):
+    assert request_timeout({"x-request-timeout": header}) == expected
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from alerts import validate_rule
+from synthetic_data import write_market_data
+
+RULE = {"owner": "alice", "left": "RSI", "op": "crosses_below", "right": 30}
+
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1:9000/hook", "http://169.254.169.254/latest/meta-data/",
+                                 "http://192.168.0.10/hook", "gopher://example.com/"])
+def test_rule_with_internal_webhook_is_refused(url):
+    with pytest.raises(ValueError, match="webhook_url"):
+        validate_rule(RULE | {"webhook_url": url})
+
+
+def test_rule_without_webhook():
+    assert validate_rule(RULE)["webhook_url"] is None
+
+
+@pytest.fixture
+def api(tmp_path):
+    api = pytest.importorskip("api")
+    saved = api.DATA_FILE, api.JOB_DB, api.ALERT_RULES_FILE
+    api.JOB_DB = tmp_path / "jobs.sqlite3"
+    api.ALERT_RULES_FILE = tmp_path / "alert_rules.json"
+    api.alert_engine = api.stock_data = api.stock_data_version = None
+    yield api
+    api.DATA_FILE, api.JOB_DB, api.ALERT_RULES_FILE = saved
+    api.alert_engine = api.stock_data = api.stock_data_version = None
+
+
+def processed(tmp_path):
+    """A processed-data file (prices only: enough to load and evaluate price rules)."""
+    path = tmp_path / "stock_data_with_indicators.csv"
+    write_market_data(path, n_symbols=5, n_days=30)
+    return path
+
+
+def test_server_start_arms_alert_engine(api, tmp_path):
+    api.DATA_FILE = processed(tmp_path)
+    with TestClient(api.app):
+        assert api.alert_engine is not None and api.stock_data is not None
+        assert api.job_queue is not None and api.job_queue.threads
+    assert api.job_queue is None
+
+
+def test_concurrent_reloads_load_and_evaluate_once(api, tmp_path, monkeypatch):
+    api.DATA_FILE = processed(tmp_path)
+    loads, evaluations = [], []
+    load = api.load_stock_data
+
+    def slow_load(path):
+        loads.append(path)
+        time.sleep(0.1)
+        return load(path)
+
+    class Engine:
+        def evaluate(self, frame):
+            evaluations.append(len(frame))
+            return []
+
+    monkeypatch.setattr(api, "load_stock_data", slow_load)
+    api.get_stock_data()
+    api.alert_engine = Engine()
+    os.utime(api.DATA_FILE, ns=(time.time_ns(), time.time_ns() + 10 ** 9))  # a new data version
+    threads = [threading.Thread(target=api.get_stock_data) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 2 and len(evaluations) == 1
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+from fastapi.testclient import TestClient
+
+from calculate_indicators import add_cross_sectional_features
+from dataset import load_stock_data
+from indicator_engine import compute_indicators
+from synthetic_data import generate_market_data
+
+
+@pytest.fixture(scope="module")
+def processed_csv(tmp_path_factory):
+    df = generate_market_data(n_symbols=120, n_days=160, seed=7).sort_values(["symbol", "tradedate"], ignore_index=True)
+    values = compute_indicators(df)
+    df[values.columns] = values
+    path = tmp_path_factory.mktemp("data") / "stock_data_with_indicators.csv"
+    add_cross_sectional_features(df).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope="module")
+def api(processed_csv, tmp_path_factory):
+    api = pytest.importorskip("api")
+    work = tmp_path_factory.mktemp("api")
+    api.DATA_FILE = processed_csv
+    api.JOB_DB = work / "jobs.sqlite3"
+    api.WATCHLIST_FILE = work / "watchlists.json"
+    api.watchlists = None
+    yield api
+    if api.job_queue is not None:
+        api.job_queue.stop()
+        api.job_queue = None
+    api.stock_data = api.snapshot = None
+
+
+def responses(api, client, df, symbols):
+    api.stock_data, api.stock_data_version = df, api.snapshot_version(api.DATA_FILE.stat())
+    api.response_cache.version = api.snapshot = None
+    urls = ["/stocks", "/sectors", "/watchlist/compact/summary"]
+    urls += [f"/stocks/{s}{suffix}" for s in symbols for suffix in ("", "/indicators")]
+    return {url: client.get(url).json() for url in urls}
+
+
+def differences(where, expected, got):
+    """Paths where got differs from expected: exactly, except floats that aren't cent-rounded (7 digits)."""
+    if isinstance(expected, dict):
+        assert expected.keys() == got.keys(), where
+        return [d for key in expected for d in differences(f"{where}.{key}", expected[key], got[key])]
+    if isinstance(expected, list):
+        assert len(expected) == len(got), where
+        return [d for i, (a, b) in enumerate(zip(expected, got)) for d in differences(f"{where}[{i}]", a, b)]
+    if isinstance(expected, float) and isinstance(got, float) and not where.startswith(("/sectors", "/watchlist")):
+        return [] if math.isclose(expected, got, rel_tol=1e-6, abs_tol=1e-9) else [(where, expected, got)]
+    return [] if expected == got else [(where, expected, got)]
+
+
+def test_compact_frame_serves_the_float64_responses(api, processed_csv):
+    compact, full = load_stock_data(processed_csv), load_stock_data(processed_csv, compact=False)
+    assert "float32" in compact.dtypes.astype(str).tolist()
+    symbols = compact["symbol"].cat.categories.tolist()
+    client = TestClient(api.app)
+    assert client.put("/watchlist/compact", json={"symbols": symbols[:200]}).status_code == 200
+
+    expected = responses(api, client, full, symbols[::10])
+    got = responses(api, client, compact, symbols[::10])
+    # /sectors and /watchlist round to cents: those must match exactly, not within a cent
+    assert [d for url in expected for d in differences(url, expected[url], got[url])] == []
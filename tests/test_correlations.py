@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlations import RollingCorrelation, daily_returns, track_correlations
+from dataset import load_stock_data
+from synthetic_data import generate_market_data
+
+WINDOW = 20
+
+
+@pytest.fixture
+def df(tmp_path):
+    """Six symbols over 80 days, plus TWIN: SYN0000's closes scaled by 3."""
+    df = generate_market_data(n_symbols=6, n_days=80, seed=5)
+    twin = df[df["symbol"] == "SYN0000"].assign(symbol="TWIN")
+    twin["close"] *= 3
+    df = pd.concat([df, twin]).sort_values(["symbol", "tradedate"], ignore_index=True)
+    df.to_csv(tmp_path / "processed.csv", index=False)
+    return load_stock_data(tmp_path / "processed.csv", compact=False)
+
+
+def test_rolling_correlation_matches_pandas(df):
+    days, symbols, returns, listed, _ = daily_returns(df)
+    tracker = RollingCorrelation(symbols, WINDOW).fit(days, returns, listed)
+    expected = pd.DataFrame(returns[-WINDOW:].astype(np.float64)).corr().to_numpy()
+    np.testing.assert_allclose(tracker.correlation(), expected, atol=1e-5)
+    assert tracker.pairs(1)[0][:2] == ("SYN0000", "TWIN")
+    top, _ = tracker.peers("TWIN", k=1)
+    assert top[0][0] == "SYN0000" and top[0][1] == pytest.approx(1, abs=1e-5)
+
+
+def test_appended_days_update_incrementally(df):
+    last = np.sort(df["tradedate"].unique())[-3]
+    tracker, applied = track_correlations(df[df["tradedate"] <= last].reset_index(drop=True), WINDOW)
+    assert applied is None
+    tracker, applied = track_correlations(df, WINDOW, tracker=tracker)
+    assert applied == 2
+    np.testing.assert_allclose(tracker.correlation(), track_correlations(df, WINDOW)[0].correlation(), atol=1e-5)
+
+
+def test_revised_history_rebuilds(df):
+    days = np.sort(df["tradedate"].unique())
+    tracker, _ = track_correlations(df[df["tradedate"] <= days[-2]].reset_index(drop=True), WINDOW)
+    revised = df.copy()
+    corrected = (revised["symbol"] == "SYN0001") & (revised["tradedate"] == days[-6])
+    assert corrected.sum() == 1
+    revised.loc[corrected, "close"] *= 1.5  # a corrected close inside the window the tracker has seen
+    tracker, applied = track_correlations(revised, WINDOW, tracker=tracker)
+    assert applied is None
+    np.testing.assert_allclose(tracker.correlation(), track_correlations(revised, WINDOW)[0].correlation(), atol=1e-5)
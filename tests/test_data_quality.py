@@ -0,0 +1,71 @@
+import json
+
+import pandas as pd
+import pytest
+
+from data_quality import CHECKS, validate_prices, validation_paths, write_validation
+from synthetic_data import generate_market_data
+
+
+@pytest.fixture
+def raw():
+    return generate_market_data(n_symbols=8, n_days=30, seed=4)
+
+
+def row(df, symbol, date):
+    return df.index[(df["symbol"] == symbol) & (df["tradedate"] == date)][0]
+
+
+def test_clean_batch_passes(raw):
+    clean, quarantined, report = validate_prices(raw.sample(frac=1, random_state=0))
+    assert len(clean) == len(raw) and quarantined.empty
+    assert clean[["symbol", "tradedate"]].equals(raw.sort_values(["symbol", "tradedate"])[["symbol", "tradedate"]]
+                                                .reset_index(drop=True))
+    assert report["gaps"]["count"] == report["prev_close_mismatches"]["count"] == 0
+    assert report["sessions"] == 30 and report["quarantined"] == dict.fromkeys(CHECKS, 0)
+
+
+def test_each_fault_is_quarantined_with_its_reason(raw):
+    dates = sorted(raw["tradedate"].unique())
+    df = raw.copy()
+    df["close"] = df["close"].astype(object)
+    df.loc[row(df, "SYN0000", dates[5]), "close"] = "n/a"
+    df.loc[row(df, "SYN0002", dates[5]), ["high", "low"]] = [100.0, 200.0]
+    df.loc[row(df, "SYN0003", dates[5]), "vol"] = 0
+    breach = row(df, "SYN0004", dates[5])
+    df.loc[breach, "close"] = df.loc[breach, "prev. close"] * 1.2
+    friday = df.loc[row(df, "SYN0005", dates[-1])].copy()
+    friday["tradedate"] = "2025-10-31"
+    assert pd.Timestamp("2025-10-31").day_name() == "Friday"
+    stale = df.loc[row(df, "SYN0006", dates[-2])].copy()
+    stale["tradedate"] = dates[-1]
+    df = df.drop(row(df, "SYN0006", dates[-1]))  # replaced by a repeat of the day before
+    duplicate = df.loc[row(df, "SYN0001", dates[5])].copy()
+    df = pd.concat([df, pd.DataFrame([friday, stale, duplicate])], ignore_index=True)
+
+    clean, quarantined, report = validate_prices(df)
+    reasons = {(r.symbol, r.tradedate): r.quarantine_reason for r in quarantined.itertuples()}
+    assert reasons == {("SYN0000", dates[5]): "bad_value", ("SYN0001", dates[5]): "duplicate",
+                       ("SYN0005", "2025-10-31"): "non_trading_day", ("SYN0002", dates[5]): "ohlc",
+                       ("SYN0003", dates[5]): "zero_volume", ("SYN0004", dates[5]): "circuit_breach",
+                       ("SYN0006", dates[-1]): "stale_repeat"}
+    assert report["quarantined"] == dict.fromkeys(CHECKS, 1) and len(clean) == len(df) - 7
+    assert clean["close"].dtype == float  # the text column is parsed for the clean rows
+    assert report["schema"]["dtype_drift"]["close"]["examples"] == ["n/a"]
+    # Each mid-history row quarantined leaves a one-session gap (the duplicate's original stays); SYN0006 now ends a
+    # session early
+    assert report["gaps"]["count"] == 4 and report["gaps"]["missing_sessions"] == 4
+    assert [e["symbol"] for e in report["behind_latest_session"]["examples"]] == ["SYN0006"]
+
+
+def test_missing_required_column(raw):
+    with pytest.raises(ValueError, match="prev. close"):
+        validate_prices(raw.drop(columns=["prev. close"]))
+
+
+def test_write_validation(raw, tmp_path):
+    _, quarantined, report = validate_prices(raw)
+    quarantine_path, report_path = validation_paths(tmp_path / "stock_data_with_indicators.csv")
+    write_validation(quarantined, report, quarantine_path, report_path)
+    assert quarantine_path.name == "stock_data_with_indicators_quarantine.csv"
+    assert json.loads(report_path.read_text())["clean_rows"] == len(raw)
@@ -0,0 +1,47 @@
+import os
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from http_cache import IMMUTABLE, NO_CACHE, HashedStaticFiles
+
+
+def rewrite(path, text):
+    """Write text and move the mtime on, as a later edit would."""
+    stat = path.stat() if path.exists() else None
+    path.write_text(text)
+    if stat is not None:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_changed_and_new_files_get_new_aliases(tmp_path):
+    rewrite(tmp_path / "app.js", "one")
+    static = HashedStaticFiles(directory=tmp_path)
+    client = TestClient(Starlette(routes=[Mount("/static", app=static)]))
+
+    old = static.url_for("app.js")
+    response = client.get(old)
+    assert response.text == "one" and response.headers["cache-control"] == IMMUTABLE
+
+    rewrite(tmp_path / "app.js", "two")
+    new = static.url_for("app.js")
+    assert new != old
+    assert client.get(new).text == "two"
+    assert client.get(old).status_code == 404  # never new bytes under the old immutable URL
+
+    rewrite(tmp_path / "manifest.json", "{}")  # created after startup
+    assert static.url_for("manifest.json") != "/static/manifest.json"
+    assert client.get(static.url_for("manifest.json")).headers["cache-control"] == IMMUTABLE
+    assert client.get("/static/manifest.json").headers["cache-control"] == NO_CACHE
+
+
+def test_stale_alias_is_refused_before_any_lookup(tmp_path):
+    rewrite(tmp_path / "app.js", "one")
+    static = HashedStaticFiles(directory=tmp_path)
+    client = TestClient(Starlette(routes=[Mount("/static", app=static)]))
+    old = static.url_for("app.js")
+    rewrite(tmp_path / "app.js", "two")
+    assert client.get(old).status_code == 404
+    (tmp_path / "app.js").unlink()
+    assert static.refresh() == {}
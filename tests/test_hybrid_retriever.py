@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from hybrid_retriever import HybridRetriever, LexicalIndex, reciprocal_rank_fusion, tokenize
+from indicator_engine import compute_indicators
+from rag_data_loader import frame_to_text_chunks
+from synthetic_data import generate_market_data
+
+
+@pytest.fixture(scope="module")
+def docs():
+    df = generate_market_data(n_symbols=4, n_days=40).sort_values(["symbol", "tradedate"], ignore_index=True)
+    values = compute_indicators(df, ["MA", "RSI"])
+    df[values.columns] = values
+    return frame_to_text_chunks(df, 20)
+
+
+def doc(text, symbol="AAA", end_date="2025-01-05", rsi=50.0, change=0.0):
+    return Document(page_content=text, metadata={"symbol": symbol, "end_date": end_date, "latest_rsi": rsi,
+                                                 "period_change": change})
+
+
+def test_tokenize_keeps_symbols_dates_and_decimals():
+    assert tokenize("NABIL closed at Rs. 54.21 on 2025-11-06!") == ["nabil", "closed", "at", "rs", "54.21", "on",
+                                                                    "2025-11-06"]
+
+
+def test_bm25_scores():
+    corpus = ["alpha beta", "alpha alpha gamma delta", "beta gamma"]
+    index = LexicalIndex.build([doc(text) for text in corpus])
+    avg = np.mean([2, 4, 2])
+
+    def bm25(query, text):
+        words = text.split()
+        score = 0.0
+        for term in set(query.split()):
+            n = sum(term in other.split() for other in corpus)
+            if term in words:
+                tf = words.count(term)
+                idf = math.log(1 + (3 - n + 0.5) / (n + 0.5))
+                score += idf * tf * 2.5 / (tf + 1.5 * (0.25 + 0.75 * len(words) / avg))
+        return score
+
+    scores = [bm25("alpha gamma", text) for text in corpus]
+    assert index.search("alpha gamma") == sorted(range(3), key=lambda n: -scores[n])
+    assert index.search("alpha gamma", k=1) == [1]
+    assert index.search("omega") == []
+
+
+def test_metadata_filters_and_save_load(tmp_path):
+    index = LexicalIndex.build([doc("rising", "AAA", "2025-01-05", 72.0, 4.0), doc("falling", "BBB", "2025-02-05", 25.0, -3.0),
+                                doc("rising again", "AAA", "2025-03-05", 55.0, 1.0)])
+    assert index.mask() is None
+    assert index.mask(symbol="AAA").tolist() == [True, False, True]
+    assert index.mask(symbol=["NOPE"]).tolist() == [False] * 3
+    assert index.mask(end_date_from="2025-02-01", rsi_max=60).tolist() == [False, True, True]
+    assert index.mask(period_change_min=0, period_change_max=2).tolist() == [False, False, True]
+    assert index.symbols_in("How is bbb doing vs AAA?") in (["BBB", "AAA"], ["AAA", "BBB"])
+
+    index.save(tmp_path / "bm25")
+    loaded = LexicalIndex.load(tmp_path / "bm25")
+    assert loaded.search("rising") == index.search("rising") == [0, 2]
+    assert loaded.search("rising", mask=loaded.mask(symbol="AAA", end_date_from="2025-02-01")) == [2]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 2, 4]]) == [3, 2, 1, 4]  # 1/61 + 1/63 > 2/62
+
+
+def test_hybrid_retrieval_filters_to_the_named_symbol(docs):
+    embeddings = DeterministicFakeEmbedding(size=32)
+    db = FAISS.from_documents(docs, embeddings)
+    retriever = HybridRetriever(db, LexicalIndex.build(docs), k=3)
+    question = "What is the RSI trend for SYN0002?"
+    found = retriever.retrieve(question, embeddings.embed_query(question))
+    assert len(found) == 3 and {d.metadata["symbol"] for d in found} == {"SYN0002"}
+
+    # A chunk's own embedding is its nearest neighbour, searched within the filter or not
+    target = 5
+    vector = embeddings.embed_query(docs[target].page_content)
+    assert retriever.dense_search(vector, 1) == [target]
+    assert retriever.dense_search(vector, 1, mask=retriever.lexical.mask(symbol=docs[target].metadata["symbol"])) == [target]
+    assert retriever.dense_search(vector, 3, mask=retriever.lexical.mask(symbol="NOPE")) == []
+
+    with pytest.raises(ValueError, match="rebuild both"):
+        HybridRetriever(db, LexicalIndex.build(docs[:-1]))
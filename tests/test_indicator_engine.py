@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from indicator_engine import rolling
+
+
+def test_rolling_std_matches_pandas():
+    rng = np.random.default_rng(0)
+    x = 1000 + np.cumsum(rng.normal(0, 5, (20, 300)), axis=1)
+    x[1, 100:150] = 1234.5  # a halted stock
+    x[2, :30] = np.nan  # listed later
+    x[3, 200:205] = np.nan
+    out = rolling(x, "std", [5, 20], min_periods=2)
+    for w in (5, 20):
+        expected = pd.DataFrame(x.T).rolling(w, min_periods=2).std().to_numpy().T
+        np.testing.assert_allclose(out[w], expected, rtol=1e-8, atol=1e-9)
+        assert (out[w][1, 120:150] == 0).all()
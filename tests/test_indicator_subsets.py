@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from calculate_indicators import add_cross_sectional_features
+from dataset import load_stock_data
+from indicator_engine import INDICATORS, compute_indicators
+from rag_data_loader import frame_to_text_chunks
+from synthetic_data import generate_market_data
+
+SUBSETS = [["MA", "RSI", "BB", "MACD", "ATR"], ["ATR"], ["MA"], ["ADX", "OBV"], ["STOCH", "ICHIMOKU", "SUPERTREND"]]
+
+
+def processed(names):
+    """Processed rows as calculate_indicators writes them, with only the named indicators."""
+    df = generate_market_data(n_symbols=4, n_days=90).sort_values(["symbol", "tradedate"], ignore_index=True)
+    values = compute_indicators(df, names)
+    df[values.columns] = values
+    return add_cross_sectional_features(df)
+
+
+@pytest.fixture(scope="module")
+def api():
+    return pytest.importorskip("api")
+
+
+@pytest.mark.parametrize("names", SUBSETS)
+def test_chunks_mention_only_computed_indicators(names):
+    df = processed(names)
+    docs = frame_to_text_chunks(df)
+    assert docs
+    text = docs[-1].page_content
+    assert ("RSI:" in text) == ("RSI" in df.columns)
+    assert ("ATR(14)" in text) == ("ATR" in df.columns)
+    assert ("Bollinger Bands" in text) == ("BB_MID" in df.columns)
+    assert ("OBV" in text) == ("OBV" in df.columns)
+
+
+def test_chunks_with_all_indicators():
+    text = frame_to_text_chunks(processed(list(INDICATORS)))[-1].page_content
+    for label in ("MA20:", "RSI:", "MACD:", "ATR(14)", "Stochastic:", "Ichimoku:", "Supertrend(10,3)", "RSI="):
+        assert label in text
+
+
+@pytest.mark.parametrize("names", SUBSETS)
+def test_indicators_serves_present_groups(api, names, tmp_path):
+    path = tmp_path / "processed.csv"
+    processed(names).to_csv(path, index=False)
+    df = load_stock_data(path)
+    symbol = df["symbol"].iloc[0]
+
+    body = json.loads(api.indicators_json(df, symbol))
+    assert ("moving_averages" in body) == ("MA20" in df.columns)
+    assert ("volatility" in body) == ("ATR" in df.columns)
+    assert ("bollinger_bands" in body) == ("BB_MID" in df.columns)
+    assert ("rsi" in body.get("momentum", {})) == ("RSI" in df.columns)
+    assert body["market_context"]["volume_percentile"] is not None
+    assert ("rsi_percentile" in body["market_context"]) == ("RSI_RANK" in df.columns)
+    assert json.loads(api.stock_info_json(df, symbol))["symbol"] == symbol
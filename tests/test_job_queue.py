@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from job_queue import SCHEMA, JobQueue
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def crashed(path, **kwargs):
+    """A queue whose process 'died' mid-job: the job stays running with the lease it was claimed with."""
+    queue = JobQueue(path, {"echo": lambda payload: payload}, **kwargs)
+    job_id = queue.enqueue("echo", {"n": 1})
+    assert queue.claim()["id"] == job_id
+    return job_id
+
+
+def test_restart_within_the_lease_picks_the_job_up_once_it_runs_out(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    job_id = crashed(path, lease=0.3)
+    queue = JobQueue(path, {"echo": lambda payload: payload}, lease=0.3, poll=0.01).start()
+    try:
+        assert queue.get(job_id)["status"] == "running"  # restarted before the lease ran out
+        wait_for(lambda: queue.get(job_id)["status"] == "succeeded")
+        assert queue.get(job_id)["attempts"] == 2
+    finally:
+        queue.stop()
+
+
+def test_expired_job_out_of_attempts_is_dead_lettered(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    job_id = crashed(path, lease=0.05, max_attempts=1)
+    time.sleep(0.1)
+    queue = JobQueue(path, {"echo": lambda payload: payload}, lease=0.05, max_attempts=1)
+    queue.sweep()
+    job = queue.get(job_id)
+    assert job["status"] == "dead" and job["error"].startswith("Lease expired")
+
+
+def test_heartbeat_keeps_a_long_job_leased(tmp_path):
+    release = threading.Event()
+    runs = []
+
+    def slow(payload):
+        runs.append(payload)
+        release.wait(5)
+        return "done"
+
+    queue = JobQueue(tmp_path / "jobs.sqlite3", {"slow": slow}, workers=2, lease=0.2, poll=0.01).start()
+    try:
+        job_id = queue.enqueue("slow", {})
+        time.sleep(0.6)  # three leases; the idle worker's claims sweep expired ones
+        assert queue.get(job_id)["status"] == "running" and len(runs) == 1
+        release.set()
+        wait_for(lambda: queue.get(job_id)["status"] == "succeeded")
+    finally:
+        release.set()
+        queue.stop()
+
+
+@pytest.mark.parametrize("outcome", ["succeeds", "fails"])
+def test_worker_that_lost_its_lease_does_not_overwrite_the_job(tmp_path, outcome):
+    def stalled(payload):
+        if outcome == "fails":
+            raise RuntimeError("too late")
+        return "first"
+
+    path = tmp_path / "jobs.sqlite3"
+    queue = JobQueue(path, {"echo": stalled}, lease=0.05)
+    job_id = queue.enqueue("echo", {"n": 1}, webhook_url="https://example.com/hook")
+    job = queue.claim()
+    time.sleep(0.1)  # no heartbeat: the lease runs out and another queue takes the job over
+    other = JobQueue(path, {"echo": lambda payload: "second"}, lease=0.05)
+    other.run(other.claim())
+    delivered = []
+    queue.webhooks.submit = lambda *args: delivered.append(args)
+    queue.run(job)
+    job = queue.get(job_id)
+    assert (job["status"], job["result"], job["attempts"], job["error"]) == ("succeeded", "second", 2, None)
+    assert delivered == []
+    queue.webhooks.shutdown()
+    other.webhooks.shutdown()
+
+
+def test_database_from_before_lease_owners_is_migrated(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA.replace(",\n    lease_owner TEXT", ""))
+    conn.close()
+    queue = JobQueue(path, {"echo": lambda payload: payload}, lease=0.3, poll=0.01).start()
+    try:
+        job_id = queue.enqueue("echo", {"n": 1})
+        wait_for(lambda: queue.get(job_id)["status"] == "succeeded")
+    finally:
+        queue.stop()
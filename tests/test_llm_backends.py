@@ -0,0 +1,26 @@
+import pytest
+
+import llm_backends
+from stub_llm import StubChatModel
+
+
+@pytest.fixture
+def llamacpp(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "llamacpp")
+    monkeypatch.delenv("LLM_FALLBACK", raising=False)
+    monkeypatch.setenv("LLAMA_MODEL_PATH", "model.gguf")
+    monkeypatch.setenv("LLM_TIMEOUT_LLAMACPP", "0.2")
+    monkeypatch.setattr(llm_backends, "make_backend", lambda name: StubChatModel(latency=1.0))
+
+
+def test_lone_llamacpp_backend_is_timed_out(llamacpp):
+    llm = llm_backends.load_llm()
+    assert isinstance(llm, llm_backends.FailoverChatModel) and llm.timeouts == {"llamacpp": 0.2}
+    with pytest.raises(TimeoutError, match="llamacpp timed out"):
+        llm.invoke("Analyze stock NABIL for 2024-01-01 using a swing approach")
+
+
+def test_other_lone_backend_is_returned_as_is(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    monkeypatch.delenv("LLM_FALLBACK", raising=False)
+    assert isinstance(llm_backends.load_llm(), StubChatModel)
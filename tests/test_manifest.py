@@ -0,0 +1,26 @@
+from calculate_indicators import add_cross_sectional_features
+from indicator_engine import compute_indicators
+from manifest import MANIFEST_FIELDS, build_manifest
+from synthetic_data import generate_market_data
+
+
+def processed_csv(path, names):
+    df = generate_market_data(n_symbols=3, n_days=60).sort_values(["symbol", "tradedate"], ignore_index=True)
+    values = compute_indicators(df, names)
+    df[values.columns] = values
+    add_cross_sectional_features(df).to_csv(path, index=False)
+    return path
+
+
+def test_manifest_of_subset_built_file(tmp_path):
+    manifest = build_manifest(processed_csv(tmp_path / "processed.csv", ["ATR"]))
+    latest = manifest["latest"]
+    assert len(manifest["symbols"]) == 3
+    assert set(latest) == {"date", *MANIFEST_FIELDS.values()}
+    assert latest["rsi"] == latest["ma20"] == latest["ma50"] == [None] * 3
+    assert all(isinstance(close, float) for close in latest["close"])
+
+
+def test_manifest_with_all_fields(tmp_path):
+    latest = build_manifest(processed_csv(tmp_path / "processed.csv", ["MA", "RSI"]))["latest"]
+    assert all(value is not None for field in ("rsi", "ma20", "ma50") for value in latest[field])
@@ -0,0 +1,64 @@
+import random
+import time
+
+import pytest
+
+from markdown_formatter import format_markdown, format_output_regex, format_stream
+
+# Fragments that exercise every rule: numbered items, headings, bold labels, section icons and blank-line runs
+FRAGMENTS = ["1. ", "2.", "12. ", "3.\n", "Title", "Body text ", "a", " ", ":", ": ", "**", "**Label:**", "\n", "\n\n",
+             "\n\n\n", "## ", "### ", "## 🎯 ", "## ⚠️ ", "#", "Rs. 230.28", "x: y", "🎯", "\t"]
+
+
+def random_text(rng, size):
+    return "".join(rng.choice(FRAGMENTS) for _ in range(size))
+
+
+def random_chunks(rng, text):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 12))))
+    return [text[a:b] for a, b in zip([0, *cuts], [*cuts, len(text)])]
+
+
+def test_matches_regex_on_a_response():
+    text = ("##  RECOMMENDATION\n**Action:** HOLD\n## 🎯 WHY HOLD?\n1. **Trend:** below MA50.\n"
+            "### 3️⃣ MACD\n1. MACD Position: below the signal line. 2. Crossover: None 3. Momentum: weak\n\n\n\nEnd")
+    assert format_markdown(text) == format_output_regex(text)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fuzz_matches_regex(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        text = random_text(rng, rng.randint(0, 60))
+        expected = format_output_regex(text)
+        assert format_markdown(text) == expected, repr(text)
+        assert "".join(format_stream(random_chunks(rng, text))) == expected, repr(text)
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_pathological_input_is_linear():
+    # "1. a 1. a ..." without a colon makes the reference regex backtrack quadratically (seconds at 64k characters);
+    # here 4,000 and 64,000 repetitions, i.e. 20k and 320k characters
+    small, large = "1. a " * 4000, "1. a " * 64000
+    assert format_markdown(small) == format_output_regex(small)
+    small_s, large_s = best_of(lambda: format_markdown(small)), best_of(lambda: format_markdown(large))
+    assert large_s < 0.5
+    # 16x the input; quadratic would be ~256x
+    assert large_s < 40 * max(small_s, 1e-4)
+
+
+def test_pathological_stream_is_linear():
+    text = "1. a " * 64000
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+    start = time.perf_counter()
+    out = "".join(format_stream(chunks))
+    assert time.perf_counter() - start < 2.0
+    assert out == format_markdown(text)
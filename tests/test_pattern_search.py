@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import load_stock_data
+from indicator_engine import compute_indicators
+from pattern_search import PatternIndex
+from synthetic_data import generate_market_data
+
+LAG = 200  # calendar days COPY's history runs ahead of SYN0000's
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    """Eight symbols, plus COPY: SYN0000's history replayed LAG days earlier."""
+    df = generate_market_data(n_symbols=8, n_days=300, seed=3)
+    copy = df[df["symbol"] == "SYN0000"].copy()
+    copy["symbol"] = "COPY"
+    copy["tradedate"] = (pd.to_datetime(copy["tradedate"]) - pd.Timedelta(days=LAG)).dt.strftime("%Y-%m-%d")
+    df = pd.concat([df, copy]).sort_values(["symbol", "tradedate"], ignore_index=True)
+    df["RSI"] = compute_indicators(df, ["RSI"])["RSI"]
+    path = tmp_path_factory.mktemp("data") / "processed.csv"
+    df.to_csv(path, index=False)
+    return PatternIndex(load_stock_data(path), workers=2)
+
+
+def test_past_query_finds_the_settled_replay(index):
+    s, copy = index.position["SYN0000"], index.position["COPY"]
+    end_day = index.days[s, 250]
+    (_, t), found = index.search("SYN0000", window=20, k=5, end_day=end_day)
+    row, end, distance = found[0]
+    assert (row, index.days[row, end], t) == (copy, end_day - LAG, 250) and distance < 1e-6
+
+
+@pytest.mark.parametrize("position", [60, 150, 250])
+def test_past_query_sees_no_outcome_from_its_future(index, position):
+    s = index.position["SYN0000"]
+    end_day = index.days[s, position]
+    _, found = index.search("SYN0000", window=20, k=10, end_day=end_day)
+    assert found
+    longest = max(index.horizons)
+    for row, end, _ in found:
+        # Other symbols too: COPY's window ending on end_day is an exact match, but its outcome is in the future
+        settles = index.days[row, min(end + longest, index.lengths[row] - 1)]
+        assert settles <= end_day
+        assert not np.isnan(index.forward[:, row, end]).any()
+
+
+def test_latest_query_excludes_its_own_overlapping_windows(index):
+    (s, t), found = index.search("SYN0001", window=10, k=10)
+    assert len(found) == 10 and t == index.lengths[s] - 1
+    assert all(abs(end - t) >= 10 for row, end, _ in found if row == s)
+    distances = [distance for _, _, distance in found]
+    assert distances == sorted(distances)
+
+
+def test_empty_index(tmp_path):
+    df = generate_market_data(n_symbols=3, n_days=22).sort_values(["symbol", "tradedate"], ignore_index=True)
+    df["RSI"] = 50.0
+    df.to_csv(tmp_path / "processed.csv", index=False)
+    index = PatternIndex(load_stock_data(tmp_path / "processed.csv"), workers=1)
+    assert index.windows()[20] == 0  # no 20-day window has a known 5-day outcome yet
+    day = index.days[0, 21]
+    assert index.search("SYN0000", window=20)[1] == []
+    assert index.search("SYN0000", window=20, end_day=day)[1] == []
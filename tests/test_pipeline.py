@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from pipeline import Hasher, Pipeline, Stage, build_pipeline, chunk_partitions
+from rag_data_loader import frame_to_text_chunks
+from synthetic_data import generate_market_data, write_market_data
+
+
+def copy_stage(name, source, target, runs):
+    def run(pipeline):
+        runs.append(name)
+        target.write_text(source.read_text().upper())
+    return Stage(name, run, inputs=[source], outputs=[target])
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / "a.txt").write_text("one")
+    return {name: tmp_path / f"{name}.txt" for name in "abc"}
+
+
+def pipeline(files, runs, tmp_path):
+    # Listed out of order: b reads a, c reads b
+    stages = [copy_stage("c", files["b"], files["c"], runs), copy_stage("b", files["a"], files["b"], runs)]
+    return Pipeline(stages, state_path=tmp_path / "state.json")
+
+
+def test_stages_rerun_only_when_inputs_or_outputs_change(files, tmp_path):
+    runs = []
+    report = pipeline(files, runs, tmp_path).run()
+    assert {stage: result["status"] for stage, result in report.items()} == {"b": "ran", "c": "ran"}
+    assert runs == ["b", "c"] and files["c"].read_text() == "ONE"
+
+    runs.clear()
+    pipeline(files, runs, tmp_path).run()
+    assert runs == []
+
+    files["a"].write_text("One")  # b reruns, but writes the same "ONE": c stays fresh
+    pipeline(files, runs, tmp_path).run()
+    assert runs == ["b"]
+
+    runs.clear()
+    files["c"].unlink()
+    pipeline(files, runs, tmp_path).run()
+    assert runs == ["c"]
+
+    runs.clear()
+    pipeline(files, runs, tmp_path).run(force=["all"])
+    assert runs == ["b", "c"]
+
+
+def test_missing_input_and_cycles(files, tmp_path):
+    with pytest.raises(FileNotFoundError, match="input"):
+        Pipeline([copy_stage("b", files["b"], files["c"], [])], state_path=tmp_path / "state.json").run()
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([copy_stage("b", files["a"], files["b"], []), copy_stage("a", files["b"], files["a"], [])])
+
+
+def test_hasher_rereads_only_changed_files(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_text("one")
+    hasher = Hasher()
+    first = hasher.file(path)
+    hasher.memo[str(path)][2] = "memoized"
+    assert hasher.file(path) == "memoized"  # same size and mtime: not read
+    path.write_text("two")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert hasher.file(path) not in (first, "memoized")
+    assert Hasher().digest(tmp_path) != Hasher().digest(path) and Hasher().digest(tmp_path / "none") is None
+
+
+def test_partitioned_chunks_match_a_single_pass():
+    df = generate_market_data(n_symbols=9, n_days=30).sort_values(["symbol", "tradedate"], ignore_index=True)
+    expected = frame_to_text_chunks(df, 20)
+    got = chunk_partitions(df, 20, workers=2)
+    assert [doc.page_content for doc in got] == [doc.page_content for doc in expected]
+    assert [doc.metadata for doc in got] == [doc.metadata for doc in expected]
+
+
+def test_built_pipeline_end_to_end(tmp_path):
+    pytest.importorskip("build_vector_store")
+    raw = tmp_path / "raw.csv"
+    write_market_data(raw, n_symbols=4, n_days=70)
+    paths = {"processed": tmp_path / "processed" / "stock_data_with_indicators.csv",
+             "chunks": tmp_path / "processed" / "chunks.jsonl", "vector_store": tmp_path / "vectorstore",
+             "manifest": tmp_path / "manifest.json"}
+    build = lambda: build_pipeline(raw, **paths, embeddings="fake", state_path=tmp_path / "state.json", workers=1)
+    report = build().run()
+    assert {stage: result["status"] for stage, result in report.items()} == dict.fromkeys(
+        ["indicators", "chunks", "index", "timeframes", "manifest"], "ran")
+    assert len(json.loads(paths["manifest"].read_text())["symbols"]) == 4
+    assert (tmp_path / "processed" / "stock_data_with_indicators_weekly.csv").exists()
+    assert all(result["status"] == "skipped" for result in build().run().values())
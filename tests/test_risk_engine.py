@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+
+from dataset import load_stock_data
+from indicator_engine import compute_indicators
+from risk_engine import batch_risk, describe, risk_inputs, simulate
+from synthetic_data import generate_market_data
+
+
+def inputs(closes, atr=np.nan, bb=(np.nan, np.nan)):
+    return {"symbol": "TEST", "day": 20000, "closes": np.asarray(closes, dtype=np.float64), "close": float(closes[-1]),
+            "atr": atr, "bb_upper": bb[0], "bb_lower": bb[1]}
+
+
+@pytest.fixture(scope="module")
+def walk():
+    return 500 * np.exp(np.cumsum(np.random.default_rng(1).normal(0.001, 0.02, 251)))
+
+
+def test_normal_var_matches_the_closed_form(walk):
+    risk = simulate(inputs(walk), method="normal")
+    returns = np.diff(np.log(walk))
+    mean, std = returns.mean() * 20, returns.std() * math.sqrt(20)
+    for level, z in ((95, 1.6449), (99, 2.3263)):
+        assert risk[f"var_{level}_percent"] == pytest.approx(-math.expm1(mean - z * std) * 100, abs=0.3)
+        assert risk[f"cvar_{level}_percent"] > risk[f"var_{level}_percent"]
+    assert risk["daily_volatility_percent"] == pytest.approx(returns.std() * 100, abs=0.01)
+
+
+def test_same_data_same_numbers(walk):
+    assert simulate(inputs(walk), paths=5000) == simulate(inputs(walk), paths=5000)
+    assert simulate(inputs(walk), paths=5000) != simulate(inputs(walk), paths=5000, seed=1)
+
+
+def test_levels(walk):
+    close = walk[-1]
+    risk = simulate(inputs(walk, atr=close * 0.02, bb=(close * 1.05, close * 0.95)), paths=20000)
+    atr, bollinger = risk["levels"]["atr"], risk["levels"]["bollinger"]
+    assert atr["stop"] == round(close * 0.96, 2) and atr["target"] == round(close * 1.08, 2)
+    assert bollinger["stop"] == round(close * 0.95, 2)
+    for level in (atr, bollinger):
+        assert level["p_target_first"] + level["p_stop_first"] + level["p_neither"] == pytest.approx(1, abs=0.002)
+    # The wider Bollinger stop is hit first less often than the 2 x ATR one
+    assert bollinger["p_stop_first"] < atr["p_stop_first"]
+    assert "Stop Rs." in describe(risk)
+
+
+def test_missing_levels_and_short_history(walk):
+    assert simulate(inputs(walk), paths=1000)["levels"] == {"atr": None, "bollinger": None}
+    assert simulate(inputs(walk[:20]), paths=1000) is None
+    assert describe(None) == ""
+
+
+def test_batch_matches_single_symbol_runs(tmp_path):
+    df = generate_market_data(n_symbols=4, n_days=300, seed=2).sort_values(["symbol", "tradedate"], ignore_index=True)
+    df[["ATR", "BB_UPPER", "BB_MID", "BB_LOWER"]] = compute_indicators(df, ["ATR", "BB"])[["ATR", "BB_UPPER", "BB_MID", "BB_LOWER"]]
+    df.to_csv(tmp_path / "processed.csv", index=False)
+    df = load_stock_data(tmp_path / "processed.csv")
+    results = batch_risk(df, symbols=["SYN0001", "SYN0003"], workers=2, paths=2000)
+    assert list(results) == ["SYN0001", "SYN0003"]
+    rows = df[df["symbol"] == "SYN0003"]
+    assert results["SYN0003"] == simulate(risk_inputs(rows), paths=2000)
+    assert results["SYN0003"]["history_days"] == 250 and results["SYN0003"]["levels"]["atr"] is not None
@@ -0,0 +1,57 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from semantic_cache import SemanticCache, cache_question
+
+STRATEGIES = ["multi-strategy", "trend-following", "mean reversion", "swing trading", "breakout/pullback"]
+
+
+class BagOfWords:
+    """Word-count embeddings: texts that share most of their words score close to 1, as with a sentence model."""
+
+    size = 512
+
+    def embed_query(self, text):
+        vector = np.zeros(self.size, dtype="float32")
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.size] += 1
+        return vector.tolist()
+
+
+def cosine(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return float(a @ b / np.linalg.norm(a) / np.linalg.norm(b))
+
+
+def test_full_template_makes_strategies_look_alike():
+    # Why the cache doesn't embed build_question: only the strategy word differs between requests
+    build_question = pytest.importorskip("rag_trading_bot").build_question
+    embeddings = BagOfWords()
+    swing, trend = (embeddings.embed_query(build_question("NABIL", s)) for s in ("swing", "trend-following"))
+    assert cosine(swing, trend) > 0.95
+
+
+@pytest.mark.parametrize("stored, asked", [(a, b) for a in STRATEGIES for b in STRATEGIES if a != b])
+def test_other_strategy_misses(stored, asked):
+    cache = SemanticCache(BagOfWords(), threshold=0.95)
+    cache.store("v1", ("NABIL", "markdown"), cache_question(stored), stored)
+    answer, _ = cache.lookup("v1", ("NABIL", "markdown"), cache_question(asked))
+    assert answer is None
+
+
+@pytest.mark.parametrize("stored, asked", [("trend-following", "Trend Following"), ("mean reversion", "Mean-Reversion"),
+                                           ("swing trading", "  swing   trading ")])
+def test_same_strategy_spelled_differently_hits(stored, asked):
+    cache = SemanticCache(BagOfWords(), threshold=0.95)
+    cache.store("v1", ("NABIL", "markdown"), cache_question(stored), stored)
+    assert cache.lookup("v1", ("NABIL", "markdown"), cache_question(asked))[0] == stored
+
+
+def test_other_symbol_and_new_version_miss():
+    cache = SemanticCache(BagOfWords(), threshold=0.95)
+    cache.store("v1", ("NABIL", "markdown"), cache_question("swing"), "answer")
+    assert cache.lookup("v1", ("NICA", "markdown"), cache_question("swing"))[0] is None
+    assert cache.lookup("v2", ("NABIL", "markdown"), cache_question("swing"))[0] is None
@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeframes import calculate_timeframes, period_starts, resample_bars, timeframe_path
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def day(text):
+    return (datetime.date.fromisoformat(text) - EPOCH).days
+
+
+def rows(symbol, dates, closes, volumes=None):
+    volumes = volumes or [100.0] * len(dates)
+    return pd.DataFrame({"symbol": symbol, "tradedate": dates, "open": [c - 1 for c in closes],
+                         "high": [c + 2 for c in closes], "low": [c - 3 for c in closes], "close": closes,
+                         "vwap": closes, "vol": volumes, "turnover": [c * v for c, v in zip(closes, volumes)]})
+
+
+def test_weeks_start_on_sunday_and_months_on_the_first():
+    # 2025-11-02 was a Sunday, 2025-11-06 the Thursday after it
+    assert period_starts([day("2025-11-02"), day("2025-11-06"), day("2025-11-08")], "weekly").tolist() == \
+        [day("2025-11-02")] * 3
+    assert period_starts([day("2025-11-09")], "weekly").tolist() == [day("2025-11-09")]
+    assert period_starts([day("2025-11-30"), day("2025-12-01")], "monthly").tolist() == \
+        [day("2025-11-01"), day("2025-12-01")]
+    with pytest.raises(ValueError):
+        period_starts([0], "yearly")
+
+
+def test_weekly_bars():
+    df = rows("AAA", ["2025-11-02", "2025-11-03", "2025-11-06", "2025-11-09", "2025-11-10"],
+              [100.0, 104.0, 102.0, 110.0, 112.0], [10.0, 30.0, 60.0, 0.0, 50.0])
+    bars = resample_bars(df, "weekly")
+    assert bars["tradedate"].tolist() == ["2025-11-06", "2025-11-10"]  # dated by their last trading day
+    first, second = bars.iloc[0], bars.iloc[1]
+    assert (first["days"], first["open"], first["high"], first["low"], first["close"]) == (3, 99.0, 106.0, 97.0, 102.0)
+    assert first["vol"] == 100.0 and first["vwap"] == pytest.approx((100 * 10 + 104 * 30 + 102 * 60) / 100, abs=0.01)
+    assert np.isnan(first["diff %"]) and second["diff %"] == pytest.approx(round((112 / 102 - 1) * 100, 2))
+    assert second["days"] == 2 and second["vwap"] == 112.0
+
+
+def test_bars_never_mix_symbols():
+    df = pd.concat([rows("AAA", ["2025-11-02", "2025-11-03"], [10.0, 11.0]),
+                    rows("BBB", ["2025-11-03", "2025-12-01"], [50.0, 55.0])], ignore_index=True)
+    bars = resample_bars(df, "monthly")
+    assert bars[["symbol", "close", "days"]].values.tolist() == [["AAA", 11.0, 2], ["BBB", 50.0, 1], ["BBB", 55.0, 1]]
+    assert np.isnan(bars["diff %"].iloc[1]) and bars["diff %"].iloc[2] == 10.0
+
+
+def test_calculate_timeframes_writes_bars_with_indicators(tmp_path):
+    dates = pd.bdate_range("2024-01-01", periods=400).strftime("%Y-%m-%d").tolist()
+    closes = (100 + np.cumsum(np.random.default_rng(0).normal(0, 1, 400))).round(2).tolist()
+    processed = tmp_path / "stock_data_with_indicators.csv"
+    results = calculate_timeframes(rows("AAA", dates, closes), processed, indicators=["MA", "RSI"])
+    weekly = pd.read_csv(timeframe_path(processed, "weekly"))
+    assert timeframe_path(processed, "weekly").name == "stock_data_with_indicators_weekly.csv"
+    assert len(weekly) == len(results["weekly"]) == 80 and "MA20" in weekly and "ATR" not in weekly
+    assert weekly["MA20"].iloc[-1] == pytest.approx(weekly["close"].iloc[-20:].mean(), rel=1e-6)
+    assert len(pd.read_csv(timeframe_path(processed, "monthly"))) == 19
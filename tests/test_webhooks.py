@@ -0,0 +1,57 @@
+import pytest
+
+import webhooks
+from job_queue import JobQueue
+from test_job_queue import wait_for
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/hook", "http://localhost/hook", "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/hook", "http://192.168.1.1/hook", "http://[::1]/hook", "http://[::ffff:127.0.0.1]/hook",
+    "http://0.0.0.0/hook", "ftp://example.com/hook", "http:///hook", "http://example.com:99999/hook",
+])
+def test_webhook_to_internal_or_malformed_url_is_refused(url):
+    with pytest.raises(ValueError):
+        webhooks.check_url(url, allowed_hosts=set())
+
+
+def test_webhook_allowlist():
+    assert webhooks.check_url("http://10.0.0.5/hook", allowed_hosts={"10.0.0.5"})
+    with pytest.raises(ValueError, match="WEBHOOK_ALLOWED_HOSTS"):
+        webhooks.check_url("https://example.com/hook", allowed_hosts={"10.0.0.5"})
+
+
+def test_webhook_to_public_address(monkeypatch):
+    monkeypatch.setattr(webhooks.socket, "getaddrinfo", lambda *args, **kwargs: [(2, 1, 6, "", ("93.184.215.14", 443))])
+    assert webhooks.check_url("https://example.com/hook", allowed_hosts=set()) == "https://example.com/hook"
+
+
+class Response:
+    status_code, ok = 204, True
+
+
+def test_post_rechecks_the_url_and_never_follows_redirects(monkeypatch):
+    calls = []
+    monkeypatch.setattr(webhooks.requests, "post", lambda url, **kwargs: calls.append((url, kwargs)) or Response())
+    monkeypatch.setattr(webhooks, "ALLOWED_HOSTS", {"hooks.example.com"})
+    assert webhooks.post("https://hooks.example.com/in", {"id": 1}).status_code == 204
+    assert calls == [("https://hooks.example.com/in", {"json": {"id": 1}, "timeout": webhooks.TIMEOUT,
+                                                       "allow_redirects": False})]
+    with pytest.raises(ValueError):
+        webhooks.post("https://elsewhere.example.com/in", {"id": 2})
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("post, outcome", [
+    (lambda url, payload: Response(), "204"),
+    (lambda url, payload: webhooks.check_url("http://127.0.0.1/hook", allowed_hosts=set()), "refused"),
+])
+def test_finished_job_records_its_webhook_outcome(tmp_path, monkeypatch, post, outcome):
+    monkeypatch.setattr(webhooks, "post", post)
+    queue = JobQueue(tmp_path / "jobs.sqlite3", {"echo": lambda payload: payload}, poll=0.01).start()
+    try:
+        job_id = queue.enqueue("echo", {"n": 1}, webhook_url="https://hooks.example.com/in")
+        wait_for(lambda: queue.get(job_id)["webhook_status"] is not None)
+        assert queue.get(job_id)["webhook_status"] == outcome
+    finally:
+        queue.stop()